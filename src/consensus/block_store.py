@@ -1,14 +1,20 @@
-from typing import Dict
-from .types import BlockHeader
+from typing import Dict, Optional, Union
+from .types import Block, BlockHeader
 
 
 class BlockStore:
 
     def __init__(self):
-        self.blocks: Dict[str, BlockHeader] = {}
+        self.blocks: Dict[str, Union[Block, BlockHeader]] = {}
+        self._last: Optional[Union[Block, BlockHeader]] = None
 
-    def save(self, header: BlockHeader):
+    def save(self, header: Union[Block, BlockHeader]):
         self.blocks[header.block_id] = header
+        if self._last is None or header.height >= self._last.height:
+            self._last = header
 
     def get(self, block_id: str):
         return self.blocks.get(block_id)
+
+    def get_last_block_hash(self) -> str:
+        return self._last.block_id if self._last is not None else "0" * 64
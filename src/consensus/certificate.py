@@ -0,0 +1,242 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from src.consensus.validator_set import ValidatorSet
+from src.crypto.keys import load_public_key
+from src.encoding.codec import encode_vote_for_signing
+
+# Chứng chỉ quorum (QC): gom +2/3 phiếu của một (height, round, phase, block_hash) thành một message.
+# - bitmap: bit i = validator thứ i của ValidatorSet (thứ tự id đã sort, trùng chỉ số của VoteTally),
+#   nên collector lấy thẳng bitset của tally, không dựng lại danh sách voter.
+# - Ở chế độ aggregation, validator chỉ gửi phiếu cho collector (proposer của round); collector phát
+#   một QC cho mọi node -> mỗi phase O(n) message thay vì O(n^2).
+# - CommitCertificate: bằng chứng finality lưu cùng ledger (bitmap + chữ ký PRECOMMIT theo thứ tự bit),
+#   kiểm bằng CertificateVerifier: một lượt qua mọi chứng chỉ, public key nạp một lần cho mỗi validator,
+#   phần đầu sign-bytes (gồm height, round, phase, block_hash) dựng một lần cho mỗi chứng chỉ.
+
+
+def _power_of_bitmap(bitmap: int, powers: Sequence[int]) -> int:
+    total = 0
+    idx = 0
+    while bitmap:
+        if bitmap & 1:
+            total += powers[idx]
+        bitmap >>= 1
+        idx += 1
+    return total
+
+
+@dataclass(frozen=True, slots=True)
+class QuorumCertificate:
+    height: int
+    round: int
+    phase: str
+    block_hash: Optional[str]
+    bitmap: int
+    aggregator: str = ""
+    # Chữ ký hex theo thứ tự bit (mọi phase, khi phiếu có ký): follower kiểm QC trước khi tin và
+    # dựng CommitCertificate từ QC precommit
+    signatures: Tuple[str, ...] = ()
+
+    def voters(self, validator_set: ValidatorSet) -> List[str]:
+        ids = validator_set.ids
+        return [ids[i] for i in range(len(ids)) if self.bitmap >> i & 1]
+
+    def power(self, validator_set: ValidatorSet) -> int:
+        return _power_of_bitmap(self.bitmap, validator_set.powers)
+
+    def verify(self, validator_set: ValidatorSet) -> bool:
+        """
+        Bitmap chỉ chứa validator hợp lệ và tổng power đạt quorum.
+        """
+        if self.bitmap <= 0 or self.bitmap >> len(validator_set.ids):
+            return False
+        return self.power(validator_set) >= validator_set.quorum_power
+
+    def to_wire(self) -> Dict[str, Any]:
+        return {
+            "type": "QC",
+            "height": self.height,
+            "round": self.round,
+            "phase": self.phase,
+            "block_hash": self.block_hash,
+            # Hex: bitmap của cụm lớn vẫn là chuỗi ngắn, an toàn với JSON
+            "bitmap": format(self.bitmap, "x"),
+            "from": self.aggregator,
+            "signatures": list(self.signatures),
+        }
+
+    @classmethod
+    def from_wire(cls, payload: Dict[str, Any]) -> "QuorumCertificate":
+        return cls(
+            height=payload["height"],
+            round=payload.get("round", 0),
+            phase=payload["phase"],
+            block_hash=payload.get("block_hash"),
+            bitmap=int(payload["bitmap"], 16),
+            aggregator=payload.get("from", ""),
+            signatures=tuple(payload.get("signatures", ())),
+        )
+
+
+def vote_sign_bytes(height: int, round_num: int, phase: str, block_hash: Optional[str], voter: str,
+                    chain_id: str = "") -> bytes:
+    """
+    Sign-bytes của phiếu (domain VOTE:chain_id, encode_vote_for_signing), gồm cả round:
+    chữ ký của round này không dùng lại được cho round khác.
+    """
+    return encode_vote_for_signing({"height": height, "round": round_num, "block_hash": block_hash,
+                                    "phase": phase, "voter": voter}, chain_id)
+
+
+def precommit_sign_bytes(height: int, round_num: int, block_hash: Optional[str], voter: str,
+                         chain_id: str = "") -> bytes:
+    return vote_sign_bytes(height, round_num, "PRECOMMIT", block_hash, voter, chain_id)
+
+
+def _vote_prefix(height: int, round_num: int, phase: str, block_hash: Optional[str], chain_id: str) -> bytes:
+    # canonical_json sort key -> "voter" là key cuối: sign-bytes = prefix + json(voter) + "}"
+    return vote_sign_bytes(height, round_num, phase, block_hash, "", chain_id)[:-3]
+
+
+@dataclass(frozen=True, slots=True)
+class CommitCertificate:
+    height: int
+    round: int
+    block_hash: str
+    bitmap: int
+    # Chữ ký (bytes) của từng validator trong bitmap, theo thứ tự bit; rỗng nếu phiếu không ký
+    signatures: Tuple[bytes, ...] = ()
+
+    @property
+    def signed(self) -> bool:
+        return bool(self.signatures)
+
+    def voters(self, validator_set: ValidatorSet) -> List[str]:
+        ids = validator_set.ids
+        return [ids[i] for i in range(len(ids)) if self.bitmap >> i & 1]
+
+    def to_wire(self) -> Dict[str, Any]:
+        return {
+            "height": self.height,
+            "round": self.round,
+            "block_hash": self.block_hash,
+            "bitmap": format(self.bitmap, "x"),
+            "signatures": [sig.hex() for sig in self.signatures],
+        }
+
+    @classmethod
+    def from_wire(cls, payload: Dict[str, Any]) -> "CommitCertificate":
+        return cls(
+            height=payload["height"],
+            round=payload.get("round", 0),
+            block_hash=payload["block_hash"],
+            bitmap=int(payload["bitmap"], 16),
+            signatures=tuple(bytes.fromhex(sig) for sig in payload.get("signatures", ())),
+        )
+
+
+class CertificateVerifier:
+    """
+    verifier = CertificateVerifier(validator_set, pubkeys={id: pub_bytes}, chain_id="chain-demo")
+    verifier.verify_batch(certs) -> bool;  verifier.verify_chain(ledger, certs) -> bool
+    pubkeys=None: chỉ kiểm bitmap/power (simulation không ký phiếu), như require_signature=False.
+    """
+
+    def __init__(self, validator_set: ValidatorSet, pubkeys: Optional[Mapping[str, bytes]] = None,
+                 chain_id: str = ""):
+        self.validator_set = validator_set
+        self.pubkeys = pubkeys
+        self.chain_id = chain_id
+        self._n = len(validator_set.ids)
+        self._powers = list(validator_set.powers)
+        self._quorum = validator_set.quorum_power
+        # Public key đã nạp, theo chỉ số validator (nạp lười, một lần)
+        self._keys: Dict[int, Any] = {}
+        # json(voter) dựng sẵn cho phần đuôi sign-bytes
+        self._voter_suffix = [json.dumps(vid).encode("utf-8") + b"}" for vid in validator_set.ids]
+
+    def _key(self, idx: int):
+        key = self._keys.get(idx)
+        if key is None:
+            key = self._keys[idx] = load_public_key(self.pubkeys[self.validator_set.ids[idx]])
+        return key
+
+    def verify_signature(self, voter: str, message: bytes, signature: bytes) -> bool:
+        """
+        Một chữ ký đơn lẻ (vd. phiếu nhận qua network), dùng chung cache public key.
+        """
+        idx = self.validator_set.index.get(voter)
+        if idx is None or self.pubkeys is None or voter not in self.pubkeys:
+            return False
+        try:
+            self._key(idx).verify(signature, message)
+            return True
+        except Exception:
+            return False
+
+    def verify(self, cert: CommitCertificate) -> bool:
+        return self.verify_batch((cert,))
+
+    def verify_batch(self, certs: Iterable[CommitCertificate]) -> bool:
+        """
+        Một lượt qua mọi chứng chỉ: bitmap hợp lệ, power >= quorum, rồi từng chữ ký theo thứ tự bit.
+        Dừng ở lỗi đầu tiên.
+        """
+        for cert in certs:
+            if not self._check(cert.height, cert.round, "PRECOMMIT", cert.block_hash, cert.bitmap,
+                               cert.signatures):
+                return False
+        return True
+
+    def verify_quorum(self, qc: QuorumCertificate) -> bool:
+        """
+        QC của mọi phase (kể cả NIL): như verify_batch, chữ ký hex theo thứ tự bit.
+        """
+        try:
+            sigs = tuple(bytes.fromhex(sig) for sig in qc.signatures)
+        except ValueError:
+            return False
+        return self._check(qc.height, qc.round, qc.phase, qc.block_hash, qc.bitmap, sigs)
+
+    def _check(self, height: int, round_num: int, phase: str, block_hash: Optional[str], bitmap: int,
+               signatures: Sequence[bytes]) -> bool:
+        if bitmap <= 0 or bitmap >> self._n:
+            return False
+        if _power_of_bitmap(bitmap, self._powers) < self._quorum:
+            return False
+        if self.pubkeys is None:
+            return True
+        if len(signatures) != bitmap.bit_count():
+            return False
+        prefix = _vote_prefix(height, round_num, phase, block_hash, self.chain_id)
+        sigs = iter(signatures)
+        idx = 0
+        while bitmap:
+            if bitmap & 1:
+                try:
+                    self._key(idx).verify(next(sigs), prefix + self._voter_suffix[idx])
+                except Exception:
+                    return False
+            bitmap >>= 1
+            idx += 1
+        return True
+
+    def verify_chain(self, entries: Sequence[Mapping[str, Any]],
+                     certs: Mapping[int, CommitCertificate]) -> bool:
+        """
+        Kiểm một đoạn ledger (sync/light client): parent nối đúng, mỗi height có chứng chỉ cho đúng
+        hash, rồi batch-verify toàn bộ chứng chỉ.
+        """
+        batch = []
+        prev_hash = None
+        for entry in entries:
+            if prev_hash is not None and entry["parent_hash"] != prev_hash:
+                return False
+            cert = certs.get(entry["height"])
+            if cert is None or cert.height != entry["height"] or cert.block_hash != entry["hash"]:
+                return False
+            batch.append(cert)
+            prev_hash = entry["hash"]
+        return self.verify_batch(batch)
@@ -0,0 +1,97 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.consensus.types import Block
+from src.mempool import tx_hash
+
+# Compact block relay: proposal chỉ mang header + short id của từng tx thay vì cả dict tx.
+# - short id = sha256(salt || tx_hash)[:SHORT_ID_HEX]; salt = hash của block nên không tính trước được
+#   va chạm cho block chưa có.
+# - Người nhận dựng lại block từ mempool của mình (index short id -> tx), thiếu tx nào thì xin đúng các
+#   vị trí đó từ proposer (GETBLOCKTXN), proposer trả BLOCKTXN qua send_body trên header của proposal.
+#   Quá BLOCK_TXN_TIMEOUT_MS chưa đủ tx thì xin lại; proposal lặp lại từ node khác -> xin node đó.
+# - Block dựng lại được kiểm lại hash; va chạm short id (hiếm) -> xin toàn bộ tx.
+
+# 6 byte (12 hex) như short id của BIP-152
+SHORT_ID_HEX = 12
+# GETBLOCKTXN/BLOCKTXN rơi: quá hạn này chưa đủ tx thì xin lại phần còn thiếu
+BLOCK_TXN_TIMEOUT_MS = 100.0
+
+
+def short_id(salt: str, tx_id: str) -> str:
+    return hashlib.sha256((salt + tx_id).encode("ascii")).hexdigest()[:SHORT_ID_HEX]
+
+
+@dataclass(frozen=True, slots=True)
+class CompactBlock:
+    height: int
+    round: int
+    parent_hash: str
+    proposer: str
+    timestamp: float
+    hash: str
+    short_ids: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_block(cls, block: Block, tx_ids: Optional[Iterable[str]] = None) -> "CompactBlock":
+        tx_ids = tx_ids if tx_ids is not None else (tx_hash(tx) for tx in block.txs)
+        return cls(block.height, block.round, block.parent_hash, block.proposer, block.timestamp, block.hash,
+                   tuple(short_id(block.hash, tx_id) for tx_id in tx_ids))
+
+    def to_wire(self) -> Dict[str, Any]:
+        return {
+            "height": self.height,
+            "round": self.round,
+            "parent_hash": self.parent_hash,
+            "proposer": self.proposer,
+            "timestamp": self.timestamp,
+            "hash": self.hash,
+            "short_ids": list(self.short_ids),
+        }
+
+    @classmethod
+    def from_wire(cls, data: Dict[str, Any]) -> "CompactBlock":
+        return cls(
+            height=data["height"],
+            round=data.get("round", 0),
+            parent_hash=data.get("parent_hash", ""),
+            proposer=data.get("proposer", ""),
+            timestamp=data.get("timestamp", 0.0),
+            hash=data["hash"],
+            short_ids=tuple(data.get("short_ids", ())),
+        )
+
+    def match(self, pool) -> Tuple[List[Optional[Dict[str, Any]]], List[int]]:
+        """
+        Ghép short id với tx trong mempool: (danh sách tx theo vị trí, None nếu thiếu; các vị trí thiếu).
+        Salt theo block nên mỗi proposal phải băm lại pool (O(pool) sha256, như SipHash của BIP-152);
+        mỗi hash block chỉ được ghép một lần (proposal lặp lại đi qua _partial/block_store của helper) nên
+        không cache index theo salt. Dừng sớm khi mọi short id đã ghép được.
+        """
+        salt = self.hash
+        wanted = set(self.short_ids)
+        index: Dict[str, str] = {}
+        for tx_id in pool.ids():
+            sid = short_id(salt, tx_id)
+            if sid in wanted and sid not in index:
+                index[sid] = tx_id
+                if len(index) == len(wanted):
+                    break
+        txs: List[Optional[Dict[str, Any]]] = []
+        missing: List[int] = []
+        for pos, sid in enumerate(self.short_ids):
+            tx_id = index.get(sid)
+            tx = pool.get(tx_id) if tx_id is not None else None
+            if tx is None:
+                missing.append(pos)
+            txs.append(tx)
+        return txs, missing
+
+    def build(self, txs: Iterable[Dict[str, Any]]) -> Optional[Block]:
+        """
+        Block đầy đủ từ tx đã ghép; None nếu hash không khớp (va chạm short id hoặc tx sai).
+        """
+        block = Block(height=self.height, round=self.round, parent_hash=self.parent_hash, proposer=self.proposer,
+                      txs=tuple(txs), timestamp=self.timestamp)
+        return block if block.hash == self.hash else None
@@ -12,6 +12,8 @@ class ConsensusStep(enum.Enum):
 TIMEOUT_PROPOSE = 3.0
 TIMEOUT_PREVOTE = 2.0
 TIMEOUT_PRECOMMIT = 2.0
+# Mỗi round tăng thêm (backoff tuyến tính mặc định của TimeoutPolicy)
+TIMEOUT_DELTA = 0.5
 
 # --- Domain Separation Contexts ---
 #  Use explicit context strings so signature valid for one message type 
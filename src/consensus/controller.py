@@ -1,75 +1,186 @@
-from typing import Optional, Any
+from typing import Optional, Any, Callable, Dict, List
 from src.consensus.constants import (
     ConsensusStep,
-    TIMEOUT_PROPOSE,
-    TIMEOUT_PREVOTE,
-    TIMEOUT_PRECOMMIT,
     NIL_BLOCK_HASH,
 )
+from src.consensus.message_buffer import MessageBuffer
+from src.consensus.timeouts import TimeoutPolicy
+from src.consensus.tracing import Tracer, TraceLevel, get_tracer
 
 
 class ConsensusController:
-    def __init__(self, node_id: str, helper: Any, auto_advance: bool = True):
+    def __init__(self, node_id: str, helper: Any, auto_advance: bool = True,
+                 tracer: Optional[Tracer] = None, timeout_policy: Optional[TimeoutPolicy] = None,
+                 message_buffer: Optional[MessageBuffer] = None, pipelined: bool = False):
         """
         Khởi tạo bộ điều khiển đồng thuận.
         Args:
             node_id: Định danh của node hiện tại.
             helper: Interface giao tiếp với module khác (Helper implementation).
             auto_advance: Sau khi finalize block, có tự động start_round cho height mới không.
+            tracer: Tracer cho event có cấu trúc (mặc định: tracer của package, tắt).
+            timeout_policy: Timeout theo bước/round (mặc định: hằng số + backoff tuyến tính).
+            message_buffer: Bộ đệm proposal/quorum đến sớm theo (height, round).
+            pipelined: Proposer của height+1 đề xuất ngay khi lock block của height hiện tại
+                (parent = block đã lock), chồng pha PROPOSE của h+1 lên pha PRECOMMIT của h.
         """
         self.node_id = node_id
         self.helper = helper
         self.auto_advance = auto_advance
+        self.tracer = tracer if tracer is not None else get_tracer()
+        self.timeout_policy = timeout_policy if timeout_policy is not None else TimeoutPolicy()
+        # Đồng hồ (ms) để đo thời lượng bước cho policy adaptive; helper không có thì bỏ qua
+        self._clock = getattr(helper, "now_ms", None)
+        self._step_started_ms: Optional[float] = None
+        # Proposal/quorum của (height, round) hoặc bước chưa tới: phát lại khi controller tới đó
+        self.buffer = message_buffer if message_buffer is not None else MessageBuffer()
+
+        # --- Pipelining ---
+        self.pipelined = pipelined
+        # Hash block commit gần nhất: proposal (có thể gửi sớm) phải nối tiếp đúng block này
+        self.last_commit_hash: Optional[str] = None
+        # Proposal gửi sớm cho height kế tiếp (mỗi height tối đa một lần)
+        self._ahead_block: Optional[Any] = None
 
         # --- State Variables ---
         self.current_height: int = 1
         self.current_round: int = 0
-        self.current_step: Optional[ConsensusStep] = None
+        self._current_step: Optional[ConsensusStep] = None
+
+        # Listener nhận (event, info) cho "step", "timeout", "commit" (timeline/trace)
+        self.listeners: List[Callable[[str, Dict[str, Any]], None]] = []
 
         # --- Locking Mechanism (Safety Rules) ---
         self.locked_block: Optional[Any] = None
         self.locked_round: int = -1
 
+    @property
+    def current_step(self) -> Optional[ConsensusStep]:
+        return self._current_step
+
+    @current_step.setter
+    def current_step(self, step: Optional[ConsensusStep]):
+        self._current_step = step
+        if self._clock is not None:
+            self._step_started_ms = self._clock()
+        if self.listeners:
+            self._emit("step", step=step.value if step is not None else None)
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        self.listeners.append(listener)
+
+    def _emit(self, event: str, **info: Any):
+        info.update(node_id=self.node_id, height=self.current_height, round=self.current_round)
+        for listener in self.listeners:
+            listener(event, info)
+
+    def _observe_step(self, step: ConsensusStep):
+        # Bước kết thúc nhờ tiến triển (proposal/quorum): cho policy học thời lượng thực tế
+        if self._clock is not None and self._step_started_ms is not None:
+            self.timeout_policy.observe(step, self._clock() - self._step_started_ms)
+
+    def _schedule_timeout(self, step: ConsensusStep):
+        self.helper.schedule_timeout(self.timeout_policy.timeout(step, self.current_round), step)
+
+    def _relative(self, height: int, round_num: int) -> int:
+        # -1: (height, round) đã qua, 0: hiện tại, 1: phía trước
+        key, current = (height, round_num), (self.current_height, self.current_round)
+        return (key > current) - (key < current)
+
+    def _defer(self, height: int, round_num: int, kind: str, item: Any):
+        if not self.buffer.within_horizon(self.current_height, self.current_round, height, round_num):
+            self._trace(TraceLevel.DEBUG, "buffer_drop", msg_kind=kind, msg_height=height, msg_round=round_num)
+            return
+        if self.buffer.add(height, round_num, kind, item):
+            self._trace(TraceLevel.DEBUG, "buffered", msg_kind=kind, msg_height=height, msg_round=round_num)
+
+    def _replay(self, kind: str):
+        """
+        Phát lại các mục kind đã đệm cho (height, round) hiện tại, ngay sau khi vào bước tương ứng.
+        """
+        height, round_num = self.current_height, self.current_round
+        handler = {
+            "proposal": self.on_proposal_received,
+            "prevote": self.on_majority_prevote,
+            "precommit": self.on_majority_precommit,
+        }[kind]
+        for item in self.buffer.take(height, round_num, kind):
+            # Handler có thể đưa controller sang round/height khác: mục còn lại tự bị bỏ qua
+            handler(item, height, round_num)
+
+    def _trace(self, level: TraceLevel, kind: str, **fields: Any):
+        self.tracer.emit(level, kind, self.node_id, self.current_height, self.current_round,
+                         self._current_step, **fields)
+
     def start_round(self, round_num: int):
         """
         Hàm khởi động một vòng đồng thuận mới.
         """
-        print(f"--- [CONTROLLER] Starting Round {round_num} at Height {self.current_height} ---")
-
         # 1. Cập nhật trạng thái đầu vòng
         self.current_round = round_num
         self.current_step = ConsensusStep.PROPOSE
+        self.buffer.prune(self.current_height, round_num)
+        self._trace(TraceLevel.INFO, "round_start")
 
         # 2. Xác định Proposer (Người B cung cấp logic tính toán)
         proposer_id = self.helper.get_proposer(self.current_height, self.current_round)
 
         if proposer_id == self.node_id:
             # TRƯỜNG HỢP: TÔI LÀ PROPOSER
-            print(f"[{self.node_id}] I am the Proposer. Creating proposal...")
 
             # Logic: Nếu đang bị lock block nào đó, phải đề xuất lại block đó (Proof of Lock).
             # Nếu không, tạo block mới từ pool giao dịch.
             if self.locked_block is not None:
                 proposal_block = self.locked_block
-                print(f"[{self.node_id}] Re-proposing Locked Block: {proposal_block.hash}")
+                self._trace(TraceLevel.INFO, "repropose_locked", block_hash=proposal_block.hash)
+            elif self._take_ahead_block() is not None:
+                # Đã đề xuất sớm lúc lock block cha: proposal đang trên đường (hoặc đã trong buffer)
+                proposal_block = None
             else:
                 proposal_block = self.helper.create_proposal(self.current_height, self.current_round)
-                print(f"[{self.node_id}] Proposing New Block: {proposal_block.hash}")
+                self._trace(TraceLevel.INFO, "propose", block_hash=proposal_block.hash)
 
-            self.broadcast_proposal(proposal_block)
+            if proposal_block is not None:
+                self.broadcast_proposal(proposal_block)
 
         else:
             # TRƯỜNG HỢP: TÔI LÀ VALIDATOR
-            print(f"[{self.node_id}] Waiting for Proposal from {proposer_id}...")
+            self._trace(TraceLevel.DEBUG, "wait_proposal", proposer=proposer_id)
             # Đặt hẹn giờ: Nếu quá thời gian mà không nhận được Proposal -> Vote NIL
-            self.helper.schedule_timeout(TIMEOUT_PROPOSE, ConsensusStep.PROPOSE)
+            self._schedule_timeout(ConsensusStep.PROPOSE)
+
+        # 3. Proposal của round này đã tới trước khi node vào round
+        self._replay("proposal")
 
-    def on_proposal_received(self, proposal_block: Any):
+    def on_proposal_received(self, proposal_block: Any, height: Optional[int] = None,
+                             round_num: Optional[int] = None):
         """
         Callback từ Helper: Khi nhận được một Proposal hợp lệ.
+        height/round của proposal (mặc định: height của block, round hiện tại).
         """
+        height = proposal_block.height if height is None else height
+        round_num = self.current_round if round_num is None else round_num
+        position = self._relative(height, round_num)
+        # Sai proposer: bỏ trước khi đệm/xử lý. Proposer của height sau chỉ biết chắc khi đã commit
+        # height hiện tại (lịch reputation) -> proposal height sau được kiểm lúc phát lại từ buffer
+        if (position >= 0 and height == self.current_height
+                and proposal_block.proposer != self.helper.get_proposer(height, round_num)):
+            self._trace(TraceLevel.INFO, "proposal_wrong_proposer", block_hash=proposal_block.hash,
+                        proposer=proposal_block.proposer)
+            return
+        if position > 0:
+            # Proposal của height/round chưa tới: đệm lại
+            self._defer(height, round_num, "proposal", proposal_block)
+            return
         # Chỉ xử lý nếu đang ở bước PROPOSE (tránh xử lý tin nhắn cũ/spam)
-        if self.current_step != ConsensusStep.PROPOSE:
+        if position < 0 or self.current_step != ConsensusStep.PROPOSE:
+            return
+        if (self.pipelined and self.last_commit_hash is not None
+                and proposal_block.parent_hash != self.last_commit_hash):
+            # Proposal gửi sớm trên block cha không được commit (height trước chốt block khác): bỏ qua,
+            # chờ proposal khác hoặc timeout
+            self._trace(TraceLevel.INFO, "stale_parent", block_hash=proposal_block.hash,
+                        parent_hash=proposal_block.parent_hash)
             return
 
         # --- SAFETY RULE: LOCKING CHECK ---
@@ -77,27 +188,38 @@ class ConsensusController:
 
         # Nếu tôi đã khóa một block khác với block đang được đề xuất
         if self.locked_block is not None and self.locked_block.hash != proposal_block.hash:
-            print(f"[{self.node_id}] Proposal differs from Locked Block -> Vote NIL")
+            self._trace(TraceLevel.INFO, "proposal_conflicts_lock", block_hash=proposal_block.hash,
+                        locked_hash=self.locked_block.hash)
             vote_hash = NIL_BLOCK_HASH
 
         # Chuyển sang bước PREVOTE
+        self._observe_step(ConsensusStep.PROPOSE)
         self.current_step = ConsensusStep.PREVOTE
 
         # Gửi phiếu PREVOTE
         self.broadcast_vote(ConsensusStep.PREVOTE, vote_hash)
 
         # Đặt hẹn giờ cho bước PREVOTE
-        self.helper.schedule_timeout(TIMEOUT_PREVOTE, ConsensusStep.PREVOTE)
+        self._schedule_timeout(ConsensusStep.PREVOTE)
+        self._replay("prevote")
 
-    def on_majority_prevote(self, majority_block_hash: str):
+    def on_majority_prevote(self, majority_block_hash: str, height: Optional[int] = None,
+                            round_num: Optional[int] = None):
         """
-        Callback từ Helper: Khi đã thu thập đủ +2/3 phiếu PREVOTE.
+        Callback từ Helper: Khi đã thu thập đủ +2/3 phiếu PREVOTE (mặc định: height/round hiện tại).
         """
+        height = self.current_height if height is None else height
+        round_num = self.current_round if round_num is None else round_num
+        position = self._relative(height, round_num)
+        if position > 0 or (position == 0 and self.current_step == ConsensusStep.PROPOSE):
+            # Quorum tới trước khi node prevote: phát lại khi vào bước PREVOTE
+            self._defer(height, round_num, "prevote", majority_block_hash)
+            return
         # Chỉ xử lý khi đang ở bước PREVOTE
-        if self.current_step != ConsensusStep.PREVOTE:
+        if position < 0 or self.current_step != ConsensusStep.PREVOTE:
             return
 
-        print(f"[{self.node_id}] Majority PREVOTE reached for: {majority_block_hash}")
+        self._trace(TraceLevel.DEBUG, "majority_prevote", block_hash=majority_block_hash)
 
         # --- SAFETY RULE: UPDATE LOCK ---
         # Nếu đa số đồng ý một block thực (không phải NIL), tôi sẽ khóa vào nó
@@ -106,31 +228,79 @@ class ConsensusController:
             block_obj = self.helper.get_block_by_hash(majority_block_hash)
             self.locked_block = block_obj
             self.locked_round = self.current_round
-            print(f"[{self.node_id}] LOCKED on block {majority_block_hash}")
+            self._trace(TraceLevel.INFO, "lock", block_hash=majority_block_hash)
 
         # Chuyển sang bước PRECOMMIT
+        self._observe_step(ConsensusStep.PREVOTE)
         self.current_step = ConsensusStep.PRECOMMIT
 
         # Gửi phiếu PRECOMMIT (Vote cho cái mà đa số đã chọn)
         self.broadcast_vote(ConsensusStep.PRECOMMIT, majority_block_hash)
 
         # Đặt hẹn giờ cho bước PRECOMMIT
-        self.helper.schedule_timeout(TIMEOUT_PRECOMMIT, ConsensusStep.PRECOMMIT)
+        self._schedule_timeout(ConsensusStep.PRECOMMIT)
+        if self.pipelined and self.locked_block is not None:
+            self._propose_ahead(self.locked_block)
+        self._replay("precommit")
 
-    def on_majority_precommit(self, majority_block_hash: str):
+    def _propose_ahead(self, parent_block: Any):
         """
-        Callback từ Helper: Khi đã thu thập đủ +2/3 phiếu PRECOMMIT.
+        Pipelining: nếu tôi là proposer của (height+1, round 0), đề xuất ngay trên block vừa lock.
+        Luật lock không đổi: validator chỉ prevote proposal này sau khi commit đúng block cha.
         """
-        if self.current_step != ConsensusStep.PRECOMMIT:
+        next_height = self.current_height + 1
+        if self._ahead_block is not None and self._ahead_block.height == next_height:
             return
+        if self.helper.get_proposer(next_height, 0) != self.node_id:
+            return
+        block = self.helper.create_proposal(next_height, 0, parent_hash=parent_block.hash)
+        self._ahead_block = block
+        self._trace(TraceLevel.INFO, "propose_ahead", block_hash=block.hash, parent_hash=parent_block.hash)
+        self.helper.broadcast_proposal(next_height, 0, block)
+
+    def _take_ahead_block(self) -> Optional[Any]:
+        # Proposal sớm còn dùng được cho (height, round 0) hiện tại nếu block cha đúng là block đã commit
+        block, self._ahead_block = self._ahead_block, None
+        if (block is None or self.current_round != 0 or block.height != self.current_height
+                or block.parent_hash != self.last_commit_hash):
+            return None
+        return block
+
+    def on_majority_precommit(self, majority_block_hash: str, height: Optional[int] = None,
+                              round_num: Optional[int] = None):
+        """
+        Callback từ Helper: Khi đã thu thập đủ +2/3 phiếu PRECOMMIT (mặc định: height/round hiện tại).
+        +2/3 precommit cho một block của height hiện tại (round bất kỳ đã qua) là quyết định cuối:
+        commit ngay, không cần đang ở bước PRECOMMIT.
+        """
+        height = self.current_height if height is None else height
+        round_num = self.current_round if round_num is None else round_num
+        position = self._relative(height, round_num)
+        if position > 0:
+            self._defer(height, round_num, "precommit", majority_block_hash)
+            return
+        if height != self.current_height:
+            return
+        if majority_block_hash == NIL_BLOCK_HASH:
+            if position < 0:
+                return
+            if self.current_step != ConsensusStep.PRECOMMIT:
+                # NIL quorum chỉ đổi round khi node đã tới bước PRECOMMIT của round này
+                self._defer(height, round_num, "precommit", majority_block_hash)
+                return
+        if position == 0 and self.current_step == ConsensusStep.PRECOMMIT:
+            self._observe_step(ConsensusStep.PRECOMMIT)
 
         if majority_block_hash != NIL_BLOCK_HASH:
             # --- HAPPY PATH: FINALIZATION ---
-            print(f"[{self.node_id}] !!! CONSENSUS REACHED !!! Block {majority_block_hash} finalized.")
+            self._trace(TraceLevel.INFO, "finalize", block_hash=majority_block_hash)
 
             # 1. Commit block vào Ledger
             block_obj = self.helper.get_block_by_hash(majority_block_hash)
             self.helper.commit_block(block_obj)
+            self.last_commit_hash = majority_block_hash
+            if self.listeners:
+                self._emit("commit", block_hash=majority_block_hash)
 
             # 2. Reset trạng thái Lock (đã xong việc, mở khóa)
             self.locked_block = None
@@ -144,9 +314,19 @@ class ConsensusController:
         else:
             # --- UNHAPPY PATH: ROUND CHANGE ---
             # Đa số đồng ý là "không đồng ý gì cả" (NIL) -> Sang vòng sau
-            print(f"[{self.node_id}] Consensus failed (NIL). Moving to Round {self.current_round + 1}")
+            self._trace(TraceLevel.INFO, "nil_round_change", next_round=self.current_round + 1)
             self.start_round(self.current_round + 1)
 
+    def on_round_evidence(self, height: int, round_num: int):
+        """
+        Callback từ Helper: validator với tổng power >= f+1 đã gửi phiếu ở round_num > round hiện tại
+        (ít nhất một node trung thực đã ở đó) -> nhảy thẳng tới round đó, không chờ timeout.
+        """
+        if height != self.current_height or round_num <= self.current_round:
+            return
+        self._trace(TraceLevel.INFO, "round_skip", next_round=round_num)
+        self.start_round(round_num)
+
     def on_timeout(self, step: ConsensusStep):
         """
         Hàm xử lý khi hết thời gian chờ (Liveness Guarantee).
@@ -155,25 +335,64 @@ class ConsensusController:
         if self.current_step != step:
             return
 
-        print(f"[{self.node_id}] !!! TIMEOUT at step {step.value} !!!")
+        self._trace(TraceLevel.WARN, "timeout", timeout_step=step.value)
+        if self.listeners:
+            self._emit("timeout", step=step.value)
 
         if step == ConsensusStep.PROPOSE:
             # Hết giờ chờ Proposal -> Vote NIL và sang Prevote
             self.current_step = ConsensusStep.PREVOTE
             self.broadcast_vote(ConsensusStep.PREVOTE, NIL_BLOCK_HASH)
-            self.helper.schedule_timeout(TIMEOUT_PREVOTE, ConsensusStep.PREVOTE)
+            self._schedule_timeout(ConsensusStep.PREVOTE)
+            self._replay("prevote")
 
         elif step == ConsensusStep.PREVOTE:
             # Hết giờ Prevote (không đủ phiếu đa số) -> Vote Precommit NIL
             self.current_step = ConsensusStep.PRECOMMIT
             self.broadcast_vote(ConsensusStep.PRECOMMIT, NIL_BLOCK_HASH)
-            self.helper.schedule_timeout(TIMEOUT_PRECOMMIT, ConsensusStep.PRECOMMIT)
+            self._schedule_timeout(ConsensusStep.PRECOMMIT)
+            self._replay("precommit")
 
         elif step == ConsensusStep.PRECOMMIT:
             # Hết giờ Precommit (vẫn không chốt được) -> Sang vòng mới
-            print(f"[{self.node_id}] Timeout Precommit -> Round Change")
             self.start_round(self.current_round + 1)
 
+    # --- Checkpoint ---
+    def checkpoint(self) -> dict:
+        """
+        Chụp trạng thái vòng đồng thuận. Locked block lưu theo hash và được lấy lại
+        qua helper khi restore (helper phải được restore trước).
+        """
+        return {
+            "current_height": self.current_height,
+            "current_round": self.current_round,
+            "current_step": self.current_step,
+            "locked_block_hash": self.locked_block.hash if self.locked_block is not None else None,
+            "locked_round": self.locked_round,
+            "step_started_ms": self._step_started_ms,
+            "timeout_policy": self.timeout_policy.checkpoint(),
+            "buffer": self.buffer.checkpoint(),
+            "last_commit_hash": self.last_commit_hash,
+            "ahead_block_hash": self._ahead_block.hash if self._ahead_block is not None else None,
+        }
+
+    def restore(self, snap: dict):
+        self.current_height = snap["current_height"]
+        self.current_round = snap["current_round"]
+        # Gán trực tiếp: restore không phải một lần chuyển bước
+        self._current_step = snap["current_step"]
+        locked_hash = snap["locked_block_hash"]
+        self.locked_block = self.helper.get_block_by_hash(locked_hash) if locked_hash is not None else None
+        self.locked_round = snap["locked_round"]
+        self._step_started_ms = snap.get("step_started_ms")
+        if "timeout_policy" in snap:
+            self.timeout_policy.restore(snap["timeout_policy"])
+        if "buffer" in snap:
+            self.buffer.restore(snap["buffer"])
+        self.last_commit_hash = snap.get("last_commit_hash")
+        ahead_hash = snap.get("ahead_block_hash")
+        self._ahead_block = self.helper.get_block_by_hash(ahead_hash) if ahead_hash is not None else None
+
     # --- Các hàm Wrapper gọi Helper ---
     def broadcast_proposal(self, block: Any):
         if self.helper:
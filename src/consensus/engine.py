@@ -1,33 +1,56 @@
 from collections import defaultdict
 
+from .vote_tally import VoteTally
+
+
+class _VotesView:
+    """
+    Giữ tương thích engine.votes[height][phase][block_hash] = set(validator_ids), dựng từ tally.
+    """
+
+    def __init__(self, tally):
+        self._tally = tally
+
+    def __getitem__(self, height):
+        by_phase = self._tally.by_phase(height, 0)
+        return defaultdict(lambda: defaultdict(set),
+                           {phase: defaultdict(set, by_hash) for phase, by_hash in by_phase.items()})
+
 
 class ConsensusEngine:
     """
     Engine tối giản: đếm phiếu prevote/precommit, trả về tín hiệu khi đạt quorum.
+    Vote của engine không có round -> mọi phiếu nằm ở round 0 của VoteTally.
     """
 
-    def __init__(self, my_id, total_nodes):
+    def __init__(self, my_id, total_nodes, validator_set=None):
         self.my_id = my_id
         self.total_nodes = total_nodes
-        # votes[height][phase][block_hash] = set(validator_ids)
-        self.votes = defaultdict(lambda: defaultdict(lambda: defaultdict(set)))
+        # Có ValidatorSet -> quorum theo voting power; không thì mỗi node 1 phiếu
+        if validator_set is not None:
+            self.tally = VoteTally(validator_set, on_quorum=self._remember_quorum)
+        else:
+            self.tally = VoteTally(capacity=total_nodes, on_quorum=self._remember_quorum)
+        self._quorum = None
+
+    @property
+    def votes(self):
+        return _VotesView(self.tally)
 
     def process_vote(self, vote):
         if not self._mock_verify_signature(vote):
             return
 
-        if vote.validator_id in self.votes[vote.height][vote.phase][vote.block_hash]:
-            return
-
-        self.votes[vote.height][vote.phase][vote.block_hash].add(vote.validator_id)
-
-        threshold = (self.total_nodes * 2) // 3 + 1
-        count = len(self.votes[vote.height][vote.phase][vote.block_hash])
-
-        if count >= threshold:
-            return self._on_quorum_reached(vote.height, vote.phase, vote.block_hash)
+        # Callback quorum chỉ chạy đúng một lần, ở phiếu làm count vượt ngưỡng
+        self._quorum = None
+        self.tally.add(vote.height, 0, vote.phase, vote.block_hash, vote.validator_id)
+        if self._quorum is not None:
+            return self._on_quorum_reached(*self._quorum)
         return None
 
+    def _remember_quorum(self, height, round_num, phase, block_hash):
+        self._quorum = (height, phase, block_hash)
+
     def _on_quorum_reached(self, height, phase, block_hash):
         if phase == "PREVOTE":
             return "SEND_PRECOMMIT"
@@ -37,4 +60,3 @@ class ConsensusEngine:
 
     def _mock_verify_signature(self, vote):
         return True
-
@@ -1,13 +1,17 @@
-import hashlib
-import json
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from src.consensus.constants import ConsensusStep
-
-
-def _deterministic_hash(obj: Any) -> str:
-    data = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
-    return hashlib.sha256(data).hexdigest()
+from src.consensus.certificate import CertificateVerifier, CommitCertificate, QuorumCertificate, vote_sign_bytes
+from src.consensus.compact import BLOCK_TXN_TIMEOUT_MS, CompactBlock
+from src.consensus.constants import ConsensusStep, NIL_BLOCK_HASH
+from src.consensus.proposer import ProposerSchedule
+from src.consensus.reputation import ReputationSchedule
+from src.consensus.tracing import Tracer, TraceLevel, get_tracer
+from src.consensus.types import Block, Proposal, Vote
+from src.consensus.validator_set import ValidatorSet
+from src.consensus.vote_tally import TallyKey, VoteTally
+from src.crypto.signing import sign_message
+from src.execution.execution import Transaction
+from src.mempool import Mempool
 
 
 class NetworkConsensusHelper:
@@ -15,51 +19,166 @@ class NetworkConsensusHelper:
     Bridge giữa ConsensusController và NetworkSimulator.
     - Tạo proposal, gửi/nhận proposal & vote qua network.
     - Đếm quorum và gọi ngược controller.on_majority_prevote/precommit.
+    - aggregation=True: phiếu chỉ gửi cho collector (proposer của round), collector phát QuorumCertificate.
+    - Lưu CommitCertificate (bitmap + chữ ký PRECOMMIT nếu phiếu có ký) cho mỗi height đã commit.
+    - mempool (nếu có): proposer đóng gói tx từ pool, pool được cập nhật nonce sau mỗi commit.
+    - compact_blocks=True: proposal mang header + short id tx (CompactBlock), người nhận dựng lại từ mempool
+      và chỉ xin tx thiếu (GETBLOCKTXN -> BLOCKTXN qua send_body).
     - Quản lý block store, ledger tối giản.
     """
 
-    def __init__(self, node_id: str, peers: List[str], network):
+    def __init__(self, node_id: str, peers: List[str], network, execution=None,
+                 tracer: Optional[Tracer] = None, validator_set: Optional[ValidatorSet] = None,
+                 proposer_schedule: Union[ProposerSchedule, ReputationSchedule, None] = None,
+                 aggregation: bool = False, chain_id: str = "", signing_key: Optional[bytes] = None,
+                 pubkeys: Optional[Dict[str, bytes]] = None, mempool: Optional[Mempool] = None,
+                 compact_blocks: bool = False, max_timestamp_drift_ms: Optional[float] = None,
+                 block_txn_timeout_ms: float = BLOCK_TXN_TIMEOUT_MS):
         self.node_id = node_id
         self.peers = peers
         self.network = network
         self.controller = None  # sẽ set từ outside
-        self.block_store: Dict[str, Any] = {}
+        self.block_store: Dict[str, Block] = {}
         self.ledger: List[Dict[str, Any]] = []
-        self.votes: Dict[int, Dict[str, Dict[str, Set[str]]]] = {}  # votes[height][phase][block_hash] = set(ids)
+        # Voting power: mặc định mỗi validator 1 (quorum = 2/3+1 số node)
+        self.validator_set = validator_set or ValidatorSet(self.peers + [self.node_id])
+        # Phiếu theo (height, round, phase, block_hash), lưu bitset validator + power chạy
+        self.tally = VoteTally(self.validator_set, on_quorum=self._on_quorum)
+        # Lịch proposer dựng một lần (lịch tĩnh dùng chung được giữa các node cùng validator set;
+        # ReputationSchedule có trạng thái nên mỗi node một instance)
+        self.proposer_schedule = proposer_schedule or ProposerSchedule(self.validator_set)
+        # Block dựng sẵn cho (height, round 0) khi look-ahead cho biết node là proposer kế tiếp
+        self._prepared: Optional[Block] = None
+        # Gom phiếu qua collector; QC nhận được theo (height, round, phase, block_hash)
+        self.aggregation = aggregation
+        self.certificates: Dict[TallyKey, QuorumCertificate] = {}
+        # Ký phiếu (signing_key) / kiểm chữ ký phiếu nhận được (pubkeys); None = không ký như trước
+        self.chain_id = chain_id
+        self.signing_key = signing_key
+        self.pubkeys = pubkeys
+        self.verifier = CertificateVerifier(self.validator_set, pubkeys, chain_id)
+        # Bằng chứng finality theo height, song song với ledger (mỗi node giữ bitmap phiếu mình thấy)
+        self.commit_certificates: Dict[int, CommitCertificate] = {}
+        # Chữ ký phiếu theo (height, round, phase, block_hash, voter); round đạt quorum precommit của block
+        self._vote_sigs: Dict[Tuple[int, int, str, str, str], bytes] = {}
+        self._commit_rounds: Dict[Tuple[int, str], int] = {}
+        # QC của height mà lịch proposer có trạng thái chưa biết collector: kiểm lại sau commit
+        self._early_certificates: List[QuorumCertificate] = []
+        # Tx chờ đề xuất; None = mỗi block một tx demo như trước
+        self.mempool = mempool
+        # Compact proposal đang chờ tx thiếu: block_hash ->
+        # (compact, tx theo vị trí, height, round, người gửi proposal, header_id của proposal, đã xin toàn bộ,
+        #  thời điểm xin gần nhất); quá block_txn_timeout_ms chưa đủ tx thì xin lại
+        self.compact_blocks = compact_blocks
+        self.block_txn_timeout_ms = block_txn_timeout_ms
+        self._partial: Dict[str, Tuple[CompactBlock, List[Optional[Dict[str, Any]]],
+                                       int, int, str, str, bool, float]] = {}
+        # Kiểm timestamp proposal (ReputationSchedule đo latency từ timestamp do proposer tự đóng dấu):
+        # phải lớn hơn block cha và không vượt đồng hồ local quá max_timestamp_drift_ms; None = không kiểm
+        self.max_timestamp_drift_ms = max_timestamp_drift_ms
+        # ExecutionState tùy chọn: nếu có, commit_block sẽ apply tx và ghi state_root thật
+        self.execution = execution
+        self.tracer = tracer if tracer is not None else get_tracer()
 
     def set_controller(self, controller):
         self.controller = controller
 
     # Interface expected by ConsensusController --------------------------------
     def get_proposer(self, height: int, round_num: int) -> str:
-        nodes = sorted(self.peers + [self.node_id])
-        return nodes[(height + round_num) % len(nodes)]
-
-    def create_proposal(self, height: int, round_num: int):
-        block = {
-            "height": height,
-            "round": round_num,
-            "parent_hash": self.ledger[-1]["hash"] if self.ledger else "0" * 64,
-            "proposer": self.node_id,
-            "txs": [
-                {"sender": f"User{height}", "key": f"User{height}/msg", "value": f"hello-{height}"}
-            ],
-        }
-        block["hash"] = _deterministic_hash(block)
-        self.block_store[block["hash"]] = block
-        return type("Proposal", (), block)
+        return self.proposer_schedule.proposer(height, round_num)
+
+    def create_proposal(self, height: int, round_num: int, parent_hash: Optional[str] = None) -> Block:
+        # parent_hash: block cha khác đỉnh ledger (pipelining: block đã lock nhưng chưa commit)
+        if parent_hash is None:
+            parent_hash = self.ledger[-1]["hash"] if self.ledger else "0" * 64
+        prepared, self._prepared = self._prepared, None
+        if (prepared is not None and prepared.height == height and prepared.round == round_num
+                and prepared.parent_hash == parent_hash):
+            return prepared
+        block = Block(
+            height=height,
+            round=round_num,
+            parent_hash=parent_hash,
+            proposer=self.node_id,
+            timestamp=self._proposal_timestamp(parent_hash),
+            txs=self._proposal_txs(height, parent_hash),
+        )
+        self.block_store[block.hash] = block
+        return block
+
+    def _proposal_timestamp(self, parent_hash: str) -> float:
+        # Timestamp tăng ngặt theo chuỗi: đồng hồ local chậm hơn block cha thì đóng dấu ngay sau cha
+        now = self.now_ms()
+        parent = self.block_store.get(parent_hash)
+        if parent is not None and now <= parent.timestamp:
+            return parent.timestamp + 1.0
+        return now
+
+    def _timestamp_ok(self, block: Block) -> bool:
+        if self.max_timestamp_drift_ms is None:
+            return True
+        if block.timestamp > self.now_ms() + self.max_timestamp_drift_ms:
+            return False
+        parent = self.block_store.get(block.parent_hash)
+        return parent is None or block.timestamp > parent.timestamp
+
+    def _proposal_txs(self, height: int, parent_hash: str) -> Tuple[Dict[str, Any], ...]:
+        if self.mempool is None:
+            return ({"sender": f"User{height}", "key": f"User{height}/msg", "value": f"hello-{height}"},)
+        # Block cha đã lock nhưng chưa commit (pipelining): tx của nó vẫn trong pool, đóng gói sau nonce của chúng
+        pending = ()
+        tip = self.ledger[-1]["hash"] if self.ledger else "0" * 64
+        if parent_hash != tip:
+            parent = self.block_store.get(parent_hash)
+            pending = parent.txs if parent is not None else ()
+        return tuple(self.mempool.pack(pending=pending))
+
+    def prepare_next_proposal(self, next_height: int) -> Optional[Block]:
+        """
+        Nếu node là proposer của (next_height, round 0), dựng block trước khi controller vào height đó.
+        """
+        if not self.proposer_schedule.is_proposer(self.node_id, next_height, 0):
+            return None
+        self._prepared = self.create_proposal(next_height, 0)
+        return self._prepared
+
+    def now_ms(self) -> float:
+        # Đồng hồ ảo của network (đo thời lượng bước cho TimeoutPolicy)
+        return float(getattr(self.network, "now_ms", 0.0))
 
     def schedule_timeout(self, timeout_sec: float, step: ConsensusStep):
-        return
-
-    def broadcast_proposal(self, height: int, round_num: int, block: Any):
-        payload = {
-            "type": "PROPOSAL",
-            "height": height,
-            "round": round_num,
-            "block_hash": block.hash,
-            "block": block.__dict__,
-        }
+        # Network không hỗ trợ hẹn giờ (vd. LogReplayNetwork) -> bỏ qua như trước
+        schedule_timer = getattr(self.network, "schedule_timer", None)
+        if schedule_timer is None or self.controller is None:
+            return
+        schedule_timer(self.node_id, timeout_sec * 1000.0, {
+            "type": "TIMEOUT",
+            "height": self.controller.current_height,
+            "round": self.controller.current_round,
+            "step": step.value,
+        })
+
+    def on_timer(self, payload: Dict[str, Any]):
+        """
+        Timer handler đăng ký với network. Bỏ qua timeout cũ (khác height/round hiện tại).
+        """
+        if payload.get("type") == "BLOCKTXN_RETRY":
+            self._retry_block_txs(payload.get("block_hash"))
+            return
+        if payload.get("type") != "TIMEOUT" or self.controller is None:
+            return
+        if (payload["height"] != self.controller.current_height
+                or payload["round"] != self.controller.current_round):
+            return
+        self.controller.on_timeout(ConsensusStep(payload["step"]))
+
+    def broadcast_proposal(self, height: int, round_num: int, block: Block):
+        # Một payload cho mọi peer; dict wire của block được cache trong Block
+        if self.compact_blocks and self.mempool is not None:
+            payload = Proposal(height, round_num, block.hash, self.node_id).to_wire()
+            payload["compact"] = CompactBlock.from_block(block).to_wire()
+        else:
+            payload = Proposal(height, round_num, block.hash, self.node_id).to_wire(block)
         for peer in self.peers + [self.node_id]:
             self.network.send_header(
                 sender=self.node_id,
@@ -69,16 +188,25 @@ class NetworkConsensusHelper:
                 payload=payload,
             )
 
+    def collector(self, height: int, round_num: int) -> str:
+        # Collector xác định: proposer của (height, round)
+        return self.proposer_schedule.proposer(height, round_num)
+
+    def _collector_known(self, height: int) -> bool:
+        # Lịch tĩnh: luôn biết. ReputationSchedule(lag): biết tới height commit + 1 + lag
+        lag = getattr(self.proposer_schedule, "lag", None)
+        if lag is None:
+            return True
+        committed = self.ledger[-1]["height"] if self.ledger else 0
+        return height <= committed + 1 + lag
+
     def broadcast_vote(self, height: int, round: int, vote_type: ConsensusStep, block_hash: Optional[str]):
-        payload = {
-            "type": "VOTE",
-            "height": height,
-            "round": round,
-            "block_hash": block_hash,
-            "phase": vote_type.value,
-            "from": self.node_id,
-        }
-        for peer in self.peers + [self.node_id]:
+        payload = Vote(height, round, block_hash, vote_type.value, self.node_id).to_wire()
+        if self.signing_key is not None:
+            payload["signature"] = sign_message(self.signing_key, self._vote_sign_bytes(
+                height, round, vote_type.value, block_hash, self.node_id)).hex()
+        targets = [self.collector(height, round)] if self.aggregation else self.peers + [self.node_id]
+        for peer in targets:
             self.network.send_header(
                 sender=self.node_id,
                 receiver=peer,
@@ -87,57 +215,362 @@ class NetworkConsensusHelper:
                 payload=payload,
             )
 
-    def get_block_by_hash(self, block_hash: str):
-        block = self.block_store.get(block_hash)
-        if block is None:
-            return None
-        return type("Proposal", (), block)
+    def _vote_sign_bytes(self, height: int, round_num: int, phase: str, block_hash: Optional[str],
+                         voter: str) -> bytes:
+        return vote_sign_bytes(height, round_num, phase, block_hash, voter, self.chain_id)
+
+    def broadcast_certificate(self, qc: QuorumCertificate):
+        payload = qc.to_wire()
+        for peer in self.peers + [self.node_id]:
+            self.network.send_header(
+                sender=self.node_id,
+                receiver=peer,
+                header_id=f"qc-{qc.phase}-{qc.height}-{qc.round}-{self.node_id}-{peer}",
+                height=qc.height,
+                payload=payload,
+            )
+
+    def get_block_by_hash(self, block_hash: str) -> Optional[Block]:
+        return self.block_store.get(block_hash)
 
-    def commit_block(self, block_obj: Any):
+    def commit_block(self, block_obj: Block):
+        state_root = getattr(block_obj, "state_root", "")
+        if self.execution is not None:
+            state_root = self._execute_block(block_obj)
         header = {
             "height": block_obj.height,
             "parent_hash": block_obj.parent_hash,
-            "state_root": getattr(block_obj, "state_root", ""),
+            "state_root": state_root,
             "proposer": block_obj.proposer,
+            "round": block_obj.round,
+            "timestamp": block_obj.timestamp,
             "hash": block_obj.hash,
         }
         self.ledger.append(header)
+        cert = self._commit_certificate(block_obj)
+        if cert is not None:
+            self.commit_certificates[block_obj.height] = cert
+        self.proposer_schedule.on_commit(header)
+        if self.mempool is not None:
+            self.mempool.on_commit(block_obj.txs)
+        # Giữ phiếu của height vừa commit (vote trễ vẫn tới), bỏ các height cũ hơn
+        self.tally.prune(block_obj.height)
+        if self.certificates:
+            self.certificates = {k: qc for k, qc in self.certificates.items() if k[0] >= block_obj.height}
+        if self._vote_sigs:
+            self._vote_sigs = {k: v for k, v in self._vote_sigs.items() if k[0] >= block_obj.height}
+        self._commit_rounds = {k: r for k, r in self._commit_rounds.items() if k[0] > block_obj.height}
+        if self._partial:
+            self._partial = {k: p for k, p in self._partial.items() if p[2] > block_obj.height}
+        if self._early_certificates:
+            early, self._early_certificates = self._early_certificates, []
+            for qc in early:
+                if qc.height > block_obj.height:
+                    self._on_certificate(qc)
+        # Pipelined: proposal của height kế tiếp đã được dựng lúc lock, không dựng sẵn nữa
+        if not getattr(self.controller, "pipelined", False):
+            self.prepare_next_proposal(block_obj.height + 1)
+        # Mốc commit cho latency tracing của simulator (network khác có thể không hỗ trợ)
+        trace_mark = getattr(self.network, "trace_mark", None)
+        if trace_mark is not None:
+            trace_mark(self.node_id, "commit", block_obj.height)
+
+    def _commit_certificate(self, block_obj: Block) -> Optional[CommitCertificate]:
+        height, block_hash = block_obj.height, block_obj.hash
+        round_num = self._commit_rounds.get((height, block_hash))
+        if round_num is None:
+            # Commit không qua quorum của helper (vd. test gọi thẳng commit_block)
+            return None
+        phase = ConsensusStep.PRECOMMIT.value
+        qc = self.certificates.get((height, round_num, phase, block_hash))
+        if qc is not None:
+            return CommitCertificate(height, round_num, block_hash, qc.bitmap,
+                                     tuple(bytes.fromhex(sig) for sig in qc.signatures))
+        bitmap = self.tally.bitset(height, round_num, phase, block_hash)
+        return CommitCertificate(height, round_num, block_hash, bitmap,
+                                 self._signatures_for(height, round_num, phase, block_hash, bitmap))
+
+    def _signatures_for(self, height: int, round_num: int, phase: str, block_hash: str,
+                        bitmap: int) -> Tuple[bytes, ...]:
+        # Chữ ký theo thứ tự bit; thiếu một chữ ký (phiếu không ký) -> chứng chỉ không ký
+        sigs = []
+        for voter in self.tally.decode(bitmap):
+            sig = self._vote_sigs.get((height, round_num, phase, block_hash, voter))
+            if sig is None:
+                return ()
+            sigs.append(sig)
+        return tuple(sigs)
+
+    def _execute_block(self, block_obj: Block) -> str:
+        # Mô phỏng: bỏ qua verify chữ ký tx, giống run_full_simulation
+        for tx in block_obj.txs:
+            self.execution.apply_transaction(Transaction(
+                sender=tx["sender"],
+                key=tx["key"],
+                value=tx["value"],
+                signature=b"",
+                pubkey=b"",
+                meta=tx.get("meta", {}),
+            ), require_signature=False)
+        return self.execution.compute_state_root()
+
+    # Checkpoint ---------------------------------------------------------------
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Chụp trạng thái helper; Block (bất biến)/ledger entry được chia sẻ, chỉ copy container.
+        ExecutionState (nếu có) do ConsensusNode chụp riêng.
+        """
+        return {
+            "block_store": dict(self.block_store),
+            "ledger": list(self.ledger),
+            "tally": self.tally.checkpoint(),
+            "prepared": self._prepared,
+            "certificates": dict(self.certificates),
+            "commit_certificates": dict(self.commit_certificates),
+            "vote_sigs": dict(self._vote_sigs),
+            "commit_rounds": dict(self._commit_rounds),
+            "early_certificates": list(self._early_certificates),
+            "proposer_schedule": self.proposer_schedule.checkpoint(),
+            "mempool": self.mempool.checkpoint() if self.mempool is not None else None,
+            "partial": {k: p[:1] + (list(p[1]),) + p[2:] for k, p in self._partial.items()},
+        }
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        self.block_store = dict(snap["block_store"])
+        self.ledger = list(snap["ledger"])
+        self.tally.restore(snap["tally"])
+        self._prepared = snap.get("prepared")
+        self.certificates = dict(snap.get("certificates", {}))
+        self.commit_certificates = dict(snap.get("commit_certificates", {}))
+        self._vote_sigs = dict(snap.get("vote_sigs", {}))
+        self._commit_rounds = dict(snap.get("commit_rounds", {}))
+        self._early_certificates = list(snap.get("early_certificates", ()))
+        self.proposer_schedule.restore(snap.get("proposer_schedule"))
+        if self.mempool is not None and snap.get("mempool") is not None:
+            self.mempool.restore(snap["mempool"])
+        self._partial = {k: p[:1] + (list(p[1]),) + p[2:] for k, p in snap.get("partial", {}).items()}
 
     # Message handling ---------------------------------------------------------
     def on_message(self, msg: Dict[str, Any]):
         payload = msg.get("payload", {})
         mtype = payload.get("type")
         if mtype == "PROPOSAL":
+            block_hash = payload.get("block_hash")
+            block = self.block_store.get(block_hash)
             block_dict = payload.get("block")
-            if block_dict:
-                block_hash = payload.get("block_hash")
-                block_copy = dict(block_dict)
-                block_copy["hash"] = block_hash
-                self.block_store[block_hash] = block_copy
-                if self.controller:
-                    self.controller.on_proposal_received(type("Proposal", (), block_copy))
+            compact = payload.get("compact")
+            if block is None and block_dict:
+                block = Block.from_wire(block_dict, block_hash)
+                # Băm lại trước khi lưu: hash giả sẽ cho commit nội dung khác (như CompactBlock.build)
+                if not block.verify_hash():
+                    return
+                self.block_store[block_hash] = block
+            elif block is None and compact:
+                block = self._on_compact(CompactBlock.from_wire(compact), payload.get("height"),
+                                         payload.get("round", 0), msg.get("from"), msg.get("header_id"))
+            if block is not None:
+                self._on_proposal_block(block, payload.get("height", block.height), payload.get("round", 0))
+        elif mtype == "GETBLOCKTXN":
+            self._on_get_block_txs(payload, msg.get("from"))
+        elif mtype == "BLOCKTXN":
+            self._on_block_txs(payload)
         elif mtype == "VOTE":
             height = payload.get("height")
+            round_num = payload.get("round", 0)
             phase = payload.get("phase")
             block_hash = payload.get("block_hash")
             voter = payload.get("from")
             if not (height and phase and block_hash and voter):
                 return
-            count = self._record_vote(height, phase, block_hash, voter)
-            threshold = (len(self.peers) + 1) * 2 // 3 + 1
-            if count >= threshold and self.controller:
-                if phase == ConsensusStep.PREVOTE.value:
-                    if self.controller.current_step != ConsensusStep.PREVOTE:
-                        self.controller.current_step = ConsensusStep.PREVOTE
-                    self.controller.on_majority_prevote(block_hash)
-                elif phase == ConsensusStep.PRECOMMIT.value:
-                    if self.controller.current_step != ConsensusStep.PRECOMMIT:
-                        self.controller.current_step = ConsensusStep.PRECOMMIT
-                    self.controller.on_majority_precommit(block_hash)
-
-    def _record_vote(self, height: int, phase: str, block_hash: str, voter: str) -> int:
-        self.votes.setdefault(height, {}).setdefault(phase, {}).setdefault(block_hash, set()).add(voter)
-        count = len(self.votes[height][phase][block_hash])
-        print(f"[{self.node_id}] Votes {phase} for {block_hash[:6]}... count={count}")
+            controller = self.controller
+            # Phiếu quá xa phía trước (ngoài tầm bộ đệm của controller): bỏ, tally không phình vô hạn
+            if controller is not None and not controller.buffer.within_horizon(
+                    controller.current_height, controller.current_round, height, round_num):
+                return
+            signature = payload.get("signature")
+            if self.pubkeys is not None:
+                # Phiếu thiếu/sai chữ ký bị bỏ trước khi vào tally
+                if not signature or not self.verifier.verify_signature(
+                        voter, self._vote_sign_bytes(height, round_num, phase, block_hash, voter),
+                        bytes.fromhex(signature)):
+                    return
+            if signature:
+                # Lưu trước khi đếm: phiếu vượt ngưỡng kích hoạt on_quorum (collector dựng QC có ký) ngay
+                # trong tally.add. Chỉ voter có trong bitmap của block_hash mới được dùng chữ ký.
+                self._vote_sigs[height, round_num, phase, block_hash, voter] = bytes.fromhex(signature)
+            if self._record_vote(height, round_num, phase, block_hash, voter) is None:
+                return
+            # Quorum đã đạt trước đó (callback chỉ chạy một lần) nhưng chưa có block: thử lại ở mỗi
+            # phiếu sau. Controller tự đệm quorum của bước/round chưa tới.
+            if self.tally.has_quorum(height, round_num, phase, block_hash):
+                self._dispatch_quorum(height, round_num, phase, block_hash)
+            # f+1 power ở round cao hơn của height hiện tại -> round skip
+            if (controller is not None and height == controller.current_height
+                    and round_num > controller.current_round
+                    and self.tally.round_power(height, round_num) >= self.validator_set.f_plus_one_power):
+                controller.on_round_evidence(height, round_num)
+        elif mtype == "QC":
+            self._on_certificate(QuorumCertificate.from_wire(payload))
+
+    def _on_proposal_block(self, block: Block, height: int, round_num: int):
+        if not self.controller:
+            return
+        if self._timestamp_ok(block):
+            self.controller.on_proposal_received(block, height, round_num)
+        else:
+            # Không prevote cho block này (timeout sẽ prevote NIL); block vẫn được giữ để commit
+            # nếu đa số khác đã chấp nhận nó
+            self.tracer.emit(TraceLevel.INFO, "proposal_bad_timestamp", self.node_id, height, round_num,
+                             None, block_hash=block.hash, timestamp=block.timestamp)
+        # Phiếu tới trước proposal (quorum đạt khi chưa có block): thử lại ngay khi có block
+        for phase in (ConsensusStep.PREVOTE.value, ConsensusStep.PRECOMMIT.value):
+            if self._has_quorum(height, round_num, phase, block.hash):
+                self._dispatch_quorum(height, round_num, phase, block.hash)
+
+    # Compact block ------------------------------------------------------------
+    def _on_compact(self, compact: CompactBlock, height: int, round_num: int, sender: str,
+                    header_id: str) -> Optional[Block]:
+        partial = self._partial.get(compact.hash)
+        if partial is not None:
+            # Proposal lặp lại (node khác/round sau): xin phần còn thiếu từ người gửi mới, trên header của họ
+            if (sender, header_id) != partial[4:6]:
+                txs = partial[1]
+                self._partial[compact.hash] = partial[:4] + (sender, header_id) + partial[6:]
+                self._request_block_txs(compact.hash, height, sender, header_id,
+                                        [i for i, tx in enumerate(txs) if tx is None])
+            return None
+        if self.mempool is not None:
+            txs, missing = compact.match(self.mempool)
+        else:
+            txs, missing = [None] * len(compact.short_ids), list(range(len(compact.short_ids)))
+        if not missing:
+            block = compact.build(txs)
+            if block is not None:
+                self.block_store[block.hash] = block
+                return block
+            # Va chạm short id: xin toàn bộ tx
+            txs, missing = [None] * len(txs), list(range(len(txs)))
+        self._partial[compact.hash] = (compact, txs, height, round_num, sender, header_id,
+                                       len(missing) == len(txs), 0.0)
+        self._request_block_txs(compact.hash, height, sender, header_id, missing)
+        return None
+
+    def _request_block_txs(self, block_hash: str, height: int, sender: str, header_id: str,
+                           indexes: List[int]):
+        # BODY trả lời đi trên header_id của proposal (người nhận đã thấy header đó)
+        now = self.now_ms()
+        partial = self._partial.get(block_hash)
+        if partial is not None:
+            self._partial[block_hash] = partial[:7] + (now,)
+        self.network.send_header(self.node_id, sender,
+                                 f"getblocktxn-{block_hash}-{self.node_id}-{len(indexes)}-{now:g}",
+                                 height, {"type": "GETBLOCKTXN", "height": height, "block_hash": block_hash,
+                                          "indexes": indexes, "header_id": header_id})
+        schedule_timer = getattr(self.network, "schedule_timer", None)
+        if schedule_timer is not None:
+            schedule_timer(self.node_id, self.block_txn_timeout_ms,
+                           {"type": "BLOCKTXN_RETRY", "block_hash": block_hash})
+
+    def _retry_block_txs(self, block_hash: Optional[str]):
+        partial = self._partial.get(block_hash)
+        # Đã đủ tx/đã commit, hoặc một lần xin mới hơn đã tự hẹn giờ riêng
+        if partial is None or self.now_ms() - partial[7] < self.block_txn_timeout_ms:
+            return
+        _, txs, height, _, sender, header_id = partial[:6]
+        self._request_block_txs(block_hash, height, sender, header_id,
+                                [i for i, tx in enumerate(txs) if tx is None])
+
+    def _on_get_block_txs(self, payload: Dict[str, Any], requester: str):
+        block = self.block_store.get(payload.get("block_hash"))
+        if block is None:
+            return
+        indexes = [i for i in payload.get("indexes", ()) if 0 <= i < len(block.txs)]
+        self.network.send_body(self.node_id, requester, payload.get("header_id"), block.height, {
+            "type": "BLOCKTXN", "block_hash": block.hash, "indexes": indexes,
+            "txs": [block.txs[i] for i in indexes]})
+
+    def _on_block_txs(self, payload: Dict[str, Any]):
+        block_hash = payload.get("block_hash")
+        partial = self._partial.get(block_hash)
+        if partial is None:
+            return
+        compact, txs, height, round_num, sender, header_id, requested_all, _ = partial
+        for i, tx in zip(payload.get("indexes", ()), payload.get("txs", ())):
+            if 0 <= i < len(txs):
+                txs[i] = tx
+        if any(tx is None for tx in txs):
+            return
+        del self._partial[block_hash]
+        block = compact.build(txs)
+        if block is None:
+            if not requested_all:
+                # Tx trong pool trùng short id nhưng khác tx của block: xin lại toàn bộ một lần
+                self._partial[block_hash] = (compact, [None] * len(txs), height, round_num, sender, header_id,
+                                             True, 0.0)
+                self._request_block_txs(block_hash, height, sender, header_id, list(range(len(txs))))
+            return
+        self.block_store[block_hash] = block
+        self._on_proposal_block(block, height, round_num)
+
+    def _record_vote(self, height: int, round_num: int, phase: str, block_hash: str,
+                     voter: str) -> Optional[int]:
+        count = self.tally.add(height, round_num, phase, block_hash, voter)
+        # O(n^2) event mỗi height: chỉ dựng event khi DEBUG được bật
+        if count is not None and self.tracer.enabled(TraceLevel.DEBUG):
+            self.tracer.emit(TraceLevel.DEBUG, "vote_received", self.node_id, height, round_num, phase,
+                             block_hash=block_hash, voter=voter, count=count)
         return count
 
+    def _on_quorum(self, height: int, round_num: int, phase: str, block_hash: str):
+        self.tracer.emit(TraceLevel.INFO, "quorum", self.node_id, height, round_num, phase,
+                         block_hash=block_hash)
+        is_commit = phase == ConsensusStep.PRECOMMIT.value and block_hash != NIL_BLOCK_HASH
+        if is_commit:
+            self._commit_rounds.setdefault((height, block_hash), round_num)
+        if self.aggregation and self.collector(height, round_num) == self.node_id:
+            # Bitset của tally chính là bitmap QC (cùng chỉ số ValidatorSet)
+            bitmap = self.tally.bitset(height, round_num, phase, block_hash)
+            sigs = self._signatures_for(height, round_num, phase, block_hash, bitmap)
+            self.broadcast_certificate(QuorumCertificate(height, round_num, phase, block_hash, bitmap,
+                                                         self.node_id, tuple(sig.hex() for sig in sigs)))
+
+    def _on_certificate(self, qc: QuorumCertificate):
+        controller = self.controller
+        if controller is None or not qc.verify(self.validator_set):
+            return
+        if not controller.buffer.within_horizon(controller.current_height, controller.current_round,
+                                                qc.height, qc.round):
+            return
+        if not self._collector_known(qc.height):
+            # Lịch proposer có trạng thái chưa tới height này: chờ commit rồi mới kiểm được collector
+            self._early_certificates.append(qc)
+            return
+        if qc.aggregator != self.collector(qc.height, qc.round):
+            return
+        # Phiếu có ký: kiểm chữ ký của mọi phase (PREVOTE, NIL) trước khi tin
+        if self.pubkeys is not None and not self.verifier.verify_quorum(qc):
+            return
+        if qc.phase == ConsensusStep.PRECOMMIT.value and qc.block_hash != NIL_BLOCK_HASH:
+            self._commit_rounds.setdefault((qc.height, qc.block_hash), qc.round)
+        self.certificates[qc.height, qc.round, qc.phase, qc.block_hash] = qc
+        self._dispatch_quorum(qc.height, qc.round, qc.phase, qc.block_hash)
+        # +2/3 đã ở round cao hơn (hơn cả f+1) -> round skip
+        if qc.height == controller.current_height and qc.round > controller.current_round:
+            controller.on_round_evidence(qc.height, qc.round)
+
+    def _has_quorum(self, height: int, round_num: int, phase: str, block_hash: str) -> bool:
+        return (self.tally.has_quorum(height, round_num, phase, block_hash)
+                or (height, round_num, phase, block_hash) in self.certificates)
+
+    def _dispatch_quorum(self, height: int, round_num: int, phase: str, block_hash: str):
+        # Controller tự xét height/round/bước: bỏ quorum cũ (vote trễ của height đã commit),
+        # đệm quorum của round/bước chưa tới
+        if self.controller is None:
+            return
+        # Chưa có block tương ứng (proposal bị rơi) thì không thể lock/commit: thử lại khi block tới
+        if block_hash != NIL_BLOCK_HASH and block_hash not in self.block_store:
+            return
+        if phase == ConsensusStep.PREVOTE.value:
+            self.controller.on_majority_prevote(block_hash, height, round_num)
+        elif phase == ConsensusStep.PRECOMMIT.value:
+            self.controller.on_majority_precommit(block_hash, height, round_num)
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Tuple
+
+# Bộ đệm tin nhắn đến sớm của ConsensusController, theo (height, round).
+# - Proposal của round/height chưa tới, quorum prevote/precommit khi node chưa tới bước đó:
+#   giữ lại và phát lại khi controller vào đúng bước, thay vì bỏ mất (tốn cả một round timeout).
+# - Có giới hạn: chỉ nhận tối đa max_heights_ahead height và max_rounds_ahead round phía trước,
+#   mỗi (height, round) tối đa max_per_key mục -> peer lỗi không thể làm phình bộ nhớ.
+# Phiếu bầu vẫn nằm trong VoteTally của helper; bộ đệm chỉ giữ sự kiện (kind, item).
+
+BufferKey = Tuple[int, int]
+
+
+class MessageBuffer:
+    """
+    buffer.add(height, round, "proposal", block) / buffer.take(height, round, "proposal") -> [block, ...]
+    """
+
+    def __init__(self, max_heights_ahead: int = 2, max_rounds_ahead: int = 8, max_per_key: int = 16):
+        self.max_heights_ahead = max_heights_ahead
+        self.max_rounds_ahead = max_rounds_ahead
+        self.max_per_key = max_per_key
+        self._entries: Dict[BufferKey, List[Tuple[str, Any]]] = {}
+        # Số mục bị từ chối (ngoài tầm hoặc đầy) - chỉ để quan sát
+        self.dropped = 0
+
+    def within_horizon(self, current_height: int, current_round: int, height: int, round_num: int) -> bool:
+        """
+        (height, round) không quá xa phía trước vị trí hiện tại (quá khứ luôn True).
+        """
+        if height < current_height:
+            return True
+        if height == current_height:
+            return round_num <= current_round + self.max_rounds_ahead
+        return height <= current_height + self.max_heights_ahead and round_num <= self.max_rounds_ahead
+
+    def add(self, height: int, round_num: int, kind: str, item: Any) -> bool:
+        entries = self._entries.setdefault((height, round_num), [])
+        # Trùng lặp (proposal gửi lại, quorum được báo lại ở mỗi phiếu sau): so theo hash
+        ident = getattr(item, "hash", item)
+        if any(k == kind and getattr(i, "hash", i) == ident for k, i in entries):
+            return True
+        if len(entries) >= self.max_per_key:
+            self.dropped += 1
+            return False
+        entries.append((kind, item))
+        return True
+
+    def take(self, height: int, round_num: int, kind: str) -> List[Any]:
+        """
+        Lấy ra (và xóa) các mục loại kind của (height, round), theo thứ tự đến.
+        """
+        entries = self._entries.get((height, round_num))
+        if not entries:
+            return []
+        taken = [item for k, item in entries if k == kind]
+        if taken:
+            rest = [(k, item) for k, item in entries if k != kind]
+            if rest:
+                self._entries[height, round_num] = rest
+            else:
+                del self._entries[height, round_num]
+        return taken
+
+    def prune(self, height: int, round_num: int) -> None:
+        """
+        Bỏ mọi mục của (height, round) đã qua.
+        """
+        for key in [k for k in self._entries if k < (height, round_num)]:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    # Checkpoint ------------------------------------------------------------------
+    def checkpoint(self) -> Dict[BufferKey, List[Tuple[str, Any]]]:
+        # Mục (Block bất biến, hash str) được chia sẻ, chỉ copy container
+        return {key: list(entries) for key, entries in self._entries.items()}
+
+    def restore(self, snap: Dict[BufferKey, List[Tuple[str, Any]]]) -> None:
+        self._entries = {key: list(entries) for key, entries in snap.items()}
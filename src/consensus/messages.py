@@ -1,4 +1,6 @@
 class Vote:
+    __slots__ = ("validator_id", "height", "block_hash", "phase", "signature")
+
     def __init__(self, validator_id, height, block_hash, phase, signature=None):
         self.validator_id = validator_id
         self.height = height
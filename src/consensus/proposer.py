@@ -0,0 +1,101 @@
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from src.consensus.validator_set import MAX_CYCLE_TABLE, ValidatorSet
+
+# Lịch proposer dựng một lần cho mỗi epoch của tập validator.
+# - "round_robin": order[(height + round + offset) % n], dạng đóng, không cần bảng.
+# - "weighted": bảng một chu kỳ weighted round-robin của ValidatorSet (dài total_power/gcd),
+#   tra bằng (height + round + offset) % len(bảng). Chu kỳ dài hơn MAX_CYCLE_TABLE (stake thật)
+#   không dựng bảng: ValidatorSet.proposer_at tính dần theo priority, có cache.
+# Mỗi validator có danh sách vị trí của mình trong chu kỳ -> look-ahead "lần tới tôi đề xuất"
+# là một bisect, không phải quét từng height (không có bảng thì quét tối đa lookahead_limit height).
+
+ROUND_ROBIN = "round_robin"
+WEIGHTED = "weighted"
+PROPOSER_MODES = (ROUND_ROBIN, WEIGHTED)
+
+
+class ProposerSchedule:
+    """
+    schedule = ProposerSchedule(validator_set, mode="weighted")
+    schedule.proposer(height, round) -> node_id   (O(1))
+    schedule.next_height_for(node_id, from_height) -> height gần nhất (round 0) node đó đề xuất
+    validators: ValidatorSet (thứ tự theo id đã sort) hoặc danh sách id (giữ nguyên thứ tự, power 1).
+    """
+
+    def __init__(self, validators: Union[ValidatorSet, Sequence[str]], mode: str = WEIGHTED,
+                 offset: int = 0, epoch: int = 0):
+        if mode not in PROPOSER_MODES:
+            raise ValueError(f"unknown proposer mode {mode!r}, expected one of {PROPOSER_MODES}")
+        if isinstance(validators, ValidatorSet):
+            self.validator_set = validators
+            order = list(validators.ids)
+        else:
+            order = list(validators)
+            self.validator_set = ValidatorSet(order)
+        self.mode = mode
+        self.offset = offset
+        self.epoch = epoch
+        # None: chu kỳ quá dài, proposer tính qua validator_set.proposer_at
+        self._table: Optional[List[str]]
+        if mode == WEIGHTED and not self.validator_set.is_uniform:
+            if self.validator_set.cycle_length > MAX_CYCLE_TABLE:
+                self._table = None
+            else:
+                self._table = list(self.validator_set.proposer_cycle())
+        else:
+            # Power bằng nhau: weighted trùng round-robin
+            self._table = order
+        self._positions: Dict[str, List[int]] = {}
+        for pos, vid in enumerate(self._table or ()):
+            self._positions.setdefault(vid, []).append(pos)
+
+    @property
+    def period(self) -> int:
+        return len(self._table) if self._table is not None else self.validator_set.cycle_length
+
+    def proposer(self, height: int, round_num: int) -> str:
+        if self._table is None:
+            return self.validator_set.proposer_at(height + round_num + self.offset)
+        return self._table[(height + round_num + self.offset) % len(self._table)]
+
+    def is_proposer(self, node_id: str, height: int, round_num: int) -> bool:
+        return self.proposer(height, round_num) == node_id
+
+    # Lịch tĩnh: không phụ thuộc dữ liệu commit (cùng interface với ReputationSchedule)
+    def on_commit(self, entry: Dict[str, Any]) -> None:
+        pass
+
+    def checkpoint(self) -> None:
+        return None
+
+    def restore(self, snap: Any) -> None:
+        pass
+
+    # Look-ahead ------------------------------------------------------------------
+    def lookahead(self, height: int, count: int, round_num: int = 0) -> List[Tuple[int, str]]:
+        """
+        Proposer của count height tiếp theo (giả định chốt ở round round_num).
+        """
+        return [(h, self.proposer(h, round_num)) for h in range(height, height + count)]
+
+    def next_height_for(self, node_id: str, from_height: int, round_num: int = 0,
+                        lookahead_limit: int = MAX_CYCLE_TABLE) -> Optional[int]:
+        """
+        Height nhỏ nhất >= from_height mà node_id là proposer ở round round_num; None nếu không bao giờ
+        (hoặc, khi chu kỳ quá dài để có bảng, không trong lookahead_limit height tới).
+        """
+        if self._table is None:
+            for height in range(from_height, from_height + lookahead_limit):
+                if self.proposer(height, round_num) == node_id:
+                    return height
+            return None
+        positions = self._positions.get(node_id)
+        if not positions:
+            return None
+        period = len(self._table)
+        slot = (from_height + round_num + self.offset) % period
+        i = bisect_left(positions, slot)
+        pos = positions[i] if i < len(positions) else positions[0] + period
+        return from_height + (pos - slot)
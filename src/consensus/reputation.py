@@ -0,0 +1,143 @@
+import hashlib
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.consensus.validator_set import ValidatorSet
+
+# Chọn proposer theo uy tín (reputation), chỉ dựa trên dữ liệu đã commit nên mọi node
+# cùng ledger tính ra cùng proposer.
+# - Độ trễ proposal -> commit của block k ~ timestamp(k+1) - timestamp(k) (timestamp do proposer đóng
+#   lúc đề xuất; proposer kế tiếp đề xuất ngay khi commit k). Chỉ lấy mẫu khi block k+1 chốt ở round 0,
+#   để thời gian timeout của height sau không bị tính cho proposer của k.
+# - Round bị lỡ: block k chốt ở round r > 0 -> proposer của (k, 0..r-1) mỗi người một lần lỡ.
+# - Trọng số = power * (latency tốt nhất / latency của mình)^exponent / (1 + miss_penalty * số lần lỡ),
+#   tính trên cửa sổ window block gần nhất; tối thiểu 1 để leader chậm vẫn thỉnh thoảng được đo lại.
+# Round 0 bốc thăm theo trọng số bằng hash(height); round > 0 đi theo thứ hạng trọng số, bỏ qua
+# proposer của round 0 (round 1 = validator tốt nhất còn lại) để round change không rơi lại vào leader chậm.
+
+_WEIGHT_SCALE = 1000
+# Node không prevote proposal có timestamp <= block cha hoặc vượt đồng hồ local quá mức này (ms):
+# proposer đóng dấu muộn để giảm latency của mình chỉ lợi được tối đa độ trễ mạng + drift
+MAX_TIMESTAMP_DRIFT_MS = 5.0
+
+
+class ReputationSchedule:
+    """
+    Cùng interface với ProposerSchedule (proposer/is_proposer/on_commit/checkpoint/restore).
+    Có trạng thái -> mỗi node một instance, được helper gọi on_commit(ledger_entry) theo thứ tự height.
+    """
+
+    mode = "reputation"
+
+    def __init__(self, validator_set: ValidatorSet, window: int = 32, latency_exponent: float = 4.0,
+                 miss_penalty: float = 4.0, lag: int = 0):
+        if lag < 0:
+            raise ValueError("lag must be >= 0")
+        self.validator_set = validator_set
+        self.window = window
+        self.latency_exponent = latency_exponent
+        self.miss_penalty = miss_penalty
+        # Proposer của height h chỉ dùng commit <= h - 1 - lag. lag=1 cho pipelining: proposer của h+1
+        # được hỏi lúc lock h, trước khi commit h -> phải ra cùng kết quả như sau khi commit h
+        self.lag = lag
+        # (height, round, proposer, timestamp) của các block commit gần nhất
+        self._commits: Deque[Tuple[int, int, str, float]] = deque(maxlen=window + 1 + lag)
+        # (height, proposer bị lỡ round)
+        self._misses: Deque[Tuple[int, str]] = deque()
+        # Cache trọng số/thứ hạng theo height commit cuối được dùng, tính lại sau mỗi commit
+        self._cache: Dict[int, Tuple[List[int], List[str]]] = {}
+
+    # Dữ liệu commit ----------------------------------------------------------------
+    def on_commit(self, entry: Dict[str, Any]) -> None:
+        height = entry["height"]
+        round_num = entry.get("round", 0)
+        # Proposer các round bị lỡ, theo đúng trạng thái đã dùng để chọn ở height này
+        for r in range(round_num):
+            self._misses.append((height, self.proposer(height, r)))
+        self._commits.append((height, round_num, entry["proposer"], float(entry.get("timestamp", 0.0))))
+        oldest = self._commits[0][0]
+        while self._misses and self._misses[0][0] < oldest:
+            self._misses.popleft()
+        self._cache.clear()
+
+    def _through(self, height: Optional[int]) -> int:
+        # Height commit cuối được dùng; mọi giá trị >= commit mới nhất cho cùng một view
+        latest = self._commits[-1][0] if self._commits else 0
+        return latest if height is None else min(latest, height - 1 - self.lag)
+
+    def _view(self, through: int) -> List[Tuple[int, int, str, float]]:
+        commits = [c for c in self._commits if c[0] <= through]
+        return commits[-(self.window + 1):]
+
+    def latency_samples(self, height: Optional[int] = None) -> Dict[str, List[float]]:
+        """Mẫu latency theo proposer, trên view dùng để chọn proposer của height (None = mọi commit)."""
+        return self._samples(self._view(self._through(height)))
+
+    @staticmethod
+    def _samples(commits: List[Tuple[int, int, str, float]]) -> Dict[str, List[float]]:
+        samples: Dict[str, List[float]] = {}
+        for i in range(len(commits) - 1):
+            height, _, proposer, ts = commits[i]
+            next_height, next_round, _, next_ts = commits[i + 1]
+            if next_height == height + 1 and next_round == 0 and next_ts >= ts:
+                samples.setdefault(proposer, []).append(next_ts - ts)
+        return samples
+
+    def weights(self, height: Optional[int] = None) -> Dict[str, int]:
+        return dict(zip(self.validator_set.ids, self._compute(height)[0]))
+
+    def _compute(self, height: Optional[int] = None) -> Tuple[List[int], List[str]]:
+        through = self._through(height)
+        cached = self._cache.get(through)
+        if cached is None:
+            commits = self._view(through)
+            samples = self._samples(commits)
+            mean = {v: sum(s) / len(s) for v, s in samples.items()}
+            best = min((m for m in mean.values() if m > 0), default=None)
+            oldest = commits[0][0] if commits else 0
+            misses: Dict[str, int] = {}
+            for miss_height, proposer in self._misses:
+                if oldest <= miss_height <= through:
+                    misses[proposer] = misses.get(proposer, 0) + 1
+            weights: List[int] = []
+            for vid, power in zip(self.validator_set.ids, self.validator_set.powers):
+                factor = 1.0
+                if best is not None and mean.get(vid, 0) > 0:
+                    factor = (best / mean[vid]) ** self.latency_exponent
+                factor /= 1.0 + self.miss_penalty * misses.get(vid, 0)
+                weights.append(max(1, int(power * _WEIGHT_SCALE * factor)))
+            ranked = [vid for _, vid in sorted(zip(weights, self.validator_set.ids),
+                                               key=lambda wv: (-wv[0], wv[1]))]
+            cached = self._cache[through] = (weights, ranked)
+        return cached
+
+    # Chọn proposer ---------------------------------------------------------------
+    def proposer(self, height: int, round_num: int) -> str:
+        first = self._weighted_pick(height)
+        if round_num == 0:
+            return first
+        _, ranked = self._compute(height)
+        others = [vid for vid in ranked if vid != first]
+        return ([first] + others)[round_num % len(ranked)]
+
+    def _weighted_pick(self, height: int) -> str:
+        weights, _ = self._compute(height)
+        digest = hashlib.sha256(f"proposer:{height}".encode("utf-8")).digest()
+        pick = int.from_bytes(digest[:8], "big") % sum(weights)
+        for vid, weight in zip(self.validator_set.ids, weights):
+            if pick < weight:
+                return vid
+            pick -= weight
+        return self.validator_set.ids[-1]
+
+    def is_proposer(self, node_id: str, height: int, round_num: int) -> bool:
+        return self.proposer(height, round_num) == node_id
+
+    # Checkpoint ------------------------------------------------------------------
+    def checkpoint(self) -> Dict[str, Any]:
+        return {"commits": list(self._commits), "misses": list(self._misses)}
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        self._commits = deque(snap["commits"], maxlen=self.window + 1 + self.lag)
+        self._misses = deque(snap["misses"])
+        self._cache.clear()
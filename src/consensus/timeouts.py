@@ -0,0 +1,104 @@
+import random
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from src.consensus.constants import (
+    ConsensusStep,
+    TIMEOUT_PROPOSE,
+    TIMEOUT_PREVOTE,
+    TIMEOUT_PRECOMMIT,
+    TIMEOUT_DELTA,
+)
+
+# Chính sách timeout cho ConsensusController (đơn vị giây, như constants).
+# - Backoff theo round: linear (base + delta * round) hoặc exponential (base * factor^round), chặn max_s.
+# - adaptive=True: base của mỗi bước tiến dần về margin * percentile thời lượng bước quan sát được
+#   (bước kết thúc nhờ quorum/proposal, không tính bước kết thúc vì timeout), trong [min_s, max_s].
+#   LAN nhanh -> timeout co lại; link xuyên vùng chậm -> timeout giãn ra.
+# - deterministic=True (mặc định, cho simulation): không jitter ngẫu nhiên, thời lượng làm tròn ms,
+#   nên cùng chuỗi quan sát (đồng hồ ảo) luôn cho cùng timeout.
+#   deterministic=False: thêm jitter ±jitter_fraction để các node thật không hết giờ đồng loạt.
+
+BACKOFF_MODES = ("linear", "exponential")
+
+_STATIC_BASE = {
+    ConsensusStep.PROPOSE: TIMEOUT_PROPOSE,
+    ConsensusStep.PREVOTE: TIMEOUT_PREVOTE,
+    ConsensusStep.PRECOMMIT: TIMEOUT_PRECOMMIT,
+}
+
+
+class TimeoutPolicy:
+    """
+    policy.timeout(step, round) -> giây;  policy.observe(step, duration_ms) sau mỗi bước kết thúc sớm.
+    """
+
+    def __init__(self, base: Optional[Dict[ConsensusStep, float]] = None, backoff: str = "linear",
+                 delta_s: float = TIMEOUT_DELTA, factor: float = 1.5, max_s: float = 60.0,
+                 adaptive: bool = False, percentile: float = 95.0, margin: float = 2.0,
+                 window: int = 64, min_samples: int = 8, alpha: float = 0.25, min_s: float = 0.01,
+                 deterministic: bool = True, jitter_fraction: float = 0.1, seed: Optional[int] = None):
+        if backoff not in BACKOFF_MODES:
+            raise ValueError(f"unknown backoff {backoff!r}, expected one of {BACKOFF_MODES}")
+        self.backoff = backoff
+        self.delta_s = delta_s
+        self.factor = factor
+        self.max_s = max_s
+        self.adaptive = adaptive
+        self.percentile = percentile
+        self.margin = margin
+        self.window = window
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.min_s = min_s
+        self.deterministic = deterministic
+        self.jitter_fraction = jitter_fraction
+        self._rng = random.Random(seed)
+        self._base: Dict[ConsensusStep, float] = dict(_STATIC_BASE)
+        if base:
+            self._base.update(base)
+        self._samples: Dict[ConsensusStep, Deque[float]] = {step: deque(maxlen=window) for step in self._base}
+
+    def base(self, step: ConsensusStep) -> float:
+        return self._base[step]
+
+    def timeout(self, step: ConsensusStep, round_num: int) -> float:
+        base = self._base[step]
+        if self.backoff == "linear":
+            value = base + self.delta_s * round_num
+        else:
+            value = base * self.factor ** round_num
+        value = min(value, self.max_s)
+        if not self.deterministic and self.jitter_fraction:
+            value *= 1.0 + self._rng.uniform(-self.jitter_fraction, self.jitter_fraction)
+        return value
+
+    def observe(self, step: ConsensusStep, duration_ms: float) -> None:
+        """
+        Ghi thời lượng một bước kết thúc nhờ tiến triển (không phải timeout).
+        """
+        if not self.adaptive or step not in self._samples:
+            return
+        if self.deterministic:
+            duration_ms = float(round(duration_ms))
+        samples = self._samples[step]
+        samples.append(duration_ms)
+        if len(samples) < self.min_samples:
+            return
+        ordered = sorted(samples)
+        rank = max(0, min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0 + 0.5) - 1))
+        target = min(self.max_s, max(self.min_s, ordered[rank] * self.margin / 1000.0))
+        self._base[step] += self.alpha * (target - self._base[step])
+
+    # Checkpoint ------------------------------------------------------------------
+    def checkpoint(self) -> Dict[str, Any]:
+        return {
+            "base": dict(self._base),
+            "samples": {step: list(s) for step, s in self._samples.items()},
+            "rng_state": self._rng.getstate(),
+        }
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        self._base = dict(snap["base"])
+        self._samples = {step: deque(s, maxlen=self.window) for step, s in snap["samples"].items()}
+        self._rng.setstate(snap["rng_state"])
@@ -0,0 +1,167 @@
+import json
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Dict, IO, List, Optional, Union
+
+# Tracing có cấu trúc cho package consensus (thay cho print()).
+# - Event có kiểu: level, kind, node, height, round, step + field bổ sung.
+# - Lọc theo level; event bị tắt bị loại trước khi tạo object, không format chuỗi.
+# - Sink thay được: Null (mặc định), RingBuffer (test/debug), JSONL (phân tích), Console (đọc bằng mắt).
+# Hot path (vd. mỗi vote nhận được) nên kiểm tra tracer.enabled(level) trước khi gọi emit.
+
+
+class TraceLevel(IntEnum):
+    DEBUG = 10
+    INFO = 20
+    WARN = 30
+    OFF = 100
+
+
+@dataclass(frozen=True)
+class TraceEvent:
+    level: TraceLevel
+    kind: str
+    node_id: Optional[str]
+    height: Optional[int]
+    round: Optional[int]
+    step: Optional[str]
+    fields: Dict[str, Any] = field(default_factory=dict)
+    time_ms: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {
+            "level": self.level.name,
+            "kind": self.kind,
+            "node": self.node_id,
+            "height": self.height,
+            "round": self.round,
+            "step": self.step,
+        }
+        if self.time_ms is not None:
+            out["time_ms"] = self.time_ms
+        out.update(self.fields)
+        return out
+
+    def format(self) -> str:
+        # Chỉ được gọi bởi sink dạng text, tức là khi event đã được bật
+        extra = " ".join(f"{k}={v}" for k, v in self.fields.items())
+        head = f"[{self.node_id}] {self.kind} h={self.height} r={self.round}"
+        if self.step is not None:
+            head += f" step={self.step}"
+        return f"{head} {extra}" if extra else head
+
+
+class NullSink:
+    def write(self, event: TraceEvent) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class RingBufferSink:
+    """
+    Giữ capacity event gần nhất trong bộ nhớ.
+    """
+
+    def __init__(self, capacity: int = 10_000):
+        self._events: deque = deque(maxlen=capacity)
+
+    def write(self, event: TraceEvent) -> None:
+        self._events.append(event)
+
+    def events(self, kind: Optional[str] = None) -> List[TraceEvent]:
+        if kind is None:
+            return list(self._events)
+        return [e for e in self._events if e.kind == kind]
+
+    def clear(self) -> None:
+        self._events.clear()
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlSink:
+    """
+    Mỗi event một dòng JSON (sort_keys) để so sánh/tái lập giữa các lần chạy.
+    """
+
+    def __init__(self, target: Union[str, IO[str]]):
+        if isinstance(target, str):
+            self._fh: IO[str] = open(target, "w", encoding="utf-8")
+            self._owns_fh = True
+        else:
+            self._fh = target
+            self._owns_fh = False
+
+    def write(self, event: TraceEvent) -> None:
+        self._fh.write(json.dumps(event.to_dict(), sort_keys=True, default=str) + "\n")
+
+    def close(self) -> None:
+        if self._owns_fh:
+            self._fh.close()
+        else:
+            self._fh.flush()
+
+
+class ConsoleSink:
+    def __init__(self, stream: Optional[IO[str]] = None):
+        self._stream = stream
+
+    def write(self, event: TraceEvent) -> None:
+        print(event.format(), file=self._stream or sys.stdout)
+
+    def close(self) -> None:
+        pass
+
+
+class Tracer:
+    """
+    Bộ phát event. level lọc event; sink=None tương đương NullSink và tắt mọi event.
+    clock (tùy chọn, vd. lambda: network.now_ms) đóng dấu thời gian cho event.
+    """
+
+    def __init__(self, sink: Any = None, level: TraceLevel = TraceLevel.INFO,
+                 clock: Optional[Callable[[], float]] = None):
+        self.sink = sink if sink is not None else NullSink()
+        self.level = TraceLevel.OFF if isinstance(self.sink, NullSink) else level
+        self.clock = clock
+
+    def enabled(self, level: TraceLevel) -> bool:
+        return level >= self.level
+
+    def emit(self, level: TraceLevel, kind: str, node_id: Optional[str] = None,
+             height: Optional[int] = None, round: Optional[int] = None,
+             step: Any = None, **fields: Any) -> None:
+        if level < self.level:
+            return
+        step_value = getattr(step, "value", step)
+        time_ms = self.clock() if self.clock is not None else None
+        self.sink.write(TraceEvent(level, kind, node_id, height, round, step_value, fields, time_ms))
+
+    def close(self) -> None:
+        self.sink.close()
+
+
+_DEFAULT_TRACER = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """
+    Tracer mặc định của package (tắt) cho các object không được truyền tracer riêng.
+    """
+    return _DEFAULT_TRACER
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Tracer:
+    """
+    Đổi tracer mặc định (None = tắt). Trả về tracer cũ để khôi phục.
+    Chỉ ảnh hưởng object tạo sau lời gọi.
+    """
+    global _DEFAULT_TRACER
+    previous = _DEFAULT_TRACER
+    _DEFAULT_TRACER = tracer if tracer is not None else Tracer()
+    return previous
@@ -1,26 +1,164 @@
-from dataclasses import dataclass
-from typing import Optional
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
 
+# Kiểu dữ liệu bất biến (frozen + __slots__) dùng chung trong src/consensus.
+# - Block cache hash (tính một lần khi tạo) và dạng wire (dict gửi qua network).
+# - to_wire()/from_wire() chuyển đổi với payload dict hiện có, không tạo class động.
 
-@dataclass
+
+def _deterministic_hash(obj: Any) -> str:
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
 class Vote:
     height: int
-    round: int 
+    round: int
     block_id: Optional[str]
     vote_type: str
-    validator: str 
-    chain_id: str
-    
-@dataclass
+    validator: str
+    chain_id: str = ""
+
+    def to_wire(self) -> Dict[str, Any]:
+        return {
+            "type": "VOTE",
+            "height": self.height,
+            "round": self.round,
+            "block_hash": self.block_id,
+            "phase": getattr(self.vote_type, "value", self.vote_type),
+            "from": self.validator,
+        }
+
+    @classmethod
+    def from_wire(cls, payload: Dict[str, Any], chain_id: str = "") -> "Vote":
+        return cls(
+            height=payload["height"],
+            round=payload.get("round", 0),
+            block_id=payload.get("block_hash"),
+            vote_type=payload["phase"],
+            validator=payload["from"],
+            chain_id=chain_id,
+        )
+
+
+@dataclass(frozen=True, slots=True)
 class Proposal:
     height: int
     round: int
     block_id: str
     proposer: str
-    
-@dataclass
+    signature: Optional[str] = None
+
+    def to_wire(self, block: Optional["Block"] = None) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "type": "PROPOSAL",
+            "height": self.height,
+            "round": self.round,
+            "block_hash": self.block_id,
+        }
+        if block is not None:
+            payload["block"] = block.to_wire()
+        return payload
+
+    @classmethod
+    def from_wire(cls, payload: Dict[str, Any]) -> "Proposal":
+        block = payload.get("block") or {}
+        return cls(
+            height=payload["height"],
+            round=payload.get("round", 0),
+            block_id=payload["block_hash"],
+            proposer=block.get("proposer", ""),
+        )
+
+
+@dataclass(frozen=True, slots=True)
 class BlockHeader:
     block_id: str
     height: int
     proposer: str
-    timestamp: float
\ No newline at end of file
+    timestamp: float = 0.0
+    parent_hash: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class Block:
+    """
+    Block bất biến. hash = sha256(JSON sort_keys) của các field nội dung (không gồm hash),
+    được tính một lần trong __post_init__ nếu không truyền sẵn (vd. từ wire).
+    """
+    height: int
+    round: int
+    parent_hash: str
+    proposer: str
+    txs: Tuple[Any, ...] = ()
+    # Thời điểm proposer đề xuất (ms, theo đồng hồ network); nằm trong hash
+    timestamp: float = 0.0
+    hash: str = ""
+    # Dạng wire được cache lại: không tham gia so sánh/repr
+    _wire: Optional[Dict[str, Any]] = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self):
+        if not isinstance(self.txs, tuple):
+            object.__setattr__(self, "txs", tuple(self.txs))
+        if not self.hash:
+            object.__setattr__(self, "hash", self.compute_hash())
+
+    def __hash__(self) -> int:
+        return hash(self.hash)
+
+    def content(self) -> Dict[str, Any]:
+        return {
+            "height": self.height,
+            "round": self.round,
+            "parent_hash": self.parent_hash,
+            "proposer": self.proposer,
+            "timestamp": self.timestamp,
+            "txs": list(self.txs),
+        }
+
+    def compute_hash(self) -> str:
+        return _deterministic_hash(self.content())
+
+    @property
+    def block_id(self) -> str:
+        return self.hash
+
+    def header(self) -> BlockHeader:
+        return BlockHeader(block_id=self.hash, height=self.height, proposer=self.proposer,
+                           timestamp=self.timestamp, parent_hash=self.parent_hash)
+
+    def to_wire(self) -> Dict[str, Any]:
+        """
+        Dict gửi qua network (JSON/pickle được). Được cache: người nhận không được sửa dict này.
+        """
+        wire = self._wire
+        if wire is None:
+            wire = self.content()
+            wire["hash"] = self.hash
+            object.__setattr__(self, "_wire", wire)
+        return wire
+
+    @classmethod
+    def from_wire(cls, data: Dict[str, Any], block_hash: Optional[str] = None) -> "Block":
+        """
+        Dựng Block từ dict wire; tin hash đi kèm (block_hash hoặc data["hash"]) thay vì băm lại.
+        Dùng verify_hash() nếu cần kiểm tra.
+        """
+        block_hash = block_hash or data.get("hash", "")
+        return cls(
+            height=data["height"],
+            round=data.get("round", 0),
+            parent_hash=data.get("parent_hash", ""),
+            proposer=data.get("proposer", ""),
+            txs=tuple(data.get("txs", ())),
+            timestamp=data.get("timestamp", 0.0),
+            hash=block_hash,
+            # Dict wire hợp lệ được dùng lại nguyên vẹn khi chuyển tiếp
+            _wire=data if block_hash and data.get("hash") == block_hash else None,
+        )
+
+    def verify_hash(self) -> bool:
+        return self.hash == self.compute_hash()
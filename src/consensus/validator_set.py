@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from functools import reduce
+from math import gcd
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+# Tập validator có trọng số (voting power / stake).
+# - Validator được sort theo id và đánh chỉ số dày đặc (dùng cho bitset của VoteTally).
+# - Ngưỡng tính sẵn một lần: quorum_power = +2/3 tổng power, f_plus_one_power = +1/3 tổng power
+#   (ít nhất một validator trung thực).
+# - Luân phiên proposer theo stake: weighted round-robin "mượt" như Tendermint (mỗi slot priority
+#   tăng theo power, proposer bị trừ tổng power). Chu kỳ dài total_power/gcd: chu kỳ ngắn
+#   (<= MAX_CYCLE_TABLE) được dựng thành bảng; stake thật (vd. 1e9) thì tính dần từng slot,
+#   O(số validator) mỗi slot, với checkpoint priority định kỳ và cache proposer gần đây.
+#   Power bằng nhau -> đúng thứ tự sort, giống rotation modulo cũ.
+
+MAX_CYCLE_TABLE = 4096
+# Checkpoint priority mỗi _CHECKPOINT_EVERY slot (giữ tối đa _MAX_CHECKPOINTS): tra ngược về slot
+# cũ chỉ tính lại tối đa _CHECKPOINT_EVERY bước
+_CHECKPOINT_EVERY = 1024
+_MAX_CHECKPOINTS = 64
+_RECENT_PROPOSERS = 256
+
+
+class ValidatorSet:
+    """
+    vs = ValidatorSet({"A": 10, "B": 5, "C": 5})   hoặc   ValidatorSet(["A", "B", "C"]) (power 1)
+    """
+
+    def __init__(self, validators: Union[Mapping[str, int], Iterable[str]]):
+        if isinstance(validators, Mapping):
+            powers = dict(validators)
+        else:
+            powers = {v: 1 for v in validators}
+        if not powers:
+            raise ValueError("validator set is empty")
+        for vid, power in powers.items():
+            if not isinstance(power, int) or power <= 0:
+                raise ValueError(f"voting power of {vid!r} must be a positive int, got {power!r}")
+        self.ids: List[str] = sorted(powers)
+        self.index: Dict[str, int] = {v: i for i, v in enumerate(self.ids)}
+        self.powers: List[int] = [powers[v] for v in self.ids]
+        self.total_power = sum(self.powers)
+        self.quorum_power = self.total_power * 2 // 3 + 1
+        self.f_plus_one_power = (self.total_power - 1) // 3 + 1
+        g = reduce(gcd, self.powers)
+        # Trọng số rút gọn: cùng chuỗi proposer với power gốc
+        self._weights = [p // g for p in self.powers]
+        self.cycle_length = sum(self._weights)
+        self._cycle: Optional[List[str]] = None
+        # Trạng thái tính dần (chu kỳ dài): priority sau _pos slot đầu tiên
+        self._pos = 0
+        self._priority = [0] * len(self._weights)
+        self._checkpoints: "OrderedDict[int, Tuple[int, ...]]" = OrderedDict()
+        self._recent: "OrderedDict[int, str]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, validator: str) -> bool:
+        return validator in self.index
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def power_of(self, validator: str) -> int:
+        idx = self.index.get(validator)
+        return self.powers[idx] if idx is not None else 0
+
+    def power_of_ids(self, validators: Iterable[str]) -> int:
+        return sum(self.power_of(v) for v in set(validators))
+
+    def has_quorum(self, validators: Iterable[str]) -> bool:
+        return self.power_of_ids(validators) >= self.quorum_power
+
+    def has_f_plus_one(self, validators: Iterable[str]) -> bool:
+        return self.power_of_ids(validators) >= self.f_plus_one_power
+
+    @property
+    def is_uniform(self) -> bool:
+        return len(set(self.powers)) == 1
+
+    # Proposer -------------------------------------------------------------------
+    def _step(self, priority: List[int]) -> int:
+        total = self.cycle_length
+        for i, w in enumerate(self._weights):
+            priority[i] += w
+        # Hòa thì chọn id nhỏ nhất (chỉ số nhỏ nhất) -> tất định
+        best = max(range(len(priority)), key=lambda i: (priority[i], -i))
+        priority[best] -= total
+        return best
+
+    def proposer_cycle(self) -> List[str]:
+        """
+        Một chu kỳ luân phiên proposer theo stake: mỗi validator xuất hiện power/g lần.
+        Chỉ dựng cho chu kỳ <= MAX_CYCLE_TABLE; dài hơn thì dùng proposer_at.
+        """
+        if self._cycle is None:
+            if self.cycle_length > MAX_CYCLE_TABLE:
+                raise ValueError(f"proposer cycle of {self.cycle_length} slots is too long for a table")
+            priority = [0] * len(self._weights)
+            self._cycle = [self.ids[self._step(priority)] for _ in range(self.cycle_length)]
+        return self._cycle
+
+    def proposer_at(self, slot: int) -> str:
+        """
+        Proposer của slot thứ slot trong chuỗi luân phiên (slot = height + round [+ offset]).
+        """
+        slot %= self.cycle_length
+        if self.cycle_length <= MAX_CYCLE_TABLE:
+            return self.proposer_cycle()[slot]
+        recent = self._recent
+        vid = recent.get(slot)
+        if vid is not None:
+            recent.move_to_end(slot)
+            return vid
+        if slot < self._pos:
+            # Tra ngược: quay về checkpoint gần nhất <= slot (slot 0 = priority toàn 0)
+            start = (slot // _CHECKPOINT_EVERY) * _CHECKPOINT_EVERY
+            saved = self._checkpoints.get(start)
+            if saved is None:
+                start, saved = max(((p, c) for p, c in self._checkpoints.items() if p <= slot),
+                                   default=(0, (0,) * len(self._weights)))
+            self._pos, self._priority = start, list(saved)
+        priority = self._priority
+        while True:
+            pos = self._pos
+            if pos % _CHECKPOINT_EVERY == 0 and pos not in self._checkpoints:
+                self._checkpoints[pos] = tuple(priority)
+                if len(self._checkpoints) > _MAX_CHECKPOINTS:
+                    self._checkpoints.popitem(last=False)
+            vid = self.ids[self._step(priority)]
+            self._pos = pos + 1
+            if pos == slot:
+                break
+        recent[slot] = vid
+        if len(recent) > _RECENT_PROPOSERS:
+            recent.popitem(last=False)
+        return vid
+
+    def proposer(self, height: int, round_num: int) -> str:
+        return self.proposer_at(height + round_num)
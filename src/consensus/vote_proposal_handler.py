@@ -3,20 +3,25 @@ from .vote_set import VoteSet
 from .block_store import BlockStore
 from .proposal_store import ProposalStore
 from .message_validator import MessageValidator
+from .proposer import ProposerSchedule, ROUND_ROBIN
 from .types import Vote, Proposal, BlockHeader, Block
 from src.consensus.constants import NIL_BLOCK_HASH
+from src.consensus.tracing import Tracer, TraceLevel, get_tracer
 
 
 class VoteProposalHandler:
 
-    def __init__(self, chain_id: str, validators: list[str]):
+    def __init__(self, chain_id: str, validators: list[str], tracer: Optional[Tracer] = None):
         self.vote_set = VoteSet()
         self.block_store = BlockStore()
         self.proposal_store = ProposalStore()
         self.validator = MessageValidator(chain_id)
 
-        self.validators = validators  
+        self.validators = validators
+        # Round-robin theo đúng thứ tự validators truyền vào
+        self.proposer_schedule = ProposerSchedule(validators, mode=ROUND_ROBIN)
         self.chain_id = chain_id
+        self.tracer = tracer if tracer is not None else get_tracer()
 
         self.cb_proposal_ready: Optional[Callable[[Any], None]] = None
         
@@ -49,8 +54,7 @@ class VoteProposalHandler:
         return self.vote_set.add_vote(vote)
     
     def get_proposer(self, height: int, round: int) -> str:
-        idx = (height + round) % len(self.validators)
-        return self.validators[idx]
+        return self.proposer_schedule.proposer(height, round)
 
     def create_proposal(self, height: int, round: int) -> Block:
         
@@ -59,8 +63,8 @@ class VoteProposalHandler:
             height=height,
             round=round,
             parent_hash=parent,
-            hash=f"block-{height}-{round}",
-            txs=["tx1", "tx2"]
+            proposer=self.get_proposer(height, round),
+            txs=("tx1", "tx2"),
         )
         self.block_store.save(block)
         return block
@@ -70,10 +74,11 @@ class VoteProposalHandler:
             height=height,
             round=round,
             block_id=block.hash,
-            proposer_id="?",
+            proposer=block.proposer,
             signature="dummy"
         )
-        print(f"[BROADCAST] Proposal {proposal.block_id}")
+        self.tracer.emit(TraceLevel.INFO, "broadcast_proposal", None, height, round,
+                         block_hash=proposal.block_id)
 
     def broadcast_vote(self, height: int, round: int, vote_type: str, block_hash: str):
         vote = Vote(
@@ -84,17 +89,20 @@ class VoteProposalHandler:
             validator="local-node",
             chain_id=self.chain_id
         )
-        print(f"[BROADCAST] VOTE {vote_type} -> {block_hash}")
+        if self.tracer.enabled(TraceLevel.DEBUG):
+            self.tracer.emit(TraceLevel.DEBUG, "broadcast_vote", None, height, round, vote_type,
+                             block_hash=block_hash)
         self.vote_set.add_vote(vote)
 
     def schedule_timeout(self, duration: float, step):
-        print(f"[TIMER] Schedule timeout {step} in {duration}s")
+        self.tracer.emit(TraceLevel.DEBUG, "schedule_timeout", step=step, duration_s=duration)
 
     def get_block_by_hash(self, h: str) -> Optional[Block]:
         return self.block_store.get(h)
 
     def commit_block(self, block: Block):
-        print(f"[LEDGER] Committing block: {block.hash}")
+        self.tracer.emit(TraceLevel.INFO, "commit", None, block.height, block.round,
+                         block_hash=block.hash)
         
     def get_votes(self, height: int, round: int, vote_type: str):
         return self.vote_set.get_votes(height, round, vote_type)
@@ -1,29 +1,40 @@
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
 from .types import Vote
 from .constants import ConsensusStep
+from .vote_tally import QuorumCallback, VoteTally
 
 class VoteSet:
-    
-    def __init__(self):
+    """
+    Lưu Vote đầy đủ (để lấy lại/chuyển tiếp) và đếm qua VoteTally: count_for_block là O(1).
+    validators: danh sách validator (None = nhận validator lạ tới capacity).
+    """
+
+    def __init__(self, validators: Optional[Iterable[str]] = None, capacity: int = 1 << 16,
+                 on_quorum: Optional[QuorumCallback] = None):
         self.votes: Dict[str, Dict[int, Dict[int, Dict[str, Vote]]]] = {
             ConsensusStep.PREVOTE: defaultdict(lambda: defaultdict(dict)),
             ConsensusStep.PRECOMMIT : defaultdict(lambda: defaultdict(dict))
         }
+        if validators is not None:
+            self.tally = VoteTally(validators, on_quorum=on_quorum)
+        else:
+            self.tally = VoteTally(capacity=capacity, on_quorum=on_quorum)
 
     def has_vote(self, vote: Vote) -> bool:
         return vote.validator in self.votes[vote.vote_type][vote.height][vote.round]
 
     def add_vote(self, vote: Vote) -> bool:
         if self.has_vote(vote):
-            return False 
+            return False
+        if self.tally.add(vote.height, vote.round, vote.vote_type, vote.block_id, vote.validator) is None:
+            return False
 
         self.votes[vote.vote_type][vote.height][vote.round][vote.validator] = vote
         return True
 
     def count_for_block(self, height: int, round: int, vote_type: str, block_id: str) -> int:
-        return sum(1 for v in self.votes[vote_type][height][round].values()
-                   if v.block_id == block_id)
+        return self.tally.count(height, round, vote_type, block_id)
 
     def get_votes(self, height: int, round: int, vote_type: str) -> List[Vote]:
-        return list(self.votes[vote_type][height][round].values())
\ No newline at end of file
+        return list(self.votes[vote_type][height][round].values())
@@ -0,0 +1,196 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.consensus.validator_set import ValidatorSet
+
+# Đếm phiếu tăng dần dùng chung cho engine/helper/VoteSet.
+# - Validator được đánh chỉ số dày đặc 0..n-1 (theo thứ tự sort) -> phiếu lưu thành bitset int.
+# - Mỗi key (height, round, phase, block_hash) giữ bitset + tổng voting power chạy:
+#   thêm phiếu O(1), không quét lại. Power mặc định 1 -> "count" đúng là số phiếu.
+# - Mỗi (height, round, phase) giữ bitset "đã bỏ phiếu": một validator chỉ được tính một phiếu,
+#   phiếu thứ hai cho hash khác bị từ chối (equivocation).
+# - Mỗi (height, round) giữ bitset validator đã gửi phiếu bất kỳ phase nào: bằng chứng f+1 cho
+#   round cao hơn (round skip) là một phép OR, không quét lại.
+# - Callback on_quorum được gọi đúng một lần khi power vượt threshold cho một key
+#   (mặc định quorum_power của ValidatorSet).
+
+TallyKey = Tuple[int, int, str, Optional[str]]
+QuorumCallback = Callable[[int, int, str, Optional[str]], None]
+
+
+def _phase_name(phase: Any) -> str:
+    return getattr(phase, "value", phase)
+
+
+class VoteTally:
+    """
+    tally = VoteTally(ValidatorSet({"A": 2, "B": 1, "C": 1}), on_quorum=cb)
+    tally.add(height, round, "PREVOTE", block_hash, "A")  -> power mới, hoặc None nếu bị bỏ qua
+    validators: ValidatorSet hoặc danh sách id (power 1).
+    capacity: nếu chưa biết trước danh sách validator (vd. ConsensusEngine chỉ biết tổng số node),
+    validator lạ được cấp chỉ số tiếp theo (power 1) cho tới khi đủ capacity.
+    """
+
+    def __init__(self, validators: Union[ValidatorSet, Iterable[str]] = (), threshold: Optional[int] = None,
+                 on_quorum: Optional[QuorumCallback] = None, capacity: Optional[int] = None):
+        if not isinstance(validators, ValidatorSet):
+            validators = sorted(validators)
+            if validators or capacity is None:
+                validators = ValidatorSet(validators)
+        if isinstance(validators, ValidatorSet):
+            self.validator_set: Optional[ValidatorSet] = validators
+            self.validators: List[str] = list(validators.ids)
+            self._powers: List[int] = list(validators.powers)
+            self.capacity = len(self.validators)
+            default_threshold = validators.quorum_power
+        else:
+            # Chưa biết validator: power 1, ngưỡng theo capacity
+            self.validator_set = None
+            self.validators = []
+            self._powers = []
+            self.capacity = capacity
+            default_threshold = capacity * 2 // 3 + 1
+        self.index: Dict[str, int] = {v: i for i, v in enumerate(self.validators)}
+        # Power chung khi mọi validator bằng nhau (kể cả chế độ capacity: power 1) -> popcount
+        if self.validator_set is None or not self._powers:
+            self._uniform_power: Optional[int] = 1
+        elif self.validator_set.is_uniform:
+            self._uniform_power = self._powers[0]
+        else:
+            self._uniform_power = None
+        self.threshold = threshold if threshold is not None else default_threshold
+        self.on_quorum = on_quorum
+        self._bits: Dict[TallyKey, int] = {}
+        self._counts: Dict[TallyKey, int] = {}
+        # (height, round, phase) -> bitset validator đã bỏ phiếu (cho bất kỳ hash nào)
+        self._voted: Dict[Tuple[int, int, str], int] = {}
+        # (height, round) -> bitset validator đã bỏ phiếu ở bất kỳ phase nào
+        self._round_voters: Dict[Tuple[int, int], int] = {}
+        self._reached: set = set()
+
+    # Ghi phiếu -------------------------------------------------------------------
+    def add(self, height: int, round_num: int, phase: Any, block_hash: Optional[str],
+            validator: str) -> Optional[int]:
+        """
+        Ghi một phiếu. Trả về tổng power hiện tại của block_hash, hoặc None nếu validator lạ
+        hoặc đã bỏ phiếu ở (height, round, phase) này.
+        """
+        idx = self.index.get(validator)
+        if idx is None:
+            if len(self.validators) >= self.capacity:
+                return None
+            idx = self.index[validator] = len(self.validators)
+            self.validators.append(validator)
+            self._powers.append(1)
+        phase = _phase_name(phase)
+        bit = 1 << idx
+        round_key = (height, round_num, phase)
+        voted = self._voted.get(round_key, 0)
+        if voted & bit:
+            return None
+        self._voted[round_key] = voted | bit
+        self._round_voters[height, round_num] = self._round_voters.get((height, round_num), 0) | bit
+
+        key = (height, round_num, phase, block_hash)
+        self._bits[key] = self._bits.get(key, 0) | bit
+        before = self._counts.get(key, 0)
+        count = before + self._powers[idx]
+        self._counts[key] = count
+        # Vượt ngưỡng đúng ở phiếu này (power > 1 có thể nhảy qua ngưỡng)
+        if before < self.threshold <= count:
+            self._reached.add(key)
+            if self.on_quorum is not None:
+                self.on_quorum(height, round_num, phase, block_hash)
+        return count
+
+    # Truy vấn --------------------------------------------------------------------
+    def count(self, height: int, round_num: int, phase: Any, block_hash: Optional[str]) -> int:
+        # Tổng voting power (= số phiếu khi mọi power bằng 1)
+        return self._counts.get((height, round_num, _phase_name(phase), block_hash), 0)
+
+    def bitset(self, height: int, round_num: int, phase: Any, block_hash: Optional[str]) -> int:
+        return self._bits.get((height, round_num, _phase_name(phase), block_hash), 0)
+
+    def has_quorum(self, height: int, round_num: int, phase: Any, block_hash: Optional[str]) -> bool:
+        return (height, round_num, _phase_name(phase), block_hash) in self._reached
+
+    def has_voted(self, height: int, round_num: int, phase: Any, validator: str) -> bool:
+        idx = self.index.get(validator)
+        if idx is None:
+            return False
+        return bool(self._voted.get((height, round_num, _phase_name(phase)), 0) >> idx & 1)
+
+    def voters(self, height: int, round_num: int, phase: Any, block_hash: Optional[str]) -> List[str]:
+        return self.decode(self.bitset(height, round_num, phase, block_hash))
+
+    def round_power(self, height: int, round_num: int) -> int:
+        """
+        Tổng power của các validator đã bỏ phiếu (phase bất kỳ) ở (height, round).
+        """
+        return self.power_of_bits(self._round_voters.get((height, round_num), 0))
+
+    def power_of_bits(self, bits: int) -> int:
+        if self._uniform_power is not None:
+            return bits.bit_count() * self._uniform_power
+        total = 0
+        idx = 0
+        while bits:
+            if bits & 1:
+                total += self._powers[idx]
+            bits >>= 1
+            idx += 1
+        return total
+
+    def decode(self, bits: int) -> List[str]:
+        out = []
+        idx = 0
+        while bits:
+            if bits & 1:
+                out.append(self.validators[idx])
+            bits >>= 1
+            idx += 1
+        return out
+
+    def block_counts(self, height: int, round_num: int, phase: Any) -> Dict[Optional[str], int]:
+        """
+        {block_hash: power} của mọi hash nhận phiếu ở (height, round, phase).
+        """
+        phase = _phase_name(phase)
+        return {key[3]: c for key, c in self._counts.items()
+                if key[0] == height and key[1] == round_num and key[2] == phase}
+
+    def by_phase(self, height: int, round_num: int) -> Dict[str, Dict[Optional[str], set]]:
+        """
+        Dạng {phase: {block_hash: set(validator)}} của (height, round), cho code cũ đọc dict.
+        """
+        out: Dict[str, Dict[Optional[str], set]] = {}
+        for key, bits in self._bits.items():
+            if key[0] == height and key[1] == round_num:
+                out.setdefault(key[2], {})[key[3]] = set(self.decode(bits))
+        return out
+
+    # Dọn dẹp & checkpoint ----------------------------------------------------------
+    def prune(self, below_height: int) -> None:
+        """
+        Bỏ mọi phiếu của height < below_height (đã commit).
+        """
+        for table in (self._bits, self._counts, self._voted, self._round_voters):
+            for key in [k for k in table if k[0] < below_height]:
+                del table[key]
+        self._reached = {k for k in self._reached if k[0] >= below_height}
+
+    def checkpoint(self) -> Dict[str, Any]:
+        # Giá trị là int bất biến: chỉ copy container
+        return {
+            "bits": dict(self._bits),
+            "counts": dict(self._counts),
+            "voted": dict(self._voted),
+            "round_voters": dict(self._round_voters),
+            "reached": set(self._reached),
+        }
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        self._bits = dict(snap["bits"])
+        self._counts = dict(snap["counts"])
+        self._voted = dict(snap["voted"])
+        self._round_voters = dict(snap.get("round_voters", {}))
+        self._reached = set(snap["reached"])
@@ -49,6 +49,7 @@ def encode_vote_for_signing(vote: dict, chain_id: str) -> bytes:
         "chain_id": chain_id,
         "type": "VOTE",
         "height": vote["height"],
+        "round": vote["round"],
         "block_hash": vote["block_hash"],
         "phase": vote["phase"],  # "PREVOTE" / "PRECOMMIT"
         "voter": vote["voter"],
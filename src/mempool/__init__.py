@@ -0,0 +1,2 @@
+from .mempool import Mempool, MempoolEntry, tx_hash  # noqa: F401
+from .gossip import TxGossip, SeenSet, TX_MESSAGE_TYPES  # noqa: F401
@@ -0,0 +1,234 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.mempool.mempool import Mempool, tx_hash
+
+# Lan truyền tx qua NetworkSimulator theo kiểu inventory (INV -> GETDATA -> BODY):
+# - Tx mới (submit hoặc nhận được và được mempool chấp nhận) chỉ được *báo* bằng hash: id dồn vào hàng
+#   đợi của từng link, mỗi announce_interval_ms gửi một HEADER TX_INV cho mỗi peer (tối đa max_announce id).
+# - Peer chỉ xin (TX_GETDATA) những id chưa thấy và chưa xin ai; người báo trả thân tx bằng send_body trên
+#   chính header_id của INV (network chỉ nhận BODY khi receiver đã thấy HEADER đó). Peer khác báo cùng id
+#   trong lúc chờ được ghi lại; quá request_timeout_ms chưa có thân (rơi gói) thì xin lại từ peer đó.
+# - seen: tập hash đã xử lý, giới hạn kích thước (FIFO), để INV lặp lại từ nhiều peer không gây tải lại.
+# - mode="flood": gửi thẳng thân tx cho mọi peer (để so sánh băng thông).
+
+TX_INV = "TX_INV"
+TX_GETDATA = "TX_GETDATA"
+TX_BODY = "TX_BODY"
+TX_FLOOD = "TX_FLOOD"
+TX_FLUSH = "TX_FLUSH"
+TX_MESSAGE_TYPES = frozenset({TX_INV, TX_GETDATA, TX_BODY, TX_FLOOD})
+
+GOSSIP_MODES = ("inv", "flood")
+
+
+class SeenSet:
+    """
+    Tập hash có giới hạn: vượt capacity thì bỏ hash cũ nhất.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, item: str) -> None:
+        if item in self._items:
+            return
+        self._items[item] = None
+        if len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def checkpoint(self) -> "OrderedDict[str, None]":
+        return OrderedDict(self._items)
+
+    def restore(self, snap: "OrderedDict[str, None]") -> None:
+        self._items = OrderedDict(snap)
+
+
+class TxGossip:
+    """
+    gossip = TxGossip(node_id, peers, network, mempool); gossip.submit(tx)
+    Node chuyển payload TX_* tới on_message và timer TX_FLUSH tới on_timer.
+    stats: số id đã báo, số id xin, số tx gửi thân, số tx nhận trùng (tx đã có).
+    """
+
+    def __init__(self, node_id: str, peers: List[str], network, mempool: Mempool, mode: str = "inv",
+                 announce_interval_ms: float = 20.0, max_announce: int = 1_000,
+                 seen_capacity: int = 100_000, request_timeout_ms: float = 500.0):
+        if mode not in GOSSIP_MODES:
+            raise ValueError(f"unknown gossip mode {mode!r}")
+        self.node_id = node_id
+        self.peers = peers
+        self.network = network
+        self.mempool = mempool
+        self.mode = mode
+        self.announce_interval_ms = announce_interval_ms
+        self.max_announce = max_announce
+        self.request_timeout_ms = request_timeout_ms
+        self.seen = SeenSet(seen_capacity)
+        # Id chờ báo theo peer (inv) hoặc tx chờ gửi (flood)
+        self._outbox: Dict[str, List[Any]] = {}
+        self._flush_pending = False
+        # Id đã xin -> (thời điểm xin, [(peer, inv_id)] các peer khác đã báo id này)
+        self._requested: Dict[str, Tuple[float, List[Tuple[str, str]]]] = {}
+        self._seq = 0
+        self.stats = {"announced": 0, "requested": 0, "bodies_sent": 0, "duplicates": 0}
+
+    def _now(self) -> float:
+        return float(getattr(self.network, "now_ms", 0.0))
+
+    def _next_id(self, prefix: str) -> str:
+        self._seq += 1
+        return f"{prefix}-{self.node_id}-{self._seq}"
+
+    def submit(self, tx: Dict[str, Any]) -> bool:
+        """
+        Tx do client gửi tới node này: vào mempool rồi lan truyền.
+        """
+        return self._accept(tx, tx_hash(tx), source=None)
+
+    def _accept(self, tx: Dict[str, Any], tx_id: str, source: Optional[str]) -> bool:
+        self._requested.pop(tx_id, None)
+        if tx_id in self.seen:
+            self.stats["duplicates"] += 1
+            return False
+        self.seen.add(tx_id)
+        if not self.mempool.add(tx, tx_id):
+            return False
+        item = tx if self.mode == "flood" else tx_id
+        for peer in self.peers:
+            if peer != source:
+                self._outbox.setdefault(peer, []).append(item)
+        self._schedule_flush()
+        return True
+
+    # Gửi theo lô ------------------------------------------------------------
+    def _schedule_flush(self) -> None:
+        if self._flush_pending:
+            return
+        schedule_timer = getattr(self.network, "schedule_timer", None)
+        if schedule_timer is None:
+            self.flush()
+            return
+        self._flush_pending = True
+        schedule_timer(self.node_id, self.announce_interval_ms, {"type": TX_FLUSH})
+
+    def on_timer(self, payload: Dict[str, Any]) -> None:
+        if payload.get("type") != TX_FLUSH:
+            return
+        self._flush_pending = False
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Mỗi peer một message cho các id/tx dồn từ lần flush trước (tối đa max_announce, phần dư để lần sau);
+        xin lại các id quá hạn.
+        """
+        if self._requested:
+            self._retry_requests()
+        outbox, self._outbox = self._outbox, {}
+        for peer, items in outbox.items():
+            batch, rest = items[:self.max_announce], items[self.max_announce:]
+            if rest:
+                self._outbox[peer] = rest
+            if self.mode == "flood":
+                self.network.send_header(self.node_id, peer, self._next_id("txflood"), 0, {
+                    "type": TX_FLOOD, "from": self.node_id, "txs": batch})
+                self.stats["bodies_sent"] += len(batch)
+            else:
+                self.network.send_header(self.node_id, peer, self._next_id("txinv"), 0, {
+                    "type": TX_INV, "from": self.node_id, "ids": batch})
+                self.stats["announced"] += len(batch)
+        # Không có timer (vd. LogReplayNetwork): flush đúng một lần, không tự gọi lại (đồng hồ không chạy
+        # nên id đang xin không bao giờ quá hạn); phần dư/xin lại chờ tx hoặc INV kế tiếp
+        if (self._outbox or self._requested) and getattr(self.network, "schedule_timer", None) is not None:
+            self._schedule_flush()
+
+    def _retry_requests(self) -> None:
+        now = self._now()
+        retries: Dict[Tuple[str, str], List[str]] = {}
+        for tx_id, (asked_at, alternates) in list(self._requested.items()):
+            if now - asked_at < self.request_timeout_ms:
+                continue
+            if not alternates:
+                # Không còn ai để xin: id sẽ được xin lại nếu có INV mới
+                del self._requested[tx_id]
+                continue
+            peer, inv_id = alternates.pop(0)
+            self._requested[tx_id] = (now, alternates)
+            retries.setdefault((peer, inv_id), []).append(tx_id)
+        for (peer, inv_id), ids in retries.items():
+            self._send_getdata(peer, inv_id, ids)
+
+    def _send_getdata(self, peer: str, inv_id: str, ids: List[str]) -> None:
+        self.stats["requested"] += len(ids)
+        self.network.send_header(self.node_id, peer, self._next_id("txreq"), 0, {
+            "type": TX_GETDATA, "from": self.node_id, "inv_id": inv_id, "ids": ids})
+
+    # Nhận -------------------------------------------------------------------
+    def on_message(self, msg: Dict[str, Any]) -> None:
+        payload = msg.get("payload", {})
+        mtype = payload.get("type")
+        source = payload.get("from")
+        if mtype == TX_INV:
+            self._on_inv(source, msg.get("header_id"), payload.get("ids", ()))
+        elif mtype == TX_GETDATA:
+            self._on_getdata(source, payload.get("inv_id"), payload.get("ids", ()))
+        elif mtype in (TX_BODY, TX_FLOOD):
+            self._on_txs(source, payload.get("txs", ()))
+
+    def _on_inv(self, source: str, inv_id: str, ids: Iterable[str]) -> None:
+        now = self._now()
+        requested = self._requested
+        wanted = []
+        for tx_id in ids:
+            if tx_id in self.seen or tx_id in self.mempool:
+                continue
+            pending = requested.get(tx_id)
+            if pending is not None:
+                # Đang chờ thân từ peer khác: nhớ người báo này để xin lại nếu quá hạn
+                pending[1].append((source, inv_id))
+                continue
+            requested[tx_id] = (now, [])
+            wanted.append(tx_id)
+        if wanted:
+            self._send_getdata(source, inv_id, wanted)
+            self._schedule_flush()
+
+    def _on_getdata(self, source: str, inv_id: str, ids: Iterable[str]) -> None:
+        # Tx đã commit/bị evict thì không còn trong pool: người xin sẽ nhận từ peer khác hoặc qua block
+        txs = [tx for tx in (self.mempool.get(tx_id) for tx_id in ids) if tx is not None]
+        if not txs:
+            return
+        self.stats["bodies_sent"] += len(txs)
+        self.network.send_body(self.node_id, source, inv_id, 0, {
+            "type": TX_BODY, "from": self.node_id, "txs": txs})
+
+    def _on_txs(self, source: str, txs: Iterable[Dict[str, Any]]) -> None:
+        for tx in txs:
+            self._accept(tx, tx_hash(tx), source)
+
+    # Checkpoint ---------------------------------------------------------------
+    def checkpoint(self) -> Dict[str, Any]:
+        return {
+            "seen": self.seen.checkpoint(),
+            "outbox": {peer: list(items) for peer, items in self._outbox.items()},
+            "flush_pending": self._flush_pending,
+            "requested": {tx_id: (t, list(alts)) for tx_id, (t, alts) in self._requested.items()},
+            "seq": self._seq,
+            "stats": dict(self.stats),
+        }
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        self.seen.restore(snap["seen"])
+        self._outbox = {peer: list(items) for peer, items in snap["outbox"].items()}
+        self._flush_pending = snap["flush_pending"]
+        self._requested = {tx_id: (t, list(alts)) for tx_id, (t, alts) in snap["requested"].items()}
+        self._seq = snap["seq"]
+        self.stats = dict(snap["stats"])
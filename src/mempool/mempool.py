@@ -0,0 +1,273 @@
+import hashlib
+import heapq
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.encoding.codec import canonical_json
+
+# Mempool: tx chờ vào block.
+# - Mỗi sender một hàng theo nonce (dict nonce -> entry). Tx "sẵn sàng" là chuỗi nonce liên tục bắt đầu
+#   từ nonce đã commit + 1, đúng luật nonce của state.apply_transaction (nonce == last_nonce + 1).
+# - Ưu tiên theo fee (tx["fee"], mặc định 0), hòa thì tx tới trước. Heap min theo ưu tiên -> evict O(log n)
+#   khi pool đầy; xóa lười: entry đã gỡ chỉ bị bỏ khi nổi lên đỉnh heap (heap được dựng lại khi quá nhiều rác).
+# - pack(): heap max trên đầu hàng sẵn sàng của mỗi sender, lấy dần tới hết ngân sách số tx/byte.
+# - on_commit(): chỉ xét lại các sender có tx trong block vừa commit, không quét cả pool.
+
+DEFAULT_MAX_TXS = 50_000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_PER_SENDER = 64
+DEFAULT_BLOCK_MAX_TXS = 5_000
+DEFAULT_BLOCK_MAX_BYTES = 1024 * 1024
+
+
+def tx_hash(tx: Dict[str, Any]) -> str:
+    """
+    sha256(canonical_json(tx)): id dùng để khử trùng lặp (cùng nội dung -> cùng hash).
+    """
+    return hashlib.sha256(canonical_json(tx)).hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class MempoolEntry:
+    tx: Dict[str, Any]
+    hash: str
+    sender: str
+    nonce: int
+    fee: int
+    size: int
+    # Thứ tự tới pool: hòa fee thì tx cũ hơn được ưu tiên
+    seq: int
+
+
+class Mempool:
+    """
+    pool = Mempool(); pool.add(tx) -> bool; txs = pool.pack(); pool.on_commit(block.txs)
+    nonces: nonce đã commit theo sender; truyền State.nonces để dùng chung với state, mặc định pool tự giữ.
+    validate: hook kiểm tra thêm (vd. chữ ký) gọi sau các kiểm tra rẻ.
+    """
+
+    def __init__(self, nonces: Optional[Dict[str, int]] = None, max_txs: int = DEFAULT_MAX_TXS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_per_sender: int = DEFAULT_MAX_PER_SENDER,
+                 block_max_txs: Optional[int] = DEFAULT_BLOCK_MAX_TXS,
+                 block_max_bytes: Optional[int] = DEFAULT_BLOCK_MAX_BYTES,
+                 validate: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.nonces: Dict[str, int] = nonces if nonces is not None else {}
+        self.max_txs = max_txs
+        self.max_bytes = max_bytes
+        self.max_per_sender = max_per_sender
+        self.block_max_txs = block_max_txs
+        self.block_max_bytes = block_max_bytes
+        self.validate = validate
+        self._by_hash: Dict[str, MempoolEntry] = {}
+        self._queues: Dict[str, Dict[int, MempoolEntry]] = {}
+        # (fee, -seq, hash): đỉnh là tx fee thấp nhất, hòa thì tx mới nhất -> ứng viên evict
+        self._evict_heap: List[Tuple[int, int, str]] = []
+        self._bytes = 0
+        self._seq = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._by_hash)
+
+    def __contains__(self, tx_id: str) -> bool:
+        return tx_id in self._by_hash
+
+    def ids(self) -> Iterable[str]:
+        return self._by_hash.keys()
+
+    def get(self, tx_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._by_hash.get(tx_id)
+        return entry.tx if entry is not None else None
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def add(self, tx: Dict[str, Any], tx_id: Optional[str] = None) -> bool:
+        """
+        Thêm tx; False nếu trùng hash, nonce cũ/quá xa, sai ownership, không qua validate,
+        hoặc pool đầy mà tx không ưu tiên hơn tx yếu nhất. tx_id: hash đã tính sẵn (vd. từ gossip).
+        """
+        sender = tx.get("sender")
+        nonce = tx.get("nonce")
+        key = tx.get("key")
+        if not isinstance(sender, str) or not isinstance(nonce, int) or not isinstance(key, str):
+            return False
+        tx_id = tx_id or tx_hash(tx)
+        if tx_id in self._by_hash:
+            return False
+        committed = self.nonces.get(sender, 0)
+        if nonce <= committed or nonce > committed + self.max_per_sender:
+            return False
+        # Luật ownership của state.apply_transaction: tx không áp được thì không giữ trong pool
+        if not key.startswith(sender + "/"):
+            return False
+        if self.validate is not None and not self.validate(tx):
+            return False
+        fee = tx.get("fee", 0)
+        queue = self._queues.get(sender)
+        existing = queue.get(nonce) if queue else None
+        if existing is not None:
+            # Cùng (sender, nonce): chỉ thay khi fee cao hơn
+            if fee <= existing.fee:
+                return False
+        size = len(canonical_json(tx))
+        # Tx cũ chỉ bị gỡ khi chắc chắn tx mới vào được (không mất cả hai khi pool đầy)
+        if size > self.max_bytes or not self._make_room(fee, size, existing):
+            return False
+        if existing is not None and existing.hash in self._by_hash:
+            self._remove(existing)
+        self._seq += 1
+        entry = MempoolEntry(tx, tx_id, sender, nonce, fee, size, self._seq)
+        self._by_hash[tx_id] = entry
+        self._queues.setdefault(sender, {})[nonce] = entry
+        self._bytes += size
+        heapq.heappush(self._evict_heap, (fee, -entry.seq, tx_id))
+        return True
+
+    def _make_room(self, fee: int, size: int, replacing: Optional[MempoolEntry] = None) -> bool:
+        # Evict tx yếu nhất khi đầy; tx mới (seq lớn nhất) chỉ thắng khi fee cao hơn hẳn.
+        # Chọn đủ nạn nhân trước rồi mới gỡ: không đủ chỗ thì pool giữ nguyên.
+        # replacing: tx cùng (sender, nonce) sắp bị thay, chỗ của nó coi như đã trống.
+        count = len(self._by_hash) - (replacing is not None)
+        used = self._bytes - (replacing.size if replacing is not None else 0)
+        victims: Dict[str, MempoolEntry] = {}
+        popped: List[Tuple[int, int, str]] = []
+        while count >= self.max_txs or used + size > self.max_bytes:
+            entry = self._peek_weakest()
+            if entry is None or entry.fee >= fee:
+                for item in popped:
+                    heapq.heappush(self._evict_heap, item)
+                return False
+            popped.append(heapq.heappop(self._evict_heap))
+            if entry.hash in victims:
+                continue
+            # Nonce sau tx bị evict không còn áp được -> bỏ luôn phần đuôi của sender
+            queue = self._queues[entry.sender]
+            for nonce in sorted(n for n in queue if n >= entry.nonce):
+                victim = queue[nonce]
+                if victim.hash in victims:
+                    continue
+                victims[victim.hash] = victim
+                if victim is not replacing:
+                    count -= 1
+                    used -= victim.size
+        for victim in victims.values():
+            self._remove(victim)
+            if victim is not replacing:
+                self.evicted += 1
+        return True
+
+    def _peek_weakest(self) -> Optional[MempoolEntry]:
+        heap = self._evict_heap
+        while heap:
+            _, neg_seq, tx_id = heap[0]
+            entry = self._by_hash.get(tx_id)
+            if entry is not None and entry.seq == -neg_seq:
+                return entry
+            heapq.heappop(heap)
+        return None
+
+    def _remove(self, entry: MempoolEntry) -> None:
+        del self._by_hash[entry.hash]
+        queue = self._queues[entry.sender]
+        del queue[entry.nonce]
+        if not queue:
+            del self._queues[entry.sender]
+        self._bytes -= entry.size
+        # Dọn rác của heap xóa lười khi nó lớn gấp đôi pool
+        if len(self._evict_heap) > 2 * len(self._by_hash) + 64:
+            self._evict_heap = [(e.fee, -e.seq, e.hash) for e in self._by_hash.values()]
+            heapq.heapify(self._evict_heap)
+
+    def remove(self, tx_id: str) -> bool:
+        entry = self._by_hash.get(tx_id)
+        if entry is None:
+            return False
+        self._remove(entry)
+        return True
+
+    def pack(self, max_txs: Optional[int] = None, max_bytes: Optional[int] = None,
+             pending: Iterable[Dict[str, Any]] = ()) -> List[Dict[str, Any]]:
+        """
+        Chọn tx cho block: fee cao trước nhưng giữ thứ tự nonce trong từng sender, dừng ở ngân sách
+        (mặc định block_max_txs/block_max_bytes). Không gỡ tx khỏi pool (gỡ khi commit).
+        pending: tx của block cha đã đề xuất nhưng chưa commit (pipelining) -> đóng gói tiếp sau nonce của chúng.
+        """
+        max_txs = self.block_max_txs if max_txs is None else max_txs
+        max_bytes = self.block_max_bytes if max_bytes is None else max_bytes
+        # Nonce cuối đã "chiếm" theo sender: chỉ ghi đè cho sender có tx pending, còn lại đọc self.nonces
+        last_nonce: Dict[str, int] = {}
+        for tx in pending:
+            sender, nonce = tx.get("sender"), tx.get("nonce")
+            if isinstance(nonce, int) and nonce > last_nonce.get(sender, self.nonces.get(sender, 0)):
+                last_nonce[sender] = nonce
+        nonces = self.nonces
+        heap = []
+        for sender, queue in self._queues.items():
+            last = last_nonce[sender] if sender in last_nonce else nonces.get(sender, 0)
+            entry = queue.get(last + 1)
+            if entry is not None:
+                heap.append((-entry.fee, entry.seq, entry))
+        heapq.heapify(heap)
+        out: List[Dict[str, Any]] = []
+        used = 0
+        while heap and (max_txs is None or len(out) < max_txs):
+            _, _, entry = heapq.heappop(heap)
+            if max_bytes is not None and used + entry.size > max_bytes:
+                # Không vừa: cả phần còn lại của sender này cũng bị bỏ qua (phải theo thứ tự nonce)
+                continue
+            out.append(entry.tx)
+            used += entry.size
+            nxt = self._queues[entry.sender].get(entry.nonce + 1)
+            if nxt is not None:
+                heapq.heappush(heap, (-nxt.fee, nxt.seq, nxt))
+        return out
+
+    def on_commit(self, txs: Iterable[Dict[str, Any]]) -> int:
+        """
+        Cập nhật nonce đã commit theo tx của block và gỡ mọi tx có nonce <= nonce đó của các sender liên quan
+        (chính tx đã commit và tx xung đột cùng nonce). Trả về số tx bị gỡ.
+        """
+        touched = set()
+        for tx in txs:
+            sender, nonce = tx.get("sender"), tx.get("nonce")
+            if not isinstance(nonce, int):
+                continue
+            if nonce > self.nonces.get(sender, 0):
+                self.nonces[sender] = nonce
+            touched.add(sender)
+        removed = 0
+        for sender in touched:
+            queue = self._queues.get(sender)
+            if not queue:
+                continue
+            committed = self.nonces.get(sender, 0)
+            for nonce in [n for n in queue if n <= committed]:
+                self._remove(queue[nonce])
+                removed += 1
+        return removed
+
+    # Checkpoint ---------------------------------------------------------------
+    def checkpoint(self) -> Dict[str, Any]:
+        # Entry bất biến được chia sẻ, chỉ copy container
+        return {
+            "nonces": dict(self.nonces),
+            "by_hash": dict(self._by_hash),
+            "queues": {sender: dict(queue) for sender, queue in self._queues.items()},
+            "evict_heap": list(self._evict_heap),
+            "bytes": self._bytes,
+            "seq": self._seq,
+            "evicted": self.evicted,
+        }
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        # Giữ nguyên object dict nonces (có thể dùng chung với State)
+        self.nonces.clear()
+        self.nonces.update(snap["nonces"])
+        self._by_hash = dict(snap["by_hash"])
+        self._queues = {sender: dict(queue) for sender, queue in snap["queues"].items()}
+        self._evict_heap = list(snap["evict_heap"])
+        self._bytes = snap["bytes"]
+        self._seq = snap["seq"]
+        self.evicted = snap["evicted"]
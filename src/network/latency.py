@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Tracing độ trễ theo virtual time cho từng message và báo cáo critical path theo height.
+# Thành phần độ trễ của một message (từ lúc ứng dụng gửi tới lúc handler receiver chạy):
+# - backpressure: chờ trong _pending_link (byte backpressure hoặc receiver pause)
+# - link_wait: chờ link rảnh, tức thời gian truyền (serialize) của các gói đi trước trên link
+#   (NetworkConfig.transmit_delay: gồm cả thời gian truyền của chính gói)
+# - propagation: base delay của link
+# - jitter: phần delay ngẫu nhiên
+# - receiver: chờ + xử lý trong mailbox CPU của receiver
+
+COMPONENTS = ("backpressure", "link_wait", "propagation", "jitter", "receiver")
+
+
+@dataclass
+class MessageTrace:
+    msg_id: int
+    sender: str
+    receiver: str
+    mtype: str
+    height: Optional[int]
+    cause: Optional[int]
+    sent_at: float
+    scheduled_at: float
+    start_at: float
+    base_delay: float
+    jitter: float
+    arrive_at: Optional[float] = None
+    handled_at: Optional[float] = None
+
+    def components(self) -> Dict[str, float]:
+        arrive = self.arrive_at if self.arrive_at is not None else self.start_at + self.base_delay + self.jitter
+        handled = self.handled_at if self.handled_at is not None else arrive
+        return {
+            "backpressure": self.scheduled_at - self.sent_at,
+            "link_wait": self.start_at - self.scheduled_at,
+            "propagation": self.base_delay,
+            "jitter": self.jitter,
+            "receiver": handled - arrive,
+        }
+
+
+def _zero_components() -> Dict[str, float]:
+    return {c: 0.0 for c in COMPONENTS}
+
+
+class LatencyTracer:
+    """
+    Nhận hook từ NetworkSimulator (on_schedule/on_arrival/on_handled/mark) và dựng:
+    - breakdown(): tổng từng thành phần trên mọi message đã được xử lý, theo loại message;
+    - critical_path_report(): với mỗi height, chuỗi nhân quả message dẫn tới commit
+      và thời gian finality đã đi vào đâu.
+    """
+
+    def __init__(self):
+        self.traces: Dict[int, MessageTrace] = {}
+        # (time_ms, node_id, event, height, cause_msg_id)
+        self.marks: List[Tuple[float, str, str, Optional[int], Optional[int]]] = []
+
+    # Hook -----------------------------------------------------------------------
+    def on_schedule(self, msg_id: int, sender: str, receiver: str, envelope: Dict[str, Any],
+                    cause: Optional[int], sent_at: float, scheduled_at: float, start_at: float,
+                    base_delay: float, jitter: float) -> None:
+        payload = envelope.get("payload") or {}
+        self.traces[msg_id] = MessageTrace(
+            msg_id=msg_id, sender=sender, receiver=receiver,
+            mtype=payload.get("type") or envelope["type"], height=envelope.get("height"),
+            cause=cause, sent_at=sent_at, scheduled_at=scheduled_at, start_at=start_at,
+            base_delay=base_delay, jitter=jitter,
+        )
+
+    def on_arrival(self, msg_id: int, now_ms: float) -> None:
+        trace = self.traces.get(msg_id)
+        if trace is not None:
+            trace.arrive_at = now_ms
+
+    def on_handled(self, msg_id: int, now_ms: float) -> None:
+        trace = self.traces.get(msg_id)
+        if trace is not None:
+            trace.handled_at = now_ms
+
+    def mark(self, now_ms: float, node_id: str, event: str,
+             height: Optional[int], cause: Optional[int]) -> None:
+        self.marks.append((now_ms, node_id, event, height, cause))
+
+    # Phân tích ------------------------------------------------------------------
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """
+        {mtype: {component: tổng ms, "count": n}} trên các message đã tới handler.
+        """
+        out: Dict[str, Dict[str, float]] = {}
+        for trace in self.traces.values():
+            if trace.handled_at is None:
+                continue
+            agg = out.setdefault(trace.mtype, dict(_zero_components(), count=0))
+            for name, value in trace.components().items():
+                agg[name] += value
+            agg["count"] += 1
+        return out
+
+    def _commits(self, node_id: Optional[str]) -> Dict[int, Tuple[float, str, Optional[int]]]:
+        # Commit sớm nhất mỗi height (hoặc commit của node_id nếu chỉ định)
+        commits: Dict[int, Tuple[float, str, Optional[int]]] = {}
+        for time_ms, nid, event, height, cause in self.marks:
+            if event != "commit" or height is None:
+                continue
+            if node_id is not None and nid != node_id:
+                continue
+            if height not in commits or time_ms < commits[height][0]:
+                commits[height] = (time_ms, nid, cause)
+        return commits
+
+    def critical_path(self, cause: Optional[int], height: int) -> List[MessageTrace]:
+        """
+        Lần ngược chuỗi nguyên nhân từ message cause, dừng khi ra khỏi height.
+        Trả về chuỗi theo thứ tự thời gian.
+        """
+        path: List[MessageTrace] = []
+        while cause is not None:
+            trace = self.traces.get(cause)
+            if trace is None or trace.height != height:
+                break
+            path.append(trace)
+            cause = trace.cause
+        path.reverse()
+        return path
+
+    def critical_path_report(self, node_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Mỗi height đã commit: finality_ms (từ commit height trước tới commit này), phân rã theo
+        thành phần của các message trên critical path, và "wait" = thời gian trước khi chuỗi bắt đầu
+        (timeout, chờ proposer...).
+        """
+        commits = self._commits(node_id)
+        report: List[Dict[str, Any]] = []
+        prev_commit = 0.0
+        for height in sorted(commits):
+            commit_ms, nid, cause = commits[height]
+            path = self.critical_path(cause, height)
+            components = _zero_components()
+            for trace in path:
+                for name, value in trace.components().items():
+                    components[name] += value
+            chain_start = path[0].sent_at if path else commit_ms
+            report.append({
+                "height": height,
+                "node": nid,
+                "commit_ms": commit_ms,
+                "finality_ms": commit_ms - prev_commit,
+                "wait_ms": max(0.0, chain_start - prev_commit),
+                "components": components,
+                "path": [(t.mtype, t.sender, t.receiver) for t in path],
+            })
+            prev_commit = commit_ms
+        return report
+
+    def format_report(self, node_id: Optional[str] = None) -> str:
+        rows = self.critical_path_report(node_id)
+        header = ["height", "finality", "wait"] + list(COMPONENTS) + ["hops"]
+        lines = ["\t".join(header)]
+        totals = dict(_zero_components(), finality=0.0, wait=0.0)
+        for row in rows:
+            comps = row["components"]
+            totals["finality"] += row["finality_ms"]
+            totals["wait"] += row["wait_ms"]
+            for name in COMPONENTS:
+                totals[name] += comps[name]
+            lines.append("\t".join([str(row["height"]), f"{row['finality_ms']:.1f}", f"{row['wait_ms']:.1f}"]
+                                   + [f"{comps[c]:.1f}" for c in COMPONENTS] + [str(len(row["path"]))]))
+        if rows:
+            lines.append("\t".join(["total", f"{totals['finality']:.1f}", f"{totals['wait']:.1f}"]
+                                   + [f"{totals[c]:.1f}" for c in COMPONENTS] + ["-"]))
+        return "\n".join(lines)
@@ -0,0 +1,210 @@
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Registry metric nhẹ cho simulator: counter, gauge và histogram log-bucket (kiểu HDR).
+# Mọi cập nhật là O(1); xuất ra dict (cho test/so sánh) hoặc text Prometheus.
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + body + "}"
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class LogHistogram:
+    """
+    Histogram bucket theo log2, mỗi lũy thừa 2 chia thành sub_buckets bucket đều nhau
+    (sai số tương đối <= 1/sub_buckets). record() là O(1); bucket lưu thưa trong dict.
+    Giá trị <= 0 rơi vào bucket riêng (cận trên 0).
+    """
+
+    __slots__ = ("sub_buckets", "buckets", "count", "sum", "min", "max")
+
+    _ZERO = -(1 << 30)
+
+    def __init__(self, sub_buckets: int = 8):
+        if sub_buckets < 1:
+            raise ValueError("sub_buckets must be >= 1")
+        self.sub_buckets = sub_buckets
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: float) -> int:
+        if value <= 0:
+            return self._ZERO
+        mantissa, exponent = math.frexp(value)  # value = mantissa * 2^exponent, mantissa in [0.5, 1)
+        return exponent * self.sub_buckets + int((mantissa - 0.5) * 2 * self.sub_buckets)
+
+    def upper_bound(self, index: int) -> float:
+        if index == self._ZERO:
+            return 0.0
+        exponent, sub = divmod(index, self.sub_buckets)
+        return math.ldexp(0.5 * (1 + (sub + 1) / self.sub_buckets), exponent)
+
+    def record(self, value: float) -> None:
+        idx = self._index(value)
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Ước lượng percentile q (0..100) bằng cận trên của bucket chứa nó (kẹp bởi max).
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * q / 100.0))
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                return min(self.upper_bound(idx), self.max)
+        return self.max
+
+    def cumulative_buckets(self) -> List[Tuple[float, int]]:
+        out: List[Tuple[float, int]] = []
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            out.append((self.upper_bound(idx), seen))
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class MetricsRegistry:
+    """
+    Tập metric theo (tên, nhãn). Metric được tạo lười ở lần dùng đầu.
+    """
+
+    def __init__(self, prefix: str = "", sub_buckets: int = 8):
+        self.prefix = prefix
+        self.sub_buckets = sub_buckets
+        self._counters: Dict[str, Dict[LabelKey, Counter]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, Gauge]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, LogHistogram]] = {}
+
+    # Truy cập / cập nhật -----------------------------------------------------
+    def counter(self, name: str, **labels: Any) -> Counter:
+        family = self._counters.setdefault(name, {})
+        key = _label_key(labels)
+        metric = family.get(key)
+        if metric is None:
+            metric = family[key] = Counter()
+        return metric
+
+    def gauge(self, name: str, **labels: Any) -> Gauge:
+        family = self._gauges.setdefault(name, {})
+        key = _label_key(labels)
+        metric = family.get(key)
+        if metric is None:
+            metric = family[key] = Gauge()
+        return metric
+
+    def histogram(self, name: str, **labels: Any) -> LogHistogram:
+        family = self._histograms.setdefault(name, {})
+        key = _label_key(labels)
+        metric = family.get(key)
+        if metric is None:
+            metric = family[key] = LogHistogram(self.sub_buckets)
+        return metric
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        self.counter(name, **labels).inc(amount)
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        self.gauge(name, **labels).set(value)
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        self.histogram(name, **labels).record(value)
+
+    def reset(self) -> None:
+        self._counters.clear()
+        self._gauges.clear()
+        self._histograms.clear()
+
+    # Xuất ----------------------------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        {"counters": {name: {label_str: value}}, "gauges": ..., "histograms": {name: {label_str: summary}}}
+        label_str dạng 'k=v,k2=v2' (rỗng nếu không có nhãn).
+        """
+        def key_str(key: LabelKey) -> str:
+            return ",".join(f"{k}={v}" for k, v in key)
+
+        return {
+            "counters": {n: {key_str(k): c.value for k, c in fam.items()} for n, fam in self._counters.items()},
+            "gauges": {n: {key_str(k): g.value for k, g in fam.items()} for n, fam in self._gauges.items()},
+            "histograms": {n: {key_str(k): h.to_dict() for k, h in fam.items()}
+                           for n, fam in self._histograms.items()},
+        }
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._counters):
+            full = self.prefix + name
+            lines.append(f"# TYPE {full} counter")
+            for key, c in sorted(self._counters[name].items()):
+                lines.append(f"{full}{_format_labels(key)} {c.value}")
+        for name in sorted(self._gauges):
+            full = self.prefix + name
+            lines.append(f"# TYPE {full} gauge")
+            for key, g in sorted(self._gauges[name].items()):
+                lines.append(f"{full}{_format_labels(key)} {g.value}")
+        for name in sorted(self._histograms):
+            full = self.prefix + name
+            lines.append(f"# TYPE {full} histogram")
+            for key, h in sorted(self._histograms[name].items()):
+                for bound, cum in h.cumulative_buckets():
+                    lines.append(f"{full}_bucket{_format_labels(key, [('le', repr(float(bound)))])} {cum}")
+                lines.append(f"{full}_bucket{_format_labels(key, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{full}_sum{_format_labels(key)} {h.sum}")
+                lines.append(f"{full}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
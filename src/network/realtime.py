@@ -0,0 +1,122 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from src.network.simulator import NetworkSimulator, NetworkConfig, ScheduledMessage
+
+# Chế độ real-time cho NetworkSimulator: cùng API register_node/send_header/send_body và
+# cùng mô hình delay/drop/bandwidth, nhưng việc deliver được đặt lịch trên asyncio event loop
+# bằng loop.call_at theo đồng hồ thật (có thể nhân hệ số time_scale).
+
+
+class AsyncNetworkSimulator(NetworkSimulator):
+    """
+    NetworkSimulator chạy theo đồng hồ của event loop.
+    - now_ms (virtual) = (loop.time() - origin) * 1000 * time_scale.
+      time_scale=1.0 là wall-clock; time_scale=10 chạy nhanh gấp 10 lần.
+    - Mỗi lần đẩy sự kiện vào hàng đợi, chỉ một loop.call_at được giữ cho sự kiện sớm nhất.
+    - Timer của node (schedule_timer, dùng cho timeout controller) đi chung cơ chế nên là
+      asyncio timer thật.
+    Gọi start() bên trong event loop trước khi gửi message.
+    """
+
+    def __init__(self, seed: int = 0, config: Optional[NetworkConfig] = None,
+                 time_scale: float = 1.0, loop: Optional[asyncio.AbstractEventLoop] = None):
+        super().__init__(seed=seed, config=config)
+        if time_scale <= 0:
+            raise ValueError("time_scale must be positive")
+        self.time_scale = time_scale
+        self._loop = loop
+        self._origin: Optional[float] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._armed_at: Optional[float] = None
+        self._idle: Optional[asyncio.Event] = None
+        # Trong lúc tick() đang deliver, đồng hồ đứng yên tại thời điểm sự kiện
+        self._dispatching = False
+
+    # Vòng đời ---------------------------------------------------------------
+    def start(self) -> None:
+        """
+        Gắn simulator vào event loop đang chạy; virtual time tiếp tục từ now_ms hiện tại.
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        self._origin = self._loop.time() - self.now_ms / 1000.0 / self.time_scale
+        self._arm()
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = None
+        self._armed_at = None
+        self._origin = None
+
+    @property
+    def running(self) -> bool:
+        return self._origin is not None
+
+    async def wait_idle(self, timeout_s: Optional[float] = None) -> None:
+        """
+        Chờ tới khi hàng đợi sự kiện rỗng (không còn message hay timer).
+        """
+        while self._queue:
+            self._idle = asyncio.Event()
+            await asyncio.wait_for(self._idle.wait(), timeout_s)
+
+    async def run_for(self, virtual_ms: float) -> None:
+        """
+        Cho mô phỏng chạy thêm virtual_ms (quy đổi ra thời gian thật theo time_scale).
+        """
+        await asyncio.sleep(virtual_ms / 1000.0 / self.time_scale)
+        self._sync_clock()
+
+    # Đồng hồ ----------------------------------------------------------------
+    def _virtual_now(self) -> float:
+        return (self._loop.time() - self._origin) * 1000.0 * self.time_scale
+
+    def _wall_time(self, virtual_ms: float) -> float:
+        return self._origin + virtual_ms / 1000.0 / self.time_scale
+
+    def _sync_clock(self) -> None:
+        if self._origin is not None and not self._dispatching:
+            self.now_ms = max(self.now_ms, self._virtual_now())
+
+    # Hook vào NetworkSimulator ----------------------------------------------
+    def _enqueue(self, sender: str, receiver: str, envelope: Dict[str, Any]) -> None:
+        # Send từ ngoài callback (vd. start_round ban đầu) cần đóng dấu thời gian thật
+        self._sync_clock()
+        super()._enqueue(sender, receiver, envelope)
+
+    def schedule_timer(self, node_id: str, delay_ms: float, payload: Dict[str, Any]) -> None:
+        self._sync_clock()
+        super().schedule_timer(node_id, delay_ms, payload)
+
+    def _push(self, scheduled: ScheduledMessage) -> None:
+        super()._push(scheduled)
+        self._arm()
+
+    def _arm(self) -> None:
+        if self._origin is None or not self._queue:
+            return
+        head = self._queue[0].deliver_at
+        if self._handle is not None and self._armed_at is not None and self._armed_at <= head:
+            return
+        if self._handle is not None:
+            self._handle.cancel()
+        self._armed_at = head
+        self._handle = self._loop.call_at(self._wall_time(head), self._on_due)
+
+    def _on_due(self) -> None:
+        self._handle = None
+        self._armed_at = None
+        self._sync_clock()
+        # call_at có thể bắn sớm vài µs do độ phân giải đồng hồ: không bỏ lỡ sự kiện đầu hàng
+        if self._queue:
+            self.now_ms = max(self.now_ms, self._queue[0].deliver_at)
+        self._dispatching = True
+        try:
+            self.tick()
+        finally:
+            self._dispatching = False
+        self._arm()
+        if not self._queue and self._idle is not None:
+            self._idle.set()
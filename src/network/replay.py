@@ -0,0 +1,108 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.network.simulator import MessageHandler
+
+# Phát lại trace mạng đã ghi (dump_logs/logs()) thẳng vào handler của các node.
+# Sự kiện timer_fire cũng được phát lại vào timer handler để controller đi đúng nhánh timeout.
+# Không chạy lại RNG, kiểm tra _enqueue hay tính băng thông: chỉ gọi handler theo đúng
+# thứ tự và thời điểm đã ghi. Dùng để regression-test/benchmark consensus và execution
+# trên một trace traffic cố định.
+
+# (time_ms, receiver, envelope hoặc payload timer, is_timer)
+Delivery = Tuple[float, str, Dict[str, Any], bool]
+
+_REPLAY_EVENTS = ("deliver", "timer_fire")
+
+
+def _to_delivery(entry: Dict[str, Any]) -> Delivery:
+    if entry["event"] == "timer_fire":
+        return entry["time_ms"], entry["to"], entry["details"]["timer"], True
+    return entry["time_ms"], entry["to"], entry["details"]["envelope"], False
+
+
+class LogReplayNetwork:
+    """
+    Network thay thế NetworkSimulator khi phát lại trace.
+    - register_node giống NetworkSimulator.
+    - send_header/send_body chỉ đếm, không gửi: mọi lần deliver đã có sẵn trong trace.
+    - now_ms được đặt theo thời điểm deliver đã ghi trước khi gọi handler.
+    - schedule_timer không được cung cấp: timeout đến từ sự kiện timer_fire trong trace.
+    """
+
+    def __init__(self, deliveries: Iterable[Delivery]):
+        self.handlers: Dict[str, MessageHandler] = {}
+        self.timer_handlers: Dict[str, MessageHandler] = {}
+        self.now_ms = 0.0
+        self.sends_ignored = 0
+        self._deliveries: List[Delivery] = list(deliveries)
+        self._cursor = 0
+
+    @classmethod
+    def from_logs(cls, entries: Iterable[Dict[str, Any]]) -> "LogReplayNetwork":
+        return cls(_to_delivery(entry) for entry in entries if entry["event"] in _REPLAY_EVENTS)
+
+    @classmethod
+    def from_file(cls, path: str) -> "LogReplayNetwork":
+        """
+        Nạp file JSON lines do NetworkSimulator.dump_logs ghi ra.
+        """
+        deliveries: List[Delivery] = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                # Lọc nhanh trước khi parse JSON: chỉ cần sự kiện deliver/timer_fire
+                if '"event": "deliver"' not in line and '"event": "timer_fire"' not in line:
+                    continue
+                entry = json.loads(line)
+                if entry["event"] not in _REPLAY_EVENTS:
+                    continue
+                deliveries.append(_to_delivery(entry))
+        return cls(deliveries)
+
+    # API tương thích NetworkSimulator -----------------------------------
+    def register_node(self, node_id: str, handler: MessageHandler) -> None:
+        self.handlers[node_id] = handler
+
+    def register_timer_handler(self, node_id: str, handler: MessageHandler) -> None:
+        self.timer_handlers[node_id] = handler
+
+    def send_header(self, sender: str, receiver: str, header_id: str,
+                    height: int, payload: Dict[str, Any]) -> None:
+        self.sends_ignored += 1
+
+    def send_body(self, sender: str, receiver: str, header_id: str,
+                  height: int, payload: Dict[str, Any]) -> None:
+        self.sends_ignored += 1
+
+    # Replay -------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._deliveries)
+
+    def remaining(self) -> int:
+        return len(self._deliveries) - self._cursor
+
+    def replay(self, until_ms: Optional[float] = None) -> int:
+        """
+        Gọi handler cho các deliver còn lại (tới until_ms nếu có). Trả về số message đã phát.
+        Receiver không đăng ký bị bỏ qua.
+        """
+        deliveries = self._deliveries
+        handlers = self.handlers
+        timer_handlers = self.timer_handlers
+        start = i = self._cursor
+        end = len(deliveries)
+        while i < end:
+            time_ms, receiver, envelope, is_timer = deliveries[i]
+            if until_ms is not None and time_ms > until_ms:
+                break
+            self.now_ms = time_ms
+            handler = (timer_handlers if is_timer else handlers).get(receiver)
+            if handler is not None:
+                handler(envelope)
+            i += 1
+        self._cursor = i
+        return i - start
+
+    def rewind(self) -> None:
+        self._cursor = 0
+        self.now_ms = 0.0
@@ -0,0 +1,367 @@
+import heapq
+import multiprocessing
+import random
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.network.simulator import MessageHandler, NetworkConfig, NetworkSimulator, TimerHandler
+from src.network.transport import _LEN as _FRAME_LEN
+from src.network.transport import KIND_BODY, KIND_HEADER, decode_frame, decode_route, encode_frame
+
+# Runtime mỗi validator một tiến trình, trao đổi envelope qua ring buffer shared memory.
+# - Mỗi node có 2 ring SPSC: out (node -> broker) và in (broker -> node).
+# - Broker (một tiến trình) áp mô hình delay/jitter/bandwidth/drop của NetworkConfig
+#   (kể cả link profile) và luật header trước body, rồi chuyển frame nguyên vẹn.
+# - Frame là nhị phân có tiền tố độ dài (xem transport.encode_frame); broker chỉ đọc phần
+#   định tuyến, payload không bị parse hay pickle ở mỗi chặng.
+
+_RING_HEADER = struct.Struct("<QQ")  # head (tổng byte đã ghi), tail (tổng byte đã đọc)
+_REC_LEN = struct.Struct("<I")
+
+
+class ShmRing:
+    """
+    Ring buffer một producer/một consumer trên multiprocessing.shared_memory.
+    Bộ đếm head/tail tăng đơn điệu (mod 2^64); bản ghi = u32 độ dài + dữ liệu, có thể vắt qua
+    cuối vùng đệm. Producer chỉ ghi head, consumer chỉ ghi tail, head được cập nhật sau khi
+    dữ liệu đã chép xong.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._buf = shm.buf
+        self.capacity = shm.size - _RING_HEADER.size
+
+    @classmethod
+    def create(cls, capacity: int) -> "ShmRing":
+        shm = shared_memory.SharedMemory(create=True, size=capacity + _RING_HEADER.size)
+        _RING_HEADER.pack_into(shm.buf, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "ShmRing":
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self) -> None:
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def _copy_in(self, pos: int, data: bytes) -> None:
+        base = _RING_HEADER.size
+        start = pos % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._buf[base + start:base + start + first] = data[:first]
+        if first < len(data):
+            self._buf[base:base + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos: int, length: int) -> bytes:
+        base = _RING_HEADER.size
+        start = pos % self.capacity
+        first = min(length, self.capacity - start)
+        out = bytes(self._buf[base + start:base + start + first])
+        if first < length:
+            out += bytes(self._buf[base:base + length - first])
+        return out
+
+    def push(self, data: bytes) -> bool:
+        """
+        Ghi một bản ghi. Trả về False nếu ring không đủ chỗ (caller tự thử lại).
+        """
+        need = _REC_LEN.size + len(data)
+        if need > self.capacity:
+            raise ValueError(f"record of {len(data)} bytes exceeds ring capacity {self.capacity}")
+        head, tail = _RING_HEADER.unpack_from(self._buf, 0)
+        if self.capacity - (head - tail) < need:
+            return False
+        self._copy_in(head, _REC_LEN.pack(len(data)))
+        self._copy_in(head + _REC_LEN.size, data)
+        struct.pack_into("<Q", self._buf, 0, head + need)
+        return True
+
+    def pop(self) -> Optional[bytes]:
+        head, tail = _RING_HEADER.unpack_from(self._buf, 0)
+        if head == tail:
+            return None
+        (length,) = _REC_LEN.unpack(self._copy_out(tail, _REC_LEN.size))
+        data = self._copy_out(tail + _REC_LEN.size, length)
+        struct.pack_into("<Q", self._buf, 8, tail + _REC_LEN.size + length)
+        return data
+
+
+class ShmEndpoint:
+    """
+    Network adapter trong tiến trình node: cùng API NetworkSimulator
+    (register_node/send_header/send_body, timer) nhưng gửi frame vào ring out và
+    nhận từ ring in. Mọi message (kể cả gửi cho chính mình) đi qua broker.
+    """
+
+    def __init__(self, node_id: str, inbound: ShmRing, outbound: ShmRing, idle_sleep_s: float = 0.0002):
+        self.node_id = node_id
+        self.inbound = inbound
+        self.outbound = outbound
+        self.idle_sleep_s = idle_sleep_s
+        self.handlers: Dict[str, MessageHandler] = {}
+        self.timer_handlers: Dict[str, TimerHandler] = {}
+        self._timers: List[Tuple[float, int, str, Dict[str, Any]]] = []
+        self._timer_seq = 0
+        self._origin = time.monotonic()
+        self.stats: Dict[str, int] = {"sent": 0, "received": 0, "ring_full_waits": 0}
+
+    @property
+    def now_ms(self) -> float:
+        return (time.monotonic() - self._origin) * 1000.0
+
+    def register_node(self, node_id: str, handler: MessageHandler) -> None:
+        self.handlers[node_id] = handler
+
+    def register_timer_handler(self, node_id: str, handler: TimerHandler) -> None:
+        self.timer_handlers[node_id] = handler
+
+    def schedule_timer(self, node_id: str, delay_ms: float, payload: Dict[str, Any]) -> None:
+        self._timer_seq += 1
+        heapq.heappush(self._timers, (self.now_ms + delay_ms, self._timer_seq, node_id, payload))
+
+    def send_header(self, sender: str, receiver: str, header_id: str,
+                    height: int, payload: Dict[str, Any]) -> None:
+        self._send({"type": "HEADER", "header_id": header_id, "height": height,
+                    "from": sender, "to": receiver, "body_allowed": False, "payload": payload})
+
+    def send_body(self, sender: str, receiver: str, header_id: str,
+                  height: int, payload: Dict[str, Any]) -> None:
+        # Luật header trước body được broker kiểm tra (broker biết receiver đã thấy header chưa)
+        self._send({"type": "BODY", "header_id": header_id, "height": height,
+                    "from": sender, "to": receiver, "payload": payload})
+
+    def _send(self, envelope: Dict[str, Any]) -> None:
+        # Ring đã tự lưu độ dài bản ghi: bỏ tiền tố độ dài của frame
+        body = encode_frame(envelope)[_FRAME_LEN.size:]
+        while not self.outbound.push(body):
+            self.stats["ring_full_waits"] += 1
+            time.sleep(self.idle_sleep_s)
+        self.stats["sent"] += 1
+
+    def poll(self) -> int:
+        """
+        Xử lý timer đến hạn và mọi frame đang chờ trong ring in. Trả về số việc đã làm.
+        """
+        done = 0
+        now = self.now_ms
+        while self._timers and self._timers[0][0] <= now:
+            _, _, node_id, payload = heapq.heappop(self._timers)
+            handler = self.timer_handlers.get(node_id)
+            if handler is not None:
+                handler(payload)
+            done += 1
+        while True:
+            body = self.inbound.pop()
+            if body is None:
+                break
+            envelope = decode_frame(body)
+            self.stats["received"] += 1
+            handler = self.handlers.get(envelope["to"])
+            if handler is not None:
+                handler(envelope)
+            done += 1
+        return done
+
+
+class ShmBroker:
+    """
+    Broker trung tâm: đọc ring out của mọi node, áp mô hình mạng của NetworkSimulator
+    (delay/jitter/bandwidth theo link, drop ngẫu nhiên seed cố định) và luật header trước body,
+    rồi ghi frame vào ring in của receiver khi tới hạn.
+    - Đồng hồ mô hình = thời gian thật * time_scale (cùng nghĩa với AsyncNetworkSimulator:
+      time_scale=10 thì delay mô hình trôi nhanh gấp 10 lần).
+    - Header chỉ được tính là "đã thấy" khi đã ghi vào ring in của receiver, và body chỉ được
+      nhận nếu header đã thấy lúc broker định tuyến body (như NetworkSimulator.send_body):
+      body không thể tới ring trước header dù jitter khác nhau.
+    """
+
+    def __init__(self, node_ids: List[str], inbound: Dict[str, ShmRing], outbound: Dict[str, ShmRing],
+                 model: NetworkSimulator, time_scale: float = 1.0):
+        if time_scale <= 0:
+            raise ValueError("time_scale must be positive")
+        self.node_ids = list(node_ids)
+        self.inbound = inbound
+        self.outbound = outbound
+        self.model = model
+        self.time_scale = time_scale
+        self.rng = random.Random(model.rng.random())
+        # (deliver_at, seq, receiver, frame, header_id nếu là HEADER)
+        self._heap: List[Tuple[float, int, str, bytes, Optional[str]]] = []
+        self._seq = 0
+        self._seen_headers: set = set()
+        self._link_next_available: Dict[Tuple[str, str], float] = {}
+        self._link_params: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._origin = time.monotonic()
+        self.stats: Dict[str, int] = {"forwarded": 0, "delivered": 0, "drop_random": 0,
+                                      "body_rejected_missing_header": 0, "drop_no_receiver": 0}
+
+    def _now_ms(self) -> float:
+        return (time.monotonic() - self._origin) * 1000.0 * self.time_scale
+
+    def _params(self, link: Tuple[str, str]) -> Dict[str, Any]:
+        params = self._link_params.get(link)
+        if params is None:
+            params = self._link_params[link] = self.model.link_model(*link)
+        return params
+
+    def _route(self, body: bytes, now: float) -> None:
+        kind, sender, receiver, header_id = decode_route(body)
+        if receiver not in self.inbound:
+            self.stats["drop_no_receiver"] += 1
+            return
+        if kind == KIND_BODY and (receiver, header_id) not in self._seen_headers:
+            self.stats["body_rejected_missing_header"] += 1
+            return
+        link = (sender, receiver)
+        params = self._params(link)
+        if params["drop_rate"] and self.rng.random() < params["drop_rate"]:
+            self.stats["drop_random"] += 1
+            return
+        # Serialize theo băng thông link như NetworkSimulator._schedule_envelope
+        start = max(now, self._link_next_available.get(link, now))
+        tx_time = max(1, (len(body) + params["bandwidth"] - 1) // params["bandwidth"])
+        self._link_next_available[link] = start + tx_time
+        delay = params["base_delay"] + (self.rng.randint(0, params["jitter"]) if params["jitter"] else 0)
+        self._seq += 1
+        heapq.heappush(self._heap, (start + delay, self._seq, receiver, body,
+                                    header_id if kind == KIND_HEADER else None))
+        self.stats["forwarded"] += 1
+
+    def poll(self) -> int:
+        done = 0
+        now = self._now_ms()
+        for nid in self.node_ids:
+            ring = self.outbound[nid]
+            while True:
+                body = ring.pop()
+                if body is None:
+                    break
+                self._route(body, now)
+                done += 1
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, receiver, body, header_id = heap[0]
+            if not self.inbound[receiver].push(body):
+                # Ring in của receiver đầy: giữ lại, thử ở vòng sau
+                break
+            heapq.heappop(heap)
+            if header_id is not None:
+                self._seen_headers.add((receiver, header_id))
+            self.stats["delivered"] += 1
+            done += 1
+        return done
+
+
+# Tiến trình ------------------------------------------------------------------
+def _broker_main(node_ids: List[str], in_names: Dict[str, str], out_names: Dict[str, str],
+                 seed: int, config: NetworkConfig, link_profile_file: Optional[str],
+                 time_scale: float, stop: Any, results: Any) -> None:
+    inbound = {nid: ShmRing.attach(name) for nid, name in in_names.items()}
+    outbound = {nid: ShmRing.attach(name) for nid, name in out_names.items()}
+    model = NetworkSimulator(seed=seed, config=config)
+    if link_profile_file:
+        model.load_link_profile_from_file(link_profile_file)
+    broker = ShmBroker(node_ids, inbound, outbound, model, time_scale=time_scale)
+    while not stop.is_set():
+        if not broker.poll():
+            time.sleep(0.0001)
+    results.put({"node_id": "broker", "stats": dict(broker.stats)})
+    for ring in list(inbound.values()) + list(outbound.values()):
+        ring.close()
+
+
+def _node_main(node_id: str, node_ids: List[str], in_name: str, out_name: str,
+               chain_id: str, target_height: int, stop: Any, results: Any) -> None:
+    from src.simulator.cluster import ConsensusNode
+
+    inbound = ShmRing.attach(in_name)
+    outbound = ShmRing.attach(out_name)
+    endpoint = ShmEndpoint(node_id, inbound, outbound)
+    node = ConsensusNode(node_id, [p for p in node_ids if p != node_id], endpoint, chain_id=chain_id)
+    started = time.perf_counter()
+    node.controller.start_round(0)
+    reported = False
+    while not stop.is_set():
+        if not endpoint.poll():
+            time.sleep(endpoint.idle_sleep_s)
+        if not reported and len(node.helper.ledger) >= target_height:
+            reported = True
+            results.put({
+                "node_id": node_id,
+                "elapsed_s": time.perf_counter() - started,
+                "ledger_hashes": [e["hash"] for e in node.helper.ledger[:target_height]],
+                "state_root": node.helper.ledger[target_height - 1]["state_root"],
+                "stats": dict(endpoint.stats),
+            })
+    inbound.close()
+    outbound.close()
+
+
+def run_shm_cluster(
+    num_nodes: int = 4,
+    target_height: int = 5,
+    config: Optional[NetworkConfig] = None,
+    link_profile_file: Optional[str] = None,
+    seed: int = 0,
+    ring_bytes: int = 1 << 20,
+    time_scale: float = 1.0,
+    timeout_s: float = 60.0,
+    chain_id: str = "chain-demo",
+    start_method: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Chạy num_nodes validator (ConsensusController + helper + ExecutionState), mỗi node một
+    tiến trình, cộng một tiến trình broker. Trả về kết quả theo node (và "broker").
+    Node chưa đạt target_height trước timeout_s sẽ vắng mặt trong kết quả.
+    """
+    ctx = multiprocessing.get_context(start_method) if start_method else multiprocessing
+    cfg = config or NetworkConfig(base_delay_ms=1, jitter_ms=0)
+    node_ids = [str(i) for i in range(num_nodes)]
+    inbound = {nid: ShmRing.create(ring_bytes) for nid in node_ids}
+    outbound = {nid: ShmRing.create(ring_bytes) for nid in node_ids}
+    stop = ctx.Event()
+    results = ctx.Queue()
+    broker = ctx.Process(target=_broker_main, args=(
+        node_ids, {n: r.name for n, r in inbound.items()}, {n: r.name for n, r in outbound.items()},
+        seed, cfg, link_profile_file, time_scale, stop, results))
+    nodes = [
+        ctx.Process(target=_node_main, args=(nid, node_ids, inbound[nid].name, outbound[nid].name,
+                                             chain_id, target_height, stop, results))
+        for nid in node_ids
+    ]
+    collected: Dict[str, Dict[str, Any]] = {}
+    broker.start()
+    for p in nodes:
+        p.start()
+    try:
+        deadline = time.monotonic() + timeout_s
+        while len(collected) < num_nodes and time.monotonic() < deadline:
+            try:
+                res = results.get(timeout=max(0.0, min(1.0, deadline - time.monotonic())))
+            except Exception:
+                continue
+            collected[res["node_id"]] = res
+    finally:
+        stop.set()
+        for p in nodes + [broker]:
+            p.join(timeout=10)
+        while True:
+            try:
+                res = results.get(timeout=1.0)
+            except Exception:
+                break
+            collected[res["node_id"]] = res
+        for ring in list(inbound.values()) + list(outbound.values()):
+            ring.close()
+    return collected
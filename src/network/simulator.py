@@ -1,15 +1,21 @@
 import heapq
 import random
 from collections import deque
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import Callable, Dict, List, Optional, Set, Tuple, Any
 
+from src.network.latency import LatencyTracer
+from src.network.metrics import MetricsRegistry
+
 # Mô phỏng mạng không tin cậy: delay/jitter/drop/duplicate, rate limit, backpressure, auto block.
 # Dùng cho các kịch bản consensus/test để tạo điều kiện mạng xấu nhưng có log định danh.
 
 
 # Kiểu định nghĩa cho rõ ràng
 MessageHandler = Callable[[Dict[str, Any]], None]
+TimerHandler = Callable[[Dict[str, Any]], None]
+# Hàm chi phí CPU: envelope -> thời gian xử lý (ms ảo)
+CpuCostFn = Callable[[Dict[str, Any]], float]
 
 
 @dataclass
@@ -30,6 +36,154 @@ class NetworkConfig:
     link_bandwidth_bytes_per_ms: int = 50      # băng thông giả lập trên link (bytes/ms)
     rate_window_ms: int = 1000                 # cửa sổ tính rate cho auto block
     max_msgs_per_link_per_window: Optional[int] = None  # nếu đặt, block khi số gói trong cửa sổ vượt ngưỡng
+    inbound_queue_capacity: Optional[int] = None  # giới hạn mailbox nhận per-node (None = không giới hạn)
+    inbound_overflow_policy: str = "drop_newest"  # drop_oldest | drop_newest | pause_link
+    # True: gói tới nơi sau cả thời gian truyền của chính nó (size/bandwidth, store-and-forward);
+    # False: thời gian truyền chỉ làm chậm các gói sau trên cùng link
+    transmit_delay: bool = False
+
+    def __post_init__(self):
+        # Báo lỗi cấu hình ngay khi tạo, không đợi tới lần mailbox tràn đầu tiên giữa run
+        _check_overflow_policy(self.inbound_overflow_policy)
+
+
+@dataclass
+class CpuCostModel:
+    """
+    Mô hình chi phí CPU mặc định cho một message (đơn vị µs):
+    per_message_us (decode/dispatch) + vote_verify_us cho mỗi chữ ký cần verify
+    (VOTE, PROPOSAL) + tx_apply_us cho mỗi tx trong block của PROPOSAL.
+    Có thể thay bằng bất kỳ callable envelope -> ms nào qua set_cpu_model.
+    """
+    per_message_us: float = 0.0
+    vote_verify_us: float = 0.0
+    tx_apply_us: float = 0.0
+
+    def __call__(self, envelope: Dict[str, Any]) -> float:
+        payload = envelope.get("payload") or {}
+        mtype = payload.get("type")
+        cost_us = self.per_message_us
+        if mtype == "VOTE":
+            cost_us += self.vote_verify_us
+        elif mtype == "PROPOSAL":
+            block = payload.get("block") or {}
+            cost_us += self.vote_verify_us + self.tx_apply_us * len(block.get("txs", ()))
+        return cost_us / 1000.0
+
+
+INBOUND_OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "pause_link")
+
+
+def _check_overflow_policy(policy: str) -> None:
+    if policy not in INBOUND_OVERFLOW_POLICIES:
+        raise ValueError(f"unknown inbound_overflow_policy: {policy}")
+
+# Sự kiện log -> (counter, lý do) khi bật metrics; mọi drop đi qua _log_event nên đếm ở đó là đủ
+_METRIC_EVENTS: Dict[str, Tuple[str, Optional[str]]] = {
+    "send": ("messages_sent_total", None),
+    "duplicate": ("messages_duplicated_total", None),
+    "deliver": ("messages_delivered_total", None),
+    "backpressure_queue": ("messages_backpressured_total", "link_bytes"),
+    "backpressure_queue_receiver": ("messages_backpressured_total", "receiver_paused"),
+    "inbound_pause_link": ("messages_backpressured_total", "receiver_full"),
+    "drop_no_receiver": ("messages_dropped_total", "no_receiver"),
+    "drop_disconnected": ("messages_dropped_total", "disconnected"),
+    "drop_blocked_link": ("messages_dropped_total", "blocked_link"),
+    "drop_rate_limit_sender": ("messages_dropped_total", "rate_limit_sender"),
+    "drop_rate_limit_link": ("messages_dropped_total", "rate_limit_link"),
+    "auto_block_link": ("messages_dropped_total", "auto_block"),
+    "auto_block_link_rate": ("messages_dropped_total", "auto_block_rate"),
+    "drop_random": ("messages_dropped_total", "random"),
+    "body_rejected_missing_header": ("messages_dropped_total", "missing_header"),
+    "inbound_drop_oldest": ("messages_dropped_total", "inbound_drop_oldest"),
+    "inbound_drop_newest": ("messages_dropped_total", "inbound_drop_newest"),
+    "drop_missing_handler": ("messages_dropped_total", "missing_handler"),
+}
+
+
+def _copy_optional_set(value: Optional[Set[Any]]) -> Optional[Set[Any]]:
+    return None if value is None else set(value)
+
+
+def _copy_dict_of_lists(value: Dict[Any, List[Any]]) -> Dict[Any, List[Any]]:
+    return {k: list(v) for k, v in value.items()}
+
+
+def _copy_dict_of_deques(value: Dict[Any, deque]) -> Dict[Any, deque]:
+    return {k: deque(v) for k, v in value.items()}
+
+
+def _copy_dict_of_dicts(value: Dict[Any, Dict[Any, Any]]) -> Dict[Any, Dict[Any, Any]]:
+    return {k: dict(v) for k, v in value.items()}
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class LogChunk:
+    """
+    Đoạn log đã đóng băng (bất biến). parent trỏ về đoạn trước nên các nhánh rẽ từ cùng
+    checkpoint chia sẻ chung tiền tố log thay vì mỗi snapshot copy lại toàn bộ.
+    len() = số entry đã sinh từ đầu run tới hết đoạn này, kể cả skipped entry không giữ trong
+    bộ nhớ (keep_logs=False, hoặc phần log trước một checkpoint nạp từ đĩa).
+    """
+
+    __slots__ = ("parent", "entries", "length")
+
+    def __init__(self, parent: Optional["LogChunk"], entries: Tuple[Dict[str, Any], ...], skipped: int = 0):
+        self.parent = parent
+        self.entries = entries
+        self.length = (parent.length if parent is not None else 0) + skipped + len(entries)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        chunks = []
+        chunk: Optional[LogChunk] = self
+        while chunk is not None:
+            chunks.append(chunk.entries)
+            chunk = chunk.parent
+        for entries in reversed(chunks):
+            yield from entries
+
+
+class EventLog:
+    """
+    Log append-only của simulator: chuỗi LogChunk đã đóng băng + phần đuôi đang ghi.
+    freeze() đóng băng phần đuôi và trả về LogChunk làm snapshot: O(số entry mới từ lần freeze
+    trước), không phụ thuộc độ dài log.
+    """
+
+    def __init__(self, base: Optional[LogChunk] = None):
+        self._base = base if base is not None else LogChunk(None, ())
+        self._tail: List[Dict[str, Any]] = []
+        self._skipped = 0
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self._tail.append(entry)
+
+    def skip(self) -> None:
+        """
+        Đếm một entry không giữ trong bộ nhớ (để len() vẫn là vị trí trong stream sự kiện).
+        """
+        self._skipped += 1
+
+    def __len__(self) -> int:
+        return self._base.length + self._skipped + len(self._tail)
+
+    def __iter__(self):
+        yield from self._base
+        yield from self._tail
+
+    def freeze(self) -> LogChunk:
+        if self._tail or self._skipped:
+            # Entry skip chỉ xảy ra khi keep_logs=False, lúc đó _tail luôn rỗng: thứ tự không lẫn
+            self._base = LogChunk(self._base, tuple(self._tail), self._skipped)
+            self._tail = []
+            self._skipped = 0
+        return self._base
 
 
 @dataclass(order=True)
@@ -37,6 +191,13 @@ class ScheduledMessage:
     deliver_at: float
     msg_id: int = field(compare=False)
     payload: Dict[str, Any] = field(compare=False)
+    # "message" = envelope mạng, "timer" = hẹn giờ ảo của node (payload: {"to", "timer"}),
+    # "cpu" = node xử lý xong message đầu mailbox CPU (payload: {"to"})
+    kind: str = field(default="message", compare=False)
+    # Thời điểm ứng dụng gọi send (trước cả hàng đợi backpressure); None với timer/cpu
+    sent_at: Optional[float] = field(default=None, compare=False)
+    # msg_id của message mà handler đang xử lý khi gói này được gửi (None: start/timer)
+    cause: Optional[int] = field(default=None, compare=False)
 
 
 class NetworkSimulator:
@@ -50,14 +211,45 @@ class NetworkSimulator:
     - Có thể tải topo và profile từ file để tái lập nhiều lần.
     """
 
-    def __init__(self, seed: int = 0, config: Optional[NetworkConfig] = None):
+    # Các field trạng thái được chụp bởi checkpoint(): tên -> hàm copy nông.
+    # Envelope/ScheduledMessage/log entry không bị sửa sau khi tạo nên được chia sẻ
+    # giữa các nhánh; chỉ container bị copy (structure-sharing, không deepcopy).
+    # _logs không nằm ở đây: log append-only được chia sẻ qua LogChunk (xem checkpoint()).
+    _CHECKPOINT_FIELDS: Dict[str, Callable[[Any], Any]] = {
+        "now_ms": _identity,
+        "_next_msg_id": _identity,
+        "_queue": list,
+        "_inflight_count": dict,
+        "_inflight_link": dict,
+        "_inflight_bytes_link": dict,
+        "_seen_headers": dict,
+        "_allowed_edges": _copy_optional_set,
+        "_blocked_links": set,
+        "_auto_blocked_until": dict,
+        "_pending_link": _copy_dict_of_lists,
+        "_link_next_available_time": dict,
+        "_link_profile": dict,
+        "_link_send_times": _copy_dict_of_deques,
+        "_cpu_mailbox": _copy_dict_of_deques,
+        "_cpu_busy_until": dict,
+        "_cpu_busy_ms": dict,
+        "_cpu_max_queue": dict,
+        "_paused_links": dict,
+        "_inbound_stats": _copy_dict_of_dicts,
+    }
+
+    def __init__(self, seed: int = 0, config: Optional[NetworkConfig] = None, keep_logs: bool = True):
         self.config = config or NetworkConfig()
+        # keep_logs=False: không giữ _logs trong bộ nhớ (run dài), chỉ phát cho event listener
+        self.keep_logs = keep_logs
+        self._event_listeners: List[Callable[[Dict[str, Any]], None]] = []
         self.rng = random.Random(seed)
         self.handlers: Dict[str, MessageHandler] = {}
+        self.timer_handlers: Dict[str, TimerHandler] = {}
         self.now_ms = 0.0
         self._queue: List[ScheduledMessage] = []
         self._next_msg_id = 1
-        self._logs: List[Dict[str, Any]] = []
+        self._logs = EventLog()
         self._inflight_count: Dict[str, int] = {}
         self._inflight_link: Dict[Tuple[str, str], int] = {}
         self._inflight_bytes_link: Dict[Tuple[str, str], int] = {}
@@ -67,14 +259,30 @@ class NetworkSimulator:
         self._allowed_edges: Optional[Set[Tuple[str, str]]] = None
         self._blocked_links: Set[Tuple[str, str]] = set()
         self._auto_blocked_until: Dict[Tuple[str, str], float] = {}
-        # Hàng đợi backpressure theo link
-        self._pending_link: Dict[Tuple[str, str], List[Tuple[Dict[str, Any], int]]] = {}
+        # Hàng đợi backpressure theo link: (envelope, size_bytes, sent_at, cause)
+        self._pending_link: Dict[Tuple[str, str], List[Tuple[Dict[str, Any], int, float, Optional[int]]]] = {}
         # Theo dõi thời điểm link rảnh (phục vụ serialize theo băng thông)
         self._link_next_available_time: Dict[Tuple[str, str], float] = {}
         # Profile per-link (delay/jitter/bandwidth/drop) nếu có
         self._link_profile: Dict[Tuple[str, str], Dict[str, Any]] = {}
         # Theo dõi rate theo cửa sổ thời gian cho auto block
         self._link_send_times: Dict[Tuple[str, str], deque] = {}
+        # CPU ảo per-node: ScheduledMessage tới hạn xếp FIFO trong mailbox, xử lý tuần tự theo chi phí
+        self._cpu_models: Dict[str, CpuCostFn] = {}
+        self._cpu_mailbox: Dict[str, deque] = {}
+        self._cpu_busy_until: Dict[str, float] = {}
+        self._cpu_busy_ms: Dict[str, float] = {}
+        self._cpu_max_queue: Dict[str, int] = {}
+        # Backpressure phía nhận: link bị pause -> số gói đã trả lại đầu _pending_link
+        self._paused_links: Dict[Tuple[str, str], int] = {}
+        # Metric độ sâu mailbox nhận per-node (tích phân depth theo thời gian, đếm overflow)
+        self._inbound_stats: Dict[str, Dict[str, float]] = {}
+        # Metrics (tắt mặc định): không nằm trong checkpoint, giống handler
+        self._metrics: Optional[MetricsRegistry] = None
+        # Tracing độ trễ từng message (tắt mặc định)
+        self._tracer: Optional[LatencyTracer] = None
+        # msg_id đang được handler xử lý: gói gửi trong handler nhận nó làm nguyên nhân
+        self._current_cause: Optional[int] = None
 
     # Public API -----------------------------------------------------
     def register_node(self, node_id: str, handler: MessageHandler) -> None:
@@ -82,6 +290,119 @@ class NetworkSimulator:
         self._inflight_count.setdefault(node_id, 0)
         # Bộ đếm per-link sẽ được khởi tạo khi dùng
 
+    def register_timer_handler(self, node_id: str, handler: TimerHandler) -> None:
+        self.timer_handlers[node_id] = handler
+
+    def schedule_timer(self, node_id: str, delay_ms: float, payload: Dict[str, Any]) -> None:
+        """
+        Hẹn giờ ảo: sau delay_ms gọi timer handler của node với payload.
+        Timer nằm chung hàng đợi sự kiện nên được checkpoint/tái lập như message.
+        """
+        timer = ScheduledMessage(deliver_at=self.now_ms + delay_ms, msg_id=0,
+                                 payload={"to": node_id, "timer": payload}, kind="timer")
+        self._push(timer)
+
+    def set_cpu_model(self, cost_fn: Optional[CpuCostFn],
+                      node_ids: Optional[List[str]] = None) -> None:
+        """
+        Gắn mô hình CPU cho các node (mặc định: mọi node đã đăng ký).
+        Khi có mô hình, handler của node được gọi lần lượt (FIFO) lúc xử lý xong,
+        nên các send phát ra trong handler mang thời điểm hoàn tất.
+        cost_fn=None gỡ mô hình (xử lý tức thời như cũ).
+        """
+        if cost_fn is not None:
+            # config có thể bị gán lại sau khi tạo: kiểm tra lại khi bật mailbox
+            _check_overflow_policy(self.config.inbound_overflow_policy)
+        for node_id in (self.handlers.keys() if node_ids is None else node_ids):
+            if cost_fn is None:
+                self._cpu_models.pop(node_id, None)
+            else:
+                self._cpu_models[node_id] = cost_fn
+
+    def cpu_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Thống kê CPU per-node: busy_ms, utilization (theo now_ms), queue_len, max_queue_len.
+        """
+        stats: Dict[str, Dict[str, float]] = {}
+        for node_id in self._cpu_models:
+            busy = self._cpu_busy_ms.get(node_id, 0.0)
+            stats[node_id] = {
+                "busy_ms": busy,
+                "utilization": busy / self.now_ms if self.now_ms else 0.0,
+                "queue_len": len(self._cpu_mailbox.get(node_id, ())),
+                "max_queue_len": self._cpu_max_queue.get(node_id, 0),
+            }
+        return stats
+
+    def add_event_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Đăng ký callback nhận từng log entry ngay khi sinh ra (streaming, vd. xuất timeline).
+        """
+        self._event_listeners.append(listener)
+
+    def remove_event_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        self._event_listeners.remove(listener)
+
+    def enable_metrics(self, registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+        """
+        Bật metrics tăng dần O(1) mỗi sự kiện: counter sent/dropped(reason)/duplicated/delivered/
+        backpressured theo link, histogram độ trễ (send -> tới receiver) theo link và theo loại message,
+        gauge inflight bytes và độ sâu hàng đợi pending theo link.
+        """
+        self._metrics = registry if registry is not None else MetricsRegistry(prefix="netsim_")
+        return self._metrics
+
+    def disable_metrics(self) -> None:
+        self._metrics = None
+
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        return self._metrics
+
+    def enable_latency_tracing(self, tracer: Optional[LatencyTracer] = None) -> LatencyTracer:
+        """
+        Ghi lại cho mỗi message: thời gian chờ backpressure, chờ link (serialize sau các gói trước),
+        lan truyền, jitter và xử lý ở receiver, cùng message nguyên nhân để dựng critical path.
+        """
+        self._tracer = tracer if tracer is not None else LatencyTracer()
+        return self._tracer
+
+    def disable_latency_tracing(self) -> None:
+        self._tracer = None
+
+    @property
+    def tracer(self) -> Optional[LatencyTracer]:
+        return self._tracer
+
+    def trace_mark(self, node_id: str, event: str, height: Optional[int]) -> None:
+        """
+        Đánh dấu mốc của node (vd. "commit") kèm message đang xử lý; no-op khi không tracing.
+        """
+        if self._tracer is not None:
+            self._tracer.mark(self.now_ms, node_id, event, height, self._current_cause)
+
+    def inbound_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Metric mailbox nhận per-node: depth hiện tại, max_depth, avg_depth (trung bình theo thời gian),
+        số gói drop_oldest/drop_newest, số lần pause link và số link đang pause.
+        Mailbox chỉ tồn tại ở node có mô hình CPU (node không có CPU xử lý tức thời, depth luôn 0).
+        """
+        stats: Dict[str, Dict[str, float]] = {}
+        for node_id in self._cpu_models:
+            st = self._inbound_stat(node_id)
+            depth = len(self._cpu_mailbox.get(node_id, ()))
+            area = st["depth_area"] + depth * (self.now_ms - st["last_change_ms"])
+            stats[node_id] = {
+                "depth": depth,
+                "max_depth": self._cpu_max_queue.get(node_id, 0),
+                "avg_depth": area / self.now_ms if self.now_ms else 0.0,
+                "dropped_oldest": st["dropped_oldest"],
+                "dropped_newest": st["dropped_newest"],
+                "pauses": st["pauses"],
+                "paused_links": sum(1 for (_, r) in self._paused_links if r == node_id),
+            }
+        return stats
+
     def load_topology(self, edges: List[Tuple[str, str]]) -> None:
         """
         Restrict network to directed edges (sender, receiver).
@@ -89,6 +410,13 @@ class NetworkSimulator:
         """
         self._allowed_edges = set(edges)
 
+    def allow_edges(self, edges: List[Tuple[str, str]]) -> None:
+        """
+        Add directed edges to an already loaded topology (no-op for full mesh).
+        """
+        if self._allowed_edges is not None:
+            self._allowed_edges.update(edges)
+
     def load_topology_from_file(self, path: str) -> None:
         """
         Load topology from a simple CSV-like file:
@@ -132,6 +460,25 @@ class NetworkSimulator:
                     profile["drop_rate"] = float(parts[5])
                 self._link_profile[(sender, receiver)] = profile
 
+    def set_link_profile(self, sender: str, receiver: str, **profile: Any) -> None:
+        """
+        Ghi đè profile một link bằng code, cùng field với file profile
+        (base_delay_ms, jitter_ms, bandwidth_bytes_per_ms, drop_rate).
+        """
+        # Thay dict mới: checkpoint chỉ copy nông _link_profile
+        link = (sender, receiver)
+        self._link_profile[link] = {**self._link_profile.get(link, {}), **profile}
+
+    def link_model(self, sender: str, receiver: str) -> Dict[str, Any]:
+        """
+        Tham số mô hình của link (sau khi áp profile): base_delay, jitter, bandwidth, drop_rate.
+        Dùng lại mô hình delay/drop ở runtime khác (vd. broker shared-memory).
+        """
+        link = (sender, receiver)
+        params: Dict[str, Any] = dict(self._get_link_params(link))
+        params["drop_rate"] = self._get_link_drop_rate(link)
+        return params
+
     def block_link(self, sender: str, receiver: str) -> None:
         self._blocked_links.add((sender, receiver))
         self._log_event("block_link", sender, receiver, None, {})
@@ -181,6 +528,13 @@ class NetworkSimulator:
         while self._queue and self._queue[0].deliver_at <= self.now_ms:
             scheduled = heapq.heappop(self._queue)
             msg = scheduled.payload
+            if scheduled.kind == "timer":
+                self._fire_timer(msg["to"], msg["timer"])
+                continue
+            if scheduled.kind == "cpu":
+                self._cpu_complete(msg["to"])
+                delivered += 1
+                continue
             sender = msg["from"]
             receiver = msg["to"]
             size_bytes = self._estimate_size(msg)
@@ -188,14 +542,21 @@ class NetworkSimulator:
             link = (sender, receiver)
             self._inflight_link[link] = max(self._inflight_link.get(link, 0) - 1, 0)
             self._inflight_bytes_link[link] = max(self._inflight_bytes_link.get(link, 0) - size_bytes, 0)
+            if self._metrics is not None:
+                self._observe_arrival(link, msg, scheduled.sent_at)
+            if self._tracer is not None:
+                self._tracer.on_arrival(scheduled.msg_id, self.now_ms)
 
             if msg["type"] == "HEADER":
                 self._seen_headers[(receiver, msg["header_id"])] = True
 
-            self._deliver(receiver, msg)
+            if receiver in self._cpu_models:
+                self._cpu_submit(receiver, scheduled)
+            else:
+                self._deliver(receiver, msg, scheduled.msg_id)
+                delivered += 1
             # Sau khi giải phóng dung lượng, thử bơm tiếp các gói đang queue trên link này
             self._drain_pending_link(link)
-            delivered += 1
         return delivered
 
     def advance_time(self, delta_ms: int) -> int:
@@ -216,9 +577,56 @@ class NetworkSimulator:
             delivered += self.tick()
         return delivered
 
+    def run_until(self, time_ms: float) -> int:
+        """
+        Deliver every message due up to time_ms (in event order), then set now to time_ms.
+        """
+        delivered = 0
+        while self._queue and self._queue[0].deliver_at <= time_ms:
+            self.now_ms = max(self.now_ms, self._queue[0].deliver_at)
+            delivered += self.tick()
+        self.now_ms = max(self.now_ms, time_ms)
+        return delivered
+
     def logs(self) -> List[Dict[str, Any]]:
         return list(self._logs)
 
+    def log_position(self) -> int:
+        """
+        Số entry log đã sinh từ đầu run, kể cả entry không giữ trong bộ nhớ (keep_logs=False
+        hoặc phần trước checkpoint nạp từ đĩa).
+        """
+        return len(self._logs)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Snapshot toàn bộ trạng thái mạng (hàng đợi sự kiện, bộ đếm, RNG, log) để rẽ nhánh.
+        Handler không được chụp: restore() giữ handler đang đăng ký.
+        Chi phí: log được chia sẻ (chỉ đóng băng các entry mới từ snapshot trước); các container
+        còn lại được copy nông, tức O(hàng đợi sự kiện + _seen_headers + trạng thái per-link)
+        mỗi lần checkpoint/restore. _seen_headers tăng theo số header đã giao trong cả run.
+        """
+        snap = {name: copy_fn(getattr(self, name))
+                for name, copy_fn in self._CHECKPOINT_FIELDS.items()}
+        snap["_logs"] = self._logs.freeze()
+        snap["config"] = replace(self.config)
+        snap["rng_state"] = self.rng.getstate()
+        return snap
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        """
+        Đưa simulator về đúng trạng thái của checkpoint. Snapshot có thể restore nhiều lần.
+        """
+        for name, copy_fn in self._CHECKPOINT_FIELDS.items():
+            setattr(self, name, copy_fn(snap[name]))
+        logs = snap["_logs"]
+        if isinstance(logs, int):
+            # Snapshot nạp từ đĩa chỉ giữ vị trí log (xem persistence): log trong bộ nhớ bắt đầu rỗng
+            logs = LogChunk(None, (), logs)
+        self._logs = EventLog(logs)
+        self.config = replace(snap["config"])
+        self.rng.setstate(snap["rng_state"])
+
     # Internal helpers ----------------------------------------------
     def _enqueue(self, sender: str, receiver: str, envelope: Dict[str, Any]) -> None:
         height = envelope.get("height")
@@ -239,12 +647,24 @@ class NetworkSimulator:
             self._log_event("drop_blocked_link", sender, receiver, height, envelope)
             return
 
+        link = (sender, receiver)
+        if link in self._paused_links:
+            # Receiver đang quá tải (pause_link): giữ gói ở phía gửi tới khi link được resume
+            q = self._pending_link.setdefault(link, [])
+            q.append((envelope, size_bytes, self.now_ms, self._current_cause))
+            self._log_event("backpressure_queue_receiver", sender, receiver, height, {
+                "queued_size": size_bytes,
+                "queue_len": len(q),
+            })
+            if self._metrics is not None:
+                self._update_link_gauges(link)
+            return
+
         inflight = self._inflight_count.get(sender, 0)
         if inflight >= self.config.max_inflight_per_sender:
             self._log_event("drop_rate_limit_sender", sender, receiver, height, envelope)
             return
 
-        link = (sender, receiver)
         inflight_link = self._inflight_link.get(link, 0)
         if inflight_link >= self.config.max_inflight_per_link:
             self._log_event("drop_rate_limit_link", sender, receiver, height, envelope)
@@ -254,12 +674,14 @@ class NetworkSimulator:
         if inflight_bytes + size_bytes > self.config.max_bytes_inflight_per_link:
             # Backpressure: xếp hàng thay vì drop nếu vượt ngưỡng bytes
             q = self._pending_link.setdefault(link, [])
-            q.append((envelope, size_bytes))
+            q.append((envelope, size_bytes, self.now_ms, self._current_cause))
             self._log_event("backpressure_queue", sender, receiver, height, {
                 "queued_size": size_bytes,
                 "queue_len": len(q),
                 "inflight_bytes": inflight_bytes,
             })
+            if self._metrics is not None:
+                self._update_link_gauges(link)
             return
 
         if inflight_link + 1 >= self.config.auto_block_inflight_threshold:
@@ -291,7 +713,9 @@ class NetworkSimulator:
 
     def _schedule_envelope(self, sender: str, receiver: str, envelope: Dict[str, Any],
                            size_bytes: int, inflight_sender: int,
-                           inflight_link: int, height: Optional[int]) -> None:
+                           inflight_link: int, height: Optional[int],
+                           sent_at: Optional[float] = None,
+                           cause: Optional[int] = None) -> None:
         # Serialize gửi theo băng thông link
         link = (sender, receiver)
         params = self._get_link_params(link)
@@ -300,6 +724,9 @@ class NetworkSimulator:
         self._link_next_available_time[link] = start_time + tx_time
 
         delay = params["base_delay"] + self.rng.randint(0, params["jitter"])
+        if self.config.transmit_delay:
+            # Tracer tính thời gian truyền của chính gói vào link_wait
+            start_time += tx_time
         deliver_at = start_time + delay
         msg_id = self._next_msg_id
         self._next_msg_id += 1
@@ -308,8 +735,15 @@ class NetworkSimulator:
         self._inflight_link[link] = inflight_link + 1
         self._inflight_bytes_link[link] = self._inflight_bytes_link.get(link, 0) + size_bytes
 
-        scheduled = ScheduledMessage(deliver_at=deliver_at, msg_id=msg_id, payload=envelope)
-        heapq.heappush(self._queue, scheduled)
+        if sent_at is None:
+            sent_at = self.now_ms
+            cause = self._current_cause
+        scheduled = ScheduledMessage(deliver_at=deliver_at, msg_id=msg_id, payload=envelope,
+                                     sent_at=sent_at, cause=cause)
+        self._push(scheduled)
+        if self._tracer is not None:
+            self._tracer.on_schedule(msg_id, sender, receiver, envelope, cause, sent_at,
+                                     self.now_ms, start_time, params["base_delay"], delay - params["base_delay"])
         self._log_event("delay_scheduled", sender, receiver, height, {
             "msg_id": msg_id,
             "deliver_at": deliver_at,
@@ -330,9 +764,15 @@ class NetworkSimulator:
             dup_delay = delay + self.rng.randint(0, self.config.jitter_ms)
             dup = ScheduledMessage(deliver_at=self.now_ms + dup_delay,
                                    msg_id=self._next_msg_id,
-                                   payload=envelope.copy())
+                                   payload=envelope.copy(),
+                                   sent_at=sent_at,
+                                   cause=cause)
             self._next_msg_id += 1
-            heapq.heappush(self._queue, dup)
+            self._push(dup)
+            if self._tracer is not None:
+                self._tracer.on_schedule(dup.msg_id, sender, receiver, dup.payload, cause, sent_at,
+                                         self.now_ms, self.now_ms, params["base_delay"],
+                                         dup_delay - params["base_delay"])
             self._inflight_count[sender] += 1
             self._inflight_link[link] = self._inflight_link.get(link, 0) + 1
             self._inflight_bytes_link[link] = self._inflight_bytes_link.get(link, 0) + size_bytes
@@ -341,8 +781,127 @@ class NetworkSimulator:
                 "dup_msg_id": dup.msg_id,
                 "extra_delay_ms": dup_delay - delay,
             })
+        if self._metrics is not None:
+            self._update_link_gauges(link)
+
+    def _push(self, scheduled: ScheduledMessage) -> None:
+        heapq.heappush(self._queue, scheduled)
+
+    def _fire_timer(self, node_id: str, payload: Dict[str, Any]) -> None:
+        handler = self.timer_handlers.get(node_id)
+        if not handler:
+            return
+        self._log_event("timer_fire", node_id, node_id, payload.get("height"), {"timer": payload})
+        handler(payload)
+
+    def _inbound_stat(self, node_id: str) -> Dict[str, float]:
+        st = self._inbound_stats.get(node_id)
+        if st is None:
+            st = self._inbound_stats[node_id] = {
+                "depth_area": 0.0, "last_change_ms": 0.0,
+                "dropped_oldest": 0, "dropped_newest": 0, "pauses": 0,
+            }
+        return st
 
-    def _deliver(self, receiver: str, msg: Dict[str, Any]) -> None:
+    def _note_inbound_depth(self, node_id: str) -> None:
+        # Gọi trước mỗi thay đổi độ sâu mailbox để tích phân depth theo thời gian
+        st = self._inbound_stat(node_id)
+        depth = len(self._cpu_mailbox.get(node_id, ()))
+        st["depth_area"] += depth * (self.now_ms - st["last_change_ms"])
+        st["last_change_ms"] = self.now_ms
+
+    def _inbound_overflow(self, node_id: str, scheduled: ScheduledMessage, mailbox: deque) -> bool:
+        """
+        Áp policy khi mailbox đầy. Trả về True nếu gói mới vẫn được xếp vào mailbox.
+        """
+        msg = scheduled.payload
+        policy = self.config.inbound_overflow_policy
+        st = self._inbound_stat(node_id)
+        sender = msg["from"]
+        if policy == "drop_oldest" and len(mailbox) > 1:
+            # Phần tử đầu đang được xử lý: bỏ gói chờ lâu nhất sau nó
+            oldest = mailbox[1].payload
+            del mailbox[1]
+            st["dropped_oldest"] += 1
+            self._log_event("inbound_drop_oldest", oldest["from"], node_id, oldest.get("height"), {
+                "header_id": oldest.get("header_id"),
+            })
+            return True
+        if policy == "drop_oldest":
+            # Mailbox chỉ có gói đang xử lý (capacity 1): gói chờ lâu nhất chính là gói mới
+            st["dropped_oldest"] += 1
+            self._log_event("inbound_drop_oldest", sender, node_id, msg.get("height"), {
+                "header_id": msg.get("header_id"),
+            })
+            return False
+        if policy == "pause_link":
+            link = (sender, node_id)
+            returned = self._paused_links.get(link)
+            if returned is None:
+                returned = 0
+                st["pauses"] += 1
+                self._log_event("inbound_pause_link", sender, node_id, msg.get("height"), {
+                    "depth": len(mailbox),
+                })
+            # Trả gói về đầu hàng đợi của link, giữ thứ tự FIFO với các gói tới sau
+            q = self._pending_link.setdefault(link, [])
+            q.insert(returned, (msg, self._estimate_size(msg), scheduled.sent_at, scheduled.cause))
+            self._paused_links[link] = returned + 1
+            if self._metrics is not None:
+                self._update_link_gauges(link)
+            return False
+        st["dropped_newest"] += 1
+        self._log_event("inbound_drop_newest", sender, node_id, msg.get("height"), {
+            "header_id": msg.get("header_id"),
+        })
+        return False
+
+    def _resume_links(self, node_id: str) -> None:
+        for link in [l for l in self._paused_links if l[1] == node_id]:
+            del self._paused_links[link]
+            self._log_event("inbound_resume_link", link[0], node_id, None, {
+                "pending": len(self._pending_link.get(link, ())),
+            })
+            self._drain_pending_link(link)
+
+    def _cpu_submit(self, node_id: str, scheduled: ScheduledMessage) -> None:
+        mailbox = self._cpu_mailbox.setdefault(node_id, deque())
+        capacity = self.config.inbound_queue_capacity
+        if capacity is not None and len(mailbox) >= capacity:
+            if not self._inbound_overflow(node_id, scheduled, mailbox):
+                return
+        self._note_inbound_depth(node_id)
+        mailbox.append(scheduled)
+        if len(mailbox) > self._cpu_max_queue.get(node_id, 0):
+            self._cpu_max_queue[node_id] = len(mailbox)
+        if len(mailbox) == 1 and self._cpu_busy_until.get(node_id, self.now_ms) <= self.now_ms:
+            self._cpu_start(node_id)
+
+    def _cpu_start(self, node_id: str) -> None:
+        # Bắt đầu phục vụ message đầu mailbox; hoàn tất là một sự kiện "cpu" trong hàng đợi
+        msg = self._cpu_mailbox[node_id][0].payload
+        cost = max(0.0, float(self._cpu_models[node_id](msg)))
+        done_at = self.now_ms + cost
+        self._cpu_busy_until[node_id] = done_at
+        self._cpu_busy_ms[node_id] = self._cpu_busy_ms.get(node_id, 0.0) + cost
+        self._push(ScheduledMessage(deliver_at=done_at, msg_id=0, payload={"to": node_id}, kind="cpu"))
+
+    def _cpu_complete(self, node_id: str) -> None:
+        mailbox = self._cpu_mailbox.get(node_id)
+        if not mailbox:
+            return
+        self._note_inbound_depth(node_id)
+        scheduled = mailbox.popleft()
+        self._deliver(node_id, scheduled.payload, scheduled.msg_id)
+        if mailbox:
+            self._cpu_start(node_id)
+        else:
+            self._cpu_mailbox.pop(node_id, None)
+        capacity = self.config.inbound_queue_capacity
+        if self._paused_links and (capacity is None or len(mailbox) < capacity):
+            self._resume_links(node_id)
+
+    def _deliver(self, receiver: str, msg: Dict[str, Any], msg_id: Optional[int] = None) -> None:
         handler = self.handlers.get(receiver)
         if not handler:
             self._log_event("drop_missing_handler", msg["from"], receiver, msg.get("height"), msg)
@@ -350,15 +909,23 @@ class NetworkSimulator:
 
         self._log_event("deliver", msg["from"], receiver, msg.get("height"), {
             "envelope": msg,
+            "msg_id": msg_id,
         })
-        handler(msg)
+        if self._tracer is not None and msg_id is not None:
+            self._tracer.on_handled(msg_id, self.now_ms)
+        previous_cause = self._current_cause
+        self._current_cause = msg_id
+        try:
+            handler(msg)
+        finally:
+            self._current_cause = previous_cause
 
     def _drain_pending_link(self, link: Tuple[str, str]) -> None:
         """
         Attempt to schedule queued messages for a link if capacity allows.
         """
         sender, receiver = link
-        if self._is_blocked(sender, receiver):
+        if self._is_blocked(sender, receiver) or link in self._paused_links:
             return
 
         q = self._pending_link.get(link, [])
@@ -371,7 +938,7 @@ class NetworkSimulator:
 
         drained = 0
         while q:
-            envelope, size_bytes = q[0]
+            envelope, size_bytes, sent_at, cause = q[0]
             if inflight_link >= self.config.max_inflight_per_link:
                 break
             if inflight_bytes + size_bytes > self.config.max_bytes_inflight_per_link:
@@ -381,7 +948,7 @@ class NetworkSimulator:
 
             q.pop(0)
             self._schedule_envelope(sender, receiver, envelope, size_bytes,
-                                    inflight_sender, inflight_link, envelope.get("height"))
+                                    inflight_sender, inflight_link, envelope.get("height"), sent_at, cause)
             inflight_sender = self._inflight_count.get(sender, inflight_sender)
             inflight_link = self._inflight_link.get(link, inflight_link)
             inflight_bytes = self._inflight_bytes_link.get(link, inflight_bytes)
@@ -389,6 +956,24 @@ class NetworkSimulator:
 
         if drained and not q:
             self._pending_link.pop(link, None)
+        if drained and self._metrics is not None:
+            self._update_link_gauges(link)
+
+    # Metrics hooks (chỉ gọi khi self._metrics khác None) -----------------------
+    def _observe_arrival(self, link: Tuple[str, str], msg: Dict[str, Any], sent_at: Optional[float]) -> None:
+        self._update_link_gauges(link)
+        if sent_at is None:
+            return
+        latency = self.now_ms - sent_at
+        payload = msg.get("payload") or {}
+        self._metrics.observe("link_latency_ms", latency, sender=link[0], receiver=link[1])
+        self._metrics.observe("message_latency_ms", latency, type=payload.get("type") or msg["type"])
+
+    def _update_link_gauges(self, link: Tuple[str, str]) -> None:
+        self._metrics.set("inflight_bytes", self._inflight_bytes_link.get(link, 0),
+                          sender=link[0], receiver=link[1])
+        self._metrics.set("pending_queue_depth", len(self._pending_link.get(link, ())),
+                          sender=link[0], receiver=link[1])
 
     def _is_blocked(self, sender: str, receiver: str) -> bool:
         link = (sender, receiver)
@@ -448,11 +1033,25 @@ class NetworkSimulator:
 
     def _log_event(self, event: str, sender: str, receiver: str,
                    height: Optional[int], details: Dict[str, Any]) -> None:
-        self._logs.append({
+        if self._metrics is not None:
+            metric = _METRIC_EVENTS.get(event)
+            if metric is not None:
+                name, reason = metric
+                if reason is None:
+                    self._metrics.inc(name, sender=sender, receiver=receiver)
+                else:
+                    self._metrics.inc(name, sender=sender, receiver=receiver, reason=reason)
+        entry = {
             "time_ms": self.now_ms,
             "event": event,
             "from": sender,
             "to": receiver,
             "height": height,
             "details": details,
-        })
+        }
+        if self.keep_logs:
+            self._logs.append(entry)
+        else:
+            self._logs.skip()
+        for listener in self._event_listeners:
+            listener(entry)
@@ -0,0 +1,418 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import random
+import socket
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.network.simulator import MessageHandler, TimerHandler
+
+# Transport thật qua TCP loopback với cùng interface NetworkSimulator
+# (register_node/send_header/send_body, luật header trước body), để benchmark
+# ConsensusController + NetworkConsensusHelper với serialize và syscall thật.
+# Chọn TCP (không UDP): thứ tự byte trên một kết nối đảm bảo header tới trước body.
+
+Address = Tuple[str, int]
+
+# Framing nhị phân:
+#   frame := u32 body_len | body
+#   body  := u8 kind | u16 len+from | u16 len+to | u16 len+header_id | i64 height | payload
+# payload là canonical JSON (sort_keys, không khoảng trắng) của envelope["payload"].
+_LEN = struct.Struct(">I")
+_U16 = struct.Struct(">H")
+_HEIGHT = struct.Struct(">q")
+KIND_HEADER = 0
+KIND_BODY = 1
+_KIND_BY_TYPE = {"HEADER": KIND_HEADER, "BODY": KIND_BODY}
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+# Số (receiver, header_id) đã gửi được nhớ để cho phép body (FIFO, bỏ header cũ nhất)
+DEFAULT_SENT_HEADER_CAPACITY = 100_000
+
+_log = logging.getLogger(__name__)
+
+
+class FrameError(Exception):
+    pass
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return _U16.pack(len(data)) + data
+
+
+def encode_frame(envelope: Dict[str, Any]) -> bytes:
+    """
+    Mã hóa envelope (dạng NetworkSimulator) thành frame có tiền tố độ dài.
+    """
+    payload = json.dumps(envelope["payload"], sort_keys=True, separators=(",", ":")).encode("utf-8")
+    height = envelope.get("height")
+    body = b"".join((
+        bytes((_KIND_BY_TYPE[envelope["type"]],)),
+        _pack_str(envelope["from"]),
+        _pack_str(envelope["to"]),
+        _pack_str(envelope["header_id"]),
+        _HEIGHT.pack(-1 if height is None else height),
+        payload,
+    ))
+    return _LEN.pack(len(body)) + body
+
+
+def _read_route(view: memoryview) -> Tuple[int, List[str], int]:
+    if not view:
+        raise FrameError("empty frame")
+    offset = 1
+    fields: List[str] = []
+    for _ in range(3):
+        (n,) = _U16.unpack_from(view, offset)
+        offset += _U16.size
+        fields.append(bytes(view[offset:offset + n]).decode("utf-8"))
+        offset += n
+    return view[0], fields, offset
+
+
+def decode_route(body: bytes) -> Tuple[int, str, str, str]:
+    """
+    Chỉ đọc phần định tuyến (kind, from, to, header_id) của frame, không parse payload.
+    Dùng cho broker/relay cần chuyển tiếp frame nguyên vẹn.
+    """
+    kind, (sender, receiver, header_id), _ = _read_route(memoryview(body))
+    return kind, sender, receiver, header_id
+
+
+def decode_frame(body: bytes) -> Dict[str, Any]:
+    """
+    Giải mã phần body của frame (không gồm 4 byte độ dài) về envelope.
+    Frame hỏng (cắt cụt, UTF-8/JSON sai) -> FrameError.
+    """
+    view = memoryview(body)
+    try:
+        kind, (sender, receiver, header_id), offset = _read_route(view)
+        (height,) = _HEIGHT.unpack_from(view, offset)
+        offset += _HEIGHT.size
+        payload = json.loads(bytes(view[offset:]))
+    except (struct.error, ValueError) as exc:
+        raise FrameError(f"malformed frame: {exc}") from exc
+    if kind == KIND_HEADER:
+        envelope_type = "HEADER"
+    elif kind == KIND_BODY:
+        envelope_type = "BODY"
+    else:
+        raise FrameError(f"unknown frame kind {kind}")
+    envelope = {
+        "type": envelope_type,
+        "header_id": header_id,
+        "height": None if height == -1 else height,
+        "from": sender,
+        "to": receiver,
+        "payload": payload,
+    }
+    if kind == KIND_HEADER:
+        envelope["body_allowed"] = False
+    return envelope
+
+
+@dataclass
+class FaultConfig:
+    """
+    Fault injection phía gửi (tùy chọn): delay/jitter/drop như NetworkConfig.
+    """
+    base_delay_ms: int = 0
+    jitter_ms: int = 0
+    drop_rate: float = 0.0
+
+
+class LoopbackTransport:
+    """
+    Transport TCP cho một node (một tiến trình/event loop).
+    - addresses: node_id -> (host, port) của mọi node, kể cả chính nó.
+    - Gửi cho chính mình không qua socket (call_soon).
+    - Header trước body: chỉ cho gửi body khi header cùng header_id đã được gửi tới receiver
+      (nhớ sent_header_capacity header gần nhất); TCP giữ thứ tự nên receiver luôn thấy header trước.
+    - Frame hỏng/quá lớn từ một kết nối: ghi log, đếm frame_errors và đóng kết nối đó.
+    - Fault injection (delay/drop) áp dụng phía gửi, giữ FIFO theo link.
+    """
+
+    def __init__(self, node_id: str, addresses: Dict[str, Address],
+                 faults: Optional[FaultConfig] = None, seed: int = 0,
+                 sent_header_capacity: int = DEFAULT_SENT_HEADER_CAPACITY):
+        self.node_id = node_id
+        self.addresses = addresses
+        self.faults = faults
+        self.rng = random.Random(seed)
+        self.handlers: Dict[str, MessageHandler] = {}
+        self.timer_handlers: Dict[str, TimerHandler] = {}
+        self.stats: Dict[str, int] = {
+            "sent": 0, "received": 0, "bytes_sent": 0, "bytes_received": 0,
+            "dropped": 0, "body_rejected_missing_header": 0, "frame_errors": 0,
+        }
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._origin = 0.0
+        self._sent_headers: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._sent_header_capacity = sent_header_capacity
+        self._writers: Dict[str, asyncio.StreamWriter] = {}
+        self._pending: Dict[str, List[bytes]] = {}
+        self._connecting: Dict[str, asyncio.Task] = {}
+        self._link_ready_at: Dict[str, float] = {}
+        self._inbound: List[asyncio.StreamWriter] = []
+        self._readers: List[asyncio.Task] = []
+        self._closing = False
+
+    # Vòng đời ---------------------------------------------------------------
+    async def start(self) -> Address:
+        """
+        Mở server lắng nghe. Trả về địa chỉ thật (hữu ích khi cấu hình port 0).
+        """
+        self._loop = asyncio.get_running_loop()
+        self._origin = self._loop.time()
+        host, port = self.addresses[self.node_id]
+        self._server = await asyncio.start_server(self._on_connection, host, port)
+        bound = self._server.sockets[0].getsockname()[:2]
+        self.addresses[self.node_id] = (bound[0], bound[1])
+        return self.addresses[self.node_id]
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        for task in self._connecting.values():
+            task.cancel()
+        # Đóng socket (không cancel task đọc) để vòng đọc kết thúc bằng EOF
+        for writer in list(self._writers.values()) + self._inbound:
+            writer.close()
+        if self._readers:
+            await asyncio.wait(self._readers, timeout=1.0)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    @property
+    def now_ms(self) -> float:
+        if self._loop is None:
+            return 0.0
+        return (self._loop.time() - self._origin) * 1000.0
+
+    # API tương thích NetworkSimulator -----------------------------------------
+    def register_node(self, node_id: str, handler: MessageHandler) -> None:
+        if node_id != self.node_id:
+            raise ValueError(f"transport of {self.node_id} cannot host node {node_id}")
+        self.handlers[node_id] = handler
+
+    def register_timer_handler(self, node_id: str, handler: TimerHandler) -> None:
+        self.timer_handlers[node_id] = handler
+
+    def schedule_timer(self, node_id: str, delay_ms: float, payload: Dict[str, Any]) -> None:
+        handler = self.timer_handlers.get(node_id)
+        if handler is not None:
+            self._loop.call_later(delay_ms / 1000.0, handler, payload)
+
+    def send_header(self, sender: str, receiver: str, header_id: str,
+                    height: int, payload: Dict[str, Any]) -> None:
+        envelope = {
+            "type": "HEADER",
+            "header_id": header_id,
+            "height": height,
+            "from": sender,
+            "to": receiver,
+            "body_allowed": False,
+            "payload": payload,
+        }
+        if self._send(receiver, envelope):
+            sent = self._sent_headers
+            sent[(receiver, header_id)] = None
+            if len(sent) > self._sent_header_capacity:
+                sent.popitem(last=False)
+
+    def send_body(self, sender: str, receiver: str, header_id: str,
+                  height: int, payload: Dict[str, Any]) -> None:
+        if (receiver, header_id) not in self._sent_headers:
+            self.stats["body_rejected_missing_header"] += 1
+            return
+        envelope = {
+            "type": "BODY",
+            "header_id": header_id,
+            "height": height,
+            "from": sender,
+            "to": receiver,
+            "payload": payload,
+        }
+        self._send(receiver, envelope)
+
+    # Gửi ----------------------------------------------------------------------
+    def _send(self, receiver: str, envelope: Dict[str, Any]) -> bool:
+        if receiver not in self.addresses:
+            self.stats["dropped"] += 1
+            return False
+        faults = self.faults
+        ready_at = None
+        if faults is not None:
+            if faults.drop_rate and self.rng.random() < faults.drop_rate:
+                self.stats["dropped"] += 1
+                return False
+            delay_ms = faults.base_delay_ms + (self.rng.randint(0, faults.jitter_ms) if faults.jitter_ms else 0)
+            # Giữ FIFO theo link: jitter không được đẩy body vượt lên trước header.
+            # Dùng call_at với thời điểm tăng nghiêm ngặt (heap timer không ổn định khi trùng).
+            now = self._loop.time()
+            ready_at = max(now + delay_ms / 1000.0, self._link_ready_at.get(receiver, now) + 1e-6)
+            self._link_ready_at[receiver] = ready_at
+
+        frame = encode_frame(envelope)
+        self.stats["sent"] += 1
+        self.stats["bytes_sent"] += len(frame)
+        if ready_at is not None:
+            self._loop.call_at(ready_at, self._write, receiver, frame)
+        else:
+            self._write(receiver, frame)
+        return True
+
+    def _write(self, receiver: str, frame: bytes) -> None:
+        if receiver == self.node_id:
+            self._loop.call_soon(self._dispatch, frame[_LEN.size:])
+            return
+        writer = self._writers.get(receiver)
+        if writer is not None and not writer.is_closing():
+            writer.write(frame)
+            return
+        self._pending.setdefault(receiver, []).append(frame)
+        if receiver not in self._connecting:
+            self._connecting[receiver] = self._loop.create_task(self._connect(receiver))
+
+    async def _connect(self, receiver: str, retry_s: float = 0.05) -> None:
+        host, port = self.addresses[receiver]
+        while True:
+            try:
+                _, writer = await asyncio.open_connection(host, port)
+                break
+            except OSError:
+                # Peer chưa lắng nghe (đang khởi động): thử lại
+                await asyncio.sleep(retry_s)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._writers[receiver] = writer
+        for frame in self._pending.pop(receiver, []):
+            writer.write(frame)
+        self._connecting.pop(receiver, None)
+
+    # Nhận ---------------------------------------------------------------------
+    async def _on_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self._closing:
+            writer.close()
+            return
+        self._inbound.append(writer)
+        self._readers.append(asyncio.current_task())
+        try:
+            while True:
+                head = await reader.readexactly(_LEN.size)
+                (length,) = _LEN.unpack(head)
+                if length > MAX_FRAME_BYTES:
+                    raise FrameError(f"frame too large: {length}")
+                self._dispatch(await reader.readexactly(length))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        except FrameError as exc:
+            # Peer gửi frame hỏng: bỏ kết nối này, node vẫn chạy
+            self.stats["frame_errors"] += 1
+            _log.warning("%s: closing connection after bad frame: %s", self.node_id, exc)
+        except asyncio.CancelledError:
+            # Event loop đang tắt: kết thúc êm để StreamReaderProtocol không log lỗi
+            pass
+        finally:
+            writer.close()
+
+    def _dispatch(self, body: bytes) -> None:
+        envelope = decode_frame(body)
+        self.stats["received"] += 1
+        self.stats["bytes_received"] += len(body) + _LEN.size
+        handler = self.handlers.get(envelope["to"])
+        if handler is not None:
+            handler(envelope)
+
+
+# Chạy cụm: mỗi node một tiến trình -----------------------------------------------
+def pick_free_ports(count: int, host: str = "127.0.0.1") -> List[int]:
+    socks = []
+    try:
+        for _ in range(count):
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.bind((host, 0))
+            socks.append(s)
+        return [s.getsockname()[1] for s in socks]
+    finally:
+        for s in socks:
+            s.close()
+
+
+async def _run_node(node_id: str, addresses: Dict[str, Address], target_height: int,
+                    timeout_s: float, linger_s: float, faults: Optional[FaultConfig],
+                    seed: int) -> Dict[str, Any]:
+    # Import muộn để tiến trình con không kéo theo vòng import khi chỉ dùng framing
+    from src.simulator.cluster import ConsensusNode
+
+    transport = LoopbackTransport(node_id, addresses, faults=faults, seed=seed)
+    await transport.start()
+    peers = [nid for nid in addresses if nid != node_id]
+    node = ConsensusNode(node_id, peers, transport)
+
+    started = time.perf_counter()
+    node.controller.start_round(0)
+    deadline = started + timeout_s
+    while len(node.helper.ledger) < target_height and time.perf_counter() < deadline:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    # Chờ thêm để peer chậm hơn nhận đủ vote còn lại của node này
+    await asyncio.sleep(linger_s)
+    await transport.close()
+    return {
+        "node_id": node_id,
+        "ledger_hashes": [entry["hash"] for entry in node.helper.ledger[:target_height]],
+        "elapsed_s": elapsed,
+        "stats": dict(transport.stats),
+    }
+
+
+def _node_process_main(node_id: str, addresses: Dict[str, Address], target_height: int,
+                       timeout_s: float, linger_s: float, faults: Optional[FaultConfig],
+                       seed: int, results: Any) -> None:
+    results.put(asyncio.run(_run_node(node_id, addresses, target_height, timeout_s,
+                                      linger_s, faults, seed)))
+
+
+def run_loopback_cluster(
+    num_nodes: int = 4,
+    target_height: int = 5,
+    timeout_s: float = 30.0,
+    linger_s: float = 0.3,
+    faults: Optional[FaultConfig] = None,
+    seed: int = 0,
+    host: str = "127.0.0.1",
+    start_method: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Chạy num_nodes validator, mỗi node một tiến trình với asyncio loop riêng, giao tiếp qua
+    TCP 127.0.0.1. Trả về kết quả theo node: ledger_hashes, elapsed_s, thống kê transport.
+    """
+    ctx = multiprocessing.get_context(start_method) if start_method else multiprocessing
+    node_ids = [str(i) for i in range(num_nodes)]
+    ports = pick_free_ports(num_nodes, host)
+    addresses = {nid: (host, port) for nid, port in zip(node_ids, ports)}
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_node_process_main,
+                    args=(nid, dict(addresses), target_height, timeout_s, linger_s, faults,
+                          seed + i, results))
+        for i, nid in enumerate(node_ids)
+    ]
+    for p in procs:
+        p.start()
+    collected: Dict[str, Dict[str, Any]] = {}
+    for _ in procs:
+        res = results.get(timeout=timeout_s + linger_s + 30)
+        collected[res["node_id"]] = res
+    for p in procs:
+        p.join()
+    return collected
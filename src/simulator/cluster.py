@@ -0,0 +1,208 @@
+from typing import Any, Dict, List, Optional, Type, Union
+
+from src.consensus.controller import ConsensusController
+from src.consensus.helper import NetworkConsensusHelper
+from src.consensus.proposer import ProposerSchedule
+from src.consensus.reputation import MAX_TIMESTAMP_DRIFT_MS, ReputationSchedule
+from src.consensus.timeouts import TimeoutPolicy
+from src.consensus.tracing import Tracer
+from src.consensus.validator_set import ValidatorSet
+from src.crypto.keys import generate_keypair
+from src.execution.execution import ExecutionState
+from src.mempool import Mempool, TxGossip, TX_MESSAGE_TYPES
+from src.network.simulator import NetworkSimulator, NetworkConfig
+
+# Cụm validator đầy đủ (controller + helper + ExecutionState) chạy trên NetworkSimulator.
+# Hỗ trợ checkpoint/restore toàn cụm để rẽ nhánh kịch bản lỗi từ cùng một tiền tố.
+
+
+class ConsensusNode:
+    """
+    Một validator: NetworkConsensusHelper + ConsensusController + ExecutionState + Mempool (+ TxGossip).
+    """
+
+    def __init__(self, node_id: str, peers: List[str], network: NetworkSimulator,
+                 chain_id: str = "chain-demo", auto_advance: bool = True,
+                 tracer: Optional[Tracer] = None, validator_set: Optional[ValidatorSet] = None,
+                 proposer_schedule: Union[ProposerSchedule, ReputationSchedule, None] = None,
+                 timeout_policy: Optional[TimeoutPolicy] = None, pipelined: bool = False,
+                 aggregation: bool = False, signing_key: Optional[bytes] = None,
+                 pubkeys: Optional[Dict[str, bytes]] = None,
+                 mempool_kwargs: Optional[Dict[str, Any]] = None,
+                 gossip_kwargs: Optional[Dict[str, Any]] = None, compact_blocks: bool = False,
+                 max_timestamp_drift_ms: Optional[float] = None):
+        if pipelined and getattr(proposer_schedule, "lag", None) == 0:
+            raise ValueError("pipelining needs a static proposer schedule or ReputationSchedule(lag>=1)")
+        self.node_id = node_id
+        self.network = network
+        self.execution = ExecutionState(chain_id=chain_id)
+        self.mempool = Mempool(**(mempool_kwargs or {}))
+        self.gossip = TxGossip(node_id, peers, network, self.mempool, **(gossip_kwargs or {}))
+        self.helper = NetworkConsensusHelper(node_id, peers, network, execution=self.execution, tracer=tracer,
+                                             validator_set=validator_set, proposer_schedule=proposer_schedule,
+                                             aggregation=aggregation, chain_id=chain_id,
+                                             signing_key=signing_key, pubkeys=pubkeys, mempool=self.mempool,
+                                             compact_blocks=compact_blocks,
+                                             max_timestamp_drift_ms=max_timestamp_drift_ms)
+        self.controller = ConsensusController(node_id, self.helper, auto_advance=auto_advance, tracer=tracer,
+                                              timeout_policy=timeout_policy, pipelined=pipelined)
+        self.helper.set_controller(self.controller)
+        network.register_node(node_id, self.on_message)
+        register_timer = getattr(network, "register_timer_handler", None)
+        if register_timer is not None:
+            register_timer(node_id, self.on_timer)
+
+    def on_message(self, msg: Dict[str, Any]) -> None:
+        if msg.get("payload", {}).get("type") in TX_MESSAGE_TYPES:
+            self.gossip.on_message(msg)
+        else:
+            self.helper.on_message(msg)
+
+    def on_timer(self, payload: Dict[str, Any]) -> None:
+        # Mỗi node một timer handler: chia cho helper (timeout consensus) và gossip (flush INV)
+        self.helper.on_timer(payload)
+        self.gossip.on_timer(payload)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        return {
+            "helper": self.helper.checkpoint(),
+            "controller": self.controller.checkpoint(),
+            "execution": self.execution.snapshot(),
+            "gossip": self.gossip.checkpoint(),
+        }
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        # Helper trước controller: controller lấy lại locked block qua helper
+        self.helper.restore(snap["helper"])
+        self.controller.restore(snap["controller"])
+        self.execution.load_snapshot(snap["execution"])
+        self.gossip.restore(snap["gossip"])
+
+
+class ConsensusCluster:
+    """
+    Toàn bộ cụm: network + các ConsensusNode.
+    checkpoint() trả về snapshot chia sẻ cấu trúc; restore() có thể gọi nhiều lần
+    trên cùng snapshot để khám phá nhiều nhánh what-if.
+    """
+
+    def __init__(self, network: NetworkSimulator, node_ids: List[str],
+                 chain_id: str = "chain-demo", auto_advance: bool = True,
+                 tracer: Optional[Tracer] = None, voting_power: Optional[Dict[str, int]] = None,
+                 proposer_mode: str = "weighted", timeout_kwargs: Optional[Dict[str, Any]] = None,
+                 pipelined: bool = False, aggregation: bool = False, signed_votes: bool = False,
+                 mempool_kwargs: Optional[Dict[str, Any]] = None,
+                 gossip_kwargs: Optional[Dict[str, Any]] = None, compact_blocks: bool = False):
+        self.network = network
+        self.node_ids = list(node_ids)
+        # Một ValidatorSet + lịch proposer dùng chung (ngưỡng và bảng proposer chỉ tính một lần)
+        self.validator_set = ValidatorSet(voting_power or self.node_ids)
+        self.proposer_mode = proposer_mode
+        # Khóa Ed25519 cho mỗi validator khi ký phiếu (CommitCertificate có chữ ký kiểm được)
+        self.private_keys: Dict[str, bytes] = {}
+        self.pubkeys: Optional[Dict[str, bytes]] = None
+        if signed_votes:
+            self.pubkeys = {}
+            for nid in self.node_ids:
+                self.private_keys[nid], self.pubkeys[nid] = generate_keypair()
+        shared = None if proposer_mode == "reputation" else ProposerSchedule(self.validator_set, mode=proposer_mode)
+        # Reputation đo latency từ timestamp proposal -> node kiểm timestamp trước khi prevote
+        drift = MAX_TIMESTAMP_DRIFT_MS if proposer_mode == "reputation" else None
+        self.nodes: Dict[str, ConsensusNode] = {}
+        for nid in self.node_ids:
+            peers = [p for p in self.node_ids if p != nid]
+            # Reputation có trạng thái theo ledger của từng node; pipelining hỏi proposer h+1 trước khi
+            # commit h -> lịch trễ một height
+            schedule = shared or ReputationSchedule(self.validator_set, lag=1 if pipelined else 0)
+            # TimeoutPolicy học theo quan sát của từng node -> mỗi node một instance
+            self.nodes[nid] = ConsensusNode(nid, peers, network, chain_id=chain_id,
+                                            auto_advance=auto_advance, tracer=tracer,
+                                            validator_set=self.validator_set,
+                                            proposer_schedule=schedule,
+                                            timeout_policy=TimeoutPolicy(**(timeout_kwargs or {})),
+                                            pipelined=pipelined, aggregation=aggregation,
+                                            signing_key=self.private_keys.get(nid), pubkeys=self.pubkeys,
+                                            mempool_kwargs=mempool_kwargs, gossip_kwargs=gossip_kwargs,
+                                            compact_blocks=compact_blocks, max_timestamp_drift_ms=drift)
+
+    def start(self) -> None:
+        for node in self.nodes.values():
+            node.controller.start_round(0)
+
+    def submit_tx(self, tx: Dict[str, Any], node_id: Optional[str] = None) -> int:
+        """
+        node_id: client gửi tx tới một node, node đó lan truyền qua TxGossip.
+        None: đưa thẳng vào mempool của mọi node (không qua network). Trả về số node nhận ngay.
+        """
+        if node_id is not None:
+            return int(self.nodes[node_id].gossip.submit(tx))
+        return sum(node.mempool.add(tx) for node in self.nodes.values())
+
+    def ledgers(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {nid: list(n.helper.ledger) for nid, n in self.nodes.items()}
+
+    def checkpoint(self) -> Dict[str, Any]:
+        return {
+            "network": self.network.checkpoint(),
+            "nodes": {nid: n.checkpoint() for nid, n in self.nodes.items()},
+        }
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        self.network.restore(snap["network"])
+        for nid, node_snap in snap["nodes"].items():
+            self.nodes[nid].restore(node_snap)
+
+
+def build_consensus_cluster(
+    num_nodes: int = 4,
+    seed: int = 0,
+    config: Optional[NetworkConfig] = None,
+    topology_file: Optional[str] = None,
+    link_profile_file: Optional[str] = None,
+    chain_id: str = "chain-demo",
+    auto_advance: bool = True,
+    network_cls: Type[NetworkSimulator] = NetworkSimulator,
+    network_kwargs: Optional[Dict[str, Any]] = None,
+    tracer: Optional[Tracer] = None,
+    voting_power: Optional[Dict[str, int]] = None,
+    proposer_mode: str = "weighted",
+    timeout_kwargs: Optional[Dict[str, Any]] = None,
+    pipelined: bool = False,
+    aggregation: bool = False,
+    signed_votes: bool = False,
+    mempool_kwargs: Optional[Dict[str, Any]] = None,
+    gossip_kwargs: Optional[Dict[str, Any]] = None,
+    compact_blocks: bool = False,
+) -> ConsensusCluster:
+    """
+    Dựng cụm num_nodes validator. Self-edge luôn được cho phép vì helper gửi cả cho chính nó.
+    network_cls cho phép thay simulator (vd. AsyncNetworkSimulator) với tham số bổ sung network_kwargs.
+    tracer (nếu có và chưa có clock) được gắn đồng hồ ảo của network.
+    voting_power: {node_id: power} (mặc định mỗi node 1); proposer_mode: "weighted" | "round_robin" | "reputation".
+    timeout_kwargs: tham số TimeoutPolicy cho mỗi node (vd. {"adaptive": True, "backoff": "exponential"}).
+    pipelined: proposer của h+1 đề xuất ngay khi lock block h (xem ConsensusController).
+    aggregation: phiếu gửi cho collector, collector phát QuorumCertificate (O(n) message mỗi phase).
+    signed_votes: mỗi validator ký phiếu bằng Ed25519 -> CommitCertificate mang chữ ký kiểm được.
+    mempool_kwargs: tham số Mempool của mỗi node (vd. {"block_max_txs": 2000}); proposer đóng gói từ pool.
+    gossip_kwargs: tham số TxGossip (vd. {"announce_interval_ms": 10, "mode": "flood"}).
+    compact_blocks: proposal gửi header + short id tx, người nhận dựng lại block từ mempool.
+    """
+    cfg = config or NetworkConfig(base_delay_ms=5, jitter_ms=0, drop_rate=0.0, duplicate_rate=0.0)
+    net = network_cls(seed=seed, config=cfg, **(network_kwargs or {}))
+    node_ids = [str(i) for i in range(num_nodes)]
+    if tracer is not None and tracer.clock is None:
+        tracer.clock = lambda: net.now_ms
+    cluster = ConsensusCluster(net, node_ids, chain_id=chain_id, auto_advance=auto_advance, tracer=tracer,
+                               voting_power=voting_power, proposer_mode=proposer_mode,
+                               timeout_kwargs=timeout_kwargs, pipelined=pipelined, aggregation=aggregation,
+                               signed_votes=signed_votes, mempool_kwargs=mempool_kwargs,
+                               gossip_kwargs=gossip_kwargs, compact_blocks=compact_blocks)
+
+    if topology_file:
+        net.load_topology_from_file(topology_file)
+    else:
+        net.load_topology([(a, b) for a in node_ids for b in node_ids if a != b])
+    net.allow_edges([(nid, nid) for nid in node_ids])
+    if link_profile_file:
+        net.load_link_profile_from_file(link_profile_file)
+    return cluster
@@ -1,5 +1,6 @@
 from typing import Dict, List, Any, Set, Optional
 
+from src.consensus.validator_set import ValidatorSet
 from src.network.simulator import NetworkSimulator, NetworkConfig
 
 
@@ -101,13 +102,14 @@ def run_consensus_smoke_simple(
     seed: int = 123,
     topology_file: Optional[str] = None,
     link_profile_file: Optional[str] = None,
+    voting_power: Optional[Dict[str, int]] = None,
 ) -> Dict[str, Any]:
     """
     Smoke test consensus flow qua NetworkSimulator (không dùng engine phức tạp):
     - Proposer broadcast proposal.
     - Tất cả node broadcast PREVOTE.
     - Sau đó tất cả node broadcast PRECOMMIT.
-    - Finalized nếu nhận >= 2/3+1 precommit.
+    - Finalized nếu precommit nhận được có tổng voting power >= 2/3+1 (voting_power mặc định 1/node).
     """
     cfg = NetworkConfig(
         base_delay_ms=5,
@@ -153,9 +155,9 @@ def run_consensus_smoke_simple(
         n.broadcast_vote("PRECOMMIT")
     net.run_until_idle()
 
-    threshold = (num_nodes * 2) // 3 + 1
+    validator_set = ValidatorSet(voting_power or node_ids)
     finalized = {
-        nid: (len(n.precommit_from) >= threshold)
+        nid: validator_set.has_quorum(n.precommit_from)
         for nid, n in nodes.items()
     }
     finalized_count = sum(1 for v in finalized.values() if v)
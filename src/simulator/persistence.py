@@ -0,0 +1,179 @@
+import io
+import json
+import mmap
+import os
+import pickle
+import struct
+import zlib
+from typing import Any, Dict, Optional
+
+from src.network.simulator import LogChunk
+
+# Lưu/khôi phục checkpoint mô phỏng xuống đĩa (snapshot từ NetworkSimulator.checkpoint()
+# hoặc ConsensusCluster.checkpoint()).
+#
+# Định dạng file:
+#   MAGIC (8 byte) | header: version u16, flags u16, payload_len u64, crc32 u32 | payload
+# payload là pickle protocol 5 của snapshot, tùy chọn nén zlib (flag bit 0).
+# Khi không nén, load_checkpoint unpickle thẳng từ vùng mmap, không copy cả file vào bộ nhớ.
+# Log sự kiện của simulator không được ghi vào checkpoint (file sẽ lớn dần theo độ dài run):
+# chỉ lưu vị trí log (số entry); log đầy đủ ghi riêng vào file JSON lines append-only
+# (PeriodicCheckpointer log_path). Simulator restore từ file bắt đầu với log rỗng trong bộ nhớ.
+
+MAGIC = b"LBCKPT\x00\x01"
+FORMAT_VERSION = 1
+FLAG_ZLIB = 0x1
+_HEADER = struct.Struct(">HHQI")
+
+
+class CheckpointFormatError(Exception):
+    pass
+
+
+class _SnapshotPickler(pickle.Pickler):
+    def persistent_id(self, obj: Any) -> Any:
+        # Log chia sẻ của simulator -> chỉ lưu vị trí
+        if isinstance(obj, LogChunk):
+            return ("log_position", len(obj))
+        return None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid: Any) -> Any:
+        kind, value = pid
+        if kind != "log_position":
+            raise pickle.UnpicklingError(f"unknown persistent id {kind!r}")
+        return value
+
+
+def save_checkpoint(path: str, snapshot: Dict[str, Any], compress: bool = False) -> int:
+    """
+    Ghi snapshot ra file một cách atomic (ghi file tạm rồi os.replace).
+    Trả về số byte đã ghi.
+    """
+    buf = io.BytesIO()
+    _SnapshotPickler(buf, protocol=5).dump(snapshot)
+    payload = buf.getvalue()
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 1)
+        flags |= FLAG_ZLIB
+    header = _HEADER.pack(FORMAT_VERSION, flags, len(payload), zlib.crc32(payload))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(header)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(MAGIC) + len(header) + len(payload)
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """
+    Đọc snapshot từ file qua mmap. Kiểm tra magic, version và CRC trước khi unpickle.
+    """
+    with open(path, "rb") as f:
+        # mmap không map được file rỗng (ValueError): kiểm tra độ dài header trước
+        if os.fstat(f.fileno()).st_size < len(MAGIC) + _HEADER.size:
+            raise CheckpointFormatError(f"truncated checkpoint: {path}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                if bytes(view[:len(MAGIC)]) != MAGIC:
+                    raise CheckpointFormatError(f"not a checkpoint file: {path}")
+                offset = len(MAGIC)
+                version, flags, length, crc = _HEADER.unpack_from(view, offset)
+                if version != FORMAT_VERSION:
+                    raise CheckpointFormatError(f"unsupported checkpoint version {version}")
+                offset += _HEADER.size
+                payload = view[offset:offset + length]
+                if len(payload) != length or zlib.crc32(payload) != crc:
+                    raise CheckpointFormatError(f"corrupted checkpoint: {path}")
+                if flags & FLAG_ZLIB:
+                    return _SnapshotUnpickler(io.BytesIO(zlib.decompress(payload))).load()
+                mm.seek(offset)
+                return _SnapshotUnpickler(mm).load()
+            finally:
+                # Giải phóng mọi view trước khi đóng mmap
+                payload = None
+                view.release()
+
+
+class PeriodicCheckpointer:
+    """
+    Chạy mô phỏng theo từng đoạn interval_ms (virtual time) và ghi checkpoint sau mỗi đoạn.
+    target là đối tượng có checkpoint()/restore() (ConsensusCluster hoặc NetworkSimulator);
+    network là NetworkSimulator điều khiển thời gian.
+    Chạy theo đoạn cho kết quả giống hệt một lần run_until liền mạch.
+    log_path: ghi mọi sự kiện log của network (cùng định dạng dump_logs) vào file append-only;
+    resume() cắt file về đúng vị trí log của checkpoint. Tạo checkpointer trước khi chạy
+    mô phỏng để file có đủ log từ đầu.
+    """
+
+    def __init__(self, target: Any, network: Any, path: str, interval_ms: float,
+                 compress: bool = False, log_path: Optional[str] = None):
+        if interval_ms <= 0:
+            raise ValueError("interval_ms must be positive")
+        self.target = target
+        self.network = network
+        self.path = path
+        self.interval_ms = interval_ms
+        self.compress = compress
+        self.log_path = log_path
+        self._log_file = None
+        self.checkpoints_written = 0
+        if log_path is not None:
+            network.add_event_listener(self._write_event)
+
+    def _write_event(self, entry: Dict[str, Any]) -> None:
+        if self._log_file is None:
+            self._log_file = open(self.log_path, "a", encoding="utf-8")
+        self._log_file.write(json.dumps(entry, sort_keys=True) + "\n")
+
+    def close(self) -> None:
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+    def run_until(self, time_ms: float) -> int:
+        delivered = 0
+        while self.network.now_ms < time_ms:
+            step_end = min(self.network.now_ms + self.interval_ms, time_ms)
+            delivered += self.network.run_until(step_end)
+            self.save()
+        return delivered
+
+    def save(self) -> int:
+        if self._log_file is not None:
+            # Log phải bền trên đĩa ít nhất tới vị trí checkpoint ghi lại
+            self._log_file.flush()
+            os.fsync(self._log_file.fileno())
+        size = save_checkpoint(self.path, self.target.checkpoint(), compress=self.compress)
+        self.checkpoints_written += 1
+        return size
+
+    def resume(self) -> Optional[float]:
+        """
+        Nếu file checkpoint tồn tại, restore target từ đó và trả về thời điểm virtual đã đạt.
+        Có log_path: bỏ phần log ghi sau checkpoint (run bị ngắt giữa hai lần save).
+        """
+        if not os.path.exists(self.path):
+            return None
+        self.target.restore(load_checkpoint(self.path))
+        if self.log_path is not None:
+            self.close()
+            self._truncate_log(self.network.log_position())
+        return self.network.now_ms
+
+    def _truncate_log(self, num_entries: int) -> None:
+        # Đọc tuần tự tới entry thứ num_entries: O(kích thước log), chỉ chạy một lần khi resume
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "r+b") as f:
+            for _ in range(num_entries):
+                if not f.readline():
+                    raise CheckpointFormatError(f"log file shorter than checkpoint: {self.log_path}")
+            f.truncate(f.tell())
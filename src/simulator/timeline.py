@@ -0,0 +1,143 @@
+import json
+from typing import Any, Dict, IO, Optional, Tuple, Union
+
+# Xuất timeline Chrome trace (mở bằng chrome://tracing hoặc ui.perfetto.dev) cho một ConsensusCluster.
+# - Mỗi node là một process/track; span PROPOSE/PREVOTE/PRECOMMIT theo chuyển bước của controller.
+# - Mũi tên flow cho mỗi message PROPOSAL/VOTE (send -> deliver, nối bằng msg_id).
+# - Instant event cho timeout và commit.
+# Sự kiện được ghi ngay khi phát sinh (streaming): bộ nhớ chỉ giữ span đang mở của mỗi node.
+
+_FLOW_TYPES = ("PROPOSAL", "VOTE")
+
+
+def _us(time_ms: float) -> float:
+    # Chrome trace dùng micro giây
+    return time_ms * 1000.0
+
+
+class ChromeTraceExporter:
+    """
+    exporter = ChromeTraceExporter("run.trace.json")
+    exporter.attach(cluster)
+    cluster.start(); cluster.network.run_until(...)
+    exporter.close()
+    """
+
+    def __init__(self, target: Union[str, IO[str]]):
+        if isinstance(target, str):
+            self._fh: IO[str] = open(target, "w", encoding="utf-8")
+            self._owns_fh = True
+        else:
+            self._fh = target
+            self._owns_fh = False
+        self._first = True
+        self._closed = False
+        self._network: Any = None
+        self._pids: Dict[str, int] = {}
+        # node_id -> (step, height, round, start_ms) của span đang mở
+        self._open_spans: Dict[str, Tuple[str, int, int, float]] = {}
+        self._last_send_type: Optional[str] = None
+        self.events_written = 0
+        self._fh.write("[\n")
+
+    # Gắn nguồn sự kiện ------------------------------------------------------------
+    def attach(self, cluster: Any) -> "ChromeTraceExporter":
+        self._network = cluster.network
+        for nid in cluster.node_ids:
+            self._pid(nid)
+        cluster.network.add_event_listener(self._on_network_event)
+        for node in cluster.nodes.values():
+            node.controller.add_listener(self._on_controller_event)
+        return self
+
+    def _now(self) -> float:
+        return self._network.now_ms if self._network is not None else 0.0
+
+    def _pid(self, node_id: str) -> int:
+        pid = self._pids.get(node_id)
+        if pid is None:
+            pid = self._pids[node_id] = len(self._pids) + 1
+            self._write({"ph": "M", "name": "process_name", "pid": pid, "tid": 0,
+                         "args": {"name": f"node {node_id}"}})
+            self._write({"ph": "M", "name": "process_sort_index", "pid": pid, "tid": 0,
+                         "args": {"sort_index": pid}})
+        return pid
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        if self._closed:
+            return
+        if not self._first:
+            self._fh.write(",\n")
+        self._first = False
+        self._fh.write(json.dumps(event, separators=(",", ":")))
+        self.events_written += 1
+
+    # Controller ---------------------------------------------------------------------
+    def _close_span(self, node_id: str, end_ms: float) -> None:
+        span = self._open_spans.pop(node_id, None)
+        if span is None:
+            return
+        step, height, round_num, start_ms = span
+        self._write({"ph": "X", "name": step, "cat": "step", "pid": self._pid(node_id), "tid": 1,
+                     "ts": _us(start_ms), "dur": _us(end_ms - start_ms),
+                     "args": {"height": height, "round": round_num}})
+
+    def _on_controller_event(self, event: str, info: Dict[str, Any]) -> None:
+        now = self._now()
+        node_id = info["node_id"]
+        if event == "step":
+            self._close_span(node_id, now)
+            if info["step"] is not None:
+                self._open_spans[node_id] = (info["step"], info["height"], info["round"], now)
+            return
+        args = {k: v for k, v in info.items() if k != "node_id"}
+        self._write({"ph": "i", "s": "t", "name": event, "cat": event, "pid": self._pid(node_id),
+                     "tid": 1, "ts": _us(now), "args": args})
+
+    # Network ------------------------------------------------------------------------
+    def _on_network_event(self, entry: Dict[str, Any]) -> None:
+        event = entry["event"]
+        details = entry["details"]
+        if event == "send":
+            payload = details["envelope"].get("payload") or {}
+            self._last_send_type = payload.get("type")
+            if self._last_send_type in _FLOW_TYPES:
+                self._flow("s", self._last_send_type, details["msg_id"], entry["from"], entry["time_ms"])
+        elif event == "duplicate":
+            # Log duplicate luôn đi ngay sau send của message gốc
+            if self._last_send_type in _FLOW_TYPES:
+                self._flow("s", self._last_send_type, details["dup_msg_id"], entry["from"], entry["time_ms"])
+        elif event == "deliver":
+            msg_id = details.get("msg_id")
+            payload = details["envelope"].get("payload") or {}
+            mtype = payload.get("type")
+            if msg_id is not None and mtype in _FLOW_TYPES:
+                self._flow("f", mtype, msg_id, entry["to"], entry["time_ms"])
+
+    def _flow(self, phase: str, mtype: str, msg_id: int, node_id: str, time_ms: float) -> None:
+        event = {"ph": phase, "name": mtype, "cat": "message", "id": msg_id,
+                 "pid": self._pid(node_id), "tid": 1, "ts": _us(time_ms)}
+        if phase == "f":
+            event["bp"] = "e"
+        self._write(event)
+
+    # Kết thúc -----------------------------------------------------------------------
+    def close(self) -> None:
+        """
+        Đóng các span đang mở tại thời điểm hiện tại và kết thúc mảng JSON.
+        """
+        if self._closed:
+            return
+        now = self._now()
+        for node_id in list(self._open_spans):
+            self._close_span(node_id, now)
+        self._fh.write("\n]\n")
+        self._closed = True
+        if self._owns_fh:
+            self._fh.close()
+
+    def __enter__(self) -> "ChromeTraceExporter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,120 @@
+"""
+Benchmark compact block relay: proposal mang cả dict tx (full) vs. header + short id (compact), trên các
+link profile có sẵn trong config/. Mempool mọi node được nạp trước cùng tập tx có ký; biến thể miss=5%:
+mỗi node thiếu ngẫu nhiên 5% tx -> người nhận phải xin tx thiếu (GETBLOCKTXN/BLOCKTXN).
+Không rơi gói (chưa có đồng bộ block); transmit_delay=True để block lớn tới nơi sau thời gian truyền size/bandwidth
+của chính nó. Đo tới khi node 0 commit đủ số height:
+- propagation: thời gian từ lúc proposer gửi proposal tới khi node khác có block đầy đủ (trung bình)
+- bytes/height: byte (ước lượng của simulator) của PROPOSAL + GETBLOCKTXN + BLOCKTXN đã giao
+- ms/height: thời gian ảo mỗi height
+
+Chạy:
+    python tests/e2e/compact_block_bench.py [heights] [block_max_txs]
+"""
+
+import os
+import random
+import sys
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from src.network.simulator import NetworkConfig
+from src.simulator.cluster import build_consensus_cluster
+from tests.e2e.tx_gossip_bench import ByteCountingNetwork, make_signed_txs
+
+SCENARIOS = {
+    "4nodes_sample": {
+        "num_nodes": 4,
+        "topology_file": os.path.join(ROOT, "config", "topology_sample.csv"),
+        "link_profile_file": os.path.join(ROOT, "config", "link_profile_sample.csv"),
+    },
+    "8nodes_uniform": {
+        "num_nodes": 8,
+        "topology_file": os.path.join(ROOT, "config", "topology_8nodes_fullmesh.csv"),
+        "link_profile_file": os.path.join(ROOT, "config", "link_profile_8nodes_uniform.csv"),
+    },
+}
+# (tên, compact_blocks, tỷ lệ tx mỗi node thiếu)
+MODES = [("full", False, 0.0), ("compact", True, 0.0), ("compact_miss5", True, 0.05)]
+PROPOSAL_TYPES = ("PROPOSAL", "GETBLOCKTXN", "BLOCKTXN")
+
+
+def run_mode(scenario: str, compact: bool, miss_rate: float, txs: List[Dict[str, Any]], heights: int,
+             block_max_txs: int, seed: int = 3) -> Dict[str, float]:
+    # Băng thông mặc định chỉ áp cho self-link (link profile đặt băng thông cho mọi link giữa node)
+    cfg = NetworkConfig(base_delay_ms=5, jitter_ms=2, drop_rate=0.0, duplicate_rate=0.0,
+                        link_bandwidth_bytes_per_ms=100_000, max_inflight_per_sender=1 << 20,
+                        max_inflight_per_link=1 << 20, auto_block_inflight_threshold=1 << 20,
+                        max_bytes_inflight_per_link=1 << 30, transmit_delay=True)
+    cluster = build_consensus_cluster(seed=seed, config=cfg, network_cls=ByteCountingNetwork,
+                                      compact_blocks=compact, mempool_kwargs={"block_max_txs": block_max_txs},
+                                      **SCENARIOS[scenario])
+    net = cluster.network
+    for a in cluster.node_ids:
+        for b in cluster.node_ids:
+            if a != b:
+                net.set_link_profile(a, b, drop_rate=0.0)
+    rng = random.Random(seed)
+    for node in cluster.nodes.values():
+        for tx in txs:
+            if rng.random() >= miss_rate:
+                node.mempool.add(tx)
+
+    sent_at: Dict[str, float] = {}
+    delays: List[float] = []
+    for nid, node in cluster.nodes.items():
+        helper = node.helper
+
+        def broadcast(height, round_num, block, _orig=helper.broadcast_proposal):
+            sent_at.setdefault(block.hash, net.now_ms)
+            _orig(height, round_num, block)
+        helper.broadcast_proposal = broadcast
+
+        def on_block(block, height, round_num, _orig=helper._on_proposal_block, _nid=nid, _seen=set()):
+            if block.hash not in _seen and block.proposer != _nid and block.hash in sent_at:
+                _seen.add(block.hash)
+                delays.append(net.now_ms - sent_at[block.hash])
+            _orig(block, height, round_num)
+        helper._on_proposal_block = on_block
+
+    ledger = cluster.nodes["0"].helper.ledger
+    cluster.start()
+    while len(ledger) < heights and net.now_ms < heights * 5_000:
+        net.run_until(net.now_ms + 50)
+
+    ledgers = cluster.ledgers()
+    common = min(len(lg) for lg in ledgers.values())
+    for h in range(common):
+        assert len({lg[h]["hash"] for lg in ledgers.values()}) == 1, f"fork at height {h + 1}"
+    done = len(ledger)
+    blocks = [cluster.nodes["0"].helper.block_store[e["hash"]] for e in ledger]
+    return {
+        "heights": done,
+        "txs_per_block": sum(len(b.txs) for b in blocks) / done,
+        "propagation": sum(delays) / len(delays),
+        "bytes_per_height": sum(net.delivered_bytes[t] for t in PROPOSAL_TYPES) / done,
+        "ms_per_height": net.now_ms / done,
+    }
+
+
+def main():
+    heights = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    block_max_txs = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    # Đủ tx cho mọi height (mỗi sender tối đa 20 nonce, trong max_per_sender của mempool)
+    num_senders = block_max_txs
+    txs = make_signed_txs(num_senders * (heights + 5), num_senders=num_senders)
+    for scenario in SCENARIOS:
+        base = None
+        for name, compact, miss_rate in MODES:
+            res = run_mode(scenario, compact, miss_rate, txs, heights, block_max_txs)
+            speedup = f" propagation_speedup={base / res['propagation']:.1f}x" if base else ""
+            print(f"[{scenario}/{name}] heights={res['heights']} txs/block={res['txs_per_block']:.0f} "
+                  f"propagation={res['propagation']:.1f}ms bytes/height={res['bytes_per_height']:.0f} "
+                  f"ms/height={res['ms_per_height']:.1f}{speedup}")
+            base = base or res["propagation"]
+
+
+if __name__ == "__main__":
+    main()
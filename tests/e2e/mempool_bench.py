@@ -0,0 +1,70 @@
+"""
+Benchmark Mempool: thêm N tx (nhiều sender, mỗi sender một chuỗi nonce), rồi lặp pack -> on_commit
+như proposer đóng gói từng block. In thời gian mỗi thao tác và kiểm tra mọi tx đều được commit đúng thứ tự nonce.
+Thêm một vòng tràn pool (max_txs nhỏ hơn N) để đo evict.
+
+Chạy:
+    python tests/e2e/mempool_bench.py [num_txs] [block_max_txs]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from src.mempool import Mempool, tx_hash
+
+
+def make_txs(num_txs: int, txs_per_sender: int = 8):
+    return [
+        {"sender": f"User{i // txs_per_sender}", "key": f"User{i // txs_per_sender}/k",
+         "value": i, "nonce": i % txs_per_sender + 1, "fee": (i * 7919) % 100}
+        for i in range(num_txs)
+    ]
+
+
+def main():
+    num_txs = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    block_max_txs = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    txs = make_txs(num_txs)
+    ids = [tx_hash(tx) for tx in txs]
+
+    pool = Mempool(max_txs=num_txs, block_max_txs=block_max_txs)
+    start = time.perf_counter()
+    for tx, tx_id in zip(txs, ids):
+        pool.add(tx, tx_id)
+    add_s = time.perf_counter() - start
+
+    pack_s = commit_s = 0.0
+    blocks = 0
+    last = {}
+    while len(pool):
+        start = time.perf_counter()
+        block = pool.pack()
+        pack_s += time.perf_counter() - start
+        start = time.perf_counter()
+        pool.on_commit(block)
+        commit_s += time.perf_counter() - start
+        for tx in block:
+            assert tx["nonce"] == last.get(tx["sender"], 0) + 1, "nonce gap"
+            last[tx["sender"]] = tx["nonce"]
+        blocks += 1
+    assert sum(last.values()) == num_txs
+
+    overflow = Mempool(max_txs=num_txs // 4)
+    start = time.perf_counter()
+    for tx, tx_id in zip(txs, ids):
+        overflow.add(tx, tx_id)
+    overflow_s = time.perf_counter() - start
+
+    print(f"[mempool] txs={num_txs} add={add_s / num_txs * 1e6:.2f}us/tx")
+    print(f"[mempool] blocks={blocks} pack={pack_s / blocks * 1e3:.2f}ms/block "
+          f"on_commit={commit_s / blocks * 1e3:.2f}ms/block ({block_max_txs} tx/block)")
+    print(f"[mempool] overflow max_txs={overflow.max_txs} add={overflow_s / num_txs * 1e6:.2f}us/tx "
+          f"evicted={overflow.evicted} kept={len(overflow)}")
+
+
+if __name__ == "__main__":
+    main()
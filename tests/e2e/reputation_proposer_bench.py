@@ -0,0 +1,99 @@
+"""
+Benchmark chọn proposer: lịch weighted round-robin cố định vs. reputation (hạ trọng số leader chậm/lỗi).
+8 node full-mesh với delay/jitter của link_profile_8nodes_uniform.csv (không rơi gói ngẫu nhiên).
+Kịch bản: node 7 chậm trên mọi link (14 ms, jitter 7 ms như link 7<->0), hoặc node 7 mất uplink
+(proposal hết hạn -> round change). Đo finality theo height tại node 0
+(thời gian giữa hai lần commit liên tiếp), gộp nhiều seed.
+
+Chạy:
+    python tests/e2e/reputation_proposer_bench.py [heights] [seeds]
+"""
+
+import os
+import sys
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from src.network.simulator import NetworkConfig
+from src.simulator.cluster import build_consensus_cluster
+
+SLOW_NODE = "7"
+# Kịch bản -> (profile link đi ra từ node 7, profile link đi vào node 7)
+SCENARIOS = {
+    # Leader chậm: delay/jitter như link 7<->0 trong profile
+    "slow": ({"base_delay_ms": 14, "jitter_ms": 7}, {"base_delay_ms": 14, "jitter_ms": 7}),
+    # Uplink của node 7 chết: vẫn nhận và commit theo cụm, nhưng proposal/vote của nó không tới ai
+    "mute": ({"drop_rate": 1.0}, {}),
+}
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def run_mode(mode: str, scenario: str, heights: int, seed: int) -> Dict[str, object]:
+    cfg = NetworkConfig(base_delay_ms=5, jitter_ms=2, drop_rate=0.0, duplicate_rate=0.0,
+                        link_bandwidth_bytes_per_ms=1000)
+    cluster = build_consensus_cluster(
+        num_nodes=8,
+        seed=seed,
+        config=cfg,
+        topology_file=os.path.join(ROOT, "config", "topology_8nodes_fullmesh.csv"),
+        link_profile_file=os.path.join(ROOT, "config", "link_profile_8nodes_uniform.csv"),
+        proposer_mode=mode,
+    )
+    net = cluster.network
+    # Không rơi gói ngẫu nhiên: chưa có đồng bộ block, node lỡ proposal mà cụm vẫn commit sẽ kẹt
+    # lại height cũ và che mất ảnh hưởng của việc chọn proposer
+    outbound, inbound = SCENARIOS[scenario]
+    for a in cluster.node_ids:
+        for b in cluster.node_ids:
+            if a != b:
+                net.set_link_profile(a, b, drop_rate=0.0)
+    for a in cluster.node_ids:
+        if a != SLOW_NODE:
+            net.set_link_profile(SLOW_NODE, a, **outbound)
+            net.set_link_profile(a, SLOW_NODE, **inbound)
+
+    commit_times: List[float] = []
+    controller = cluster.nodes["0"].controller
+    controller.add_listener(lambda event, info: commit_times.append(net.now_ms) if event == "commit" else None)
+    cluster.start()
+    # Chạy theo từng đoạn thời gian ảo tới khi node 0 commit đủ số height
+    while len(commit_times) < heights and net.now_ms < heights * 10_000:
+        net.run_until(net.now_ms + 1000)
+
+    ledger = cluster.nodes["0"].helper.ledger[:heights]
+    finality = [b - a for a, b in zip([0.0] + commit_times, commit_times)][:heights]
+    return {
+        "finality": finality,
+        "round_changes": sum(1 for e in ledger if e["round"] > 0),
+        "slow_proposals": sum(1 for e in ledger if e["proposer"] == SLOW_NODE),
+    }
+
+
+def main():
+    heights = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    seeds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for scenario in SCENARIOS:
+        for mode in ("weighted", "reputation"):
+            finality: List[float] = []
+            round_changes = slow = 0
+            for seed in range(seeds):
+                res = run_mode(mode, scenario, heights, seed)
+                finality.extend(res["finality"])
+                round_changes += res["round_changes"]
+                slow += res["slow_proposals"]
+            mean = sum(finality) / len(finality)
+            print(f"[{scenario}/{mode}] heights={len(finality)} mean={mean:.1f}ms "
+                  f"p50={_percentile(finality, 50):.1f}ms p95={_percentile(finality, 95):.1f}ms "
+                  f"p99={_percentile(finality, 99):.1f}ms max={max(finality):.1f}ms "
+                  f"round_changes={round_changes} blocks_by_node{SLOW_NODE}={slow}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ Chạy:
     python tests/e2e/run_full_simulation.py
 
 Mặc định:
-- 4 node, 3 block liên tiếp.
+- 4 node, 3 block liên tiếp; mỗi node có mempool nhận cùng một tập tx, proposer đóng gói block từ pool.
 - Proposer round-robin (node_id theo thứ tự).
 - Gửi proposal qua NetworkSimulator; vote PREVOTE/PRECOMMIT qua NetworkSimulator.
 - Khi đạt ngưỡng 2/3+1 PRECOMMIT, apply block vào ExecutionState.
@@ -22,8 +22,11 @@ from typing import Any, Dict, List, Set, Optional
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.insert(0, ROOT)
 
+from src.consensus.proposer import ProposerSchedule, ROUND_ROBIN
+from src.consensus.validator_set import ValidatorSet
 from src.network.simulator import NetworkSimulator, NetworkConfig
 from src.execution.execution import ExecutionState, Transaction, deterministic_encode
+from src.mempool import Mempool
 
 
 def hash_block(block: Dict[str, Any]) -> str:
@@ -32,22 +35,25 @@ def hash_block(block: Dict[str, Any]) -> str:
 
 
 class FullNode:
-    def __init__(self, node_id: str, peers: List[str], network: NetworkSimulator, chain_id: str):
+    def __init__(self, node_id: str, peers: List[str], network: NetworkSimulator, chain_id: str,
+                 validator_set: Optional[ValidatorSet] = None, block_max_txs: Optional[int] = None):
         self.node_id = node_id
         self.peers = peers
+        self.validator_set = validator_set or ValidatorSet(peers + [node_id])
         self.network = network
         self.chain_id = chain_id
         self.exec_state = ExecutionState(chain_id=chain_id)
+        self.mempool = Mempool(block_max_txs=block_max_txs)
         self.height = 1
-        # track votes: votes[height][phase] -> set of validators
+        # track votes: votes[height][phase] -> set of validators, vote_power[(height, phase)] -> tổng power
         self.votes: Dict[int, Dict[str, Set[str]]] = {}
+        self.vote_power: Dict[Any, int] = {}
         self.blocks: Dict[str, Dict[str, Any]] = {}  # block_hash -> block dict
 
         self.network.register_node(node_id, self.on_message)
 
     def _threshold(self) -> int:
-        total = len(self.peers) + 1
-        return (total * 2) // 3 + 1
+        return self.validator_set.quorum_power
 
     def broadcast_proposal(self, block: Dict[str, Any]):
         block_hash = block["hash"]
@@ -85,8 +91,12 @@ class FullNode:
             )
 
     def _add_vote(self, height: int, phase: str, voter: str, block_hash: str) -> int:
-        self.votes.setdefault(height, {}).setdefault(phase, set()).add(voter)
-        return len(self.votes[height][phase])
+        voters = self.votes.setdefault(height, {}).setdefault(phase, set())
+        key = (height, phase)
+        if voter not in voters:
+            voters.add(voter)
+            self.vote_power[key] = self.vote_power.get(key, 0) + self.validator_set.power_of(voter)
+        return self.vote_power.get(key, 0)
 
     def finalize_block(self, block_hash: str, block: Dict[str, Any]):
         # Apply txs to execution state (skip signature verify for demo)
@@ -102,6 +112,8 @@ class FullNode:
             )
             dummy_verify = lambda m, s, p: True
             self.exec_state.apply_transaction(tx_obj, verify_fn=dummy_verify, require_signature=False)
+        # Gỡ tx đã commit (và tx cùng nonce) khỏi pool
+        self.mempool.on_commit(txs)
         # Append ledger entry
         self.exec_state.ledger.append({
             "height": block["height"],
@@ -139,11 +151,19 @@ class FullNode:
                         self.finalize_block(block_hash, block)
 
 
-def build_block(height: int, parent_hash: str, proposer: str) -> Dict[str, Any]:
-    # deterministic tx set per height
-    txs = [
-        {"sender": f"User{height}", "key": f"User{height}/message", "value": f"hello-{height}", "meta": {"n": height}}
+def make_txs(num_users: int, txs_per_user: int) -> List[Dict[str, Any]]:
+    # Tập tx xác định: mỗi user một chuỗi nonce 1..txs_per_user, fee khác nhau để pack theo ưu tiên
+    return [
+        {"sender": f"User{u}", "key": f"User{u}/message", "value": f"hello-{u}-{n}", "nonce": n,
+         "fee": (u * 7 + n) % 10, "meta": {"n": n}}
+        for u in range(num_users)
+        for n in range(1, txs_per_user + 1)
     ]
+
+
+def build_block(height: int, parent_hash: str, proposer: str, mempool: Mempool) -> Dict[str, Any]:
+    # Proposer lấy tx từ mempool của chính nó (theo fee, giữ thứ tự nonce, trong ngân sách block)
+    txs = mempool.pack()
     header = {
         "height": height,
         "parent_hash": parent_hash,
@@ -161,6 +181,7 @@ def run_full_sim(
     seed: int = 2025,
     topology_file: Optional[str] = None,
     link_profile_file: Optional[str] = None,
+    txs_per_block: int = 8,
 ):
     cfg = NetworkConfig(
         base_delay_ms=5,
@@ -178,7 +199,11 @@ def run_full_sim(
     nodes: Dict[str, FullNode] = {}
     for nid in node_ids:
         peers = [p for p in node_ids if p != nid]
-        nodes[nid] = FullNode(nid, peers, net, chain_id="chain-demo")
+        nodes[nid] = FullNode(nid, peers, net, chain_id="chain-demo", block_max_txs=txs_per_block)
+    # Chưa có gossip tx: mọi node nhận cùng tập tx (đủ lấp num_blocks block)
+    for tx in make_txs(num_users=txs_per_block, txs_per_user=num_blocks):
+        for n in nodes.values():
+            n.mempool.add(tx)
 
     # Topology: nếu cung cấp file thì nạp; ngược lại full-mesh
     if topology_file:
@@ -189,11 +214,13 @@ def run_full_sim(
     if link_profile_file:
         net.load_link_profile_from_file(link_profile_file)
 
+    # Height 1 do node đầu tiên đề xuất: offset -1
+    schedule = ProposerSchedule(node_ids, mode=ROUND_ROBIN, offset=-1)
     parent_hash = "0" * 64
     blocks_for_height: Dict[int, Dict[str, Any]] = {}
     for h in range(1, num_blocks + 1):
-        proposer_id = node_ids[(h - 1) % num_nodes]
-        block = build_block(h, parent_hash, proposer_id)
+        proposer_id = schedule.proposer(h, 0)
+        block = build_block(h, parent_hash, proposer_id, nodes[proposer_id].mempool)
         blocks_for_height[h] = block
         nodes[proposer_id].broadcast_proposal(block)
         net.run_until_idle()
@@ -0,0 +1,124 @@
+"""
+Benchmark lan truyền tx: flood (gửi thân tx cho mọi peer) vs. inventory (INV hash -> GETDATA -> BODY).
+Client gửi tx có ký (Ed25519, như tx thật của state.apply_transaction) tới các node ngẫu nhiên theo nhịp đều;
+consensus không chạy, chỉ đo lớp gossip:
+- bytes: tổng byte (ước lượng của simulator) của message TX_* đã giao
+- dup: số tx nhận trùng (thân tx tới node đã có)
+- coverage: tỷ lệ (node, tx) có tx trong mempool khi mạng lặng
+- spread: thời gian trung bình từ lúc submit tới khi tx có ở mọi node (chỉ tính tx phủ hết)
+
+Chạy:
+    python tests/e2e/tx_gossip_bench.py [num_txs]
+"""
+
+import os
+import random
+import sys
+from collections import Counter
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from src.crypto.keys import generate_keypair
+from src.crypto.signing import sign_message
+from src.encoding.codec import encode_tx_for_signing
+from src.mempool import tx_hash
+from src.network.simulator import NetworkConfig, NetworkSimulator
+from src.simulator.cluster import build_consensus_cluster
+
+SCENARIOS = {
+    "4nodes_5ms": {"num_nodes": 4},
+    "8nodes_profile": {
+        "num_nodes": 8,
+        "topology_file": os.path.join(ROOT, "config", "topology_8nodes_fullmesh.csv"),
+        "link_profile_file": os.path.join(ROOT, "config", "link_profile_8nodes_uniform.csv"),
+    },
+    "16nodes_5ms": {"num_nodes": 16},
+}
+NUM_SENDERS = 200
+
+
+def make_signed_txs(num_txs: int, num_senders: int = NUM_SENDERS, chain_id: str = "chain-demo"):
+    keys = [generate_keypair()[0] for _ in range(num_senders)]
+    txs = []
+    for i in range(num_txs):
+        u = i % num_senders
+        tx = {"sender": f"User{u}", "key": f"User{u}/k", "value": i, "nonce": i // num_senders + 1}
+        tx["signature"] = sign_message(keys[u], encode_tx_for_signing(tx, chain_id)).hex()
+        txs.append(tx)
+    return txs
+
+
+class ByteCountingNetwork(NetworkSimulator):
+    """
+    NetworkSimulator đếm byte đã giao theo payload["type"].
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delivered_bytes: Counter = Counter()
+
+    def _deliver(self, receiver, msg, msg_id=None):
+        self.delivered_bytes[msg["payload"].get("type")] += self._estimate_size(msg)
+        super()._deliver(receiver, msg, msg_id)
+
+
+def run_mode(scenario: str, mode: str, txs: List[Dict[str, Any]], seed: int = 7) -> Dict[str, float]:
+    cfg = NetworkConfig(base_delay_ms=5, jitter_ms=2, drop_rate=0.0, duplicate_rate=0.0,
+                        link_bandwidth_bytes_per_ms=1000, max_inflight_per_sender=1 << 20,
+                        max_inflight_per_link=1 << 20, auto_block_inflight_threshold=1 << 20,
+                        max_bytes_inflight_per_link=1 << 30)
+    cluster = build_consensus_cluster(seed=seed, config=cfg, network_cls=ByteCountingNetwork,
+                                      gossip_kwargs={"mode": mode}, **SCENARIOS[scenario])
+    net = cluster.network
+    rng = random.Random(seed)
+    submitted_at: Dict[str, float] = {}
+    reached: Counter = Counter()
+    full_at: Dict[str, float] = {}
+
+    # Thời điểm tx có ở mọi node: bọc mempool.add của từng node
+    for node in cluster.nodes.values():
+        def add(tx, tx_id=None, _orig=node.mempool.add):
+            ok = _orig(tx, tx_id)
+            if ok:
+                tx_id = tx_id or tx_hash(tx)
+                reached[tx_id] += 1
+                if reached[tx_id] == len(cluster.nodes):
+                    full_at[tx_id] = net.now_ms
+            return ok
+        node.mempool.add = add
+
+    # 10 tx mỗi 5ms
+    for i, tx in enumerate(txs):
+        if i and i % 10 == 0:
+            net.run_until(net.now_ms + 5)
+        submitted_at[tx_hash(tx)] = net.now_ms
+        cluster.submit_tx(tx, node_id=rng.choice(cluster.node_ids))
+    net.run_until_idle()
+
+    n = len(cluster.nodes)
+    spreads = [full_at[tx_id] - t for tx_id, t in submitted_at.items() if tx_id in full_at]
+    return {
+        "bytes": sum(b for kind, b in net.delivered_bytes.items() if str(kind).startswith("TX_")),
+        "dup": sum(node.gossip.stats["duplicates"] for node in cluster.nodes.values()),
+        "coverage": sum(reached.values()) / (n * len(txs)),
+        "spread": sum(spreads) / len(spreads) if spreads else 0.0,
+    }
+
+
+def main():
+    num_txs = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    txs = make_signed_txs(num_txs)
+    for scenario in SCENARIOS:
+        base = None
+        for mode in ("flood", "inv"):
+            res = run_mode(scenario, mode, txs)
+            saving = f" bytes_saved={1 - res['bytes'] / base:.0%}" if base else ""
+            print(f"[{scenario}/{mode}] bytes={res['bytes']} dup={res['dup']} "
+                  f"coverage={res['coverage']:.3f} spread={res['spread']:.1f}ms{saving}")
+            base = base or res["bytes"]
+
+
+if __name__ == "__main__":
+    main()
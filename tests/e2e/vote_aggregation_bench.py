@@ -0,0 +1,77 @@
+"""
+Benchmark gom phiếu: broadcast mọi PREVOTE/PRECOMMIT cho mọi peer (O(n^2) message mỗi height)
+vs. aggregation (phiếu tới collector = proposer, collector phát một QuorumCertificate: O(n)).
+Không rơi gói, delay 5ms. Đếm message theo loại payload trên mỗi height đã commit và đo throughput.
+
+Chạy:
+    python tests/e2e/vote_aggregation_bench.py [heights] [sizes...]
+"""
+
+import os
+import sys
+from collections import Counter
+from typing import Dict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from src.network.simulator import NetworkConfig, NetworkSimulator
+from src.simulator.cluster import build_consensus_cluster
+
+
+class CountingNetwork(NetworkSimulator):
+    """
+    NetworkSimulator đếm số message gửi theo payload["type"].
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent: Counter = Counter()
+
+    def send_header(self, sender, receiver, header_id, height, payload):
+        self.sent[payload.get("type")] += 1
+        super().send_header(sender, receiver, header_id, height, payload)
+
+
+def run_mode(num_nodes: int, aggregation: bool, heights: int, seed: int = 0) -> Dict[str, float]:
+    cfg = NetworkConfig(base_delay_ms=5, jitter_ms=2, drop_rate=0.0, duplicate_rate=0.0,
+                        link_bandwidth_bytes_per_ms=1000, max_inflight_per_sender=1 << 20,
+                        max_inflight_per_link=1 << 20, auto_block_inflight_threshold=1 << 20)
+    cluster = build_consensus_cluster(num_nodes=num_nodes, seed=seed, config=cfg,
+                                      network_cls=CountingNetwork, aggregation=aggregation)
+    net = cluster.network
+    ledger = cluster.nodes["0"].helper.ledger
+    cluster.start()
+    while len(ledger) < heights and net.now_ms < heights * 10_000:
+        net.run_until(net.now_ms + 100)
+    ledgers = cluster.ledgers()
+    common = min(len(lg) for lg in ledgers.values())
+    for h in range(common):
+        assert len({lg[h]["hash"] for lg in ledgers.values()}) == 1, f"fork at height {h + 1}"
+    done = len(ledger)
+    return {
+        "heights": done,
+        "msgs_per_height": sum(net.sent.values()) / done,
+        "votes_per_height": net.sent["VOTE"] / done,
+        "qcs_per_height": net.sent["QC"] / done,
+        "ms_per_height": net.now_ms / done,
+    }
+
+
+def main():
+    heights = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    sizes = [int(x) for x in sys.argv[2:]] or [4, 16, 64]
+    for n in sizes:
+        base = None
+        for aggregation in (False, True):
+            res = run_mode(n, aggregation, heights)
+            mode = "aggregation" if aggregation else "broadcast"
+            ratio = f" reduction={base / res['msgs_per_height']:.1f}x" if base else ""
+            print(f"[n={n}/{mode}] heights={res['heights']} msgs/height={res['msgs_per_height']:.0f} "
+                  f"(votes={res['votes_per_height']:.0f} qc={res['qcs_per_height']:.0f}) "
+                  f"time/height={res['ms_per_height']:.1f}ms{ratio}")
+            base = base or res["msgs_per_height"]
+
+
+if __name__ == "__main__":
+    main()
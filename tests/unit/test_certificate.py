@@ -0,0 +1,222 @@
+import os
+import sys
+import unittest
+from dataclasses import replace
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.certificate import (
+    CertificateVerifier,
+    CommitCertificate,
+    QuorumCertificate,
+    precommit_sign_bytes,
+)
+from src.consensus.constants import ConsensusStep, NIL_BLOCK_HASH
+from src.consensus.validator_set import ValidatorSet
+from src.crypto.signing import sign_message
+from src.network.simulator import NetworkSimulator
+from src.simulator.cluster import build_consensus_cluster
+
+
+class _CountingNetwork(NetworkSimulator):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = {}
+
+    def send_header(self, sender, receiver, header_id, height, payload):
+        kind = payload.get("type")
+        self.sent[kind] = self.sent.get(kind, 0) + 1
+        super().send_header(sender, receiver, header_id, height, payload)
+
+
+class TestQuorumCertificate(unittest.TestCase):
+    def setUp(self):
+        self.vs = ValidatorSet({"A": 3, "B": 1, "C": 1, "D": 1})
+
+    def test_verify_uses_voting_power(self):
+        # quorum_power = 6*2//3+1 = 5
+        self.assertTrue(QuorumCertificate(1, 0, "PREVOTE", "x", 0b0111).verify(self.vs))
+        self.assertFalse(QuorumCertificate(1, 0, "PREVOTE", "x", 0b1110).verify(self.vs))
+        self.assertEqual(QuorumCertificate(1, 0, "PREVOTE", "x", 0b1011).voters(self.vs), ["A", "B", "D"])
+
+    def test_verify_rejects_unknown_bits(self):
+        self.assertFalse(QuorumCertificate(1, 0, "PREVOTE", "x", 0b10111).verify(self.vs))
+        self.assertFalse(QuorumCertificate(1, 0, "PREVOTE", "x", 0).verify(self.vs))
+
+    def test_wire_round_trip(self):
+        qc = QuorumCertificate(7, 2, "PRECOMMIT", NIL_BLOCK_HASH, (1 << 63) | 5, "A")
+        wire = qc.to_wire()
+        self.assertEqual(wire["type"], "QC")
+        self.assertEqual(QuorumCertificate.from_wire(wire), qc)
+
+
+class TestVoteAggregation(unittest.TestCase):
+    def _run(self, aggregation, num_nodes=8):
+        cluster = build_consensus_cluster(num_nodes=num_nodes, seed=2, network_cls=_CountingNetwork,
+                                          aggregation=aggregation)
+        cluster.start()
+        cluster.network.run_until(1_000)
+        return cluster
+
+    def test_aggregation_commits_same_chain_with_linear_votes(self):
+        broadcast = self._run(False)
+        aggregated = self._run(True)
+        ledgers = aggregated.ledgers()
+        chain = ledgers["0"]
+        self.assertGreater(len(chain), 10)
+        for ledger in ledgers.values():
+            n = min(len(ledger), len(chain))
+            self.assertEqual(ledger[:n], chain[:n])
+        votes_per_height = aggregated.network.sent["VOTE"] / len(chain)
+        # Mỗi node gửi 2 phiếu/height cho collector (thêm phiếu lẻ của height đang dở)
+        self.assertLess(votes_per_height, 2 * 8 + 2)
+        self.assertLess(aggregated.network.sent["VOTE"] + aggregated.network.sent["QC"],
+                        broadcast.network.sent["VOTE"] / 2)
+
+    def test_certificate_before_proposal_is_dispatched_when_block_arrives(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=0, aggregation=True)
+        proposer_id = cluster.nodes["0"].helper.get_proposer(1, 0)
+        node = cluster.nodes[next(nid for nid in cluster.node_ids if nid != proposer_id)]
+        node.controller.start_round(0)
+        proposer = cluster.nodes[proposer_id]
+        block = proposer.helper.create_proposal(1, 0)
+        all_bits = (1 << 4) - 1
+        node.helper.on_message({"payload": QuorumCertificate(1, 0, "PRECOMMIT", block.hash, all_bits,
+                                                             proposer_id).to_wire()})
+        self.assertEqual(node.helper.ledger, [])
+        node.helper.on_message({"payload": {"type": "PROPOSAL", "height": 1, "round": 0,
+                                            "block_hash": block.hash, "block": block.to_wire()}})
+        self.assertEqual([e["hash"] for e in node.helper.ledger], [block.hash])
+
+    def test_higher_round_certificate_skips_round(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=0, aggregation=True)
+        node = cluster.nodes["1"]
+        node.controller.start_round(0)
+        qc = QuorumCertificate(1, 2, "PREVOTE", NIL_BLOCK_HASH, 0b1110, node.helper.collector(1, 2))
+        node.helper.on_message({"payload": qc.to_wire()})
+        self.assertEqual(node.controller.current_round, 2)
+        # Quorum NIL prevote của round hiện tại đã được đệm: timeout PROPOSE -> replay -> PRECOMMIT
+        node.controller.on_timeout(ConsensusStep.PROPOSE)
+        self.assertEqual(node.controller.current_step, ConsensusStep.PRECOMMIT)
+
+    def test_invalid_certificate_ignored(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=0, aggregation=True)
+        node = cluster.nodes["1"]
+        node.controller.start_round(0)
+        node.helper.on_message({"payload": QuorumCertificate(1, 3, "PREVOTE", NIL_BLOCK_HASH, 0b0011).to_wire()})
+        self.assertEqual(node.controller.current_round, 0)
+        self.assertEqual(node.helper.certificates, {})
+
+    def test_certificate_from_wrong_aggregator_ignored(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=0, aggregation=True)
+        node = cluster.nodes["1"]
+        node.controller.start_round(0)
+        collector = node.helper.collector(1, 2)
+        other = next(nid for nid in cluster.node_ids if nid != collector)
+        node.helper.on_message({"payload": QuorumCertificate(1, 2, "PREVOTE", NIL_BLOCK_HASH, 0b1111,
+                                                             other).to_wire()})
+        self.assertEqual(node.controller.current_round, 0)
+        self.assertEqual(node.helper.certificates, {})
+
+    def test_signed_aggregation_verifies_every_phase(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=2, aggregation=True, signed_votes=True)
+        cluster.start()
+        cluster.network.run_until(400)
+        helper = cluster.nodes["1"].helper
+        self.assertGreater(len(helper.ledger), 5)
+        self.assertTrue(helper.verifier.verify_chain(helper.ledger, helper.commit_certificates))
+        # QC prevote/NIL mang chữ ký; chữ ký của round khác hoặc thiếu chữ ký đều bị bỏ
+        node = cluster.nodes["2"]
+        height = len(node.helper.ledger) + 1
+        round_num = node.controller.current_round + 2
+        collector = node.helper.collector(height, round_num)
+        sigs = [sign_message(cluster.private_keys[nid], node.helper._vote_sign_bytes(
+            height, round_num - 1, "PREVOTE", NIL_BLOCK_HASH, nid)).hex() for nid in cluster.node_ids]
+        for signatures in ((), tuple(sigs)):
+            node.helper.on_message({"payload": QuorumCertificate(height, round_num, "PREVOTE", NIL_BLOCK_HASH,
+                                                                 0b1111, collector, signatures).to_wire()})
+            self.assertNotIn((height, round_num, "PREVOTE", NIL_BLOCK_HASH), node.helper.certificates)
+        sigs = [sign_message(cluster.private_keys[nid], node.helper._vote_sign_bytes(
+            height, round_num, "PREVOTE", NIL_BLOCK_HASH, nid)).hex() for nid in cluster.node_ids]
+        node.helper.on_message({"payload": QuorumCertificate(height, round_num, "PREVOTE", NIL_BLOCK_HASH,
+                                                             0b1111, collector, tuple(sigs)).to_wire()})
+        self.assertIn((height, round_num, "PREVOTE", NIL_BLOCK_HASH), node.helper.certificates)
+
+
+class TestCommitCertificate(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cluster = build_consensus_cluster(num_nodes=4, seed=5, signed_votes=True)
+        cls.cluster.start()
+        cls.cluster.network.run_until(400)
+        cls.helper = cls.cluster.nodes["2"].helper
+        cls.verifier = CertificateVerifier(cls.cluster.validator_set, cls.cluster.pubkeys, "chain-demo")
+
+    def test_every_committed_height_has_signed_certificate(self):
+        ledger = self.helper.ledger
+        self.assertGreater(len(ledger), 5)
+        for entry in ledger:
+            cert = self.helper.commit_certificates[entry["height"]]
+            self.assertEqual(cert.block_hash, entry["hash"])
+            self.assertTrue(cert.signed)
+            self.assertEqual(len(cert.signatures), cert.bitmap.bit_count())
+        self.assertTrue(self.verifier.verify_chain(ledger, self.helper.commit_certificates))
+
+    def test_tampered_certificates_rejected(self):
+        ledger = self.helper.ledger
+        certs = dict(self.helper.commit_certificates)
+        cert = certs[2]
+        bad_sig = cert.signatures[0][:-1] + bytes([cert.signatures[0][-1] ^ 1])
+        self.assertFalse(self.verifier.verify(CommitCertificate(
+            cert.height, cert.round, cert.block_hash, cert.bitmap, (bad_sig,) + cert.signatures[1:])))
+        self.assertFalse(self.verifier.verify(CommitCertificate(
+            cert.height, cert.round, cert.block_hash, cert.bitmap, cert.signatures[1:])))
+        # Chữ ký đúng nhưng cho block khác
+        self.assertFalse(self.verifier.verify(CommitCertificate(
+            cert.height, cert.round, "f" * 64, cert.bitmap, cert.signatures)))
+        certs[3] = certs[4]
+        self.assertFalse(self.verifier.verify_chain(ledger, certs))
+        del certs[3]
+        self.assertFalse(self.verifier.verify_chain(ledger, certs))
+        # Round nằm trong sign-bytes: đổi round của chứng chỉ làm hỏng mọi chữ ký
+        self.assertTrue(self.verifier.verify(cert))
+        self.assertFalse(self.verifier.verify(replace(cert, round=7)))
+
+    def test_wire_round_trip_and_sign_bytes(self):
+        cert = self.helper.commit_certificates[1]
+        self.assertEqual(CommitCertificate.from_wire(cert.to_wire()), cert)
+        voter = cert.voters(self.cluster.validator_set)[0]
+        self.assertTrue(self.verifier.verify_signature(
+            voter, precommit_sign_bytes(1, cert.round, cert.block_hash, voter, "chain-demo"), cert.signatures[0]))
+
+    def test_unsigned_votes_give_bitmap_only_certificates(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=5)
+        cluster.start()
+        cluster.network.run_until(200)
+        helper = cluster.nodes["0"].helper
+        self.assertFalse(helper.commit_certificates[1].signed)
+        self.assertTrue(CertificateVerifier(cluster.validator_set).verify_chain(
+            helper.ledger, helper.commit_certificates))
+        self.assertFalse(self.verifier.verify_batch(helper.commit_certificates.values()))
+
+    def test_aggregated_certificates_carry_signatures(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=5, signed_votes=True, aggregation=True)
+        cluster.start()
+        cluster.network.run_until(400)
+        verifier = CertificateVerifier(cluster.validator_set, cluster.pubkeys, "chain-demo")
+        for node in cluster.nodes.values():
+            self.assertGreater(len(node.helper.ledger), 3)
+            self.assertTrue(verifier.verify_chain(node.helper.ledger, node.helper.commit_certificates))
+
+    def test_badly_signed_vote_dropped(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=0, signed_votes=True)
+        helper = cluster.nodes["0"].helper
+        cluster.nodes["0"].controller.start_round(0)
+        vote = {"type": "VOTE", "height": 1, "round": 0, "phase": "PREVOTE", "block_hash": NIL_BLOCK_HASH,
+                "from": "1", "signature": "00" * 64}
+        helper.on_message({"payload": vote})
+        self.assertFalse(helper.tally.has_voted(1, 0, "PREVOTE", "1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.simulator import NetworkConfig
+from src.simulator.cluster import build_consensus_cluster
+
+
+def _events(net):
+    return [(e["time_ms"], e["event"], e["from"], e["to"], e["height"]) for e in net.logs()]
+
+
+def _cluster():
+    cfg = NetworkConfig(base_delay_ms=5, jitter_ms=4, drop_rate=0.0, duplicate_rate=0.0)
+    return build_consensus_cluster(num_nodes=4, seed=11, config=cfg)
+
+
+class TestClusterCheckpoint(unittest.TestCase):
+    def test_restore_replays_identically(self):
+        cluster = _cluster()
+        cluster.start()
+        cluster.network.run_until(30)
+        snap = cluster.checkpoint()
+
+        cluster.network.run_until(120)
+        ledgers_a = cluster.ledgers()
+        logs_a = _events(cluster.network)
+        states_a = {nid: n.execution.compute_state_root() for nid, n in cluster.nodes.items()}
+
+        cluster.restore(snap)
+        self.assertEqual(cluster.network.now_ms, 30)
+        cluster.network.run_until(120)
+        self.assertEqual(cluster.ledgers(), ledgers_a)
+        self.assertEqual(_events(cluster.network), logs_a)
+        self.assertEqual({nid: n.execution.compute_state_root() for nid, n in cluster.nodes.items()}, states_a)
+        self.assertGreater(len(ledgers_a["0"]), 1)
+
+    def test_branches_diverge_from_shared_prefix(self):
+        cluster = _cluster()
+        cluster.start()
+        cluster.network.run_until(30)
+        snap = cluster.checkpoint()
+        prefix_len = len(snap["network"]["_logs"])
+
+        cluster.network.run_until(120)
+        baseline = _events(cluster.network)
+
+        cluster.restore(snap)
+        cluster.network.block_link("3", "0")
+        cluster.network.run_until(120)
+        branch = _events(cluster.network)
+
+        self.assertEqual(baseline[:prefix_len], branch[:prefix_len])
+        self.assertNotEqual(baseline, branch)
+        # Snapshot không bị nhánh làm bẩn
+        self.assertEqual(len(snap["network"]["_logs"]), prefix_len)
+        self.assertNotIn(("3", "0"), snap["network"]["_blocked_links"])
+
+    def test_snapshots_share_log_prefix(self):
+        cluster = _cluster()
+        cluster.start()
+        cluster.network.run_until(30)
+        first = cluster.network.checkpoint()["_logs"]
+        # Không có entry mới: snapshot sau dùng lại đúng đoạn log cũ
+        self.assertIs(cluster.network.checkpoint()["_logs"], first)
+        cluster.network.run_until(60)
+        second = cluster.network.checkpoint()["_logs"]
+        self.assertIs(second.parent, first)
+        self.assertEqual(list(second)[:len(first)], list(first))
+
+
+if __name__ == "__main__":
+    unittest.main()
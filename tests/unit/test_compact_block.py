@@ -0,0 +1,152 @@
+import os
+import sys
+import unittest
+from collections import Counter
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.compact import CompactBlock, short_id
+from src.consensus.types import Block
+from src.mempool import Mempool, tx_hash
+from src.network.simulator import NetworkConfig, NetworkSimulator
+from src.simulator.cluster import build_consensus_cluster
+
+
+class _CountingNetwork(NetworkSimulator):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = Counter()
+
+        # Số message đầu tiên của mỗi loại bị rơi (mô phỏng mất gói có chủ đích)
+        self.drop = Counter()
+        self.targets = []
+
+    def send_header(self, sender, receiver, header_id, height, payload):
+        self._send(super().send_header, sender, receiver, header_id, height, payload)
+
+    def send_body(self, sender, receiver, header_id, height, payload):
+        self._send(super().send_body, sender, receiver, header_id, height, payload)
+
+    def _send(self, send, sender, receiver, header_id, height, payload):
+        kind = payload.get("type")
+        self.sent[kind] += 1
+        if kind == "GETBLOCKTXN":
+            self.targets.append(receiver)
+        if self.drop[kind]:
+            self.drop[kind] -= 1
+            return
+        send(sender, receiver, header_id, height, payload)
+
+
+def _tx(i, nonce=1):
+    return {"sender": f"U{i}", "key": f"U{i}/k", "value": i, "nonce": nonce}
+
+
+def _cluster():
+    cfg = NetworkConfig(base_delay_ms=5, jitter_ms=1, drop_rate=0.0, duplicate_rate=0.0,
+                        link_bandwidth_bytes_per_ms=1000)
+    return build_consensus_cluster(num_nodes=4, seed=6, config=cfg, network_cls=_CountingNetwork,
+                                   compact_blocks=True, mempool_kwargs={"block_max_txs": 10})
+
+
+class TestCompactBlock(unittest.TestCase):
+    def setUp(self):
+        self.txs = [_tx(i) for i in range(5)]
+        self.block = Block(height=3, round=0, parent_hash="p" * 64, proposer="0", txs=self.txs, timestamp=1.0)
+
+    def test_rebuild_from_pool_and_wire_round_trip(self):
+        compact = CompactBlock.from_block(self.block)
+        self.assertEqual(CompactBlock.from_wire(compact.to_wire()), compact)
+        self.assertEqual(len(compact.short_ids[0]), 12)
+        pool = Mempool()
+        for tx in reversed(self.txs[1:]):
+            pool.add(tx)
+        txs, missing = compact.match(pool)
+        self.assertEqual(missing, [0])
+        txs[0] = self.txs[0]
+        self.assertEqual(compact.build(txs), self.block)
+
+    def test_short_ids_are_salted_and_wrong_txs_rejected(self):
+        tx_id = tx_hash(self.txs[0])
+        self.assertNotEqual(short_id("a" * 64, tx_id), short_id("b" * 64, tx_id))
+        compact = CompactBlock.from_block(self.block)
+        self.assertIsNone(compact.build(self.txs[::-1]))
+
+    def test_cluster_commits_compact_proposals_without_fetch(self):
+        cluster = _cluster()
+        for i in range(40):
+            cluster.submit_tx(_tx(i))
+        cluster.start()
+        cluster.network.run_until(500)
+        ledgers = cluster.ledgers()
+        helper = cluster.nodes["0"].helper
+        committed = [tx for e in helper.ledger for tx in helper.block_store[e["hash"]].txs]
+        self.assertEqual(len(committed), 40)
+        for ledger in ledgers.values():
+            n = min(len(ledger), len(helper.ledger))
+            self.assertEqual(ledger[:n], helper.ledger[:n])
+        self.assertEqual(cluster.network.sent["GETBLOCKTXN"], 0)
+
+    def test_missing_txs_fetched_from_proposer(self):
+        cluster = _cluster()
+        for i in range(40):
+            cluster.submit_tx(_tx(i))
+        # Node 2 thiếu một nửa tx: phải xin từ proposer
+        for i in range(0, 40, 2):
+            cluster.nodes["2"].mempool.remove(tx_hash(_tx(i)))
+        cluster.start()
+        cluster.network.run_until(500)
+        ledger = cluster.nodes["2"].helper.ledger
+        self.assertEqual(cluster.ledgers()["0"][:len(ledger)], ledger)
+        self.assertEqual(sum(len(cluster.nodes["2"].helper.block_store[e["hash"]].txs) for e in ledger), 40)
+        self.assertGreater(cluster.network.sent["BLOCKTXN"], 0)
+        self.assertEqual(cluster.network.sent["GETBLOCKTXN"], cluster.network.sent["BLOCKTXN"])
+
+    def test_mismatched_rebuild_requests_all_txs(self):
+        cluster = _cluster()
+        sender, receiver = cluster.nodes["0"], cluster.nodes["1"]
+        receiver.mempool.add(_tx(1))
+        block = Block(height=1, round=0, parent_hash="0" * 64, proposer="0", txs=[_tx(2)])
+        sender.helper.block_store[block.hash] = block
+        # Short id trỏ vào tx khác trong pool (như va chạm): hash không khớp -> xin toàn bộ
+        forged = CompactBlock(1, 0, block.parent_hash, "0", 0.0, block.hash, (short_id(block.hash, tx_hash(_tx(1))),))
+        cluster.network.send_header("0", "1", "proposal-forged", 1, {
+            "type": "PROPOSAL", "height": 1, "round": 0, "block_hash": block.hash, "compact": forged.to_wire()})
+        cluster.network.run_until_idle()
+        self.assertEqual(receiver.helper.block_store[block.hash], block)
+        self.assertEqual(cluster.network.sent["GETBLOCKTXN"], 1)
+
+    def test_dropped_block_txs_are_requested_again(self):
+        cluster = _cluster()
+        for i in range(40):
+            cluster.submit_tx(_tx(i))
+        for i in range(0, 40, 2):
+            cluster.nodes["2"].mempool.remove(tx_hash(_tx(i)))
+        cluster.network.drop["BLOCKTXN"] = 1
+        cluster.network.drop["GETBLOCKTXN"] = 1
+        cluster.start()
+        cluster.network.run_until(1_000)
+        ledger = cluster.nodes["2"].helper.ledger
+        self.assertEqual(sum(len(cluster.nodes["2"].helper.block_store[e["hash"]].txs) for e in ledger), 40)
+        self.assertEqual(cluster.network.sent["GETBLOCKTXN"], cluster.network.sent["BLOCKTXN"] + 1)
+        self.assertEqual(cluster.nodes["2"].helper._partial, {})
+
+    def test_repeated_proposal_requests_from_new_sender(self):
+        cluster = _cluster()
+        receiver = cluster.nodes["1"]
+        block = Block(height=1, round=0, parent_hash="0" * 64, proposer="0", txs=[_tx(2)])
+        for nid in ("0", "3"):
+            cluster.nodes[nid].helper.block_store[block.hash] = block
+        cluster.network.drop["GETBLOCKTXN"] = 1
+        compact = CompactBlock.from_block(block)
+        for sender, header_id in (("0", "proposal-0"), ("0", "proposal-0"), ("3", "proposal-3")):
+            cluster.network.send_header(sender, "1", header_id, 1, {
+                "type": "PROPOSAL", "height": 1, "round": 0, "block_hash": block.hash, "compact": compact.to_wire()})
+        cluster.network.run_until(50)
+        # Bản lặp từ cùng người gửi không xin lại; người gửi mới được xin ngay, trước timeout
+        self.assertEqual(cluster.network.targets, ["0", "3"])
+        self.assertEqual(receiver.helper.block_store[block.hash], block)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.tracing import (
+    ConsoleSink, JsonlSink, RingBufferSink, TraceLevel, Tracer, get_tracer, set_tracer,
+)
+from src.simulator.cluster import build_consensus_cluster
+
+
+class TestTracer(unittest.TestCase):
+    def test_level_filtering(self):
+        sink = RingBufferSink()
+        tracer = Tracer(sink, level=TraceLevel.INFO)
+        tracer.emit(TraceLevel.DEBUG, "noise", "A", 1, 0)
+        tracer.emit(TraceLevel.WARN, "timeout", "A", 1, 0, "PROPOSE", timeout_step="PROPOSE")
+        self.assertFalse(tracer.enabled(TraceLevel.DEBUG))
+        self.assertEqual([e.kind for e in sink.events()], ["timeout"])
+        self.assertEqual(sink.events()[0].to_dict()["timeout_step"], "PROPOSE")
+
+    def test_null_sink_disables_everything(self):
+        tracer = Tracer()
+        self.assertFalse(tracer.enabled(TraceLevel.WARN))
+        self.assertFalse(get_tracer().enabled(TraceLevel.WARN))
+
+    def test_ring_buffer_is_bounded(self):
+        sink = RingBufferSink(capacity=3)
+        tracer = Tracer(sink, level=TraceLevel.DEBUG)
+        for i in range(10):
+            tracer.emit(TraceLevel.INFO, "e", height=i)
+        self.assertEqual([e.height for e in sink.events()], [7, 8, 9])
+
+    def test_jsonl_and_console_sinks(self):
+        buf = io.StringIO()
+        tracer = Tracer(JsonlSink(buf), level=TraceLevel.DEBUG, clock=lambda: 12.5)
+        tracer.emit(TraceLevel.INFO, "lock", "B", 3, 1, "PREVOTE", block_hash="ab")
+        line = json.loads(buf.getvalue())
+        self.assertEqual(line, {"level": "INFO", "kind": "lock", "node": "B", "height": 3, "round": 1,
+                                "step": "PREVOTE", "time_ms": 12.5, "block_hash": "ab"})
+        out = io.StringIO()
+        Tracer(ConsoleSink(out)).emit(TraceLevel.INFO, "finalize", "B", 3, 1, block_hash="ab")
+        self.assertEqual(out.getvalue().strip(), "[B] finalize h=3 r=1 block_hash=ab")
+
+
+class TestConsensusTracing(unittest.TestCase):
+    def test_cluster_is_silent_by_default(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            cluster = build_consensus_cluster(num_nodes=4, seed=0)
+            cluster.start()
+            cluster.network.run_until(60)
+        self.assertEqual(out.getvalue(), "")
+        self.assertTrue(cluster.ledgers()["0"])
+
+    def test_cluster_events(self):
+        sink = RingBufferSink()
+        cluster = build_consensus_cluster(num_nodes=4, seed=0, tracer=Tracer(sink, level=TraceLevel.DEBUG))
+        cluster.start()
+        cluster.network.run_until(60)
+        finalized = sink.events("finalize")
+        self.assertEqual(len(finalized), sum(len(l) for l in cluster.ledgers().values()))
+        self.assertTrue(all(e.time_ms is not None and e.step == "PRECOMMIT" for e in finalized))
+        votes = sink.events("vote_received")
+        self.assertTrue(votes)
+        self.assertEqual(sink.events("round_start")[0].step, "PROPOSE")
+
+    def test_info_level_skips_vote_events(self):
+        sink = RingBufferSink()
+        cluster = build_consensus_cluster(num_nodes=4, seed=0, tracer=Tracer(sink, level=TraceLevel.INFO))
+        cluster.start()
+        cluster.network.run_until(60)
+        self.assertFalse(sink.events("vote_received"))
+        self.assertTrue(sink.events("lock"))
+
+    def test_set_default_tracer(self):
+        sink = RingBufferSink()
+        previous = set_tracer(Tracer(sink))
+        try:
+            cluster = build_consensus_cluster(num_nodes=4, seed=0)
+            cluster.start()
+        finally:
+            set_tracer(previous)
+        self.assertTrue(sink.events("propose"))
+
+
+if __name__ == "__main__":
+    unittest.main()
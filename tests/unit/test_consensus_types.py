@@ -0,0 +1,89 @@
+import dataclasses
+import hashlib
+import json
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.types import Block, Proposal, Vote
+from src.consensus.vote_proposal_handler import VoteProposalHandler
+from src.network.simulator import NetworkConfig
+from src.simulator.cluster import build_consensus_cluster
+
+
+def _block():
+    return Block(height=2, round=1, parent_hash="p" * 64, proposer="A",
+                 txs=[{"sender": "U", "key": "U/k", "value": "v"}])
+
+
+class TestBlock(unittest.TestCase):
+    def test_hash_matches_wire_content_hash(self):
+        block = _block()
+        content = {"height": 2, "round": 1, "parent_hash": "p" * 64, "proposer": "A", "timestamp": 0.0,
+                   "txs": [{"sender": "U", "key": "U/k", "value": "v"}]}
+        expected = hashlib.sha256(json.dumps(content, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+        self.assertEqual(block.hash, expected)
+        self.assertTrue(block.verify_hash())
+        self.assertIsInstance(block.txs, tuple)
+
+    def test_immutable_and_slotted(self):
+        block = _block()
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            block.height = 3
+        self.assertFalse(hasattr(block, "__dict__"))
+        self.assertFalse(hasattr(Vote(1, 0, "h", "PREVOTE", "A"), "__dict__"))
+
+    def test_wire_roundtrip_is_cached(self):
+        block = _block()
+        wire = block.to_wire()
+        self.assertIs(block.to_wire(), wire)
+        # JSON qua network rồi dựng lại: cùng block, dict wire được dùng lại
+        decoded = json.loads(json.dumps(wire))
+        again = Block.from_wire(decoded)
+        self.assertEqual(again, block)
+        self.assertEqual(hash(again), hash(block))
+        self.assertIs(again.to_wire(), decoded)
+        self.assertEqual(pickle.loads(pickle.dumps(block)), block)
+
+    def test_from_wire_trusts_given_hash(self):
+        forged = Block.from_wire(dict(_block().to_wire()), block_hash="f" * 64)
+        self.assertFalse(forged.verify_hash())
+
+
+class TestMessages(unittest.TestCase):
+    def test_helper_drops_proposal_with_forged_hash(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=1, config=NetworkConfig(
+            base_delay_ms=1, jitter_ms=0, drop_rate=0.0, duplicate_rate=0.0))
+        block = Block(height=1, round=0, parent_hash="0" * 64, proposer="0")
+        forged = dict(block.to_wire(), txs=[{"sender": "X", "key": "X/k", "value": "stolen"}])
+        for block_hash, wire in (("f" * 64, block.to_wire()), (block.hash, forged)):
+            cluster.network.send_header("0", "1", f"p-{block_hash[:4]}-{len(wire['txs'])}", 1, Proposal(
+                1, 0, block_hash, "0").to_wire() | {"block": wire})
+        cluster.network.run_until_idle()
+        self.assertEqual(cluster.nodes["1"].helper.block_store, {})
+
+    def test_vote_and_proposal_wire(self):
+        vote = Vote(height=3, round=1, block_id="h", vote_type="PRECOMMIT", validator="B", chain_id="c")
+        payload = vote.to_wire()
+        self.assertEqual(payload, {"type": "VOTE", "height": 3, "round": 1, "block_hash": "h",
+                                   "phase": "PRECOMMIT", "from": "B"})
+        self.assertEqual(Vote.from_wire(payload, chain_id="c"), vote)
+
+        block = _block()
+        wire = Proposal(2, 1, block.hash, "A").to_wire(block)
+        self.assertIs(wire["block"], block.to_wire())
+        self.assertEqual(Proposal.from_wire(wire), Proposal(2, 1, block.hash, "A"))
+
+    def test_vote_proposal_handler_uses_shared_types(self):
+        handler = VoteProposalHandler("chain", ["A", "B", "C"])
+        block = handler.create_proposal(1, 0)
+        self.assertIs(handler.get_block_by_hash(block.hash), block)
+        self.assertEqual(handler.block_store.get_last_block_hash(), block.hash)
+        self.assertEqual(handler.create_proposal(2, 0).parent_hash, block.hash)
+
+
+if __name__ == "__main__":
+    unittest.main()
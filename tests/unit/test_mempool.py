@@ -0,0 +1,152 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.mempool import Mempool, tx_hash
+from src.network.simulator import NetworkConfig
+from src.simulator.cluster import build_consensus_cluster
+
+
+def _tx(sender, nonce, fee=0, value="v"):
+    return {"sender": sender, "key": f"{sender}/k{nonce}", "value": value, "nonce": nonce, "fee": fee}
+
+
+class TestMempool(unittest.TestCase):
+    def test_dedup_and_nonce_rules(self):
+        pool = Mempool(nonces={"A": 2}, max_per_sender=4)
+        self.assertTrue(pool.add(_tx("A", 3)))
+        self.assertFalse(pool.add(_tx("A", 3)))           # trùng hash
+        self.assertFalse(pool.add(_tx("A", 2)))           # nonce đã commit
+        self.assertFalse(pool.add(_tx("A", 7)))           # quá xa phía trước
+        self.assertFalse(pool.add({"sender": "A", "key": "B/x", "value": 1, "nonce": 4}))  # ownership
+        self.assertFalse(pool.add({"sender": "A", "key": "A/x", "value": 1}))              # thiếu nonce
+        self.assertIn(tx_hash(_tx("A", 3)), pool)
+        self.assertEqual(len(pool), 1)
+
+    def test_same_nonce_replaced_only_by_higher_fee(self):
+        pool = Mempool()
+        self.assertTrue(pool.add(_tx("A", 1, fee=5, value="a")))
+        self.assertFalse(pool.add(_tx("A", 1, fee=5, value="b")))
+        self.assertTrue(pool.add(_tx("A", 1, fee=6, value="c")))
+        self.assertEqual([tx["value"] for tx in pool.pack()], ["c"])
+
+    def test_replacement_in_full_pool_keeps_old_tx_on_failure(self):
+        pool = Mempool(max_txs=2)
+        pool.add(_tx("A", 1, fee=5, value="a"))
+        pool.add(_tx("B", 1, fee=9))
+        # Pool đầy theo số tx: thay thế dùng lại chỗ của tx cũ, không evict B
+        self.assertTrue(pool.add(_tx("A", 1, fee=6, value="b")))
+        self.assertEqual(pool.evicted, 0)
+        self.assertEqual(sorted(tx["value"] for tx in pool.pack()), ["b", "v"])
+        small = pool.size_bytes
+        pool = Mempool(max_bytes=small)
+        pool.add(_tx("A", 1, fee=5, value="b"))
+        pool.add(_tx("B", 1, fee=9))
+        # Tx thay thế lớn hơn phải evict B (fee cao hơn) -> thất bại, tx cũ vẫn còn
+        self.assertFalse(pool.add(_tx("A", 1, fee=6, value="x" * 40)))
+        self.assertIn(tx_hash(_tx("A", 1, fee=5, value="b")), pool)
+        self.assertEqual((len(pool), pool.size_bytes), (2, small))
+
+    def test_pack_orders_by_fee_but_keeps_nonce_order(self):
+        pool = Mempool()
+        pool.add(_tx("A", 2, fee=100))
+        pool.add(_tx("A", 1, fee=1))
+        pool.add(_tx("B", 1, fee=50))
+        pool.add(_tx("C", 2, fee=999))  # thiếu nonce 1 -> chưa sẵn sàng
+        packed = [(tx["sender"], tx["nonce"]) for tx in pool.pack()]
+        self.assertEqual(packed, [("B", 1), ("A", 1), ("A", 2)])
+        self.assertEqual(len(pool.pack(max_txs=2)), 2)
+        # Pack không gỡ tx khỏi pool
+        self.assertEqual(len(pool), 4)
+
+    def test_pack_respects_byte_budget(self):
+        pool = Mempool()
+        for i in range(10):
+            pool.add(_tx(f"U{i}", 1, value="x" * 50))
+        size = pool.size_bytes // 10
+        self.assertEqual(len(pool.pack(max_bytes=size * 3)), 3)
+        pool.add(_tx("Big", 1, fee=10, value="y" * 500))
+        # Tx lớn không vừa thì bị bỏ qua, tx nhỏ hơn vẫn được lấp vào
+        packed = pool.pack(max_bytes=size * 3)
+        self.assertEqual(len(packed), 3)
+        self.assertNotIn("Big", {tx["sender"] for tx in packed})
+
+    def test_pack_skips_pending_parent_txs(self):
+        pool = Mempool()
+        for n in (1, 2, 3):
+            pool.add(_tx("A", n))
+        parent = pool.pack(max_txs=2)
+        self.assertEqual([tx["nonce"] for tx in pool.pack(pending=parent)], [3])
+
+    def test_eviction_drops_weakest_and_its_tail(self):
+        pool = Mempool(max_txs=3)
+        pool.add(_tx("A", 1, fee=1))
+        pool.add(_tx("A", 2, fee=9))
+        pool.add(_tx("B", 1, fee=5))
+        self.assertFalse(pool.add(_tx("C", 1, fee=1)))    # không hơn tx yếu nhất
+        self.assertTrue(pool.add(_tx("C", 1, fee=2)))
+        # A/1 bị evict -> A/2 không còn áp được, cũng bị bỏ
+        self.assertEqual(sorted(tx["sender"] for tx in pool.pack()), ["B", "C"])
+        self.assertEqual(pool.evicted, 2)
+        self.assertEqual(len(pool), 2)
+
+    def test_on_commit_revalidates_touched_senders(self):
+        state_nonces = {}
+        pool = Mempool(nonces=state_nonces)
+        pool.add(_tx("A", 1, value="a1"))
+        pool.add(_tx("A", 2))
+        pool.add(_tx("B", 1))
+        # Block chứa tx khác cùng nonce (vd. của node khác): tx xung đột trong pool cũng bị gỡ
+        removed = pool.on_commit([_tx("A", 1, value="other")])
+        self.assertEqual(removed, 1)
+        self.assertEqual(state_nonces, {"A": 1})
+        self.assertEqual([(tx["sender"], tx["nonce"]) for tx in pool.pack()], [("A", 2), ("B", 1)])
+        self.assertFalse(pool.add(_tx("A", 1)))
+
+    def test_checkpoint_restore(self):
+        pool = Mempool()
+        pool.add(_tx("A", 1))
+        snap = pool.checkpoint()
+        pool.add(_tx("A", 2))
+        pool.on_commit([_tx("A", 1)])
+        pool.restore(snap)
+        self.assertEqual(len(pool), 1)
+        self.assertEqual(pool.nonces, {})
+        self.assertEqual([tx["nonce"] for tx in pool.pack()], [1])
+
+
+class TestMempoolCluster(unittest.TestCase):
+    def test_proposers_pack_thousands_of_txs(self):
+        cfg = NetworkConfig(base_delay_ms=5, jitter_ms=0, drop_rate=0.0, duplicate_rate=0.0,
+                            link_bandwidth_bytes_per_ms=100_000, max_bytes_inflight_per_link=10_000_000)
+        cluster = build_consensus_cluster(num_nodes=4, seed=3, config=cfg, pipelined=True,
+                                          mempool_kwargs={"block_max_txs": 1_000})
+        for user in range(300):
+            for nonce in range(1, 9):
+                self.assertEqual(cluster.submit_tx(_tx(f"User{user}", nonce)), 4)
+        total = 300 * 8
+        cluster.start()
+        net = cluster.network
+        while any(len(node.mempool) for node in cluster.nodes.values()) and net.now_ms < 2_000:
+            net.run_until(net.now_ms + 50)
+        ledgers = cluster.ledgers()
+        helper = cluster.nodes["0"].helper
+        committed = [helper.block_store[e["hash"]] for e in helper.ledger]
+        self.assertEqual(sum(len(b.txs) for b in committed), total)
+        self.assertEqual(max(len(b.txs) for b in committed), 1_000)
+        # Nonce của mỗi sender liên tục 1..8 theo thứ tự commit
+        seen = {}
+        for block in committed:
+            for tx in block.txs:
+                self.assertEqual(tx["nonce"], seen.get(tx["sender"], 0) + 1)
+                seen[tx["sender"]] = tx["nonce"]
+        for nid, node in cluster.nodes.items():
+            n = min(len(ledgers[nid]), len(helper.ledger))
+            self.assertEqual(ledgers[nid][:n], helper.ledger[:n])
+            self.assertEqual(len(node.mempool), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.constants import ConsensusStep, NIL_BLOCK_HASH
+from src.consensus.controller import ConsensusController
+from src.consensus.message_buffer import MessageBuffer
+from src.consensus.types import Block
+from src.consensus.vote_tally import VoteTally
+from src.consensus.validator_set import ValidatorSet
+from src.simulator.cluster import build_consensus_cluster
+
+
+class _RecordingHelper:
+    """
+    Helper tối giản: proposer cố định là "P", ghi lại vote/commit của controller.
+    """
+
+    def __init__(self):
+        self.blocks = {}
+        self.votes = []
+        self.committed = []
+
+    def add_block(self, height, round_num=0):
+        block = Block(height=height, round=round_num, parent_hash="0" * 64, proposer="P")
+        self.blocks[block.hash] = block
+        return block
+
+    def get_proposer(self, height, round_num):
+        return "P"
+
+    def schedule_timeout(self, timeout_sec, step):
+        pass
+
+    def broadcast_vote(self, height, round, vote_type, block_hash):
+        self.votes.append((height, round, vote_type.value, block_hash))
+
+    def broadcast_proposal(self, height, round_num, block):
+        pass
+
+    def get_block_by_hash(self, block_hash):
+        return self.blocks.get(block_hash)
+
+    def commit_block(self, block):
+        self.committed.append(block.height)
+
+
+class TestMessageBuffer(unittest.TestCase):
+    def test_take_only_requested_kind(self):
+        buf = MessageBuffer()
+        buf.add(2, 0, "proposal", "a")
+        buf.add(2, 0, "prevote", "h")
+        buf.add(2, 0, "prevote", "h")
+        self.assertEqual(len(buf), 2)
+        self.assertEqual(buf.take(2, 0, "prevote"), ["h"])
+        self.assertEqual(buf.take(2, 0, "prevote"), [])
+        self.assertEqual(buf.take(2, 0, "proposal"), ["a"])
+        self.assertEqual(len(buf), 0)
+
+    def test_bounds(self):
+        buf = MessageBuffer(max_heights_ahead=1, max_rounds_ahead=2, max_per_key=2)
+        self.assertTrue(buf.within_horizon(5, 1, 5, 3))
+        self.assertFalse(buf.within_horizon(5, 1, 5, 4))
+        self.assertTrue(buf.within_horizon(5, 1, 6, 0))
+        self.assertFalse(buf.within_horizon(5, 1, 7, 0))
+        self.assertTrue(buf.within_horizon(5, 1, 4, 9))
+        self.assertTrue(buf.add(6, 0, "prevote", "a"))
+        self.assertTrue(buf.add(6, 0, "prevote", "b"))
+        self.assertFalse(buf.add(6, 0, "prevote", "c"))
+        self.assertEqual(buf.dropped, 1)
+
+    def test_prune_and_checkpoint(self):
+        buf = MessageBuffer()
+        buf.add(1, 3, "proposal", "old")
+        buf.add(2, 0, "proposal", "new")
+        snap = buf.checkpoint()
+        buf.prune(2, 0)
+        self.assertEqual(len(buf), 1)
+        buf.restore(snap)
+        self.assertEqual(buf.take(1, 3, "proposal"), ["old"])
+
+    def test_round_power_counts_each_validator_once(self):
+        tally = VoteTally(ValidatorSet({"A": 3, "B": 1, "C": 1}))
+        tally.add(1, 2, "PREVOTE", "x", "A")
+        tally.add(1, 2, "PRECOMMIT", "x", "A")
+        tally.add(1, 2, "PREVOTE", NIL_BLOCK_HASH, "B")
+        self.assertEqual(tally.round_power(1, 2), 4)
+        self.assertEqual(tally.round_power(1, 1), 0)
+
+
+class TestControllerBuffering(unittest.TestCase):
+    def setUp(self):
+        self.helper = _RecordingHelper()
+        self.ctrl = ConsensusController("V", self.helper, auto_advance=False)
+
+    def test_future_round_proposal_replayed_on_round_start(self):
+        self.ctrl.start_round(0)
+        block = self.helper.add_block(1, 1)
+        self.ctrl.on_proposal_received(block, 1, 1)
+        self.assertEqual(self.ctrl.current_step, ConsensusStep.PROPOSE)
+        self.assertEqual(self.helper.votes, [])
+        self.ctrl.start_round(1)
+        self.assertEqual(self.ctrl.current_step, ConsensusStep.PREVOTE)
+        self.assertEqual(self.helper.votes, [(1, 1, "PREVOTE", block.hash)])
+
+    def test_early_prevote_quorum_replayed_after_proposal(self):
+        self.ctrl.start_round(0)
+        block = self.helper.add_block(1)
+        self.ctrl.on_majority_prevote(block.hash, 1, 0)
+        self.assertEqual(self.ctrl.current_step, ConsensusStep.PROPOSE)
+        self.ctrl.on_proposal_received(block, 1, 0)
+        self.assertEqual(self.ctrl.current_step, ConsensusStep.PRECOMMIT)
+        self.assertIs(self.ctrl.locked_block, block)
+        self.assertEqual(self.helper.votes[-1], (1, 0, "PRECOMMIT", block.hash))
+
+    def test_next_height_proposal_kept_until_commit(self):
+        self.ctrl.auto_advance = True
+        self.ctrl.start_round(0)
+        block1 = self.helper.add_block(1)
+        block2 = self.helper.add_block(2)
+        self.ctrl.on_proposal_received(block2, 2, 0)
+        self.ctrl.on_proposal_received(block1, 1, 0)
+        self.ctrl.on_majority_prevote(block1.hash, 1, 0)
+        self.ctrl.on_majority_precommit(block1.hash, 1, 0)
+        self.assertEqual(self.helper.committed, [1])
+        # Vào height 2: proposal đã đệm được prevote ngay
+        self.assertEqual(self.ctrl.current_step, ConsensusStep.PREVOTE)
+        self.assertEqual(self.helper.votes[-1], (2, 0, "PREVOTE", block2.hash))
+
+    def test_precommit_quorum_commits_from_any_step(self):
+        self.ctrl.start_round(0)
+        self.ctrl.start_round(2)
+        block = self.helper.add_block(1, 1)
+        self.ctrl.on_majority_precommit(block.hash, 1, 1)
+        self.assertEqual(self.helper.committed, [1])
+        self.assertEqual(self.ctrl.current_height, 2)
+
+    def test_nil_precommit_quorum_waits_for_precommit_step(self):
+        self.ctrl.start_round(0)
+        self.ctrl.on_majority_precommit(NIL_BLOCK_HASH, 1, 0)
+        self.assertEqual(self.ctrl.current_round, 0)
+        self.ctrl.on_timeout(ConsensusStep.PROPOSE)
+        self.ctrl.on_timeout(ConsensusStep.PREVOTE)
+        self.assertEqual(self.ctrl.current_round, 1)
+
+    def test_round_evidence_skips_ahead(self):
+        self.ctrl.start_round(0)
+        self.ctrl.on_round_evidence(1, 3)
+        self.assertEqual((self.ctrl.current_round, self.ctrl.current_step), (3, ConsensusStep.PROPOSE))
+        self.ctrl.on_round_evidence(1, 2)
+        self.ctrl.on_round_evidence(2, 5)
+        self.assertEqual(self.ctrl.current_round, 3)
+
+
+class TestHelperRoundSkip(unittest.TestCase):
+    def _vote(self, voter, round_num, height=1, phase="PREVOTE"):
+        return {"payload": {"type": "VOTE", "height": height, "round": round_num, "phase": phase,
+                            "block_hash": NIL_BLOCK_HASH, "from": voter}}
+
+    def test_f_plus_one_higher_round_votes_trigger_skip(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=0)
+        node = cluster.nodes["0"]
+        node.controller.start_round(0)
+        node.helper.on_message(self._vote("1", 2))
+        self.assertEqual(node.controller.current_round, 0)
+        # Cùng validator ở phase khác không được tính hai lần
+        node.helper.on_message(self._vote("1", 2, phase="PRECOMMIT"))
+        self.assertEqual(node.controller.current_round, 0)
+        node.helper.on_message(self._vote("2", 2))
+        self.assertEqual(node.controller.current_round, 2)
+
+    def test_votes_beyond_horizon_are_dropped(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=0)
+        node = cluster.nodes["0"]
+        node.controller.start_round(0)
+        node.helper.on_message(self._vote("1", 0, height=10))
+        self.assertFalse(node.helper.tally.has_voted(10, 0, "PREVOTE", "1"))
+        node.helper.on_message(self._vote("1", 0, height=2))
+        self.assertTrue(node.helper.tally.has_voted(2, 0, "PREVOTE", "1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
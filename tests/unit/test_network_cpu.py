@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.simulator import CpuCostModel, NetworkConfig, NetworkSimulator
+from src.simulator.cluster import build_consensus_cluster
+
+
+def _vote(sender, receiver):
+    return {"type": "HEADER", "from": sender, "to": receiver, "payload": {"type": "VOTE"}}
+
+
+class TestCpuModel(unittest.TestCase):
+    def setUp(self):
+        cfg = NetworkConfig(base_delay_ms=5, jitter_ms=0, drop_rate=0.0, duplicate_rate=0.0)
+        self.net = NetworkSimulator(seed=0, config=cfg)
+        self.handled = []
+        self.net.register_node("A", lambda m: None)
+        self.net.register_node("B", self._on_b)
+        self.net.register_node("C", lambda m: self.handled.append(("C", m["header_id"], self.net.now_ms)))
+
+    def _on_b(self, msg):
+        self.handled.append(("B", msg["header_id"], self.net.now_ms))
+        # Trả lời trong handler: gói gửi đi mang thời điểm xử lý xong
+        self.net.send_header("B", "C", header_id="re-" + msg["header_id"], height=1, payload={})
+
+    def test_fifo_service_and_send_stamped_at_completion(self):
+        self.net.set_cpu_model(CpuCostModel(vote_verify_us=10_000), node_ids=["B"])
+        self.net.send_header("A", "B", header_id="v1", height=1, payload={"type": "VOTE"})
+        self.net.send_header("A", "B", header_id="v2", height=1, payload={"type": "VOTE"})
+        self.net.run_until_idle()
+
+        self.assertEqual(self.handled, [
+            ("B", "v1", 15), ("C", "re-v1", 20), ("B", "v2", 25), ("C", "re-v2", 30),
+        ])
+        stats = self.net.cpu_stats()["B"]
+        self.assertEqual(stats["busy_ms"], 20)
+        self.assertEqual(stats["max_queue_len"], 2)
+        self.assertEqual(stats["queue_len"], 0)
+
+    def test_cost_model_counts_txs(self):
+        model = CpuCostModel(per_message_us=100, vote_verify_us=50, tx_apply_us=10)
+        proposal = {"payload": {"type": "PROPOSAL", "block": {"txs": [1, 2, 3]}}}
+        self.assertAlmostEqual(model(_vote("A", "B")), 0.15)
+        self.assertAlmostEqual(model(proposal), 0.18)
+        self.assertAlmostEqual(model({"payload": {}}), 0.1)
+
+
+class TestCpuCluster(unittest.TestCase):
+    def _run(self, model):
+        cluster = build_consensus_cluster(num_nodes=4, seed=5)
+        if model is not None:
+            cluster.network.set_cpu_model(model)
+        cluster.start()
+        cluster.network.run_until(400)
+        return cluster
+
+    def test_cpu_cost_slows_commits(self):
+        fast = self._run(None)
+        slow = self._run(CpuCostModel(vote_verify_us=4_000))
+        fast_len = min(len(l) for l in fast.ledgers().values())
+        slow_len = min(len(l) for l in slow.ledgers().values())
+        self.assertGreater(slow_len, 0)
+        self.assertLess(slow_len, fast_len)
+        self.assertGreater(slow.network.cpu_stats()["0"]["utilization"], 0.5)
+
+    def test_checkpoint_restores_cpu_state(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=5)
+        cluster.network.set_cpu_model(CpuCostModel(vote_verify_us=3_000))
+        cluster.start()
+        cluster.network.run_until(30)
+        snap = cluster.checkpoint()
+        cluster.network.run_until(300)
+        first = cluster.ledgers()
+        cluster.restore(snap)
+        cluster.network.run_until(300)
+        self.assertEqual(cluster.ledgers(), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
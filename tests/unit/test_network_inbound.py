@@ -0,0 +1,87 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.simulator import CpuCostModel, NetworkConfig, NetworkSimulator
+
+
+class TestInboundQueues(unittest.TestCase):
+    def _net(self, policy, capacity=2):
+        cfg = NetworkConfig(base_delay_ms=5, jitter_ms=0, drop_rate=0.0, duplicate_rate=0.0,
+                            link_bandwidth_bytes_per_ms=100_000,
+                            inbound_queue_capacity=capacity, inbound_overflow_policy=policy)
+        net = NetworkSimulator(seed=0, config=cfg)
+        handled = []
+        net.register_node("A", lambda m: None)
+        net.register_node("B", lambda m: handled.append(m["header_id"]))
+        # Gói tới B ở t=5..9 (1ms/gói trên link); B xử lý mỗi gói mất 10ms -> tràn mailbox
+        net.set_cpu_model(CpuCostModel(per_message_us=10_000), node_ids=["B"])
+        for i in range(5):
+            net.send_header("A", "B", header_id=f"m{i}", height=1, payload={})
+        return net, handled
+
+    def test_policy_rechecked_when_mailbox_enabled(self):
+        net = NetworkSimulator(seed=0)
+        net.register_node("B", lambda m: None)
+        net.config.inbound_overflow_policy = "typo"
+        with self.assertRaises(ValueError):
+            net.set_cpu_model(CpuCostModel(per_message_us=1))
+
+    def test_drop_newest(self):
+        net, handled = self._net("drop_newest")
+        net.run_until_idle()
+        self.assertEqual(handled, ["m0", "m1"])
+        self.assertEqual(net.inbound_stats()["B"]["dropped_newest"], 3)
+
+    def test_drop_oldest(self):
+        net, handled = self._net("drop_oldest")
+        net.run_until_idle()
+        # m0 đang được xử lý, các gói chờ cũ hơn lần lượt bị thay thế
+        self.assertEqual(handled, ["m0", "m4"])
+        self.assertEqual(net.inbound_stats()["B"]["dropped_oldest"], 3)
+
+    def test_drop_oldest_with_capacity_one(self):
+        net, handled = self._net("drop_oldest", capacity=1)
+        net.run_until_idle()
+        # Không có gói chờ nào sau gói đang xử lý: gói mới bị bỏ nhưng vẫn tính theo policy drop_oldest
+        self.assertEqual(handled, ["m0"])
+        stats = net.inbound_stats()["B"]
+        self.assertEqual((stats["dropped_oldest"], stats["dropped_newest"]), (4, 0))
+        self.assertEqual(sum(1 for e in net.logs() if e["event"] == "inbound_drop_oldest"), 4)
+
+    def test_pause_link_is_lossless_and_fifo(self):
+        net, handled = self._net("pause_link")
+        net.run_until(10)
+        stats = net.inbound_stats()["B"]
+        self.assertEqual(stats["paused_links"], 1)
+        self.assertEqual(stats["depth"], 2)
+        # Gói gửi khi link đang pause ở lại phía gửi
+        net.send_header("A", "B", header_id="m5", height=1, payload={})
+        self.assertEqual(len(net._pending_link[("A", "B")]), 4)
+        net.run_until_idle()
+        self.assertEqual(handled, [f"m{i}" for i in range(6)])
+        stats = net.inbound_stats()["B"]
+        self.assertEqual(stats["paused_links"], 0)
+        self.assertGreaterEqual(stats["pauses"], 1)
+        self.assertLessEqual(stats["max_depth"], 2)
+        self.assertFalse(net._pending_link)
+
+    def test_depth_metrics(self):
+        net, _ = self._net("drop_newest", capacity=None)
+        net.run_until_idle()
+        stats = net.inbound_stats()["B"]
+        self.assertEqual(stats["max_depth"], 5)
+        self.assertEqual(stats["depth"], 0)
+        # depth tăng 1..4 (mỗi mức 1ms), 5 trong 6ms, rồi 4,3,2,1 mỗi mức 10ms; tổng 55ms
+        self.assertAlmostEqual(stats["avg_depth"], 140 / 55)
+
+    def test_unknown_policy_rejected(self):
+        # Lỗi ngay khi tạo config, không đợi mailbox tràn
+        with self.assertRaises(ValueError):
+            self._net("drop_random")
+
+
+if __name__ == "__main__":
+    unittest.main()
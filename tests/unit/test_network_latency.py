@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.latency import COMPONENTS
+from src.network.simulator import CpuCostModel, NetworkConfig, NetworkSimulator
+from src.simulator.cluster import build_consensus_cluster
+
+
+class TestLatencyBreakdown(unittest.TestCase):
+    def test_components_of_single_messages(self):
+        cfg = NetworkConfig(base_delay_ms=10, jitter_ms=0, drop_rate=0.0, duplicate_rate=0.0,
+                            link_bandwidth_bytes_per_ms=10, max_bytes_inflight_per_link=250)
+        net = NetworkSimulator(seed=0, config=cfg)
+        tracer = net.enable_latency_tracing()
+        net.register_node("A", lambda m: None)
+        net.register_node("B", lambda m: net.send_header("B", "C", "re-" + m["header_id"], 1, {}))
+        net.register_node("C", lambda m: net.trace_mark("C", "commit", 1))
+        net.set_cpu_model(CpuCostModel(per_message_us=4_000), node_ids=["B"])
+        net.send_header("A", "B", header_id="h1", height=1, payload={"type": "VOTE", "pad": "x" * 50})
+        net.send_header("A", "B", header_id="h2", height=1, payload={"type": "VOTE", "pad": "x" * 50})
+        net.run_until_idle()
+
+        first, second = tracer.traces[1].components(), tracer.traces[2].components()
+        self.assertEqual(first, {"backpressure": 0, "link_wait": 0, "propagation": 10,
+                                 "jitter": 0, "receiver": 4})
+        # Gói thứ hai chờ backpressure tới khi gói đầu tới nơi, rồi chờ link hết serialize gói đầu
+        self.assertEqual(second["backpressure"], 10)
+        self.assertGreater(second["link_wait"], 0)
+        self.assertEqual(second["receiver"], 4)
+
+        # Critical path của commit ở C: reply của h1 <- h1
+        report = tracer.critical_path_report()
+        self.assertEqual(report[0]["path"], [("VOTE", "A", "B"), ("HEADER", "B", "C")])
+        self.assertEqual(report[0]["finality_ms"], 24)
+        self.assertEqual(tracer.breakdown()["VOTE"]["count"], 2)
+
+    def test_transmit_delay_adds_own_serialization(self):
+        arrivals = {}
+        for flag in (False, True):
+            cfg = NetworkConfig(base_delay_ms=10, jitter_ms=0, drop_rate=0.0, duplicate_rate=0.0,
+                                link_bandwidth_bytes_per_ms=10, transmit_delay=flag)
+            net = NetworkSimulator(seed=0, config=cfg)
+            net.register_node("A", lambda m: None)
+            net.register_node("B", lambda m, net=net, flag=flag: arrivals.setdefault(flag, net.now_ms))
+            net.send_header("A", "B", header_id="h1", height=1, payload={"type": "BLOCK", "pad": "x" * 300})
+            net.run_until_idle()
+        # Gói lớn tới muộn hơn đúng thời gian serialize của chính nó (size / bandwidth)
+        self.assertEqual(arrivals[False], 10)
+        self.assertGreater(arrivals[True] - arrivals[False], 30)
+
+    def test_cluster_report_accounts_for_finality(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=2)
+        tracer = cluster.network.enable_latency_tracing()
+        cluster.network.set_cpu_model(CpuCostModel(vote_verify_us=500))
+        cluster.start()
+        cluster.network.run_until(200)
+        report = tracer.critical_path_report()
+        self.assertGreaterEqual(len(report), 3)
+        for row in report:
+            self.assertEqual([hop[0] for hop in row["path"]], ["PROPOSAL", "VOTE", "VOTE"])
+            total = row["wait_ms"] + sum(row["components"][c] for c in COMPONENTS)
+            self.assertAlmostEqual(total, row["finality_ms"])
+            self.assertGreater(row["components"]["receiver"], 0)
+        self.assertIn("propagation", tracer.format_report().splitlines()[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
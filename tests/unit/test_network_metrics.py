@@ -0,0 +1,99 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.metrics import LogHistogram, MetricsRegistry
+from src.network.simulator import NetworkConfig, NetworkSimulator
+
+
+class TestLogHistogram(unittest.TestCase):
+    def test_percentiles_within_bucket_error(self):
+        h = LogHistogram(sub_buckets=8)
+        for v in range(1, 1001):
+            h.record(v)
+        self.assertEqual(h.count, 1000)
+        self.assertEqual(h.min, 1)
+        self.assertEqual(h.max, 1000)
+        for q, exact in ((50, 500), (90, 900), (99, 990)):
+            est = h.percentile(q)
+            self.assertGreaterEqual(est, exact)
+            self.assertLessEqual(est, exact * (1 + 1 / 8))
+        self.assertEqual(h.percentile(100), 1000)
+
+    def test_zero_and_empty(self):
+        h = LogHistogram()
+        self.assertIsNone(h.percentile(50))
+        h.record(0)
+        self.assertEqual(h.percentile(50), 0)
+
+
+class TestSimulatorMetrics(unittest.TestCase):
+    def _net(self, **cfg_kwargs):
+        cfg = NetworkConfig(base_delay_ms=10, jitter_ms=0, drop_rate=0.0, duplicate_rate=0.0,
+                            link_bandwidth_bytes_per_ms=100_000, **cfg_kwargs)
+        net = NetworkSimulator(seed=1, config=cfg)
+        net.register_node("A", lambda m: None)
+        net.register_node("B", lambda m: None)
+        return net
+
+    def test_disabled_by_default(self):
+        net = self._net()
+        net.send_header("A", "B", header_id="h", height=1, payload={"type": "VOTE"})
+        net.run_until_idle()
+        self.assertIsNone(net.metrics)
+
+    def test_counters_histograms_and_gauges(self):
+        net = self._net(max_bytes_inflight_per_link=400)
+        reg = net.enable_metrics()
+        for i in range(3):
+            net.send_header("A", "B", header_id=f"h{i}", height=1, payload={"type": "VOTE", "pad": "x" * 100})
+        net.send_body("A", "B", header_id="missing", height=1, payload={})
+        net.send_header("A", "C", header_id="x", height=1, payload={})
+        snap = reg.to_dict()
+        link = "receiver=B,sender=A"
+        self.assertEqual(snap["gauges"]["pending_queue_depth"][link], 2)
+        self.assertGreater(snap["gauges"]["inflight_bytes"][link], 0)
+
+        net.run_until_idle()
+        snap = reg.to_dict()
+        self.assertEqual(snap["counters"]["messages_sent_total"][link], 3)
+        self.assertEqual(snap["counters"]["messages_delivered_total"][link], 3)
+        self.assertEqual(snap["counters"]["messages_backpressured_total"]["reason=link_bytes,receiver=B,sender=A"], 2)
+        dropped = snap["counters"]["messages_dropped_total"]
+        self.assertEqual(dropped["reason=missing_header,receiver=B,sender=A"], 1)
+        self.assertEqual(dropped["reason=no_receiver,receiver=C,sender=A"], 1)
+        self.assertEqual(snap["gauges"]["pending_queue_depth"][link], 0)
+        self.assertEqual(snap["gauges"]["inflight_bytes"][link], 0)
+
+        lat = snap["histograms"]["link_latency_ms"][link]
+        self.assertEqual(lat["count"], 3)
+        self.assertEqual(lat["min"], 10)
+        # Gói bị backpressure tính cả thời gian chờ trong hàng đợi
+        self.assertGreater(lat["max"], 10)
+        self.assertEqual(snap["histograms"]["message_latency_ms"]["type=VOTE"]["count"], 3)
+
+    def test_prometheus_text(self):
+        net = self._net()
+        reg = net.enable_metrics()
+        net.send_header("A", "B", header_id="h", height=1, payload={"type": "VOTE"})
+        net.run_until_idle()
+        text = reg.to_prometheus()
+        self.assertIn("# TYPE netsim_messages_sent_total counter", text)
+        self.assertIn('netsim_messages_sent_total{receiver="B",sender="A"} 1', text)
+        self.assertIn('netsim_link_latency_ms_bucket{receiver="B",sender="A",le="+Inf"} 1', text)
+        self.assertIn('netsim_message_latency_ms_count{type="VOTE"} 1', text)
+
+    def test_registry_is_shared_across_simulators(self):
+        reg = MetricsRegistry()
+        for _ in range(2):
+            net = self._net()
+            net.enable_metrics(reg)
+            net.send_header("A", "B", header_id="h", height=1, payload={})
+            net.run_until_idle()
+        self.assertEqual(reg.counter("messages_delivered_total", sender="A", receiver="B").value, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.realtime import AsyncNetworkSimulator
+from src.network.simulator import NetworkConfig, NetworkSimulator
+from src.simulator.cluster import build_consensus_cluster
+
+
+class TestTimers(unittest.TestCase):
+    def test_virtual_timer_fires_in_order(self):
+        net = NetworkSimulator(seed=0)
+        fired = []
+        net.register_timer_handler("A", lambda p: fired.append((p["n"], net.now_ms)))
+        net.schedule_timer("A", 30, {"n": 2})
+        net.schedule_timer("A", 10, {"n": 1})
+        net.run_until_idle()
+        self.assertEqual(fired, [(1, 10), (2, 30)])
+
+    def test_propose_timeout_moves_to_next_round(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=1, auto_advance=False)
+        net = cluster.network
+        proposer = cluster.nodes["0"].helper.get_proposer(1, 0)
+        # Proposer round 0 bị cô lập -> các node khác timeout PROPOSE và sang round 1
+        for nid in cluster.node_ids:
+            if nid != proposer:
+                net.block_link(proposer, nid)
+        cluster.start()
+        net.run_until(2000)
+        for nid in cluster.node_ids:
+            net.unblock_link(proposer, nid)
+        net.run_until(20_000)
+
+        ledgers = cluster.ledgers()
+        hashes = {ledgers[nid][0]["hash"] for nid in cluster.node_ids if nid != proposer}
+        self.assertEqual(len(hashes), 1)
+        other = next(nid for nid in cluster.node_ids if nid != proposer)
+        self.assertEqual(cluster.nodes[other].helper.block_store[hashes.pop()].round, 1)
+
+
+class TestAsyncNetwork(unittest.TestCase):
+    def test_async_cluster_commits_on_event_loop(self):
+        async def scenario():
+            cfg = NetworkConfig(base_delay_ms=5, jitter_ms=2, drop_rate=0.0, duplicate_rate=0.0)
+            cluster = build_consensus_cluster(
+                num_nodes=4, seed=3, config=cfg,
+                network_cls=AsyncNetworkSimulator, network_kwargs={"time_scale": 50.0},
+            )
+            cluster.network.start()
+            cluster.start()
+            await cluster.network.run_for(400)
+            cluster.network.stop()
+            return cluster
+
+        cluster = asyncio.run(scenario())
+        ledgers = cluster.ledgers()
+        shortest = min(len(l) for l in ledgers.values())
+        self.assertGreaterEqual(shortest, 2)
+        prefixes = {tuple(e["hash"] for e in l[:shortest]) for l in ledgers.values()}
+        self.assertEqual(len(prefixes), 1)
+        self.assertGreaterEqual(cluster.network.now_ms, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.replay import LogReplayNetwork
+from src.network.simulator import NetworkConfig
+from src.simulator.cluster import ConsensusCluster, build_consensus_cluster
+
+
+class TestLogReplay(unittest.TestCase):
+    def test_replay_reproduces_ledgers(self):
+        cfg = NetworkConfig(base_delay_ms=5, jitter_ms=6, drop_rate=0.05, duplicate_rate=0.05)
+        recorded = build_consensus_cluster(num_nodes=4, seed=9, config=cfg)
+        recorded.start()
+        recorded.network.run_until(200)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.jsonl")
+            recorded.network.dump_logs(path)
+            replay_net = LogReplayNetwork.from_file(path)
+
+        replayed = ConsensusCluster(replay_net, recorded.node_ids)
+        replayed.start()
+        delivered = replay_net.replay()
+
+        self.assertEqual(delivered, len(replay_net))
+        self.assertEqual(replay_net.remaining(), 0)
+        self.assertGreater(replay_net.sends_ignored, 0)
+        self.assertEqual(replayed.ledgers(), recorded.ledgers())
+        self.assertGreater(len(recorded.ledgers()["0"]), 1)
+
+    def test_replay_until_time(self):
+        deliveries = [(1.0, "A", {"n": 1}, False), (5.0, "A", {"n": 2}, False), (9.0, "B", {"n": 3}, False)]
+        net = LogReplayNetwork(deliveries)
+        seen = []
+        net.register_node("A", lambda msg: seen.append(("A", msg["n"], net.now_ms)))
+        net.register_node("B", lambda msg: seen.append(("B", msg["n"], net.now_ms)))
+
+        self.assertEqual(net.replay(until_ms=5.0), 2)
+        self.assertEqual(seen, [("A", 1, 1.0), ("A", 2, 5.0)])
+        self.assertEqual(net.replay(), 1)
+        self.assertEqual(seen[-1], ("B", 3, 9.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
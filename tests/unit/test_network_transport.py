@@ -0,0 +1,126 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.transport import FaultConfig, FrameError, LoopbackTransport, decode_frame, encode_frame
+
+
+class TestFraming(unittest.TestCase):
+    def test_roundtrip_header_and_body(self):
+        header = {
+            "type": "HEADER", "header_id": "h1", "height": 7, "from": "A", "to": "B",
+            "body_allowed": False, "payload": {"type": "VOTE", "phase": "PREVOTE", "n": [1, 2]},
+        }
+        body = {"type": "BODY", "header_id": "h1", "height": None, "from": "A", "to": "B",
+                "payload": {"data": "xyz"}}
+        for envelope in (header, body):
+            frame = encode_frame(envelope)
+            self.assertEqual(int.from_bytes(frame[:4], "big"), len(frame) - 4)
+            self.assertEqual(decode_frame(frame[4:]), envelope)
+        with self.assertRaises(FrameError):
+            decode_frame(encode_frame(header)[4:-3])
+
+
+class TestLoopbackTransport(unittest.TestCase):
+    def test_header_before_body_over_tcp(self):
+        async def scenario():
+            addresses = {"A": ("127.0.0.1", 0), "B": ("127.0.0.1", 0)}
+            a = LoopbackTransport("A", addresses)
+            b = LoopbackTransport("B", addresses, faults=FaultConfig(base_delay_ms=2, jitter_ms=3))
+            await a.start()
+            await b.start()
+            received = {"A": [], "B": []}
+            a.register_node("A", received["A"].append)
+            b.register_node("B", received["B"].append)
+
+            a.send_body("A", "B", "h0", 1, {"early": True})  # chưa gửi header -> bị từ chối
+            a.send_header("A", "B", "h1", 1, {"hdr": 1})
+            a.send_body("A", "B", "h1", 1, {"body": 1})
+            b.send_header("B", "B", "self", 2, {"loop": True})
+            b.send_header("B", "A", "h2", 2, {"hdr": 2})
+            b.send_body("B", "A", "h2", 2, {"body": 2})
+            for _ in range(200):
+                if len(received["B"]) == 3 and len(received["A"]) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            await a.close()
+            await b.close()
+            return a, received
+
+        a, received = asyncio.run(scenario())
+        self.assertEqual(a.stats["body_rejected_missing_header"], 1)
+        self.assertEqual([m["type"] for m in received["A"]], ["HEADER", "BODY"])
+        self.assertEqual(sorted(m["header_id"] for m in received["B"]), ["h1", "h1", "self"])
+        types_from_a = [m["type"] for m in received["B"] if m["from"] == "A"]
+        self.assertEqual(types_from_a, ["HEADER", "BODY"])
+
+    def test_send_side_drop(self):
+        async def scenario():
+            addresses = {"A": ("127.0.0.1", 0)}
+            a = LoopbackTransport("A", addresses, faults=FaultConfig(drop_rate=1.0))
+            await a.start()
+            a.register_node("A", lambda m: None)
+            a.send_header("A", "A", "h1", 1, {})
+            a.send_body("A", "A", "h1", 1, {})
+            await a.close()
+            return a.stats
+
+        stats = asyncio.run(scenario())
+        self.assertEqual(stats["dropped"], 1)
+        self.assertEqual(stats["body_rejected_missing_header"], 1)
+        self.assertEqual(stats["sent"], 0)
+
+    def test_sent_headers_are_bounded(self):
+        async def scenario():
+            addresses = {"A": ("127.0.0.1", 0)}
+            a = LoopbackTransport("A", addresses, sent_header_capacity=2)
+            await a.start()
+            a.register_node("A", lambda m: None)
+            for i in range(3):
+                a.send_header("A", "A", f"h{i}", 1, {})
+            a.send_body("A", "A", "h0", 1, {})  # đã bị đẩy khỏi bộ nhớ
+            a.send_body("A", "A", "h2", 1, {})
+            await a.close()
+            return a
+
+        a = asyncio.run(scenario())
+        self.assertEqual(len(a._sent_headers), 2)
+        self.assertEqual(a.stats["body_rejected_missing_header"], 1)
+        self.assertEqual(a.stats["sent"], 4)
+
+    def test_bad_frames_close_only_that_connection(self):
+        async def scenario():
+            addresses = {"A": ("127.0.0.1", 0), "B": ("127.0.0.1", 0)}
+            a = LoopbackTransport("A", addresses)
+            b = LoopbackTransport("B", addresses)
+            await a.start()
+            await b.start()
+            received = []
+            b.register_node("B", received.append)
+            host, port = addresses["B"]
+            closed = []
+            for frame in ((1 << 31).to_bytes(4, "big"), (5).to_bytes(4, "big") + b"\x00\xff\xff\x00\x00"):
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(frame)
+                closed.append(await asyncio.wait_for(reader.read(), timeout=2.0))
+                writer.close()
+            a.send_header("A", "B", "h1", 1, {"ok": True})
+            for _ in range(200):
+                if received:
+                    break
+                await asyncio.sleep(0.01)
+            await a.close()
+            await b.close()
+            return b, received, closed
+
+        b, received, closed = asyncio.run(scenario())
+        self.assertEqual(closed, [b"", b""])  # server đóng kết nối (EOF)
+        self.assertEqual(b.stats["frame_errors"], 2)
+        self.assertEqual([m["header_id"] for m in received], ["h1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
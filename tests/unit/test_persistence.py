@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.simulator import NetworkConfig
+from src.simulator.cluster import build_consensus_cluster
+from src.simulator.persistence import (
+    CheckpointFormatError,
+    PeriodicCheckpointer,
+    load_checkpoint,
+    save_checkpoint,
+)
+
+
+def _cluster():
+    cfg = NetworkConfig(base_delay_ms=5, jitter_ms=4, drop_rate=0.05, duplicate_rate=0.05)
+    return build_consensus_cluster(num_nodes=4, seed=5, config=cfg)
+
+
+class TestPersistence(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sim.ckpt")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _dump(self, cluster, name):
+        path = os.path.join(self.tmp.name, name)
+        cluster.network.dump_logs(path)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_resumed_run_is_bit_identical(self):
+        reference = _cluster()
+        reference.start()
+        reference.network.run_until(150)
+
+        log_path = os.path.join(self.tmp.name, "events.jsonl")
+        interrupted = _cluster()
+        checkpointer = PeriodicCheckpointer(interrupted, interrupted.network, self.path, interval_ms=25,
+                                            log_path=log_path)
+        interrupted.start()
+        checkpointer.run_until(50)
+        interrupted.network.run_until(70)  # sự kiện sau checkpoint cuối: bị bỏ khi resume
+        checkpointer.close()
+        del interrupted  # mô phỏng crash sau checkpoint
+
+        resumed = _cluster()
+        checkpointer = PeriodicCheckpointer(resumed, resumed.network, self.path, interval_ms=25,
+                                            log_path=log_path)
+        self.assertEqual(checkpointer.resume(), 50)
+        offset = resumed.network.log_position()
+        checkpointer.run_until(150)
+        checkpointer.close()
+
+        self.assertEqual(resumed.ledgers(), reference.ledgers())
+        with open(log_path, "rb") as f:
+            self.assertEqual(f.read(), self._dump(reference, "ref.jsonl"))
+        # Log trước checkpoint không được nạp lại vào bộ nhớ
+        self.assertEqual(resumed.network.logs(), reference.network.logs()[offset:])
+        self.assertEqual(resumed.network.log_position(), reference.network.log_position())
+
+    def test_checkpoint_size_does_not_grow_with_logs(self):
+        cluster = _cluster()
+        cluster.start()
+        cluster.network.run_until(40)
+        cluster.network.block_link("0", "1")
+        size = save_checkpoint(self.path, cluster.checkpoint())
+        self.assertEqual(load_checkpoint(self.path)["network"]["_logs"], cluster.network.log_position())
+        # Thêm 1000 entry log, trạng thái còn lại giữ nguyên: kích thước file gần như không đổi
+        for _ in range(1_000):
+            cluster.network.block_link("0", "1")
+        self.assertLess(save_checkpoint(self.path, cluster.checkpoint()) - size, 8)
+
+    def test_empty_or_truncated_file_is_format_error(self):
+        for content in (b"", b"LBCKPT"):
+            with open(self.path, "wb") as f:
+                f.write(content)
+            with self.assertRaises(CheckpointFormatError):
+                load_checkpoint(self.path)
+
+    def test_compressed_roundtrip_and_corruption(self):
+        cluster = _cluster()
+        cluster.start()
+        cluster.network.run_until(40)
+        snap = cluster.checkpoint()
+        save_checkpoint(self.path, snap, compress=True)
+        self.assertEqual(load_checkpoint(self.path)["network"]["_next_msg_id"],
+                         snap["network"]["_next_msg_id"])
+
+        with open(self.path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        with self.assertRaises(CheckpointFormatError):
+            load_checkpoint(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.constants import ConsensusStep
+from src.consensus.reputation import ReputationSchedule
+from src.network.simulator import NetworkConfig, NetworkSimulator
+from src.simulator.cluster import ConsensusNode, build_consensus_cluster
+
+
+def _cluster(pipelined, seed=1, jitter_ms=2, num_nodes=4, proposer_mode="weighted"):
+    cfg = NetworkConfig(base_delay_ms=5, jitter_ms=jitter_ms, drop_rate=0.0, duplicate_rate=0.0,
+                        link_bandwidth_bytes_per_ms=1000)
+    return build_consensus_cluster(num_nodes=num_nodes, seed=seed, config=cfg, pipelined=pipelined,
+                                   proposer_mode=proposer_mode)
+
+
+class TestPipelinedConsensus(unittest.TestCase):
+    def test_pipelined_chain_is_consistent_and_faster(self):
+        heights = {}
+        for pipelined in (False, True):
+            cluster = _cluster(pipelined)
+            cluster.start()
+            cluster.network.run_until(2_000)
+            ledgers = cluster.ledgers()
+            chain = ledgers["0"]
+            for ledger in ledgers.values():
+                n = min(len(ledger), len(chain))
+                self.assertEqual([e["hash"] for e in ledger[:n]], [e["hash"] for e in chain[:n]])
+            for prev, cur in zip(chain, chain[1:]):
+                self.assertEqual(cur["parent_hash"], prev["hash"])
+            heights[pipelined] = len(chain)
+        self.assertGreater(heights[True], heights[False] * 1.2)
+
+    def test_proposal_sent_at_lock_time(self):
+        cluster = _cluster(True, jitter_ms=0)
+        net = cluster.network
+        locks, proposals = {}, {}
+        node = cluster.nodes["0"]
+        node.controller.add_listener(
+            lambda event, info: locks.setdefault(info["height"], net.now_ms)
+            if event == "step" and info["step"] == ConsensusStep.PRECOMMIT.value else None)
+        original = node.helper.broadcast_proposal
+
+        def broadcast(height, round_num, block):
+            proposals.setdefault(height, net.now_ms)
+            original(height, round_num, block)
+
+        node.helper.broadcast_proposal = broadcast
+        cluster.start()
+        net.run_until(500)
+        # Node 0 đề xuất height h+1 ngay lúc vào PRECOMMIT của h, trước khi commit h
+        ahead = [h for h in proposals if h > 1]
+        self.assertTrue(ahead)
+        for h in ahead:
+            self.assertEqual(proposals[h], locks[h - 1])
+
+    def test_stale_parent_proposal_ignored(self):
+        cluster = _cluster(True)
+        node = cluster.nodes["1"]
+        ctrl = node.controller
+        ctrl.start_round(0)
+        ctrl.last_commit_hash = "a" * 64
+        proposer = cluster.nodes[node.helper.get_proposer(1, 0)]
+        block = proposer.helper.create_proposal(1, 0, parent_hash="b" * 64)
+        ctrl.on_proposal_received(block, 1, 0)
+        self.assertEqual(ctrl.current_step, ConsensusStep.PROPOSE)
+
+    def test_wrong_proposer_dropped(self):
+        cluster = _cluster(True)
+        cluster.start()
+        expected = cluster.nodes["0"].helper.get_proposer(1, 0)
+        other = next(nid for nid in cluster.node_ids if nid != expected)
+        ctrl = cluster.nodes[next(nid for nid in cluster.node_ids if nid not in (expected, other))].controller
+        ctrl.on_proposal_received(cluster.nodes[other].helper.create_proposal(1, 0), 1, 0)
+        self.assertEqual(ctrl.current_step, ConsensusStep.PROPOSE)
+        ctrl.on_proposal_received(cluster.nodes[expected].helper.create_proposal(1, 0), 1, 0)
+        self.assertEqual(ctrl.current_step, ConsensusStep.PREVOTE)
+
+    def test_pipelined_reputation(self):
+        # Lịch reputation trễ một height: proposer h+1 chọn lúc lock h trùng với proposer sau khi commit h
+        heights = {}
+        for pipelined in (False, True):
+            cluster = _cluster(pipelined, jitter_ms=8, num_nodes=8, proposer_mode="reputation")
+            cluster.start()
+            cluster.network.run_until(1_000)
+            chain = cluster.ledgers()["0"]
+            heights[pipelined] = len(chain)
+        self.assertEqual(cluster.nodes["0"].helper.proposer_schedule.lag, 1)
+        replay = ReputationSchedule(cluster.validator_set, lag=1)
+        for entry in chain:
+            self.assertEqual(entry["proposer"], replay.proposer(entry["height"], entry["round"]))
+            replay.on_commit(entry)
+        self.assertGreater(heights[True], heights[False])
+
+    def test_pipelining_rejects_unlagged_reputation(self):
+        net = NetworkSimulator(seed=0)
+        schedule = ReputationSchedule(_cluster(False).validator_set)
+        with self.assertRaises(ValueError):
+            ConsensusNode("0", ["1", "2", "3"], net, proposer_schedule=schedule, pipelined=True)
+
+    def test_checkpoint_restore_keeps_pipeline_state(self):
+        cluster = _cluster(True)
+        cluster.start()
+        cluster.network.run_until(300)
+        snap = cluster.checkpoint()
+        cluster.network.run_until(800)
+        expected = cluster.ledgers()
+        cluster.restore(snap)
+        cluster.network.run_until(800)
+        self.assertEqual(cluster.ledgers(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
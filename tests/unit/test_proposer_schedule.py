@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.proposer import ProposerSchedule, ROUND_ROBIN
+from src.consensus.validator_set import ValidatorSet
+from src.consensus.vote_proposal_handler import VoteProposalHandler
+from src.simulator.cluster import build_consensus_cluster
+
+
+class TestProposerSchedule(unittest.TestCase):
+    def test_round_robin_with_offset_keeps_given_order(self):
+        schedule = ProposerSchedule(["C", "A", "B"], mode=ROUND_ROBIN, offset=-1)
+        self.assertEqual([schedule.proposer(h, 0) for h in range(1, 5)], ["C", "A", "B", "C"])
+        self.assertEqual(schedule.proposer(1, 2), "B")
+        self.assertEqual(VoteProposalHandler("c", ["C", "A", "B"]).get_proposer(1, 0), "A")
+
+    def test_weighted_table(self):
+        schedule = ProposerSchedule(ValidatorSet({"A": 2, "B": 1, "C": 1}))
+        self.assertEqual(schedule.period, 4)
+        self.assertEqual([schedule.proposer(h, 0) for h in range(4)], ["A", "B", "C", "A"])
+        self.assertEqual(schedule.proposer(1, 1), schedule.proposer(2, 0))
+        with self.assertRaises(ValueError):
+            ProposerSchedule(["A"], mode="random")
+
+    def test_lookahead(self):
+        schedule = ProposerSchedule(ValidatorSet({"A": 2, "B": 1, "C": 1}))
+        self.assertEqual(schedule.lookahead(5, 3), [(5, "B"), (6, "C"), (7, "A")])
+        for node in ("A", "B", "C"):
+            for start in range(0, 10):
+                expected = next(h for h in range(start, start + 10) if schedule.proposer(h, 0) == node)
+                self.assertEqual(schedule.next_height_for(node, start), expected)
+        self.assertIsNone(schedule.next_height_for("Z", 1))
+
+    def test_next_proposer_prepares_block_at_commit(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=3, auto_advance=False)
+        helper = cluster.nodes["2"].helper
+        block = cluster.nodes["1"].helper.create_proposal(1, 0)
+        helper.block_store[block.hash] = block
+        helper.commit_block(block)
+        prepared = helper._prepared
+        self.assertIsNotNone(prepared)
+        self.assertEqual((prepared.height, prepared.parent_hash), (2, block.hash))
+        self.assertIs(helper.create_proposal(2, 0), prepared)
+        # Node không phải proposer kế tiếp thì không dựng trước
+        other = cluster.nodes["3"].helper
+        other.commit_block(block)
+        self.assertIsNone(other._prepared)
+
+    def test_cluster_rotation(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=3)
+        cluster.start()
+        cluster.network.run_until(200)
+        self.assertEqual([e["proposer"] for e in cluster.ledgers()["0"][:4]], ["1", "2", "3", "0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.reputation import MAX_TIMESTAMP_DRIFT_MS, ReputationSchedule
+from src.consensus.types import Block
+from src.consensus.validator_set import ValidatorSet
+from src.simulator.cluster import build_consensus_cluster
+
+
+def _feed(schedule, entries):
+    for height, round_num, proposer, ts in entries:
+        schedule.on_commit({"height": height, "round": round_num, "proposer": proposer, "timestamp": ts})
+
+
+class TestReputationSchedule(unittest.TestCase):
+    def setUp(self):
+        self.vs = ValidatorSet(["A", "B", "C", "D"])
+
+    def test_slow_leader_is_down_weighted(self):
+        schedule = ReputationSchedule(self.vs)
+        # A mất 40ms mỗi block, các node khác 20ms
+        entries, ts = [], 0.0
+        for h in range(1, 13):
+            proposer = "ABCD"[(h - 1) % 4]
+            entries.append((h, 0, proposer, ts))
+            ts += 40.0 if proposer == "A" else 20.0
+        _feed(schedule, entries)
+        self.assertEqual(schedule.latency_samples()["A"], [40.0, 40.0, 40.0])
+        weights = schedule.weights()
+        self.assertLess(weights["A"] * 10, weights["B"])
+        self.assertEqual(weights["B"], weights["C"])
+        self.assertNotEqual(schedule.proposer(100, 1), "A")
+
+    def test_missed_rounds_penalise_scheduled_proposers(self):
+        schedule = ReputationSchedule(self.vs)
+        missed = [schedule.proposer(1, 0), schedule.proposer(1, 1)]
+        _feed(schedule, [(1, 2, schedule.proposer(1, 2), 0.0)])
+        weights = schedule.weights()
+        for vid in self.vs:
+            # Chưa có mẫu latency: chỉ phạt theo số round bị lỡ (miss_penalty=4)
+            self.assertEqual(weights[vid], 200 if vid in missed else 1000)
+        self.assertNotIn(schedule.proposer(2, 1), missed)
+
+    def test_same_commits_same_schedule_and_checkpoint(self):
+        entries = [(h, int(h % 3 == 0), "ABCD"[h % 4], h * 25.0 + (h % 5)) for h in range(1, 30)]
+        a, b = ReputationSchedule(self.vs), ReputationSchedule(self.vs)
+        _feed(a, entries)
+        snap = a.checkpoint()
+        _feed(b, entries)
+        picks = [(a.proposer(h, r), b.proposer(h, r)) for h in range(30, 60) for r in range(3)]
+        self.assertTrue(all(x == y for x, y in picks))
+        _feed(a, [(30, 0, "A", 2000.0)])
+        a.restore(snap)
+        self.assertEqual([a.proposer(h, 0) for h in range(30, 40)], [b.proposer(h, 0) for h in range(30, 40)])
+
+    def test_lag_fixes_next_proposer_before_commit(self):
+        entries, ts = [], 0.0
+        for h in range(1, 20):
+            entries.append((h, 0, "ABCD"[h % 4], ts))
+            ts += 40.0 if h % 4 == 0 else 20.0
+        lagged, plain = ReputationSchedule(self.vs, lag=1), ReputationSchedule(self.vs)
+        _feed(lagged, entries[:-1])
+        _feed(plain, entries[:-1])
+        before = [lagged.proposer(20, r) for r in range(4)]
+        _feed(lagged, entries[-1:])
+        self.assertEqual([lagged.proposer(20, r) for r in range(4)], before)
+        # Trọng số của lịch trễ = trọng số lịch không trễ dùng cho height trước đó
+        self.assertEqual(lagged.weights(20), plain.weights(19))
+        self.assertLess(plain.weights(19)["A"], plain.weights(19)["B"])
+        with self.assertRaises(ValueError):
+            ReputationSchedule(self.vs, lag=-1)
+
+    def test_cluster_in_reputation_mode(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=2, proposer_mode="reputation")
+        self.assertIsNot(cluster.nodes["0"].helper.proposer_schedule, cluster.nodes["1"].helper.proposer_schedule)
+        cluster.start()
+        cluster.network.run_until(300)
+        ledgers = cluster.ledgers()
+        heights = min(len(l) for l in ledgers.values())
+        self.assertGreaterEqual(heights, 5)
+        self.assertEqual(len({tuple(e["hash"] for e in l[:heights]) for l in ledgers.values()}), 1)
+        self.assertTrue(all(e["timestamp"] >= 0 for e in ledgers["0"]))
+
+    def test_proposal_timestamp_validated_in_reputation_mode(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=2, proposer_mode="reputation")
+        cluster.start()
+        cluster.network.run_until(100)
+        helper = cluster.nodes["1"].helper
+        self.assertEqual(helper.max_timestamp_drift_ms, MAX_TIMESTAMP_DRIFT_MS)
+        parent = helper.block_store[helper.ledger[-1]["hash"]]
+        received = []
+        helper.controller.on_proposal_received = lambda block, height, round_num: received.append(block.hash)
+        now = helper.now_ms()
+
+        def block(ts):
+            return Block(height=parent.height + 1, round=0, parent_hash=parent.hash, proposer="0", timestamp=ts)
+
+        # Đóng dấu vượt đồng hồ local, hoặc không lớn hơn block cha: không prevote
+        for ts in (now + MAX_TIMESTAMP_DRIFT_MS + 100.0, parent.timestamp):
+            helper._on_proposal_block(block(ts), parent.height + 1, 0)
+        self.assertEqual(received, [])
+        good = block(now)
+        helper._on_proposal_block(good, parent.height + 1, 0)
+        self.assertEqual(received, [good.hash])
+        # Proposal tự dựng luôn sau block cha kể cả khi đồng hồ local không chạy kịp
+        helper.block_store[good.hash] = good
+        self.assertGreater(helper._proposal_timestamp(good.hash), good.timestamp)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.network.shm_runtime import ShmBroker, ShmRing, run_shm_cluster
+from src.network.simulator import NetworkConfig, NetworkSimulator
+from src.network.transport import decode_frame, encode_frame
+
+
+class TestShmRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = ShmRing.create(64)
+        self.addCleanup(self.ring.close)
+
+    def test_push_pop_fifo(self):
+        self.assertIsNone(self.ring.pop())
+        self.assertTrue(self.ring.push(b"a"))
+        self.assertTrue(self.ring.push(b"bcd"))
+        self.assertEqual(self.ring.pop(), b"a")
+        self.assertEqual(self.ring.pop(), b"bcd")
+        self.assertIsNone(self.ring.pop())
+
+    def test_wrap_around_and_full(self):
+        reader = ShmRing.attach(self.ring.name)
+        self.addCleanup(reader.close)
+        for i in range(20):
+            data = bytes([i]) * 20
+            self.assertTrue(self.ring.push(data))
+            self.assertEqual(reader.pop(), data)
+        # 64 byte: hai bản ghi 4+26 byte vừa, bản thứ ba không
+        self.assertTrue(self.ring.push(b"x" * 26))
+        self.assertTrue(self.ring.push(b"y" * 26))
+        self.assertFalse(self.ring.push(b"z"))
+        self.assertEqual(reader.pop(), b"x" * 26)
+        self.assertTrue(self.ring.push(b"z"))
+        with self.assertRaises(ValueError):
+            self.ring.push(b"q" * 100)
+
+
+class TestShmBroker(unittest.TestCase):
+    def _broker(self, config, time_scale=1.0):
+        rings = {}
+        for key in ("inA", "inB", "outA", "outB"):
+            rings[key] = ShmRing.create(4096)
+            self.addCleanup(rings[key].close)
+        broker = ShmBroker(["A", "B"], {"A": rings["inA"], "B": rings["inB"]},
+                           {"A": rings["outA"], "B": rings["outB"]},
+                           NetworkSimulator(seed=1, config=config), time_scale=time_scale)
+        return broker, rings
+
+    @staticmethod
+    def _frame(kind, header_id):
+        return encode_frame({"type": kind, "header_id": header_id, "height": 1, "from": "A", "to": "B",
+                             "payload": {}})[4:]
+
+    def _drain(self, broker, ring, count, timeout_s=2.0):
+        got = []
+        deadline = time.monotonic() + timeout_s
+        while len(got) < count and time.monotonic() < deadline:
+            broker.poll()
+            body = ring.pop()
+            if body is not None:
+                got.append(decode_frame(body))
+        return got
+
+    def test_body_never_overtakes_header(self):
+        broker, rings = self._broker(NetworkConfig(base_delay_ms=1, jitter_ms=20))
+        # Body định tuyến khi header còn đang bay: bị từ chối như NetworkSimulator.send_body
+        rings["outA"].push(self._frame("HEADER", "h1"))
+        rings["outA"].push(self._frame("BODY", "h1"))
+        self.assertEqual([m["type"] for m in self._drain(broker, rings["inB"], 1)], ["HEADER"])
+        self.assertEqual(broker.stats["body_rejected_missing_header"], 1)
+        rings["outA"].push(self._frame("BODY", "h1"))
+        self.assertEqual([m["type"] for m in self._drain(broker, rings["inB"], 1)], ["BODY"])
+
+    def test_time_scale_speeds_up_model_clock(self):
+        broker, rings = self._broker(NetworkConfig(base_delay_ms=2_000, jitter_ms=0), time_scale=1_000)
+        rings["outA"].push(self._frame("HEADER", "h1"))
+        started = time.monotonic()
+        self.assertEqual(len(self._drain(broker, rings["inB"], 1)), 1)
+        self.assertLess(time.monotonic() - started, 1.0)
+
+
+class TestShmCluster(unittest.TestCase):
+    def test_process_cluster_agrees(self):
+        cfg = NetworkConfig(base_delay_ms=2, jitter_ms=1, drop_rate=0.0, duplicate_rate=0.0)
+        results = run_shm_cluster(num_nodes=4, target_height=3, config=cfg, timeout_s=60)
+        nodes = {nid: r for nid, r in results.items() if nid != "broker"}
+        self.assertEqual(len(nodes), 4)
+        self.assertEqual(len({tuple(r["ledger_hashes"]) for r in nodes.values()}), 1)
+        self.assertEqual(len({r["state_root"] for r in nodes.values()}), 1)
+        self.assertEqual(results["broker"]["stats"]["body_rejected_missing_header"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
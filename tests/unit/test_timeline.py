@@ -0,0 +1,62 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.simulator.cluster import build_consensus_cluster
+from src.simulator.timeline import ChromeTraceExporter
+
+
+class TestChromeTrace(unittest.TestCase):
+    def test_export_streams_valid_trace(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=4, network_kwargs={"keep_logs": False})
+        path = os.path.join(tempfile.mkdtemp(), "run.trace.json")
+        with ChromeTraceExporter(path).attach(cluster):
+            cluster.start()
+            cluster.network.run_until(120)
+        # keep_logs=False: log không giữ trong bộ nhớ nhưng timeline vẫn đầy đủ
+        self.assertEqual(cluster.network.logs(), [])
+
+        with open(path, "r", encoding="utf-8") as f:
+            events = json.load(f)
+        names = {e["args"]["name"] for e in events if e["ph"] == "M" and e["name"] == "process_name"}
+        self.assertEqual(names, {f"node {i}" for i in range(4)})
+
+        spans = [e for e in events if e["ph"] == "X"]
+        self.assertEqual({e["name"] for e in spans}, {"PROPOSE", "PREVOTE", "PRECOMMIT"})
+        self.assertTrue(all(e["dur"] >= 0 for e in spans))
+
+        starts = {e["id"] for e in events if e["ph"] == "s"}
+        finishes = {e["id"] for e in events if e["ph"] == "f"}
+        self.assertTrue(finishes)
+        self.assertLessEqual(finishes, starts)
+
+        commits = [e for e in events if e["ph"] == "i" and e["name"] == "commit"]
+        ledgers = cluster.ledgers()
+        self.assertEqual(len(commits), sum(len(l) for l in ledgers.values()))
+
+    def test_timeouts_are_instant_events(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=1, auto_advance=False)
+        net = cluster.network
+        proposer = cluster.nodes["0"].helper.get_proposer(1, 0)
+        for nid in cluster.node_ids:
+            if nid != proposer:
+                net.block_link(proposer, nid)
+        buf = io.StringIO()
+        exporter = ChromeTraceExporter(buf).attach(cluster)
+        cluster.start()
+        net.run_until(5000)
+        exporter.close()
+        events = json.loads(buf.getvalue())
+        timeouts = [e for e in events if e["ph"] == "i" and e["name"] == "timeout"]
+        # Các node không nhận được proposal timeout ở PROPOSE
+        propose_timeouts = {e["pid"] for e in timeouts if e["args"]["step"] == "PROPOSE"}
+        self.assertEqual(len(propose_timeouts), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.constants import ConsensusStep, TIMEOUT_PROPOSE, TIMEOUT_PREVOTE
+from src.consensus.timeouts import TimeoutPolicy
+from src.simulator.cluster import build_consensus_cluster
+
+
+class TestTimeoutPolicy(unittest.TestCase):
+    def test_linear_backoff_defaults_to_constants(self):
+        policy = TimeoutPolicy()
+        self.assertEqual(policy.timeout(ConsensusStep.PROPOSE, 0), TIMEOUT_PROPOSE)
+        self.assertEqual(policy.timeout(ConsensusStep.PREVOTE, 2), TIMEOUT_PREVOTE + 2 * policy.delta_s)
+
+    def test_exponential_backoff_is_capped(self):
+        policy = TimeoutPolicy(base={ConsensusStep.PROPOSE: 1.0}, backoff="exponential", factor=2.0, max_s=5.0)
+        self.assertEqual([policy.timeout(ConsensusStep.PROPOSE, r) for r in range(5)], [1.0, 2.0, 4.0, 5.0, 5.0])
+
+    def test_unknown_backoff_rejected(self):
+        with self.assertRaises(ValueError):
+            TimeoutPolicy(backoff="fibonacci")
+
+    def test_static_policy_ignores_observations(self):
+        policy = TimeoutPolicy()
+        for _ in range(50):
+            policy.observe(ConsensusStep.PROPOSE, 10.0)
+        self.assertEqual(policy.base(ConsensusStep.PROPOSE), TIMEOUT_PROPOSE)
+
+    def test_adaptive_shrinks_and_grows_toward_percentile(self):
+        policy = TimeoutPolicy(adaptive=True, margin=2.0, min_samples=4, alpha=1.0)
+        for _ in range(3):
+            policy.observe(ConsensusStep.PROPOSE, 20.0)
+        # Chưa đủ mẫu -> giữ giá trị tĩnh
+        self.assertEqual(policy.base(ConsensusStep.PROPOSE), TIMEOUT_PROPOSE)
+        policy.observe(ConsensusStep.PROPOSE, 20.0)
+        self.assertAlmostEqual(policy.base(ConsensusStep.PROPOSE), 0.04)
+        # Link chậm (xuyên vùng): timeout giãn theo
+        slow = TimeoutPolicy(adaptive=True, margin=2.0, min_samples=4, alpha=1.0, window=4)
+        for _ in range(4):
+            slow.observe(ConsensusStep.PREVOTE, 2500.0)
+        self.assertAlmostEqual(slow.base(ConsensusStep.PREVOTE), 5.0)
+
+    def test_adaptive_respects_bounds_and_alpha(self):
+        policy = TimeoutPolicy(adaptive=True, min_samples=1, alpha=0.5, min_s=0.05)
+        policy.observe(ConsensusStep.PROPOSE, 0.0)
+        self.assertAlmostEqual(policy.base(ConsensusStep.PROPOSE), (TIMEOUT_PROPOSE + 0.05) / 2)
+
+    def test_deterministic_mode_has_no_jitter(self):
+        a = TimeoutPolicy(seed=1)
+        self.assertEqual({a.timeout(ConsensusStep.PROPOSE, 1) for _ in range(10)}, {TIMEOUT_PROPOSE + a.delta_s})
+        b = TimeoutPolicy(deterministic=False, jitter_fraction=0.1, seed=1)
+        values = [b.timeout(ConsensusStep.PROPOSE, 0) for _ in range(20)]
+        self.assertGreater(len(set(values)), 1)
+        self.assertTrue(all(abs(v - TIMEOUT_PROPOSE) <= 0.1 * TIMEOUT_PROPOSE + 1e-9 for v in values))
+
+    def test_checkpoint_restore(self):
+        policy = TimeoutPolicy(adaptive=True, min_samples=2, alpha=1.0)
+        policy.observe(ConsensusStep.PROPOSE, 30.0)
+        snap = policy.checkpoint()
+        policy.observe(ConsensusStep.PROPOSE, 30.0)
+        changed = policy.base(ConsensusStep.PROPOSE)
+        policy.restore(snap)
+        self.assertEqual(policy.base(ConsensusStep.PROPOSE), TIMEOUT_PROPOSE)
+        policy.observe(ConsensusStep.PROPOSE, 30.0)
+        self.assertEqual(policy.base(ConsensusStep.PROPOSE), changed)
+
+
+class TestControllerTimeouts(unittest.TestCase):
+    def test_adaptive_cluster_learns_step_durations(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=3, timeout_kwargs={"adaptive": True})
+        cluster.start()
+        cluster.network.run_until(2_000)
+        ledgers = cluster.ledgers()
+        self.assertGreater(len(ledgers["0"]), 20)
+        policy = cluster.nodes["0"].controller.timeout_policy
+        # Bước mất vài ms trên mạng 5ms -> timeout co xa dưới giá trị tĩnh
+        self.assertLess(policy.base(ConsensusStep.PREVOTE), TIMEOUT_PREVOTE / 10)
+        self.assertLess(policy.base(ConsensusStep.PRECOMMIT), TIMEOUT_PREVOTE / 10)
+
+    def test_round_timeouts_grow_in_controller(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=0)
+        scheduled = []
+        net = cluster.network
+        original = net.schedule_timer
+        net.schedule_timer = lambda node, delay, payload: (scheduled.append((payload["round"], delay)),
+                                                           original(node, delay, payload))[1]
+        # Cắt mọi link: chỉ có timeout, round tăng dần
+        for a in cluster.node_ids:
+            for b in cluster.node_ids:
+                if a != b:
+                    net.set_link_profile(a, b, drop_rate=1.0)
+        cluster.start()
+        net.run_until(30_000)
+        by_round = {}
+        for round_num, delay in scheduled:
+            by_round.setdefault(round_num, set()).add(delay)
+        self.assertIn(3, by_round)
+        self.assertLess(max(by_round[0]), max(by_round[3]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import sys
+import unittest
+from collections import Counter
+
+sys.path.append(os.path.abspath("."))
+
+from src.mempool import Mempool, SeenSet, TxGossip, tx_hash
+from src.network.replay import LogReplayNetwork
+from src.network.simulator import NetworkConfig, NetworkSimulator
+from src.simulator.cluster import build_consensus_cluster
+
+
+class _CountingNetwork(NetworkSimulator):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = Counter()
+        self.drop_bodies_to = set()
+
+    def send_header(self, sender, receiver, header_id, height, payload):
+        self.sent[sender, payload.get("type")] += 1
+        super().send_header(sender, receiver, header_id, height, payload)
+
+    def send_body(self, sender, receiver, header_id, height, payload):
+        # Rơi thân tx đầu tiên gửi tới receiver trong drop_bodies_to
+        if receiver in self.drop_bodies_to:
+            self.drop_bodies_to.discard(receiver)
+            return
+        super().send_body(sender, receiver, header_id, height, payload)
+
+
+def _tx(i, nonce=1):
+    return {"sender": f"U{i}", "key": f"U{i}/k", "value": i, "nonce": nonce}
+
+
+def _cluster(**kwargs):
+    cfg = NetworkConfig(base_delay_ms=5, jitter_ms=1, drop_rate=0.0, duplicate_rate=0.0,
+                        link_bandwidth_bytes_per_ms=1000)
+    return build_consensus_cluster(num_nodes=4, seed=4, config=cfg, network_cls=_CountingNetwork, **kwargs)
+
+
+class TestTxGossip(unittest.TestCase):
+    def test_inventory_fetches_each_body_once_per_node(self):
+        cluster = _cluster()
+        for i in range(50):
+            self.assertEqual(cluster.submit_tx(_tx(i), node_id="0"), 1)
+        cluster.network.run_until_idle()
+        for node in cluster.nodes.values():
+            self.assertEqual(len(node.mempool), 50)
+            self.assertEqual(node.gossip.stats["duplicates"], 0)
+        self.assertEqual(sum(n.gossip.stats["bodies_sent"] for n in cluster.nodes.values()), 3 * 50)
+        # Cùng một khoảng announce: một INV cho mỗi peer
+        self.assertEqual(cluster.network.sent["0", "TX_INV"], 3)
+
+    def test_flood_mode_sends_duplicates(self):
+        cluster = _cluster(gossip_kwargs={"mode": "flood"})
+        for i in range(10):
+            cluster.submit_tx(_tx(i), node_id="0")
+        cluster.network.run_until_idle()
+        self.assertTrue(all(len(n.mempool) == 10 for n in cluster.nodes.values()))
+        self.assertGreater(sum(n.gossip.stats["duplicates"] for n in cluster.nodes.values()), 0)
+
+    def test_lost_body_is_requested_from_another_announcer(self):
+        cluster = _cluster(gossip_kwargs={"request_timeout_ms": 50})
+        cluster.network.drop_bodies_to.add("1")
+        cluster.submit_tx(_tx(1), node_id="0")
+        cluster.network.run_until_idle()
+        gossip = cluster.nodes["1"].gossip
+        self.assertIn(tx_hash(_tx(1)), cluster.nodes["1"].mempool)
+        self.assertEqual(gossip.stats["requested"], 2)
+        self.assertEqual(gossip._requested, {})
+
+    def test_rejected_tx_not_relayed(self):
+        cluster = _cluster()
+        self.assertEqual(cluster.submit_tx({"sender": "U1", "key": "U2/k", "value": 1, "nonce": 1},
+                                           node_id="0"), 0)
+        cluster.network.run_until_idle()
+        self.assertEqual(cluster.network.sent["0", "TX_INV"], 0)
+
+    def test_gossiped_txs_are_committed(self):
+        cluster = _cluster(mempool_kwargs={"block_max_txs": 20})
+        cluster.start()
+        net = cluster.network
+        for i in range(100):
+            cluster.submit_tx(_tx(i % 25, nonce=i // 25 + 1), node_id=str(i % 4))
+            net.run_until(net.now_ms + 1)
+        net.run_until(net.now_ms + 1_000)
+        helper = cluster.nodes["0"].helper
+        committed = [tx for e in helper.ledger for tx in helper.block_store[e["hash"]].txs]
+        self.assertEqual(len(committed), 100)
+        self.assertEqual(len({tx_hash(tx) for tx in committed}), 100)
+        self.assertTrue(all(len(n.mempool) == 0 for n in cluster.nodes.values()))
+
+    def test_inv_on_network_without_timers(self):
+        net = LogReplayNetwork([])
+        gossip = TxGossip("0", ["1", "2"], net, Mempool())
+        gossip.on_message({"header_id": "txinv-1-1", "payload": {"type": "TX_INV", "from": "1",
+                                                                  "ids": [tx_hash(_tx(1))]}})
+        self.assertIn(tx_hash(_tx(1)), gossip._requested)
+        self.assertEqual(gossip.stats["requested"], 1)
+        self.assertTrue(gossip.submit(_tx(2)))
+
+    def test_seen_set_is_bounded(self):
+        seen = SeenSet(2)
+        for item in ("a", "b", "c"):
+            seen.add(item)
+        self.assertEqual(len(seen), 2)
+        self.assertNotIn("a", seen)
+        self.assertIn("c", seen)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import random
+import sys
+import time
+import unittest
+from collections import Counter
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.engine import ConsensusEngine
+from src.consensus.messages import Vote as EngineVote
+from src.consensus.proposer import ProposerSchedule
+from src.consensus.validator_set import ValidatorSet
+from src.consensus.vote_tally import VoteTally
+from src.simulator.cluster import build_consensus_cluster
+
+
+class TestValidatorSet(unittest.TestCase):
+    def test_thresholds_precomputed(self):
+        vs = ValidatorSet(["A", "B", "C", "D"])
+        self.assertEqual((vs.total_power, vs.quorum_power, vs.f_plus_one_power), (4, 3, 2))
+        weighted = ValidatorSet({"A": 50, "B": 30, "C": 10, "D": 10})
+        self.assertEqual((weighted.total_power, weighted.quorum_power, weighted.f_plus_one_power), (100, 67, 34))
+        self.assertTrue(weighted.has_quorum(["A", "C", "D"]))
+        self.assertFalse(weighted.has_quorum(["B", "C", "D"]))
+        self.assertTrue(weighted.has_f_plus_one(["A"]))
+        with self.assertRaises(ValueError):
+            ValidatorSet({"A": 0})
+
+    def test_uniform_rotation_matches_sorted_round_robin(self):
+        ids = ["2", "0", "3", "1"]
+        vs = ValidatorSet(ids)
+        for height in range(1, 6):
+            for round_num in range(3):
+                self.assertEqual(vs.proposer(height, round_num), sorted(ids)[(height + round_num) % 4])
+
+    def test_weighted_rotation_follows_stake(self):
+        vs = ValidatorSet({"A": 4, "B": 2, "C": 2})
+        cycle = vs.proposer_cycle()
+        self.assertEqual(Counter(cycle), {"A": 2, "B": 1, "C": 1})
+        # Rotation "mượt": validator nặng nhất không đề xuất hai lần liên tiếp ở đây
+        self.assertEqual(cycle, ["A", "B", "C", "A"])
+
+    def test_large_stakes_computed_incrementally(self):
+        powers = {"A": 100003, "B": 99991, "C": 7, "D": 5}
+        vs = ValidatorSet(powers)
+        # Tham chiếu: weighted round-robin từng bước trên power gốc
+        ids, total = sorted(powers), sum(powers.values())
+        priority, expected = dict.fromkeys(ids, 0), []
+        for _ in range(3_000):
+            for v in ids:
+                priority[v] += powers[v]
+            best = max(ids, key=lambda v: (priority[v], -ids.index(v)))
+            priority[best] -= total
+            expected.append(best)
+        self.assertEqual([vs.proposer_at(slot) for slot in range(3_000)], expected)
+        # Tra ngược (round change, look-ahead) cho cùng kết quả
+        for slot in (2_999, 5, 1_500, 1_024, 2_048):
+            self.assertEqual(vs.proposer_at(slot), expected[slot])
+        with self.assertRaises(ValueError):
+            vs.proposer_cycle()
+
+    def test_production_scale_stakes(self):
+        rng = random.Random(4)
+        stakes = {f"v{i:02d}": rng.randint(1, 5) * 1_000_000 + rng.randint(0, 999) for i in range(64)}
+        started = time.perf_counter()
+        schedule = ProposerSchedule(ValidatorSet(stakes))
+        proposers = [schedule.proposer(h, 0) for h in range(1, 2_001)]
+        self.assertLess(time.perf_counter() - started, 5.0)
+        top = max(stakes, key=stakes.get)
+        self.assertGreater(proposers.count(top), 2_000 * stakes[top] // sum(stakes.values()) - 3)
+        height = schedule.next_height_for(top, 1)
+        self.assertEqual(schedule.proposer(height, 0), top)
+
+    def test_tally_accumulates_power(self):
+        fired = []
+        tally = VoteTally(ValidatorSet({"A": 5, "B": 1, "C": 1, "D": 1}), on_quorum=lambda *k: fired.append(k))
+        self.assertEqual(tally.threshold, 6)
+        self.assertEqual(tally.add(1, 0, "PRECOMMIT", "h", "B"), 1)
+        self.assertEqual(tally.add(1, 0, "PRECOMMIT", "h", "A"), 6)
+        self.assertEqual(fired, [(1, 0, "PRECOMMIT", "h")])
+        tally.add(1, 0, "PRECOMMIT", "h", "C")
+        self.assertEqual(len(fired), 1)
+
+    def test_engine_uses_weighted_quorum(self):
+        engine = ConsensusEngine("A", 4, validator_set=ValidatorSet({"A": 1, "B": 1, "C": 1, "D": 4}))
+        self.assertIsNone(engine.process_vote(EngineVote("A", 1, "h", "PREVOTE")))
+        self.assertEqual(engine.process_vote(EngineVote("D", 1, "h", "PREVOTE")), "SEND_PRECOMMIT")
+
+    def test_weighted_cluster_commits(self):
+        cluster = build_consensus_cluster(num_nodes=4, seed=1, voting_power={"0": 5, "1": 1, "2": 1, "3": 1})
+        cluster.start()
+        cluster.network.run_until(400)
+        ledgers = cluster.ledgers()
+        heights = min(len(l) for l in ledgers.values())
+        self.assertGreaterEqual(heights, 3)
+        self.assertEqual(len({tuple(e["hash"] for e in l[:heights]) for l in ledgers.values()}), 1)
+        proposers = [e["proposer"] for e in ledgers["0"][:heights]]
+        self.assertGreater(proposers.count("0"), proposers.count("1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath("."))
+
+from src.consensus.constants import ConsensusStep
+from src.consensus.engine import ConsensusEngine
+from src.consensus.messages import Vote as EngineVote
+from src.consensus.types import Vote
+from src.consensus.vote_set import VoteSet
+from src.consensus.vote_tally import VoteTally
+
+
+class TestVoteTally(unittest.TestCase):
+    def setUp(self):
+        self.fired = []
+        self.tally = VoteTally(["D", "C", "B", "A"], on_quorum=lambda *k: self.fired.append(k))
+
+    def test_quorum_fires_exactly_once(self):
+        self.assertEqual(self.tally.threshold, 3)
+        for voter in ("A", "B", "C", "D"):
+            self.tally.add(1, 0, "PREVOTE", "h1", voter)
+        self.assertEqual(self.fired, [(1, 0, "PREVOTE", "h1")])
+        self.assertEqual(self.tally.count(1, 0, "PREVOTE", "h1"), 4)
+        self.assertTrue(self.tally.has_quorum(1, 0, ConsensusStep.PREVOTE, "h1"))
+        self.assertEqual(self.tally.bitset(1, 0, "PREVOTE", "h1"), 0b1111)
+
+    def test_duplicates_equivocation_and_unknown_validators(self):
+        self.assertEqual(self.tally.add(1, 0, "PREVOTE", "h1", "A"), 1)
+        self.assertIsNone(self.tally.add(1, 0, "PREVOTE", "h1", "A"))
+        self.assertIsNone(self.tally.add(1, 0, "PREVOTE", "h2", "A"))
+        self.assertIsNone(self.tally.add(1, 0, "PREVOTE", "h1", "Z"))
+        # Round khác, phase khác là phiếu độc lập
+        self.assertEqual(self.tally.add(1, 1, "PREVOTE", "h2", "A"), 1)
+        self.assertEqual(self.tally.add(1, 0, "PRECOMMIT", "h1", "A"), 1)
+        self.assertTrue(self.tally.has_voted(1, 0, "PREVOTE", "A"))
+        self.assertFalse(self.tally.has_voted(1, 0, "PREVOTE", "B"))
+
+    def test_tracks_several_hashes_in_parallel(self):
+        self.tally.add(2, 0, "PREVOTE", "h1", "A")
+        self.tally.add(2, 0, "PREVOTE", "NIL", "B")
+        self.tally.add(2, 0, "PREVOTE", "h1", "C")
+        self.assertEqual(self.tally.block_counts(2, 0, "PREVOTE"), {"h1": 2, "NIL": 1})
+        self.assertEqual(self.tally.voters(2, 0, "PREVOTE", "h1"), ["A", "C"])
+        self.assertEqual(self.tally.by_phase(2, 0), {"PREVOTE": {"h1": {"A", "C"}, "NIL": {"B"}}})
+        self.assertEqual(self.fired, [])
+
+    def test_prune_and_checkpoint(self):
+        self.tally.add(1, 0, "PREVOTE", "h1", "A")
+        snap = self.tally.checkpoint()
+        self.tally.add(2, 0, "PREVOTE", "h2", "A")
+        self.tally.prune(2)
+        self.assertEqual(self.tally.count(1, 0, "PREVOTE", "h1"), 0)
+        self.assertEqual(self.tally.count(2, 0, "PREVOTE", "h2"), 1)
+        self.tally.restore(snap)
+        self.assertEqual(self.tally.count(1, 0, "PREVOTE", "h1"), 1)
+        self.assertEqual(self.tally.count(2, 0, "PREVOTE", "h2"), 0)
+
+
+class TestTallyUsers(unittest.TestCase):
+    def test_engine_signals_once_and_keeps_votes_view(self):
+        engine = ConsensusEngine(my_id="0", total_nodes=4)
+        results = [engine.process_vote(EngineVote(v, 1, "h1", "PREVOTE")) for v in ("1", "2", "3", "0")]
+        self.assertEqual(results, [None, None, "SEND_PRECOMMIT", None])
+        self.assertEqual(engine.votes[1]["PREVOTE"]["h1"], {"0", "1", "2", "3"})
+        self.assertEqual(len(engine.votes[1]["PRECOMMIT"]["h1"]), 0)
+
+    def test_vote_set_counts_incrementally(self):
+        vote_set = VoteSet(validators=["A", "B", "C"])
+        step = ConsensusStep.PREVOTE
+        self.assertTrue(vote_set.add_vote(Vote(1, 0, "h1", step, "A")))
+        self.assertTrue(vote_set.add_vote(Vote(1, 0, "h1", step, "B")))
+        self.assertFalse(vote_set.add_vote(Vote(1, 0, "h2", step, "B")))
+        self.assertFalse(vote_set.add_vote(Vote(1, 0, "h1", step, "X")))
+        self.assertEqual(vote_set.count_for_block(1, 0, step, "h1"), 2)
+        self.assertEqual(len(vote_set.get_votes(1, 0, step)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()